@@ -0,0 +1,43 @@
+"""add expense_search_tokens and users.search_indexed_at
+
+Revision ID: a9b0c1d2e3f4
+Revises: f8a9b0c1d2e3
+Create Date: 2026-10-17 12:00:00.000000
+
+expense_search_tokens holds keyed-HMAC name trigrams and exact category/tag
+tokens per expense, so /expenses/search and /insights/search narrow
+candidates in SQL. Existing accounts (search_indexed_at IS NULL) are
+indexed by the build_missing_search_indexes scheduler job, or in bulk with
+`python scripts/migrate.py rebuild-search-index`; until then their searches
+scan every expense.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'a9b0c1d2e3f4'
+down_revision = 'f8a9b0c1d2e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'expense_search_tokens',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column(
+            'expense_id', sa.Integer(),
+            sa.ForeignKey('monthly_expenses.id', ondelete='CASCADE'), nullable=False,
+        ),
+        sa.Column('token', sa.String(32), nullable=False),
+    )
+    op.create_index('ix_expense_search_tokens_user_token', 'expense_search_tokens', ['user_id', 'token'])
+    op.create_index('ix_expense_search_tokens_expense_id', 'expense_search_tokens', ['expense_id'])
+    op.add_column('users', sa.Column('search_indexed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('users', 'search_indexed_at')
+    op.drop_index('ix_expense_search_tokens_expense_id', table_name='expense_search_tokens')
+    op.drop_index('ix_expense_search_tokens_user_token', table_name='expense_search_tokens')
+    op.drop_table('expense_search_tokens')
@@ -0,0 +1,51 @@
+"""add export_jobs and users.data_version
+
+Revision ID: b0c1d2e3f4a5
+Revises: a9b0c1d2e3f4
+Create Date: 2026-10-17 15:00:00.000000
+
+export_jobs tracks background PDF/backup/GDPR exports and their stored
+artifacts. users.data_version is bumped with every write to a user's
+exportable data, so identical export requests can reuse a finished job until
+the data changes.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'b0c1d2e3f4a5'
+down_revision = 'a9b0c1d2e3f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('data_version', sa.Integer(), nullable=False, server_default='0'))
+    op.create_table(
+        'export_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('kind', sa.String(20), nullable=False),
+        sa.Column('params', sa.String(255), nullable=False, server_default='{}'),
+        sa.Column('dedup_key', sa.String(64), nullable=False),
+        sa.Column('status', sa.String(16), nullable=False, server_default='pending'),
+        sa.Column('artifact_key', sa.String(255), nullable=True),
+        sa.Column('filename', sa.String(255), nullable=True),
+        sa.Column('media_type', sa.String(64), nullable=True),
+        sa.Column('size_bytes', sa.BigInteger(), nullable=True),
+        sa.Column('error', sa.String(255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_export_jobs_id', 'export_jobs', ['id'])
+    op.create_index('ix_export_jobs_user_dedup', 'export_jobs', ['user_id', 'dedup_key'])
+    op.create_index('ix_export_jobs_status', 'export_jobs', ['status'])
+
+
+def downgrade():
+    op.drop_index('ix_export_jobs_status', table_name='export_jobs')
+    op.drop_index('ix_export_jobs_user_dedup', table_name='export_jobs')
+    op.drop_index('ix_export_jobs_id', table_name='export_jobs')
+    op.drop_table('export_jobs')
+    op.drop_column('users', 'data_version')
@@ -0,0 +1,37 @@
+"""add csv_imports
+
+Revision ID: c1d2e3f4a5b6
+Revises: b0c1d2e3f4a5
+Create Date: 2026-10-17 18:00:00.000000
+
+csv_imports tracks parsed CSV uploads awaiting confirmation. The preview
+rows themselves are staged (encrypted) in artifact storage, so a large bank
+export can be paged through and confirmed without re-uploading it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'c1d2e3f4a5b6'
+down_revision = 'b0c1d2e3f4a5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'csv_imports',
+        sa.Column('id', sa.String(32), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('artifact_key', sa.String(255), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('duplicates_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('parse_errors', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_csv_imports_user_id', 'csv_imports', ['user_id'])
+
+
+def downgrade():
+    op.drop_index('ix_csv_imports_user_id', table_name='csv_imports')
+    op.drop_table('csv_imports')
@@ -0,0 +1,54 @@
+"""add month_bidx blind index to monthly_data
+
+Revision ID: c5d6e7f8a9b0
+Revises: b2c3d4e5f6a7
+Create Date: 2026-10-16 09:00:00.000000
+
+Adds a keyed-HMAC blind index of the (Fernet-encrypted) month so month
+lookups can use a (user_id, month_bidx) index instead of decrypting every
+row. Existing rows are backfilled here; if a user somehow has two rows for
+the same month, only the lowest id keeps its index value (the row the old
+linear scan would have returned) so the unique index can be created.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'c5d6e7f8a9b0'
+down_revision = 'b2c3d4e5f6a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('monthly_data', sa.Column('month_bidx', sa.String(64), nullable=True))
+
+    from database import decrypt_value, month_blind_index
+
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.text("SELECT id, user_id, month_encrypted FROM monthly_data ORDER BY id")
+    ).fetchall()
+    seen = set()
+    for row_id, user_id, month_encrypted in rows:
+        if not month_encrypted:
+            continue
+        bidx = month_blind_index(decrypt_value(month_encrypted))
+        if (user_id, bidx) in seen:
+            continue
+        seen.add((user_id, bidx))
+        conn.execute(
+            sa.text("UPDATE monthly_data SET month_bidx = :bidx WHERE id = :id"),
+            {"bidx": bidx, "id": row_id},
+        )
+
+    op.create_index(
+        'uq_monthly_data_user_month_bidx',
+        'monthly_data',
+        ['user_id', 'month_bidx'],
+        unique=True,
+    )
+
+
+def downgrade():
+    op.drop_index('uq_monthly_data_user_month_bidx', table_name='monthly_data')
+    op.drop_column('monthly_data', 'month_bidx')
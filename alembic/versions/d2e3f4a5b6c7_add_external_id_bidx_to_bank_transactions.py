@@ -0,0 +1,46 @@
+"""add external_id_bidx blind index to bank_transactions
+
+Revision ID: d2e3f4a5b6c7
+Revises: c1d2e3f4a5b6
+Create Date: 2026-10-17 20:00:00.000000
+
+Adds a keyed-HMAC blind index of the (Fernet-encrypted) provider transaction
+id so bank sync can deduplicate with an indexed IN query instead of
+decrypting every stored transaction. Existing rows are backfilled here.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'd2e3f4a5b6c7'
+down_revision = 'c1d2e3f4a5b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('bank_transactions', sa.Column('external_id_bidx', sa.String(64), nullable=True))
+
+    from database import decrypt_value, external_id_blind_index
+
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.text("SELECT id, external_id_encrypted FROM bank_transactions")
+    ).fetchall()
+    for row_id, external_id_encrypted in rows:
+        if not external_id_encrypted:
+            continue
+        conn.execute(
+            sa.text("UPDATE bank_transactions SET external_id_bidx = :bidx WHERE id = :id"),
+            {"bidx": external_id_blind_index(decrypt_value(external_id_encrypted)), "id": row_id},
+        )
+
+    op.create_index(
+        'ix_bank_transactions_connection_external_bidx',
+        'bank_transactions',
+        ['bank_connection_id', 'external_id_bidx'],
+    )
+
+
+def downgrade():
+    op.drop_index('ix_bank_transactions_connection_external_bidx', table_name='bank_transactions')
+    op.drop_column('bank_transactions', 'external_id_bidx')
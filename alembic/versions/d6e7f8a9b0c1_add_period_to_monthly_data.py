@@ -0,0 +1,43 @@
+"""add order-preserving period key to monthly_data
+
+Revision ID: d6e7f8a9b0c1
+Revises: c5d6e7f8a9b0
+Create Date: 2026-10-16 11:00:00.000000
+
+Adds monthly_data.period — a keyed, order-preserving encoding of the
+(Fernet-encrypted) month — plus a (user_id, period) index so year and
+from/to range filters can run as SQL BETWEEN scans. Existing rows are
+backfilled by decrypting month_encrypted once.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'd6e7f8a9b0c1'
+down_revision = 'c5d6e7f8a9b0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('monthly_data', sa.Column('period', sa.BigInteger(), nullable=True))
+
+    from database import decrypt_value, month_period_key
+
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.text("SELECT id, month_encrypted FROM monthly_data")
+    ).fetchall()
+    for row_id, month_encrypted in rows:
+        if not month_encrypted:
+            continue
+        conn.execute(
+            sa.text("UPDATE monthly_data SET period = :period WHERE id = :id"),
+            {"period": month_period_key(decrypt_value(month_encrypted)), "id": row_id},
+        )
+
+    op.create_index('ix_monthly_data_user_period', 'monthly_data', ['user_id', 'period'])
+
+
+def downgrade():
+    op.drop_index('ix_monthly_data_user_period', table_name='monthly_data')
+    op.drop_column('monthly_data', 'period')
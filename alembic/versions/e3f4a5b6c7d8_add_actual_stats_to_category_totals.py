@@ -0,0 +1,55 @@
+"""add actual_stats to monthly_category_totals
+
+Revision ID: e3f4a5b6c7d8
+Revises: d2e3f4a5b6c7
+Create Date: 2026-10-17 21:00:00.000000
+
+Each rollup cell gains the running mean/variance (count, mean, M2) of its
+category's individual actual amounts, so spending-anomaly checks combine a
+few per-month summaries instead of re-reading every historical expense.
+Existing cells are backfilled here by decrypting each expense once.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'e3f4a5b6c7d8'
+down_revision = 'd2e3f4a5b6c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'monthly_category_totals',
+        sa.Column('actual_stats_encrypted', sa.String(512), nullable=True),
+    )
+
+    from core.stats import RunningStats
+    from database import decrypt_value, encrypt_value
+
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        "SELECT monthly_data_id, category_encrypted, actual_amount_encrypted "
+        "FROM monthly_expenses WHERE deleted_at IS NULL ORDER BY id"
+    )).fetchall()
+    stats = {}
+    for month_id, cat_enc, actual_enc in rows:
+        cat = (decrypt_value(cat_enc) if cat_enc else None) or "Other"
+        actual = float(decrypt_value(actual_enc)) if actual_enc else 0.0
+        stats[(month_id, cat)] = stats.get((month_id, cat), RunningStats()).add(actual)
+
+    cells = conn.execute(sa.text(
+        "SELECT id, monthly_data_id, category_encrypted FROM monthly_category_totals"
+    )).fetchall()
+    for cell_id, month_id, cat_enc in cells:
+        cell_stats = stats.get((month_id, decrypt_value(cat_enc)))
+        if cell_stats is None:
+            continue
+        conn.execute(
+            sa.text("UPDATE monthly_category_totals SET actual_stats_encrypted = :stats WHERE id = :id"),
+            {"stats": encrypt_value(cell_stats.encode()), "id": cell_id},
+        )
+
+
+def downgrade():
+    op.drop_column('monthly_category_totals', 'actual_stats_encrypted')
@@ -0,0 +1,74 @@
+"""add monthly_category_totals rollup table
+
+Revision ID: e7f8a9b0c1d2
+Revises: d6e7f8a9b0c1
+Create Date: 2026-10-16 13:00:00.000000
+
+Per-(month, category) encrypted planned/actual sums of non-deleted expenses,
+kept current by session hooks in database.py. Existing months are backfilled
+here by decrypting each expense once.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'e7f8a9b0c1d2'
+down_revision = 'd6e7f8a9b0c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'monthly_category_totals',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column(
+            'monthly_data_id', sa.Integer(),
+            sa.ForeignKey('monthly_data.id', ondelete='CASCADE'), nullable=False,
+        ),
+        sa.Column('category_encrypted', sa.String(512), nullable=False),
+        sa.Column('planned_total_encrypted', sa.String(512), nullable=True),
+        sa.Column('actual_total_encrypted', sa.String(512), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        'ix_monthly_category_totals_monthly_data_id',
+        'monthly_category_totals',
+        ['monthly_data_id'],
+    )
+
+    from datetime import datetime
+    from database import decrypt_value, encrypt_value
+
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        "SELECT monthly_data_id, category_encrypted, planned_amount_encrypted, actual_amount_encrypted "
+        "FROM monthly_expenses WHERE deleted_at IS NULL ORDER BY id"
+    )).fetchall()
+    totals = {}
+    for month_id, cat_enc, planned_enc, actual_enc in rows:
+        cat = (decrypt_value(cat_enc) if cat_enc else None) or "Other"
+        cell = totals.setdefault((month_id, cat), [0.0, 0.0])
+        cell[0] += float(decrypt_value(planned_enc)) if planned_enc else 0.0
+        cell[1] += float(decrypt_value(actual_enc)) if actual_enc else 0.0
+
+    now = datetime.utcnow()
+    for (month_id, cat), (planned, actual) in totals.items():
+        conn.execute(
+            sa.text(
+                "INSERT INTO monthly_category_totals "
+                "(monthly_data_id, category_encrypted, planned_total_encrypted, actual_total_encrypted, updated_at) "
+                "VALUES (:mid, :cat, :planned, :actual, :now)"
+            ),
+            {
+                "mid": month_id,
+                "cat": encrypt_value(cat),
+                "planned": encrypt_value(str(planned)),
+                "actual": encrypt_value(str(actual)),
+                "now": now,
+            },
+        )
+
+
+def downgrade():
+    op.drop_index('ix_monthly_category_totals_monthly_data_id', table_name='monthly_category_totals')
+    op.drop_table('monthly_category_totals')
@@ -0,0 +1,46 @@
+"""add job_runs and job_checkpoints for scheduler leader election
+
+Revision ID: f8a9b0c1d2e3
+Revises: e7f8a9b0c1d2
+Create Date: 2026-10-17 09:00:00.000000
+
+job_runs holds one lease row per scheduler job so only one replica runs it;
+job_checkpoints records committed chunks so an interrupted run resumes.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'f8a9b0c1d2e3'
+down_revision = 'e7f8a9b0c1d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'job_runs',
+        sa.Column('job_name', sa.String(64), primary_key=True),
+        sa.Column('holder', sa.String(128), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+        sa.Column('run_key', sa.String(64), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        'job_checkpoints',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('job_name', sa.String(64), nullable=False),
+        sa.Column('run_key', sa.String(64), nullable=False),
+        sa.Column('first_item', sa.BigInteger(), nullable=False),
+        sa.Column('last_item', sa.BigInteger(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_job_checkpoints_id', 'job_checkpoints', ['id'])
+    op.create_index('ix_job_checkpoints_job_run', 'job_checkpoints', ['job_name', 'run_key'])
+
+
+def downgrade():
+    op.drop_index('ix_job_checkpoints_job_run', table_name='job_checkpoints')
+    op.drop_index('ix_job_checkpoints_id', table_name='job_checkpoints')
+    op.drop_table('job_checkpoints')
+    op.drop_table('job_runs')
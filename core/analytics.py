@@ -0,0 +1,277 @@
+"""
+Month × category spending matrix for the insights endpoints.
+
+SpendingMatrix loads a user's category rollup for a list of months once —
+one MonthlyData query plus one batch-decrypted rollup query — into NumPy
+arrays, so rolling windows, baselines, z-scores, growth rates and quartile
+bands are array operations instead of nested loops over dicts of floats.
+
+Layout: row i is ``months[i]`` (in the order asked for), column j is
+``categories[j]`` (sorted). ``actual``/``planned`` hold the rollup totals,
+0.0 where there is no cell; ``present`` marks the cells that exist, so a
+category with a genuine 0.0 month is told apart from one with no history.
+Per-month scalars (``total_actual``, ``salary_actual``) come from the
+MonthlyData row itself and ``has_row`` marks months that have one.
+
+InsightsContext is the per-request loader behind it: it memoises the
+user's MonthlyData rows and rollup cells, so several widgets computed for
+one request (see /insights/dashboard) share a single load and decrypt.
+"""
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from database import MonthlyData, category_totals_by_month, month_period_key, prefetch_decrypted
+
+
+def month_index(month: str) -> int:
+    """Months since year 0 for a "YYYY-MM" month, so differences count months."""
+    year, mo = map(int, month.split("-"))
+    return year * 12 + mo - 1
+
+
+def shift_month(month: str, delta: int) -> str:
+    """Return the "YYYY-MM" month *delta* months after (or before) *month*."""
+    index = month_index(month) + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def prior_months(month: str, count: int) -> List[str]:
+    """The *count* months before *month*, oldest first."""
+    return [shift_month(month, -i) for i in range(count, 0, -1)]
+
+
+class SpendingMatrix:
+    def __init__(
+        self,
+        months: List[str],
+        categories: List[str],
+        actual: np.ndarray,
+        planned: np.ndarray,
+        present: np.ndarray,
+        has_row: np.ndarray,
+        total_actual: np.ndarray,
+        salary_actual: np.ndarray,
+    ):
+        self.months = months
+        self.categories = categories
+        self.actual = actual
+        self.planned = planned
+        self.present = present
+        self.has_row = has_row
+        self.total_actual = total_actual
+        self.salary_actual = salary_actual
+        self._row = {m: i for i, m in enumerate(months)}
+
+    @classmethod
+    def from_totals(
+        cls,
+        months: List[str],
+        totals: Dict[str, Dict[str, Dict[str, float]]],
+        month_scalars: Optional[Dict[str, Dict[str, float]]] = None,
+    ) -> "SpendingMatrix":
+        """
+        Build from ``{month: {category: {"planned", "actual"}}}`` (the shape
+        category_totals_by_month returns) and optional per-month
+        ``{"total_actual", "salary_actual"}``. A month in either mapping
+        counts as having a row.
+        """
+        month_scalars = month_scalars or {}
+        categories = sorted({cat for m in months for cat in totals.get(m, {})})
+        col = {cat: j for j, cat in enumerate(categories)}
+
+        # Flatten the cells once, then scatter them with a single fancy-index
+        # assignment per array rather than element by element.
+        rows, cols, actuals, planneds = [], [], [], []
+        for i, m in enumerate(months):
+            for cat, vals in totals.get(m, {}).items():
+                rows.append(i)
+                cols.append(col[cat])
+                actuals.append(vals["actual"])
+                planneds.append(vals["planned"])
+        shape = (len(months), len(categories))
+        actual = np.zeros(shape)
+        planned = np.zeros(shape)
+        present = np.zeros(shape, dtype=bool)
+        index = (np.array(rows, dtype=int), np.array(cols, dtype=int))
+        actual[index] = actuals
+        planned[index] = planneds
+        present[index] = True
+
+        blank = {}
+        scalars = [month_scalars.get(m, blank) for m in months]
+        total_actual = np.array([s.get("total_actual", 0.0) for s in scalars], dtype=float)
+        salary_actual = np.array([s.get("salary_actual", 0.0) for s in scalars], dtype=float)
+        has_row = np.array([m in totals or m in month_scalars for m in months], dtype=bool)
+        return cls(months, categories, actual, planned, present, has_row, total_actual, salary_actual)
+
+    @classmethod
+    def load(cls, db, user_id: int, months: Iterable[str], cells: bool = True) -> "SpendingMatrix":
+        """
+        Load the user's rollup for *months* (any "YYYY-MM" list — contiguous
+        or not); see InsightsContext.matrix.
+        """
+        return InsightsContext(db, user_id).matrix(months, cells)
+
+    # ---------- selection ----------
+
+    def rows(self, months: Iterable[str]) -> np.ndarray:
+        """Row indices of *months* (which must be part of this matrix)."""
+        return np.array([self._row[m] for m in months], dtype=int)
+
+    def row(self, month: str) -> int:
+        return self._row[month]
+
+    def has_cells(self) -> np.ndarray:
+        """Per month: whether any category cell exists."""
+        return self.present.any(axis=1)
+
+    # ---------- statistics ----------
+
+    def rolling_mean(self, window: int) -> np.ndarray:
+        """
+        Trailing mean of ``actual`` over the last *window* months at each row
+        (missing cells count as 0.0). The first rows average over however
+        many months are available, so row 0 is just its own value.
+        """
+        csum = np.cumsum(self.actual, axis=0)
+        lagged = np.zeros_like(csum)
+        if window < len(csum):
+            lagged[window:] = csum[:-window]
+        counts = np.minimum(np.arange(1, len(csum) + 1), window)[:, None]
+        return (csum - lagged) / counts
+
+    def baseline(self, rows: np.ndarray):
+        """
+        Per-category (count, mean, std) of ``actual`` over the cells present
+        in *rows*. std is the population standard deviation, and exactly 0.0
+        when every present value is equal; mean/std are 0.0 where count is 0.
+        """
+        values = self.actual[rows]
+        mask = self.present[rows]
+        count = mask.sum(axis=0)
+        safe = np.maximum(count, 1)
+        mean = np.where(mask, values, 0.0).sum(axis=0) / safe
+        deviation = np.where(mask, values - mean, 0.0)
+        std = np.sqrt((deviation * deviation).sum(axis=0) / safe)
+        # Summing equal floats can leave the mean an ulp off; pin a flat
+        # history to its exact value so rounding noise isn't read as spread.
+        low = np.where(mask, values, np.inf).min(axis=0)
+        flat = low == np.where(mask, values, -np.inf).max(axis=0)
+        mean[flat] = low[flat]
+        std[flat] = 0.0
+        mean[count == 0] = 0.0
+        std[count == 0] = 0.0
+        return count, mean, std
+
+    def zscores(self, row: int, baseline_rows: np.ndarray):
+        """
+        Score row *row* against the baseline of *baseline_rows*: returns
+        (count, mean, std, z) per category, z being NaN where std is 0.
+        """
+        count, mean, std = self.baseline(baseline_rows)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = np.where(std > 0, (self.actual[row] - mean) / std, np.nan)
+        return count, mean, std, z
+
+    @staticmethod
+    def growth(previous: np.ndarray, current: np.ndarray) -> np.ndarray:
+        """Percentage change from *previous* to *current*; NaN where previous <= 0."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(previous > 0, (current - previous) / previous * 100, np.nan)
+
+    @staticmethod
+    def quartile_levels(amounts: np.ndarray) -> np.ndarray:
+        """
+        Intensity level per amount: 0 for no spend, otherwise 1–4 by which
+        quartile of the positive amounts it falls in. Quartile q is the
+        element at index ``int(n*q) - 1`` of the n sorted positive amounts.
+        """
+        positive = np.sort(amounts[amounts > 0])
+        if positive.size:
+            idx = np.maximum(0, (positive.size * np.array([0.25, 0.5, 0.75])).astype(int) - 1)
+            q1, q2, q3 = positive[idx]
+        else:
+            q1 = q2 = q3 = 0.0
+        levels = 1 + (amounts > q1).astype(int) + (amounts > q2) + (amounts > q3)
+        return np.where(amounts == 0, 0, levels)
+
+
+# Scalar MonthlyData columns the insights widgets read.
+ROW_FIELDS = ("month", "total_actual", "total_planned", "salary_actual", "salary_planned")
+
+
+class InsightsContext:
+    """
+    One user's budget data for the duration of a request. Month rows are
+    fetched on demand with one period IN query per call (only for months
+    not already seen) — or all at once by all_rows() — and their scalar
+    columns batch-decrypted; rollup cells are fetched the same way. Either
+    is read from the database at most once per month.
+    """
+
+    def __init__(self, db, user_id: int):
+        self.db = db
+        self.user_id = user_id
+        self._rows: Dict[str, Optional[MonthlyData]] = {}  # month -> row, None = no row
+        self._complete = False
+        self._totals: Dict[int, Dict[str, Dict[str, float]]] = {}  # monthly_data_id -> cells
+
+    def all_rows(self) -> List[MonthlyData]:
+        """Every MonthlyData row the user has, in no particular order."""
+        if not self._complete:
+            rows = prefetch_decrypted(
+                self.db.query(MonthlyData).filter(MonthlyData.user_id == self.user_id).all(),
+                *ROW_FIELDS,
+            )
+            self._rows = {r.month: r for r in rows if r.month}
+            self._complete = True
+        return [r for r in self._rows.values() if r is not None]
+
+    def month_rows(self, months: Iterable[str]) -> Dict[str, MonthlyData]:
+        """{month: row} for those of *months* that have a MonthlyData row."""
+        months = list(months)
+        missing = [] if self._complete else [m for m in months if m not in self._rows]
+        if missing:
+            period_to_month = {month_period_key(m): m for m in missing}
+            found = prefetch_decrypted(
+                self.db.query(MonthlyData)
+                .filter(
+                    MonthlyData.user_id == self.user_id,
+                    MonthlyData.period.in_(list(period_to_month)),
+                )
+                .all(),
+                *ROW_FIELDS,
+            )
+            by_month = {period_to_month[r.period]: r for r in found}
+            for m in missing:
+                self._rows[m] = by_month.get(m)
+        return {m: self._rows[m] for m in months if self._rows.get(m) is not None}
+
+    def month_row(self, month: str) -> Optional[MonthlyData]:
+        return self.month_rows([month]).get(month)
+
+    def category_totals(self, months: Iterable[str]) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """{month: {category: {"planned", "actual"}}} for those of *months* with a row."""
+        rows = self.month_rows(months)
+        missing = [r.id for r in rows.values() if r.id not in self._totals]
+        if missing:
+            self._totals.update(category_totals_by_month(self.db, missing))
+        return {m: self._totals[r.id] for m, r in rows.items()}
+
+    def matrix(self, months: Iterable[str], cells: bool = True) -> SpendingMatrix:
+        """
+        SpendingMatrix over *months*. With ``cells=False`` only the per-month
+        scalars are filled in and no rollup cells are read.
+        """
+        months = list(months)
+        rows = self.month_rows(months)
+        scalars = {
+            m: {
+                "total_actual": float(r.total_actual or 0.0),
+                "salary_actual": float(r.salary_actual or 0.0),
+            }
+            for m, r in rows.items()
+        }
+        totals = self.category_totals(months) if cells else {}
+        return SpendingMatrix.from_totals(months, totals, scalars)
@@ -0,0 +1,359 @@
+"""
+Chunked runner for cross-user scheduler jobs.
+
+Usage:
+    with BatchJob("check_budget_alerts", session_factory, run_key=today) as job:
+        job.run_chunks(db, user_ids, process_chunk, deliver=send_email)
+
+``process_chunk(db, chunk)`` loads everything it needs for the chunk with
+``IN`` queries, stages its writes on *db* and returns a list of pending side
+effects (e.g. emails). The runner commits once per chunk, then hands each
+pending item to ``deliver`` — so nothing is emailed for rows that failed to
+commit. A failing chunk is rolled back and logged; later chunks still run.
+
+Multi-replica deployments:
+  * Leader election — with a session_factory, a job only runs in the process
+    that holds its row lease in ``job_runs``; other replicas (and uvicorn
+    workers) firing the same cron trigger skip it. A run whose run_key has
+    already finished is not repeated.
+  * Checkpoints — each committed chunk records its id range in
+    ``job_checkpoints`` in the same transaction, so a run interrupted by a
+    crash resumes with the remaining chunks (``resume_interrupted_jobs``).
+  * Parallelism — with SCHEDULER_WORKERS > 1 the leader processes chunks on
+    a bounded thread pool, each chunk on its own session.
+
+Each run's timing and counts are kept in-process (see ``job_stats()``, shown
+on /health) and logged as one line per job.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import JobCheckpoint, JobRun, engine
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE") or 500)
+# SQLite serialises writers anyway, so chunks only run in parallel on a server DB
+WORKERS = 1 if engine.dialect.name == "sqlite" else int(os.getenv("SCHEDULER_WORKERS") or 1)
+LEASE_TTL_SEC = int(os.getenv("SCHEDULER_LEASE_TTL_SEC") or 300)
+
+# Identifies this process as a lease holder
+HOLDER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_job_stats: Dict[str, Dict[str, Any]] = {}
+
+
+def job_stats() -> Dict[str, Dict[str, Any]]:
+    """Return the metrics of the most recent run of every job."""
+    return {name: dict(stats) for name, stats in _job_stats.items()}
+
+
+def chunked(items: Sequence, size: Optional[int] = None) -> Iterator[list]:
+    """Yield consecutive slices of *items* of at most *size* (default BATCH_SIZE)."""
+    size = size or BATCH_SIZE
+    for start in range(0, len(items), size):
+        yield list(items[start:start + size])
+
+
+# -------------------- Leases --------------------
+
+def acquire_lease(db: Session, job_name: str, holder: str = HOLDER_ID, ttl: Optional[int] = None) -> bool:
+    """
+    Take or renew the lease on *job_name*. Succeeds when the lease is free,
+    expired or already ours; a single conditional UPDATE makes it atomic
+    across replicas on both PostgreSQL and SQLite.
+    """
+    now = datetime.utcnow()
+    expires = now + timedelta(seconds=ttl or LEASE_TTL_SEC)
+    updated = (
+        db.query(JobRun)
+        .filter(
+            JobRun.job_name == job_name,
+            (JobRun.holder == None) | (JobRun.holder == holder) | (JobRun.lease_expires_at < now),  # noqa: E711
+        )
+        .update({"holder": holder, "lease_expires_at": expires}, synchronize_session=False)
+    )
+    if updated:
+        db.commit()
+        return True
+    if db.query(JobRun.job_name).filter(JobRun.job_name == job_name).first():
+        db.rollback()
+        return False
+    try:
+        db.add(JobRun(job_name=job_name, holder=holder, lease_expires_at=expires))
+        db.commit()
+        return True
+    except IntegrityError:
+        db.rollback()  # another replica created the row first
+        return False
+
+
+def release_lease(db: Session, job_name: str, holder: str = HOLDER_ID) -> None:
+    db.query(JobRun).filter(JobRun.job_name == job_name, JobRun.holder == holder).update(
+        {"holder": None, "lease_expires_at": None}, synchronize_session=False
+    )
+    db.commit()
+
+
+# -------------------- Runner --------------------
+
+class BatchJob:
+    """
+    Times one job run and records its chunk/row counts. Given a
+    *session_factory* it also takes the job's lease and checkpoints chunks
+    under *run_key*; check ``job.acquired`` (run_chunks is a no-op without it).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        session_factory: Optional[Callable[[], Session]] = None,
+        run_key: Optional[str] = None,
+        workers: Optional[int] = None,
+    ):
+        self.name = name
+        self.session_factory = session_factory
+        self.run_key = run_key or datetime.utcnow().strftime("%Y-%m-%d")
+        self.workers = workers or WORKERS
+        self.acquired = session_factory is None
+        self.resumed = False
+        self.chunks = 0
+        self.failed_chunks = 0
+        self.rows = 0
+        self.written = 0
+        self.delivered = 0
+        self._done_ranges: List[tuple] = []
+        self._lock = threading.Lock()
+        self._started = 0.0
+
+    def __enter__(self) -> "BatchJob":
+        self._started = time.perf_counter()
+        if self.session_factory is not None:
+            self._begin_run()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.session_factory is not None and self.acquired:
+            # A run with failed chunks keeps its checkpoints, so resuming it
+            # retries only the ranges that never committed
+            self._end_run(finished=exc_type is None and self.failed_chunks == 0)
+        duration_ms = round((time.perf_counter() - self._started) * 1000, 1)
+        if not self.acquired:
+            logger.info("job=%s run=%s skipped — leased elsewhere or already finished", self.name, self.run_key)
+            return
+        _job_stats[self.name] = {
+            "duration_ms": duration_ms,
+            "chunks": self.chunks,
+            "failed_chunks": self.failed_chunks,
+            "rows": self.rows,
+            "written": self.written,
+            "delivered": self.delivered,
+            "resumed": self.resumed,
+            "ok": exc_type is None and self.failed_chunks == 0,
+            "finished_at": datetime.utcnow().isoformat(),
+        }
+        logger.info(
+            "job=%s duration_ms=%s chunks=%d failed_chunks=%d rows=%d written=%d delivered=%d",
+            self.name, duration_ms, self.chunks, self.failed_chunks,
+            self.rows, self.written, self.delivered,
+        )
+
+    def _begin_run(self) -> None:
+        db = self.session_factory()
+        try:
+            if not acquire_lease(db, self.name):
+                return
+            run = db.get(JobRun, self.name)
+            if run.run_key == self.run_key and run.finished_at is not None:
+                release_lease(db, self.name)
+                return
+            if run.run_key == self.run_key:
+                # Same run, never finished: a previous leader crashed — resume
+                self._done_ranges = [
+                    (first, last) for first, last in (
+                        db.query(JobCheckpoint.first_item, JobCheckpoint.last_item)
+                        .filter(JobCheckpoint.job_name == self.name, JobCheckpoint.run_key == self.run_key)
+                        .all()
+                    )
+                ]
+                self.resumed = bool(self._done_ranges)
+            else:
+                db.query(JobCheckpoint).filter(JobCheckpoint.job_name == self.name).delete(
+                    synchronize_session=False
+                )
+                run.run_key = self.run_key
+                run.started_at = datetime.utcnow()
+                run.finished_at = None
+                db.commit()
+            self.acquired = True
+        finally:
+            db.close()
+
+    def _end_run(self, finished: bool) -> None:
+        db = self.session_factory()
+        try:
+            if finished:
+                db.query(JobRun).filter(JobRun.job_name == self.name).update(
+                    {"finished_at": datetime.utcnow()}, synchronize_session=False
+                )
+                db.query(JobCheckpoint).filter(JobCheckpoint.job_name == self.name).delete(
+                    synchronize_session=False
+                )
+            release_lease(db, self.name)
+        except Exception:
+            logger.exception("job=%s could not record run completion", self.name)
+            db.rollback()
+        finally:
+            db.close()
+
+    def _renew_lease(self) -> None:
+        db = self.session_factory()
+        try:
+            acquire_lease(db, self.name)
+        except Exception:
+            logger.warning("job=%s lease renewal failed", self.name, exc_info=True)
+            db.rollback()
+        finally:
+            db.close()
+
+    def _is_done(self, key: int) -> bool:
+        return any(first <= key <= last for first, last in self._done_ranges)
+
+    def run_chunks(
+        self,
+        db: Session,
+        items: Sequence,
+        process: Callable[[Session, list], Optional[Iterable]],
+        deliver: Optional[Callable[[Any], None]] = None,
+        size: Optional[int] = None,
+        key: Callable[[Any], int] = lambda item: item,
+    ) -> None:
+        """
+        Run *process* over *items* chunk by chunk, committing after each chunk.
+        *items* must be sorted by *key* (an integer id) for checkpointing.
+        """
+        if not self.acquired:
+            return
+        if self._done_ranges:
+            items = [item for item in items if not self._is_done(key(item))]
+        chunks = list(chunked(items, size))
+        checkpoint = self.session_factory is not None
+
+        def run_one(chunk_db: Session, chunk: list) -> None:
+            with self._lock:
+                self.chunks += 1
+                self.rows += len(chunk)
+            try:
+                pending: List = list(process(chunk_db, chunk) or [])
+                if checkpoint:
+                    chunk_db.add(JobCheckpoint(
+                        job_name=self.name, run_key=self.run_key,
+                        first_item=key(chunk[0]), last_item=key(chunk[-1]),
+                    ))
+                chunk_db.commit()
+            except Exception:
+                logger.exception("job=%s chunk %d failed — rolled back", self.name, self.chunks)
+                chunk_db.rollback()
+                with self._lock:
+                    self.failed_chunks += 1
+                return
+            delivered = 0
+            if deliver is not None:
+                for item in pending:
+                    try:
+                        deliver(item)
+                        delivered += 1
+                    except Exception:
+                        logger.exception("job=%s delivery failed", self.name)
+            with self._lock:
+                self.written += len(pending)
+                self.delivered += delivered
+
+        if self.workers <= 1 or not checkpoint or len(chunks) <= 1:
+            for chunk in chunks:
+                run_one(db, chunk)
+                if checkpoint:
+                    self._renew_lease()
+            return
+
+        def run_isolated(chunk: list) -> None:
+            chunk_db = self.session_factory()
+            try:
+                run_one(chunk_db, chunk)
+            finally:
+                chunk_db.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"job-{self.name}") as pool:
+            for _ in pool.map(run_isolated, chunks):
+                self._renew_lease()
+
+
+def _period_key(every: timedelta) -> str:
+    """Start (UTC) of the current *every*-long period, as a run_key."""
+    step = int(every.total_seconds())
+    start = int(time.time()) // step * step
+    return datetime.utcfromtimestamp(start).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def leader_only(
+    job_name: str,
+    fn: Callable[[Callable[[], Session]], None],
+    every: Optional[timedelta] = None,
+) -> Callable:
+    """
+    Wrap an unchunked job ``fn(session_factory)`` so only the lease holder runs
+    it, at most once per day across replicas — or once per *every* for
+    interval jobs.
+    """
+    def wrapper(session_factory: Callable[[], Session]) -> None:
+        run_key = _period_key(every) if every else None
+        with BatchJob(job_name, session_factory, run_key=run_key) as job:
+            if job.acquired:
+                fn(session_factory)
+    wrapper.__name__ = getattr(fn, "__name__", job_name)
+    return wrapper
+
+
+# -------------------- Crash recovery --------------------
+
+def resume_interrupted_jobs(session_factory: Callable[[], Session], jobs: Dict[str, Callable[[], None]]) -> None:
+    """
+    Periodic job: re-run any registered job whose last run never finished and
+    whose lease has expired (its leader died). The job recomputes its run_key;
+    if that still matches, BatchJob skips the checkpointed chunks.
+    """
+    db = session_factory()
+    try:
+        now = datetime.utcnow()
+        stalled = [
+            name for (name,) in (
+                db.query(JobRun.job_name)
+                .filter(
+                    JobRun.started_at != None,  # noqa: E711
+                    JobRun.finished_at == None,  # noqa: E711
+                    (JobRun.holder == None) | (JobRun.lease_expires_at < now),  # noqa: E711
+                )
+                .all()
+            )
+        ]
+    finally:
+        db.close()
+    for name in stalled:
+        job = jobs.get(name)
+        if job is None:
+            continue
+        logger.info("job=%s resuming interrupted run", name)
+        try:
+            job()
+        except Exception:
+            logger.exception("job=%s resume failed", name)
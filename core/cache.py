@@ -1,20 +1,132 @@
 """
-Redis-backed cache helpers with graceful degradation when Redis is unavailable.
+Two-tier cache: a bounded in-process LRU (L1) in front of Redis (L2).
 
-The client is initialised lazily on first use. If REDIS_URL is empty or Redis
-is unreachable, every operation silently no-ops so the app continues to work
-without caching.
+L1 holds decoded values, so a hot key costs neither a network hop nor a JSON
+decode. It is bounded by entry count and by the encoded size of its values,
+and its entries live at most CACHE_L1_TTL_SEC when Redis is present. Every
+write or delete publishes the key on INVALIDATION_CHANNEL; each worker's
+listener thread drops its L1 copy, keeping workers coherent. Without Redis
+(REDIS_URL empty or unreachable) nothing is cached, since a write would only
+invalidate the writing process's L1 — unless CACHE_SINGLE_PROCESS declares
+that there is just one process, in which case L1 is the whole cache and
+entries keep their full TTL. Values returned from the cache are shared:
+treat them as read-only.
+
+Values are stored in Redis as JSON, zlib-compressed once they pass
+COMPRESS_MIN_BYTES. Read-only per-user endpoints opt in with
+``@cached_endpoint(namespace, ttl)``: keys embed the user's generation
+counter, which is bumped after every committed write to their budget data
+(see the session hooks in database.py), so stale entries are simply never
+read again and expire on their TTL — no key enumeration on writes.
+
+Misses are single-flight (see cache_get_or_compute): concurrent requests for
+the same key wait on a per-key lock in this worker and a Redis lock across
+workers, so one of them recomputes and the rest read its result. With
+``stale_ttl`` an expired value is still served for that long while one
+background refresh recomputes it.
 """
+import functools
+import hashlib
 import json
 import logging
-from typing import Any, Optional
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+from starlette.responses import Response
+
+from core.config import settings
+from database import SessionLocal, User
 
 logger = logging.getLogger(__name__)
 
+COMPRESS_MIN_BYTES = 1024
+INVALIDATION_CHANNEL = "cache:invalidate"
+LOCK_POLL_SEC = 0.05  # how often a waiting worker re-reads the key a peer is computing
+# Identifies this process on the invalidation channel (its own messages are ignored)
+NODE_ID = uuid.uuid4().hex
+
 _redis_client = None
 _redis_unavailable = False  # avoid repeated connection attempts after first failure
+_pubsub_thread = None
+
+
+# -------------------- L1: in-process LRU --------------------
+
+class LocalCache:
+    """Thread-safe LRU with per-entry expiry, capped by entry count and total bytes."""
+
+    def __init__(self, max_items: int, max_bytes: int):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key: str, value: Any, size: int, ttl: float) -> None:
+        if size > self.max_bytes or self.max_items <= 0:
+            return
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (time.monotonic() + ttl, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_items or self._bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"items": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
 
 
+_l1 = LocalCache(settings.CACHE_L1_MAX_ITEMS, settings.CACHE_L1_MAX_MB * 1024 * 1024)
+# Generation counters without Redis (CACHE_SINGLE_PROCESS); never evicted (see user_generation)
+_local_generations: Dict[int, int] = {}
+
+
+def clear_local_cache() -> None:
+    """Drop every L1 entry and local generation (tests, or after restoring a DB)."""
+    _l1.clear()
+    _local_generations.clear()
+
+
+# -------------------- L2: Redis --------------------
+
 def _get_client():
     global _redis_client, _redis_unavailable
     if _redis_unavailable:
@@ -22,48 +134,111 @@ def _get_client():
     if _redis_client is not None:
         return _redis_client
     try:
-        from core.config import settings
         if not settings.REDIS_URL:
             return None
         import redis
         _redis_client = redis.Redis.from_url(
             settings.REDIS_URL,
-            decode_responses=True,
+            decode_responses=False,  # values may be zlib-compressed bytes
             socket_connect_timeout=2,
             socket_timeout=2,
         )
         _redis_client.ping()  # verify connection
         logger.info("Redis cache connected: %s", settings.REDIS_URL)
+        _start_invalidation_listener(_redis_client)
     except Exception as exc:
-        logger.warning("Redis unavailable — caching disabled: %s", exc)
+        logger.warning("Redis unavailable — in-process cache only: %s", exc)
         _redis_unavailable = True
         _redis_client = None
     return _redis_client
 
 
+def _start_invalidation_listener(client) -> None:
+    """Subscribe to INVALIDATION_CHANNEL on a daemon thread."""
+    global _pubsub_thread
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(**{INVALIDATION_CHANNEL: _on_invalidation})
+    _pubsub_thread = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+
+def _on_invalidation(message) -> None:
+    data = message.get("data")
+    if isinstance(data, bytes):
+        data = data.decode()
+    node, _, keys = (data or "").partition("|")
+    if node == NODE_ID:
+        return
+    for key in keys.split("\n"):
+        _l1.discard(key)
+
+
+def _publish_invalidation(client, *keys: str) -> None:
+    try:
+        client.publish(INVALIDATION_CHANNEL, f"{NODE_ID}|" + "\n".join(keys))
+    except Exception:
+        logger.warning("Redis PUBLISH failed for keys=%s", keys, exc_info=True)
+
+
+def _encode(value: Any) -> bytes:
+    raw = json.dumps(value, separators=(",", ":")).encode()
+    return zlib.compress(raw) if len(raw) >= COMPRESS_MIN_BYTES else raw
+
+
+def _decode(raw: bytes) -> Any:
+    # A zlib stream starts with 0x78 ("x"), which no JSON document can
+    if raw[:1] == b"x":
+        raw = zlib.decompress(raw)
+    return json.loads(raw)
+
+
+def _l1_ttl(ttl: float, client) -> float:
+    return ttl if client is None else min(ttl, settings.CACHE_L1_TTL_SEC)
+
+
+def _caching_enabled(client) -> bool:
+    """Whether values may be cached: with Redis, or L1 alone in a single process."""
+    return client is not None or settings.CACHE_SINGLE_PROCESS
+
+
+# -------------------- Public API --------------------
+
 def cache_get(key: str) -> Optional[Any]:
+    value = _l1.get(key)
+    if value is not None:
+        return value
     client = _get_client()
     if client is None:
         return None
     try:
         raw = client.get(key)
-        return json.loads(raw) if raw is not None else None
     except Exception:
         logger.warning("Redis GET failed for key=%s", key, exc_info=True)
         return None
+    if raw is None:
+        return None
+    value = _decode(raw)
+    _l1.set(key, value, len(raw), settings.CACHE_L1_TTL_SEC)
+    return value
 
 
 def cache_set(key: str, value: Any, ttl: int = 3600) -> None:
     client = _get_client()
+    if not _caching_enabled(client):
+        return
+    encoded = _encode(value)
+    _l1.set(key, value, len(encoded), _l1_ttl(ttl, client))
     if client is None:
         return
     try:
-        client.set(key, json.dumps(value), ex=ttl)
+        client.set(key, encoded, ex=ttl)
     except Exception:
         logger.warning("Redis SET failed for key=%s", key, exc_info=True)
+        return
+    _publish_invalidation(client, key)
 
 
 def cache_delete(key: str) -> None:
+    _l1.discard(key)
     client = _get_client()
     if client is None:
         return
@@ -71,6 +246,8 @@ def cache_delete(key: str) -> None:
         client.delete(key)
     except Exception:
         logger.warning("Redis DELETE failed for key=%s", key, exc_info=True)
+        return
+    _publish_invalidation(client, key)
 
 
 def annual_cache_key(user_id: int, year: int) -> str:
@@ -80,3 +257,292 @@ def annual_cache_key(user_id: int, year: int) -> str:
 def invalidate_annual_cache(user_id: int, year: int) -> None:
     """Delete the cached annual overview for a given user and year."""
     cache_delete(annual_cache_key(user_id, year))
+
+
+# -------------------- Per-user generations --------------------
+
+def _generation_key(user_id: int) -> str:
+    return f"gen:{user_id}"
+
+
+def user_generation(user_id: int) -> int:
+    """
+    Current cache generation of *user_id* (0 until their first write). With
+    Redis the counter lives there and is held in L1 like any hot key; without
+    it the counter is process-local and kept outside the LRU, since evicting
+    it would reset it and resurrect old entries.
+    """
+    client = _get_client()
+    if client is None:
+        return _local_generations.get(user_id, 0)
+    key = _generation_key(user_id)
+    cached = _l1.get(key)
+    if cached is not None:
+        return cached
+    try:
+        raw = client.get(key)
+    except Exception:
+        logger.warning("Redis GET failed for generation of user=%s", user_id, exc_info=True)
+        return 0
+    generation = int(raw) if raw is not None else 0
+    _l1.set(key, generation, len(key), settings.CACHE_L1_TTL_SEC)
+    return generation
+
+
+def bump_user_generations(user_ids: Iterable[int]) -> None:
+    """Invalidate every cached endpoint result of the given users."""
+    ids = sorted({uid for uid in user_ids if uid is not None})
+    if not ids:
+        return
+    client = _get_client()
+    if client is None:
+        for uid in ids:
+            _local_generations[uid] = _local_generations.get(uid, 0) + 1
+        return
+    keys = [_generation_key(uid) for uid in ids]
+    for key in keys:
+        _l1.discard(key)
+    try:
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.incr(key)
+        pipe.execute()
+    except Exception:
+        logger.warning("Redis INCR failed for generations of users=%s", ids, exc_info=True)
+        return
+    _publish_invalidation(client, *keys)
+
+
+# -------------------- Single flight / stale-while-revalidate --------------------
+
+_flights: Dict[str, list] = {}  # key -> [lock, holders + waiters]
+_refreshing: set = set()
+_flights_guard = threading.Lock()
+_refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+
+# Marks a value stored with a stale window (see _store)
+_FRESH_UNTIL = "__fresh_until__"
+
+
+@contextmanager
+def _local_flight(key: str):
+    """Serialise computations of *key* within this worker."""
+    with _flights_guard:
+        entry = _flights.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _flights_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                _flights.pop(key, None)
+
+
+def _peer_lock(key: str):
+    """
+    Try to take the cross-worker lock for *key*. Returns (acquired, lock);
+    without Redis, or if Redis fails, the caller proceeds as if it had it.
+    The lock expires after CACHE_LOCK_TIMEOUT_SEC should its holder die.
+    """
+    client = _get_client()
+    if client is None:
+        return True, None
+    try:
+        lock = client.lock(f"lock:{key}", timeout=settings.CACHE_LOCK_TIMEOUT_SEC)
+        if lock.acquire(blocking=False):
+            return True, lock
+        return False, None
+    except Exception:
+        logger.warning("Redis lock failed for key=%s", key, exc_info=True)
+        return True, None
+
+
+def _release(lock) -> None:
+    if lock is None:
+        return
+    try:
+        lock.release()
+    except Exception:  # expired and possibly taken by another worker
+        logger.warning("Redis lock release failed for %s", lock.name, exc_info=True)
+
+
+def _wait_for_peer(key: str) -> Optional[Any]:
+    """Poll *key* while another worker computes it; None if it never shows up."""
+    deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT_SEC
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_SEC)
+        entry = cache_get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def _unwrap(entry: Any, stale_ttl: int):
+    """(value, fresh) of a cached entry."""
+    if stale_ttl and isinstance(entry, dict) and _FRESH_UNTIL in entry:
+        return entry["value"], entry[_FRESH_UNTIL] > time.time()
+    return entry, True
+
+
+def _store(key: str, value: Any, ttl: int, stale_ttl: int) -> None:
+    if isinstance(value, Response):
+        return
+    value = jsonable_encoder(value)
+    if stale_ttl:
+        # Wall-clock expiry inside the value, so every worker agrees when it goes stale
+        cache_set(key, {_FRESH_UNTIL: time.time() + ttl, "value": value}, ttl=ttl + stale_ttl)
+    else:
+        cache_set(key, value, ttl=ttl)
+
+
+def _submit_refresh(task: Callable[[], None]) -> None:
+    _refresh_pool.submit(task)
+
+
+def _revalidate(key: str, compute: Callable[[Session], Any], ttl: int, stale_ttl: int) -> None:
+    """Recompute a stale *key* in the background unless a refresh is already running."""
+    with _flights_guard:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def refresh() -> None:
+        try:
+            acquired, lock = _peer_lock(key)
+            if not acquired:
+                return  # another worker is refreshing it
+            try:
+                db = SessionLocal()
+                try:
+                    _store(key, compute(db), ttl, stale_ttl)
+                finally:
+                    db.close()
+            finally:
+                _release(lock)
+        except Exception:
+            logger.warning("Background refresh failed for key=%s", key, exc_info=True)
+        finally:
+            with _flights_guard:
+                _refreshing.discard(key)
+
+    _submit_refresh(refresh)
+
+
+def _get_or_compute(key, db, compute, ttl, stale_ttl):
+    """cache_get_or_compute, also reporting whether the value came from the cache."""
+    if not _caching_enabled(_get_client()):
+        return compute(db), False
+    entry = cache_get(key)
+    if entry is not None:
+        value, fresh = _unwrap(entry, stale_ttl)
+        if not fresh:
+            _revalidate(key, compute, ttl, stale_ttl)
+        return value, True
+
+    with _local_flight(key):
+        entry = cache_get(key)  # filled by the thread we waited behind
+        if entry is not None:
+            return _unwrap(entry, stale_ttl)[0], True
+        acquired, lock = _peer_lock(key)
+        if not acquired:
+            entry = _wait_for_peer(key)
+            if entry is not None:
+                return _unwrap(entry, stale_ttl)[0], True
+            # The peer died or is too slow: compute it ourselves
+        try:
+            value = compute(db)
+            _store(key, value, ttl, stale_ttl)
+        finally:
+            _release(lock)
+        return value, False
+
+
+def cache_get_or_compute(
+    key: str,
+    db: Session,
+    compute: Callable[[Session], Any],
+    ttl: int = 3600,
+    stale_ttl: int = 0,
+) -> Any:
+    """
+    Return the cached value of *key*, computing it with ``compute(db)`` on a
+    miss. Concurrent misses are coalesced: one caller per worker computes
+    while the others wait on a local lock, and across workers the holder of
+    the Redis lock computes while the others poll for its result.
+
+    With ``stale_ttl`` a value older than *ttl* is still returned for up to
+    *stale_ttl* more seconds, while ``compute`` runs once in the background on
+    its own session. Deleting the key (e.g. invalidate_annual_cache) still
+    forces a synchronous recompute, so writers read their own writes.
+    """
+    return _get_or_compute(key, db, compute, ttl, stale_ttl)[0]
+
+
+# -------------------- Cached endpoints --------------------
+
+_endpoint_stats: Dict[str, Dict[str, int]] = {}
+
+
+def cache_stats() -> Dict[str, Any]:
+    """
+    Hit/miss counts of cached endpoints since process start, overall and per
+    namespace, plus the L1 tier's size and hit/miss counts.
+    """
+    hits = sum(s["hits"] for s in _endpoint_stats.values())
+    misses = sum(s["misses"] for s in _endpoint_stats.values())
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else 0.0,
+        "endpoints": {name: dict(stats) for name, stats in _endpoint_stats.items()},
+        "l1": _l1.stats(),
+    }
+
+
+def reset_cache_stats() -> None:
+    for stats in _endpoint_stats.values():
+        stats.update(hits=0, misses=0)
+    _l1.hits = _l1.misses = 0
+
+
+def endpoint_cache_key(namespace: str, user_id: int, generation: int, params: Dict[str, Any]) -> str:
+    # The UTC date is part of the key: many endpoints default to "this month"
+    # or count days elapsed, so yesterday's answer must not be served today.
+    blob = json.dumps(jsonable_encoder(params), sort_keys=True, default=str)
+    digest = hashlib.sha256(blob.encode()).hexdigest()[:16]
+    day = datetime.utcnow().strftime("%Y%m%d")
+    return f"ep:{namespace}:{user_id}:{generation}:{day}:{digest}"
+
+
+def cached_endpoint(namespace: str, ttl: int = 300, stale_ttl: int = 0) -> Callable:
+    """
+    Cache a read-only route handler's JSON result per user and query params.
+
+    The handler must take ``user`` (from get_current_user) and ``db``
+    keyword arguments; every other argument becomes part of the key. The
+    handler gets ``user`` loaded on whichever session computes the result.
+    Response objects are passed through uncached. Misses are single-flight
+    and *stale_ttl* enables stale-while-revalidate (see cache_get_or_compute).
+    """
+    def decorator(fn: Callable) -> Callable:
+        stats = _endpoint_stats.setdefault(namespace, {"hits": 0, "misses": 0})
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            user = kwargs["user"]
+            params = {k: v for k, v in kwargs.items() if k not in ("db", "user")}
+            key = endpoint_cache_key(namespace, user.id, user_generation(user.id), params)
+
+            def compute(db: Session) -> Any:
+                return fn(*args, **{**kwargs, "db": db, "user": db.get(User, user.id)})
+
+            result, hit = _get_or_compute(key, kwargs["db"], compute, ttl, stale_ttl)
+            stats["hits" if hit else "misses"] += 1
+            return result
+
+        return wrapper
+
+    return decorator
@@ -42,13 +42,37 @@ class Settings(BaseSettings):
     EMAIL_VERIFY_TTL_MIN: int = 60
     PASSWORD_RESET_TTL_MIN: int = 60
     REFRESH_TOKEN_TTL_DAYS: int = 30
+    # How long verify_token trusts a resolved user before re-reading it (0 disables)
+    USER_CACHE_TTL_SEC: int = 30
+    # Threads available to sync route handlers (DB, decrypt, bcrypt) per worker
+    REQUEST_THREADS: int = 40
     LOG_LEVEL: str = "INFO"
     # "production" enables HSTS and other prod-only security headers
     ENVIRONMENT: str = "development"
     # Sentry DSN — leave empty to disable error reporting (safe for local dev)
     SENTRY_DSN: str = ""
-    # Redis URL for caching — leave empty to run without cache (safe for local dev)
+    # Redis URL for caching — leave empty to use only the in-process cache (safe for local dev)
     REDIS_URL: str = ""
+    # In-process (L1) cache in front of Redis: entry and memory caps per worker,
+    # and how long an entry may be served before re-reading Redis
+    CACHE_L1_MAX_ITEMS: int = 2048
+    CACHE_L1_MAX_MB: int = 32
+    CACHE_L1_TTL_SEC: int = 60
+    # Longest a worker waits for another to fill a missing key (and the Redis lock's expiry)
+    CACHE_LOCK_TIMEOUT_SEC: int = 30
+    # Without Redis, cache in-process only when this is the sole app process
+    # (one worker, one replica); otherwise other processes would serve stale data
+    CACHE_SINGLE_PROCESS: bool = False
+    # Background exports: worker threads per process, where artifacts are kept
+    # (empty = local temp dir, file:///path, or s3://bucket/prefix) and for how long
+    EXPORT_WORKERS: int = 2
+    EXPORT_STORAGE_URL: str = ""
+    EXPORT_S3_ENDPOINT_URL: str = ""
+    EXPORT_ARTIFACT_TTL_HOURS: int = 24
+    # A running export older than this is assumed dead and re-queued
+    EXPORT_JOB_TIMEOUT_SEC: int = 900
+    # Parsed CSV uploads are staged in the same artifact store until confirmed or this old
+    CSV_IMPORT_TTL_HOURS: int = 6
     # Anthropic API key for AI financial review — leave empty to disable (safe for local dev)
     ANTHROPIC_API_KEY: str = ""
 
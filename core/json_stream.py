@@ -0,0 +1,55 @@
+"""
+Incremental JSON writer for large downloads.
+
+stream_json_object() renders a top-level object one field at a time. Plain
+values are dumped whole; iterators (generators, query batches) become arrays
+written one element at a time, so only the element being encoded and the
+output buffer are held in memory, however long the array. The output is what
+``json.dumps(obj, indent=2, default=str)`` would produce for the same data.
+"""
+import json
+from typing import Any, Iterable, Iterator, Tuple
+
+CHUNK_BYTES = 64 * 1024
+
+
+def _dumps(value: Any, depth: int) -> str:
+    text = json.dumps(value, indent=2, default=str)
+    return text.replace("\n", "\n" + "  " * depth)
+
+
+def _render(fields: Iterable[Tuple[str, Any]]) -> Iterator[str]:
+    yield "{"
+    first_field = True
+    for key, value in fields:
+        yield ("\n" if first_field else ",\n") + f"  {json.dumps(key)}: "
+        first_field = False
+        if not isinstance(value, Iterator):
+            yield _dumps(value, 1)
+            continue
+        empty = True
+        for item in value:
+            yield ("[\n    " if empty else ",\n    ") + _dumps(item, 2)
+            empty = False
+        yield "[]" if empty else "\n  ]"
+    yield "}" if first_field else "\n}"
+
+
+def stream_json_object(fields: Iterable[Tuple[str, Any]], chunk_bytes: int = CHUNK_BYTES) -> Iterator[bytes]:
+    """
+    Encode (key, value) pairs as a JSON object, yielding UTF-8 chunks of about
+    *chunk_bytes*. *fields* is consumed lazily, so a value can be computed
+    only when its turn comes. The first chunk is flushed as soon as the first
+    field is written, so clients see bytes before the slow sections run.
+    """
+    buffer: list = []
+    size = 0
+    flushed = False
+    for piece in _render(fields):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_bytes or (not flushed and len(buffer) > 2):
+            yield "".join(buffer).encode("utf-8")
+            buffer, size, flushed = [], 0, True
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
@@ -0,0 +1,76 @@
+"""
+Compiled case-insensitive substring matcher (Aho–Corasick).
+
+KeywordMatcher is built once from (pattern, value) pairs listed in
+precedence order and answers "which value belongs to the first-listed
+pattern that occurs anywhere in this text?" in a single pass over the text,
+however many patterns there are — the same answer as checking
+``pattern.lower() in text.lower()`` for each pattern in turn.
+
+Each automaton state records the best (lowest) precedence rank among the
+patterns ending there or at any state on its failure chain, so matching is
+a walk over the text keeping the minimum rank seen; it stops early once the
+overall best pattern has been found.
+"""
+from collections import deque
+from typing import Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_NO_MATCH = float("inf")
+
+
+class KeywordMatcher(Generic[T]):
+    def __init__(self, patterns: Iterable[Tuple[str, T]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._best: List[float] = [_NO_MATCH]
+        self._values: List[T] = []
+
+        for rank, (pattern, value) in enumerate(patterns):
+            self._values.append(value)
+            state = 0
+            for ch in pattern.lower():
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._best.append(_NO_MATCH)
+                state = nxt
+            self._best[state] = min(self._best[state], rank)
+
+        # Breadth-first: a state's failure target is shallower, so its best
+        # rank is already final when the state inherits it.
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._best[nxt] = min(self._best[nxt], self._best[self._fail[nxt]])
+                queue.append(nxt)
+
+        self._first = min(self._best, default=_NO_MATCH)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def match(self, text: str) -> Optional[T]:
+        """Value of the first-listed pattern found in *text*, or None."""
+        goto, fail, best = self._goto, self._fail, self._best
+        found = best[0]  # an empty pattern matches everything
+        state = 0
+        for ch in text.lower():
+            if found == self._first:
+                break
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if best[state] < found:
+                found = best[state]
+        return None if found == _NO_MATCH else self._values[int(found)]
@@ -0,0 +1,57 @@
+"""
+Running mean/variance (Welford) for anomaly detection.
+
+RunningStats is an immutable (n, mean, m2) triple: add() folds in one value,
+merge() combines two summaries (Chan et al.'s parallel form), so per-month
+summaries stored with the category rollup can be combined into any window of
+months without revisiting the expenses behind them. Variance is the
+population variance, m2 / n.
+"""
+import math
+from typing import Iterable, NamedTuple
+
+
+class RunningStats(NamedTuple):
+    n: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    @classmethod
+    def of(cls, values: Iterable[float]) -> "RunningStats":
+        stats = cls()
+        for value in values:
+            stats = stats.add(value)
+        return stats
+
+    def add(self, value: float) -> "RunningStats":
+        n = self.n + 1
+        delta = value - self.mean
+        mean = self.mean + delta / n
+        return RunningStats(n, mean, self.m2 + delta * (value - mean))
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        if not other.n:
+            return self
+        if not self.n:
+            return other
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        mean = self.mean + delta * other.n / n
+        return RunningStats(n, mean, self.m2 + other.m2 + delta * delta * self.n * other.n / n)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / self.n if self.n else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(max(self.variance, 0.0))
+
+    def encode(self) -> str:
+        """Compact text form for storage (see decode)."""
+        return f"{self.n},{self.mean!r},{self.m2!r}"
+
+    @classmethod
+    def decode(cls, text: str) -> "RunningStats":
+        n, mean, m2 = text.split(",")
+        return cls(int(n), float(mean), float(m2))
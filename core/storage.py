@@ -0,0 +1,143 @@
+"""
+Artifact storage for background exports.
+
+EXPORT_STORAGE_URL selects the backend:
+  * empty or ``file:///path`` — a local directory (default: a directory under
+    the system temp dir). Only suitable when the API and export workers share
+    a filesystem: a single host, or a path every replica mounts. With
+    ENVIRONMENT=production an empty URL is refused for export jobs, so
+    production runs on S3 or an explicitly configured shared path.
+  * ``s3://bucket/prefix`` — any S3-compatible store via boto3 (Cloudflare
+    R2, MinIO, AWS). EXPORT_S3_ENDPOINT_URL points at non-AWS endpoints;
+    credentials come from the usual AWS environment variables.
+
+Artifacts are written from an iterator of byte chunks and read back as one,
+so neither side holds a whole export in memory.
+"""
+import logging
+import os
+import shutil
+import tempfile
+from typing import Iterable, Iterator, Optional
+from urllib.parse import urlparse
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_BYTES = 64 * 1024
+
+
+class LocalStorage:
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.realpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.realpath(self.root) + os.sep):
+            raise ValueError(f"Invalid artifact key: {key!r}")
+        return path
+
+    def save(self, key: str, chunks: Iterable[bytes]) -> int:
+        """Write *chunks* to *key* atomically; returns the size in bytes."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                for chunk in chunks:
+                    fh.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return size
+
+    def open(self, key: str) -> Iterator[bytes]:
+        with open(self._path(key), "rb") as fh:
+            while True:
+                chunk = fh.read(READ_CHUNK_BYTES)
+                if not chunk:
+                    return
+                yield chunk
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
+
+
+class S3Storage:
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None):
+        import boto3
+        from botocore.client import Config
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            config=Config(signature_version="s3v4"),
+        )
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def save(self, key: str, chunks: Iterable[bytes]) -> int:
+        # Spool to disk past 8 MiB so large exports don't sit in memory while uploading
+        size = 0
+        with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+            for chunk in chunks:
+                spool.write(chunk)
+                size += len(chunk)
+            spool.seek(0)
+            self.client.upload_fileobj(spool, self.bucket, self._key(key))
+        return size
+
+    def open(self, key: str) -> Iterator[bytes]:
+        body = self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"]
+        try:
+            yield from body.iter_chunks(READ_CHUNK_BYTES)
+        finally:
+            body.close()
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except ClientError:
+            return False
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+
+_storage = None
+
+
+def get_storage():
+    """The configured artifact store (created on first use)."""
+    global _storage
+    if _storage is None:
+        url = urlparse(settings.EXPORT_STORAGE_URL)
+        if url.scheme == "s3":
+            _storage = S3Storage(url.netloc, url.path, settings.EXPORT_S3_ENDPOINT_URL)
+            logger.info("Export artifacts stored in s3://%s%s", url.netloc, url.path)
+        else:
+            root = url.path or os.path.join(tempfile.gettempdir(), "son-of-mervan-exports")
+            _storage = LocalStorage(root)
+            logger.info("Export artifacts stored in %s", root)
+    return _storage
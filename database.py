@@ -1,15 +1,28 @@
 # database.py
+import base64
+import hashlib
+import hmac
 import json
+import logging
 import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
 from sqlalchemy import (
-    Boolean, create_engine, Column, Index, Integer, String, Float, DateTime,
+    BigInteger, Boolean, create_engine, Column, Index, Integer, String, Float, DateTime,
     ForeignKey, Text, Date, UniqueConstraint
 )
-from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+from sqlalchemy import and_, event, func, inspect as sa_inspect, select
+from sqlalchemy.orm import Session, aliased, declarative_base, joinedload, object_session, relationship, sessionmaker
 from sqlalchemy.ext.hybrid import hybrid_property
 
+from core.stats import RunningStats
+
+logger = logging.getLogger(__name__)
+
 # ---------- Encryption Setup ----------
 def get_encryption_key():
     """
@@ -22,9 +35,148 @@ def get_encryption_key():
         raise ValueError("ENCRYPTION_KEY environment variable not set!")
     return key.encode()
 
+def get_encryption_keys():
+    """
+    All configured Fernet keys, primary first: ENCRYPTION_KEY followed by
+    ENCRYPTION_KEYS_PREVIOUS (comma-separated, newest first). Old keys stay
+    decrypt-only until `scripts/migrate.py rotate-keys` has re-encrypted
+    every row under the primary key.
+    """
+    keys = [get_encryption_key()]
+    previous = os.getenv("ENCRYPTION_KEYS_PREVIOUS", "")
+    keys.extend(k.strip().encode() for k in previous.split(",") if k.strip())
+    return keys
+
+# (cipher, rotator) and the blind-index key, built on first use. Key env vars
+# are read once per process; call reset_encryption_cache() after changing
+# them in-process.
+_cipher_cache = None
+_blind_index_key_cache = None
+
+def _ciphers():
+    global _cipher_cache
+    cached = _cipher_cache
+    if cached is None:
+        fernets = [Fernet(k) for k in get_encryption_keys()]
+        rotator = MultiFernet(fernets)
+        # MultiFernet tries each key in turn; with a single key the bare
+        # Fernet skips that layer on every call.
+        cached = (fernets[0] if len(fernets) == 1 else rotator, rotator)
+        _cipher_cache = cached
+    return cached
+
 def get_fernet():
-    """Returns Fernet instance for encryption/decryption"""
-    return Fernet(get_encryption_key())
+    """
+    Returns the process-wide cipher: encrypts with the primary key and
+    decrypts with any configured key (a MultiFernet once old keys are listed).
+    Built once rather than on every encrypt/decrypt call.
+    """
+    return _ciphers()[0]
+
+def reset_encryption_cache():
+    """Drop the cached cipher and blind-index key so the next call re-reads the env."""
+    global _cipher_cache, _blind_index_key_cache
+    _cipher_cache = None
+    _blind_index_key_cache = None
+
+# ---------- Batch decryption ----------
+# decrypt_many() fans out to a process pool once a batch has at least this many
+# distinct ciphertexts (0 disables the pool). Fernet is pure CPU work, so large
+# exports scale with cores instead of running on the request thread.
+DECRYPT_POOL_THRESHOLD = int(os.getenv("DECRYPT_POOL_THRESHOLD") or 5000)
+DECRYPT_POOL_WORKERS = int(os.getenv("DECRYPT_POOL_WORKERS") or 0) or None  # None → os.cpu_count()
+
+_decrypt_pool = None
+_decrypt_pool_lock = threading.Lock()
+
+def _decrypt_chunk(keys, tokens):
+    """Pool worker: decrypt *tokens* with the given key list (no env lookups)."""
+    cipher = MultiFernet([Fernet(k) for k in keys])
+    return [cipher.decrypt(t.encode()).decode() for t in tokens]
+
+def _get_decrypt_pool():
+    global _decrypt_pool
+    with _decrypt_pool_lock:
+        if _decrypt_pool is None:
+            import multiprocessing
+            # spawn, not fork: the API process runs scheduler and executor threads
+            _decrypt_pool = ProcessPoolExecutor(
+                max_workers=DECRYPT_POOL_WORKERS or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _decrypt_pool
+
+def shutdown_decrypt_pool():
+    """Stop the decrypt worker processes, if any were started."""
+    global _decrypt_pool
+    with _decrypt_pool_lock:
+        if _decrypt_pool is not None:
+            _decrypt_pool.shutdown(wait=False, cancel_futures=True)
+            _decrypt_pool = None
+
+def decrypt_many(ciphertexts):
+    """
+    Decrypt a batch of ciphertexts, returning {ciphertext: plaintext}.
+    None entries are skipped and duplicates decrypted once. On multi-core hosts,
+    batches of at least DECRYPT_POOL_THRESHOLD distinct values are split across
+    the process pool; if the pool is unavailable the batch is decrypted in-process.
+    """
+    unique = list(dict.fromkeys(t for t in ciphertexts if t is not None))
+    if not unique:
+        return {}
+    workers = DECRYPT_POOL_WORKERS or os.cpu_count() or 1
+    if workers > 1 and 0 < DECRYPT_POOL_THRESHOLD <= len(unique):
+        try:
+            pool = _get_decrypt_pool()
+            size = -(-len(unique) // (workers * 4))  # ~4 chunks per worker
+            chunks = [unique[i:i + size] for i in range(0, len(unique), size)]
+            keys = get_encryption_keys()
+            plaintexts = []
+            for part in pool.map(_decrypt_chunk, [keys] * len(chunks), chunks):
+                plaintexts.extend(part)
+            return dict(zip(unique, plaintexts))
+        except (BrokenProcessPool, OSError) as exc:
+            logger.warning("decrypt pool unavailable, decrypting in-process: %s", exc)
+            shutdown_decrypt_pool()
+    f = get_fernet()
+    return {t: f.decrypt(t.encode()).decode() for t in unique}
+
+_encrypted_attr_cache = {}
+
+def _encrypted_attr_keys(cls):
+    """ORM attribute keys of cls's Fernet columns, e.g. ["_name_encrypted", ...]."""
+    keys = _encrypted_attr_cache.get(cls)
+    if keys is None:
+        keys = [
+            prop.key for prop in sa_inspect(cls).column_attrs
+            if prop.columns[0].name.endswith("_encrypted")
+        ]
+        _encrypted_attr_cache[cls] = keys
+    return keys
+
+def prefetch_decrypted(rows, *fields):
+    """
+    Decrypt the encrypted columns of *rows* in one decrypt_many() batch and
+    seed each row's session memo, so the hybrid getters that follow are cache
+    hits. *fields* names the hybrid properties to warm (e.g. "name",
+    "category"); omit it to warm every encrypted column. Returns *rows*.
+    """
+    pending = []
+    for row in rows:
+        row_cache = _row_decrypt_memo(row)
+        if row_cache is None:
+            continue
+        keys = [f"_{f}_encrypted" for f in fields] if fields else _encrypted_attr_keys(type(row))
+        for key in keys:
+            token = getattr(row, key)
+            if token is not None and token not in row_cache:
+                pending.append((row_cache, token))
+    if pending:
+        plaintexts = decrypt_many(token for _, token in pending)
+        _count_decrypts(misses=len(plaintexts))
+        for row_cache, token in pending:
+            row_cache[token] = plaintexts[token]
+    return rows
 
 def encrypt_value(value):
     """Encrypt a string value"""
@@ -40,6 +192,166 @@ def decrypt_value(encrypted_value):
     f = get_fernet()
     return f.decrypt(encrypted_value.encode()).decode()
 
+def rotate_value(encrypted_value):
+    """Re-encrypt a ciphertext under the primary key (decrypting with any configured key)."""
+    if encrypted_value is None:
+        return None
+    return _ciphers()[1].rotate(encrypted_value.encode()).decode()
+
+# ---------- Per-transaction decrypt memoization ----------
+# Hybrid-property getters route through _decrypt_field, which memoizes the
+# plaintext on the row's own InstanceState (``inspect(row).info``) keyed by
+# ciphertext. A row read 2-4 times per request pays for one Fernet pass.
+# Setters go through _encrypt_field: a write replaces the column ciphertext,
+# so the old entry can no longer be hit, and the new plaintext is seeded.
+# A memo lives no longer than its row object, and the owning Session drops
+# every memo when its outermost transaction ends (commit, rollback, close),
+# so plaintext doesn't outlive the unit of work. Objects not attached to a
+# session are never cached.
+_DECRYPT_MEMO_KEY = "decrypt_memo"
+_DECRYPT_MEMO_ROWS_INFO_KEY = "decrypt_memo_rows"
+_decrypt_cache_counts = {"hits": 0, "misses": 0}
+_decrypt_cache_counts_lock = threading.Lock()
+
+def _count_decrypts(hits=0, misses=0):
+    with _decrypt_cache_counts_lock:
+        _decrypt_cache_counts["hits"] += hits
+        _decrypt_cache_counts["misses"] += misses
+
+def _row_decrypt_memo(obj):
+    """obj's {ciphertext: plaintext} memo, or None if obj has no session."""
+    session = object_session(obj)
+    if session is None:
+        return None
+    state = sa_inspect(obj)
+    memo = state.info.get(_DECRYPT_MEMO_KEY)
+    if memo is None:
+        memo = state.info[_DECRYPT_MEMO_KEY] = {}
+        rows = session.info.get(_DECRYPT_MEMO_ROWS_INFO_KEY)
+        if rows is None:
+            rows = session.info[_DECRYPT_MEMO_ROWS_INFO_KEY] = weakref.WeakSet()
+        rows.add(state)
+    return memo
+
+def _decrypt_field(obj, encrypted_value):
+    """decrypt_value, memoized on obj until its session's transaction ends."""
+    if encrypted_value is None:
+        return None
+    memo = _row_decrypt_memo(obj)
+    if memo is None:
+        return decrypt_value(encrypted_value)
+    if encrypted_value in memo:
+        _count_decrypts(hits=1)
+        return memo[encrypted_value]
+    _count_decrypts(misses=1)
+    plaintext = decrypt_value(encrypted_value)
+    memo[encrypted_value] = plaintext
+    return plaintext
+
+def _encrypt_field(obj, value):
+    """encrypt_value that seeds obj's memo with the plaintext it just encrypted."""
+    encrypted = encrypt_value(value)
+    memo = _row_decrypt_memo(obj)
+    if memo is not None and encrypted is not None:
+        memo[encrypted] = value
+    return encrypted
+
+@event.listens_for(Session, "after_transaction_end")
+def _clear_decrypt_memos(session, transaction):
+    if transaction.parent is not None:  # savepoint or subtransaction
+        return
+    for state in session.info.pop(_DECRYPT_MEMO_ROWS_INFO_KEY, ()):
+        state.info.pop(_DECRYPT_MEMO_KEY, None)
+
+def decrypt_cache_stats():
+    """Process-wide memoization counters: {"hits", "misses", "hit_rate"}."""
+    with _decrypt_cache_counts_lock:
+        hits = _decrypt_cache_counts["hits"]
+        misses = _decrypt_cache_counts["misses"]
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else 0.0,
+    }
+
+def reset_decrypt_cache_stats():
+    """Zero the memoization counters (used by tests and benchmarks)."""
+    with _decrypt_cache_counts_lock:
+        _decrypt_cache_counts["hits"] = 0
+        _decrypt_cache_counts["misses"] = 0
+
+def get_blind_index_key():
+    """
+    Returns the HMAC key used for deterministic blind indexes.
+    Uses BLIND_INDEX_KEY when set ("hex:<digits>" for raw key bytes, any
+    other value is used as-is); otherwise derives a separate key from the
+    oldest configured Fernet key, so the Fernet key itself is never used
+    directly as a MAC key. The derived key changes once that Fernet key is
+    dropped, so pin it first (``scripts/migrate.py show-blind-index-key``)
+    before rotating.
+    """
+    global _blind_index_key_cache
+    if _blind_index_key_cache is None:
+        explicit = os.getenv("BLIND_INDEX_KEY")
+        if explicit and explicit.startswith("hex:"):
+            key = bytes.fromhex(explicit[4:])
+        elif explicit:
+            key = explicit.encode()
+        else:
+            raw = base64.urlsafe_b64decode(get_encryption_keys()[-1])
+            key = hmac.new(raw, b"son-of-mervan:blind-index:v1", hashlib.sha256).digest()
+        _blind_index_key_cache = key
+    return _blind_index_key_cache
+
+def blind_index(value, domain):
+    """
+    Keyed HMAC-SHA256 of *value*, scoped by *domain* (e.g. "month").
+    Deterministic, so it can back an equality index without revealing the
+    plaintext. Returns None for None so nullable columns stay NULL.
+    """
+    if value is None:
+        return None
+    msg = f"{domain}:{value}".encode()
+    return hmac.new(get_blind_index_key(), msg, hashlib.sha256).hexdigest()
+
+def month_blind_index(month):
+    """Blind index for a normalised "YYYY-MM" month string."""
+    return blind_index(month, "month")
+
+def external_id_blind_index(external_id):
+    """Blind index for a bank provider's transaction id."""
+    return blind_index(external_id, "bank-external-id")
+
+def _period_transform():
+    """
+    Secret (stride, offset) pair for period keys, derived from the blind-index key.
+    Both are positive, so the mapping stays strictly increasing.
+    """
+    digest = hmac.new(get_blind_index_key(), b"period", hashlib.sha256).digest()
+    stride = 1 + int.from_bytes(digest[:2], "big")          # 1..65536
+    offset = int.from_bytes(digest[2:6], "big")              # 0..2^32-1
+    return stride, offset
+
+def month_period_key(month):
+    """
+    Order-preserving integer key for a "YYYY-MM" month: (year*12 + month - 1)
+    passed through a keyed affine map. Raw dumps don't show calendar months,
+    but ordering and relative gaps are visible by design — that's what lets
+    range filters run as SQL BETWEEN. Returns None for unparseable input.
+    """
+    if not month:
+        return None
+    try:
+        year_s, mon_s = str(month).split("-")[:2]
+        year, mon = int(year_s), int(mon_s)
+    except ValueError:
+        return None
+    if not 1 <= mon <= 12:
+        return None
+    stride, offset = _period_transform()
+    return (year * 12 + mon - 1) * stride + offset
+
 # ---------- Engine / Session ----------
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
@@ -56,12 +368,15 @@ else:
         connect_args = {"sslmode": "require"}
         pool_kwargs.update({"pool_size": 10, "max_overflow": 20})
     elif DATABASE_URL.startswith("sqlite"):
-        # SQLite with an explicit DATABASE_URL: use a single shared connection so
-        # BackgroundScheduler threads and async request handlers never contend for
-        # a write lock.  check_same_thread=False lets threads share the connection.
-        from sqlalchemy.pool import StaticPool
-        connect_args = {"check_same_thread": False}
-        pool_kwargs.update({"poolclass": StaticPool})
+        # Route handlers and BackgroundScheduler jobs run on worker threads, so
+        # each checkout gets its own connection (a shared one interleaves
+        # statements and lastrowid across threads); writers wait on the file
+        # lock for up to 30 s instead of failing. An in-memory database only
+        # exists per connection, so it keeps a single shared one.
+        connect_args = {"check_same_thread": False, "timeout": 30}
+        if ":memory:" in DATABASE_URL or DATABASE_URL.rstrip("/") == "sqlite:":
+            from sqlalchemy.pool import StaticPool
+            pool_kwargs.update({"poolclass": StaticPool})
 
     engine = create_engine(
         DATABASE_URL,
@@ -107,6 +422,14 @@ class User(Base):
     notif_budget_alerts = Column(Boolean, nullable=False, default=True, server_default="1")
     notif_milestones = Column(Boolean, nullable=False, default=True, server_default="1")
 
+    # Set once every expense of the user is in expense_search_tokens (new
+    # accounts start complete); NULL for accounts that predate the index until
+    # build_missing_search_indexes or backfill-indexes builds it
+    search_indexed_at = Column(DateTime, nullable=True, default=datetime.utcnow)
+    # Bumped in the same transaction as any write to the user's exportable data
+    # (see _resolve_cache_owners); export jobs are deduplicated against it
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
+
     # TOTP 2FA — secret encrypted at rest; enabled flag is unencrypted for fast checks
     _totp_secret_encrypted = Column("totp_secret_encrypted", String(512), nullable=True)
     totp_enabled = Column(Boolean, nullable=False, default=False, server_default="0")
@@ -118,14 +441,14 @@ class User(Base):
     def username(self):
         """Decrypt username when accessed"""
         if self._username_encrypted:
-            return decrypt_value(self._username_encrypted)
+            return _decrypt_field(self, self._username_encrypted)
         return None
     
     @username.setter
     def username(self, value):
         """Encrypt username when set"""
         if value:
-            self._username_encrypted = encrypt_value(value)
+            self._username_encrypted = _encrypt_field(self, value)
         else:
             self._username_encrypted = None
 
@@ -145,14 +468,14 @@ class User(Base):
     def totp_secret(self):
         """Decrypt TOTP secret when accessed."""
         if self._totp_secret_encrypted:
-            return decrypt_value(self._totp_secret_encrypted)
+            return _decrypt_field(self, self._totp_secret_encrypted)
         return None
 
     @totp_secret.setter
     def totp_secret(self, value):
         """Encrypt TOTP secret when set."""
         if value:
-            self._totp_secret_encrypted = encrypt_value(value)
+            self._totp_secret_encrypted = _encrypt_field(self, value)
         else:
             self._totp_secret_encrypted = None
 
@@ -168,11 +491,21 @@ class MonthlyData(Base):
     __tablename__ = "monthly_data"
     __table_args__ = (
         Index("ix_monthly_data_user_id", "user_id"),
+        Index("uq_monthly_data_user_month_bidx", "user_id", "month_bidx", unique=True),
+        Index("ix_monthly_data_user_period", "user_id", "period"),
     )
     id = Column(Integer, primary_key=True, index=True)
     
     # ENCRYPTED - month identifier
     _month_encrypted = Column("month_encrypted", String(512), nullable=False)
+
+    # Blind index of the month (keyed HMAC) — lets lookups by month hit the
+    # (user_id, month_bidx) index instead of decrypting every row in Python.
+    month_bidx = Column(String(64), nullable=True)
+
+    # Order-preserving period key (see month_period_key) — lets range/year
+    # filters run as BETWEEN on the (user_id, period) index.
+    period = Column(BigInteger, nullable=True)
     
     # ENCRYPTED - salary (stored as encrypted strings)
     _salary_planned_encrypted = Column("salary_planned_encrypted", String(512), default=None)
@@ -194,69 +527,81 @@ class MonthlyData(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     owner = relationship("User", back_populates="months")
     expenses = relationship("MonthlyExpense", back_populates="monthly", cascade="all, delete-orphan")
+    category_totals = relationship(
+        "MonthlyCategoryTotal", back_populates="monthly", cascade="all, delete-orphan"
+    )
+    # Read-only view of the month's live income sources (eager-loaded by the tracker)
+    active_income_sources = relationship(
+        "IncomeSource",
+        primaryjoin="and_(IncomeSource.monthly_data_id == MonthlyData.id, IncomeSource.deleted_at == None)",
+        order_by="IncomeSource.id",
+        viewonly=True,
+    )
     
     # Hybrid properties for transparent access
     @hybrid_property
     def month(self):
-        return decrypt_value(self._month_encrypted) if self._month_encrypted else None
+        return _decrypt_field(self, self._month_encrypted) if self._month_encrypted else None
     
     @month.setter
     def month(self, value):
-        self._month_encrypted = encrypt_value(value) if value else None
+        self._month_encrypted = _encrypt_field(self, value) if value else None
+        self.month_bidx = month_blind_index(value) if value else None
+        self.period = month_period_key(value)
     
     @hybrid_property
     def salary_planned(self):
-        val = decrypt_value(self._salary_planned_encrypted) if self._salary_planned_encrypted else "0.0"
+        val = _decrypt_field(self, self._salary_planned_encrypted) if self._salary_planned_encrypted else "0.0"
         return float(val)
     
     @salary_planned.setter
     def salary_planned(self, value):
-        self._salary_planned_encrypted = encrypt_value(str(value))
+        self._salary_planned_encrypted = _encrypt_field(self, str(value))
     
     @hybrid_property
     def salary_actual(self):
-        val = decrypt_value(self._salary_actual_encrypted) if self._salary_actual_encrypted else "0.0"
+        val = _decrypt_field(self, self._salary_actual_encrypted) if self._salary_actual_encrypted else "0.0"
         return float(val)
     
     @salary_actual.setter
     def salary_actual(self, value):
-        self._salary_actual_encrypted = encrypt_value(str(value))
+        self._salary_actual_encrypted = _encrypt_field(self, str(value))
     
     @hybrid_property
     def total_planned(self):
-        val = decrypt_value(self._total_planned_encrypted) if self._total_planned_encrypted else "0.0"
+        val = _decrypt_field(self, self._total_planned_encrypted) if self._total_planned_encrypted else "0.0"
         return float(val)
     
     @total_planned.setter
     def total_planned(self, value):
-        self._total_planned_encrypted = encrypt_value(str(value))
+        self._total_planned_encrypted = _encrypt_field(self, str(value))
     
     @hybrid_property
     def total_actual(self):
-        val = decrypt_value(self._total_actual_encrypted) if self._total_actual_encrypted else "0.0"
+        val = _decrypt_field(self, self._total_actual_encrypted) if self._total_actual_encrypted else "0.0"
         return float(val)
     
     @total_actual.setter
     def total_actual(self, value):
-        self._total_actual_encrypted = encrypt_value(str(value))
+        self._total_actual_encrypted = _encrypt_field(self, str(value))
     
     @hybrid_property
     def remaining_planned(self):
-        val = decrypt_value(self._remaining_planned_encrypted) if self._remaining_planned_encrypted else "0.0"
+        val = _decrypt_field(self, self._remaining_planned_encrypted) if self._remaining_planned_encrypted else "0.0"
         return float(val)
     
     @remaining_planned.setter
     def remaining_planned(self, value):
-        self._remaining_planned_encrypted = encrypt_value(str(value))
+        self._remaining_planned_encrypted = _encrypt_field(self, str(value))
     
     @hybrid_property
     def remaining_actual(self):
-        val = decrypt_value(self._remaining_actual_encrypted) if self._remaining_actual_encrypted else "0.0"
+        val = _decrypt_field(self, self._remaining_actual_encrypted) if self._remaining_actual_encrypted else "0.0"
         return float(val)
     
     @remaining_actual.setter
     def remaining_actual(self, value):
-        self._remaining_actual_encrypted = encrypt_value(str(value))
+        self._remaining_actual_encrypted = _encrypt_field(self, str(value))
 
 
 class MonthlyExpense(Base):
@@ -289,51 +634,51 @@ class MonthlyExpense(Base):
     # Hybrid properties
     @hybrid_property
     def name(self):
-        return decrypt_value(self._name_encrypted) if self._name_encrypted else None
+        return _decrypt_field(self, self._name_encrypted) if self._name_encrypted else None
     
     @name.setter
     def name(self, value):
-        self._name_encrypted = encrypt_value(value) if value else None
+        self._name_encrypted = _encrypt_field(self, value) if value else None
     
     @hybrid_property
     def category(self):
-        return decrypt_value(self._category_encrypted) if self._category_encrypted else None
+        return _decrypt_field(self, self._category_encrypted) if self._category_encrypted else None
     
     @category.setter
     def category(self, value):
-        self._category_encrypted = encrypt_value(value) if value else None
+        self._category_encrypted = _encrypt_field(self, value) if value else None
     
     @hybrid_property
     def planned_amount(self):
-        val = decrypt_value(self._planned_amount_encrypted) if self._planned_amount_encrypted else "0.0"
+        val = _decrypt_field(self, self._planned_amount_encrypted) if self._planned_amount_encrypted else "0.0"
         return float(val)
     
     @planned_amount.setter
     def planned_amount(self, value):
-        self._planned_amount_encrypted = encrypt_value(str(value))
+        self._planned_amount_encrypted = _encrypt_field(self, str(value))
     
     @hybrid_property
     def actual_amount(self):
-        val = decrypt_value(self._actual_amount_encrypted) if self._actual_amount_encrypted else "0.0"
+        val = _decrypt_field(self, self._actual_amount_encrypted) if self._actual_amount_encrypted else "0.0"
         return float(val)
     
     @actual_amount.setter
     def actual_amount(self, value):
-        self._actual_amount_encrypted = encrypt_value(str(value))
+        self._actual_amount_encrypted = _encrypt_field(self, str(value))
 
     @hybrid_property
     def note(self):
-        return decrypt_value(self._note_encrypted) if self._note_encrypted else None
+        return _decrypt_field(self, self._note_encrypted) if self._note_encrypted else None
 
     @note.setter
     def note(self, value):
-        self._note_encrypted = encrypt_value(value) if value else None
+        self._note_encrypted = _encrypt_field(self, value) if value else None
 
     @hybrid_property
     def tags(self):
         if not self._tags_encrypted:
             return []
-        raw = decrypt_value(self._tags_encrypted)
+        raw = _decrypt_field(self, self._tags_encrypted)
         try:
             return json.loads(raw)
         except Exception:
@@ -344,7 +689,89 @@ class MonthlyExpense(Base):
         if not value:
             self._tags_encrypted = None
         else:
-            self._tags_encrypted = encrypt_value(json.dumps(value))
+            self._tags_encrypted = _encrypt_field(self, json.dumps(value))
+
+
+class MonthlyCategoryTotal(Base):
+    """
+    Rollup of a month's non-deleted expenses per category (planned/actual sums).
+    Maintained by the session hooks below whenever expenses change, so insights
+    read ~one encrypted row per category instead of every expense.
+    """
+    __tablename__ = "monthly_category_totals"
+    __table_args__ = (
+        Index("ix_monthly_category_totals_monthly_data_id", "monthly_data_id"),
+    )
+    id = Column(Integer, primary_key=True)
+    monthly_data_id = Column(
+        Integer, ForeignKey("monthly_data.id", ondelete="CASCADE"), nullable=False
+    )
+
+    # ENCRYPTED fields
+    _category_encrypted = Column("category_encrypted", String(512), nullable=False)
+    _planned_total_encrypted = Column("planned_total_encrypted", String(512), default=None)
+    _actual_total_encrypted = Column("actual_total_encrypted", String(512), default=None)
+    # Running mean/variance of the individual actual amounts (core.stats.RunningStats)
+    _actual_stats_encrypted = Column("actual_stats_encrypted", String(512), default=None)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    monthly = relationship("MonthlyData", back_populates="category_totals")
+
+    @hybrid_property
+    def category(self):
+        return _decrypt_field(self, self._category_encrypted) if self._category_encrypted else None
+
+    @category.setter
+    def category(self, value):
+        self._category_encrypted = _encrypt_field(self, value) if value else None
+
+    @hybrid_property
+    def planned_total(self):
+        val = _decrypt_field(self, self._planned_total_encrypted) if self._planned_total_encrypted else "0.0"
+        return float(val)
+
+    @planned_total.setter
+    def planned_total(self, value):
+        self._planned_total_encrypted = _encrypt_field(self, str(value))
+
+    @hybrid_property
+    def actual_total(self):
+        val = _decrypt_field(self, self._actual_total_encrypted) if self._actual_total_encrypted else "0.0"
+        return float(val)
+
+    @actual_total.setter
+    def actual_total(self, value):
+        self._actual_total_encrypted = _encrypt_field(self, str(value))
+
+    @hybrid_property
+    def actual_stats(self):
+        val = _decrypt_field(self, self._actual_stats_encrypted) if self._actual_stats_encrypted else None
+        return RunningStats.decode(val) if val else None
+
+    @actual_stats.setter
+    def actual_stats(self, value):
+        self._actual_stats_encrypted = _encrypt_field(self, value.encode()) if value is not None else None
+
+
+class ExpenseSearchToken(Base):
+    """
+    Per-user search index over expenses: keyed-HMAC tokens for every name
+    trigram and for the exact (lower-cased) category and each tag. Searches
+    intersect tokens in SQL and decrypt only the surviving candidates.
+    Maintained by the session hooks below; see ``expense_search_query``.
+    """
+    __tablename__ = "expense_search_tokens"
+    __table_args__ = (
+        Index("ix_expense_search_tokens_user_token", "user_id", "token"),
+        Index("ix_expense_search_tokens_expense_id", "expense_id"),
+    )
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    expense_id = Column(
+        Integer, ForeignKey("monthly_expenses.id", ondelete="CASCADE"), nullable=False
+    )
+    token = Column(String(32), nullable=False)
 
 
 class PasswordResetToken(Base):
@@ -414,28 +841,28 @@ class RecurringExpense(Base):
 
     @hybrid_property
     def name(self):
-        return decrypt_value(self._name_encrypted) if self._name_encrypted else None
+        return _decrypt_field(self, self._name_encrypted) if self._name_encrypted else None
 
     @name.setter
     def name(self, value):
-        self._name_encrypted = encrypt_value(value) if value else None
+        self._name_encrypted = _encrypt_field(self, value) if value else None
 
     @hybrid_property
     def category(self):
-        return decrypt_value(self._category_encrypted) if self._category_encrypted else None
+        return _decrypt_field(self, self._category_encrypted) if self._category_encrypted else None
 
     @category.setter
     def category(self, value):
-        self._category_encrypted = encrypt_value(value) if value else None
+        self._category_encrypted = _encrypt_field(self, value) if value else None
 
     @hybrid_property
     def planned_amount(self):
-        val = decrypt_value(self._planned_amount_encrypted) if self._planned_amount_encrypted else "0.0"
+        val = _decrypt_field(self, self._planned_amount_encrypted) if self._planned_amount_encrypted else "0.0"
         return float(val)
 
     @planned_amount.setter
     def planned_amount(self, value):
-        self._planned_amount_encrypted = encrypt_value(str(value))
+        self._planned_amount_encrypted = _encrypt_field(self, str(value))
 
 
 class SavingsGoal(Base):
@@ -464,20 +891,20 @@ class SavingsGoal(Base):
 
     @hybrid_property
     def name(self):
-        return decrypt_value(self._name_encrypted) if self._name_encrypted else None
+        return _decrypt_field(self, self._name_encrypted) if self._name_encrypted else None
 
     @name.setter
     def name(self, value):
-        self._name_encrypted = encrypt_value(value) if value else None
+        self._name_encrypted = _encrypt_field(self, value) if value else None
 
     @hybrid_property
     def target_amount(self):
-        val = decrypt_value(self._target_amount_encrypted) if self._target_amount_encrypted else "0.0"
+        val = _decrypt_field(self, self._target_amount_encrypted) if self._target_amount_encrypted else "0.0"
         return float(val)
 
     @target_amount.setter
     def target_amount(self, value):
-        self._target_amount_encrypted = encrypt_value(str(value))
+        self._target_amount_encrypted = _encrypt_field(self, str(value))
 
 
 class SavingsContribution(Base):
@@ -501,20 +928,20 @@ class SavingsContribution(Base):
 
     @hybrid_property
     def amount(self):
-        val = decrypt_value(self._amount_encrypted) if self._amount_encrypted else "0.0"
+        val = _decrypt_field(self, self._amount_encrypted) if self._amount_encrypted else "0.0"
         return float(val)
 
     @amount.setter
     def amount(self, value):
-        self._amount_encrypted = encrypt_value(str(value))
+        self._amount_encrypted = _encrypt_field(self, str(value))
 
     @hybrid_property
     def note(self):
-        return decrypt_value(self._note_encrypted) if self._note_encrypted else None
+        return _decrypt_field(self, self._note_encrypted) if self._note_encrypted else None
 
     @note.setter
     def note(self, value):
-        self._note_encrypted = encrypt_value(value) if value else None
+        self._note_encrypted = _encrypt_field(self, value) if value else None
 
 
 class BudgetAlert(Base):
@@ -544,11 +971,11 @@ class BudgetAlert(Base):
 
     @hybrid_property
     def category(self):
-        return decrypt_value(self._category_encrypted) if self._category_encrypted else None
+        return _decrypt_field(self, self._category_encrypted) if self._category_encrypted else None
 
     @category.setter
     def category(self, value):
-        self._category_encrypted = encrypt_value(value) if value else None
+        self._category_encrypted = _encrypt_field(self, value) if value else None
 
 
 class Notification(Base):
@@ -580,19 +1007,19 @@ class Notification(Base):
 
     @hybrid_property
     def title(self):
-        return decrypt_value(self._title_encrypted) if self._title_encrypted else None
+        return _decrypt_field(self, self._title_encrypted) if self._title_encrypted else None
 
     @title.setter
     def title(self, value):
-        self._title_encrypted = encrypt_value(value) if value else None
+        self._title_encrypted = _encrypt_field(self, value) if value else None
 
     @hybrid_property
     def message(self):
-        return decrypt_value(self._message_encrypted) if self._message_encrypted else None
+        return _decrypt_field(self, self._message_encrypted) if self._message_encrypted else None
 
     @message.setter
     def message(self, value):
-        self._message_encrypted = encrypt_value(value) if value else None
+        self._message_encrypted = _encrypt_field(self, value) if value else None
 
 
 class AuditLog(Base):
@@ -673,37 +1100,37 @@ class Investment(Base):
 
     @hybrid_property
     def name(self):
-        return decrypt_value(self._name_encrypted) if self._name_encrypted else None
+        return _decrypt_field(self, self._name_encrypted) if self._name_encrypted else None
 
     @name.setter
     def name(self, value):
-        self._name_encrypted = encrypt_value(value) if value else None
+        self._name_encrypted = _encrypt_field(self, value) if value else None
 
     @hybrid_property
     def units(self):
-        val = decrypt_value(self._units_encrypted) if self._units_encrypted else "0.0"
+        val = _decrypt_field(self, self._units_encrypted) if self._units_encrypted else "0.0"
         return float(val)
 
     @units.setter
     def units(self, value):
-        self._units_encrypted = encrypt_value(str(value))
+        self._units_encrypted = _encrypt_field(self, str(value))
 
     @hybrid_property
     def purchase_price(self):
-        val = decrypt_value(self._purchase_price_encrypted) if self._purchase_price_encrypted else "0.0"
+        val = _decrypt_field(self, self._purchase_price_encrypted) if self._purchase_price_encrypted else "0.0"
         return float(val)
 
     @purchase_price.setter
     def purchase_price(self, value):
-        self._purchase_price_encrypted = encrypt_value(str(value))
+        self._purchase_price_encrypted = _encrypt_field(self, str(value))
 
     @hybrid_property
     def notes(self):
-        return decrypt_value(self._notes_encrypted) if self._notes_encrypted else None
+        return _decrypt_field(self, self._notes_encrypted) if self._notes_encrypted else None
 
     @notes.setter
     def notes(self, value):
-        self._notes_encrypted = encrypt_value(value) if value else None
+        self._notes_encrypted = _encrypt_field(self, value) if value else None
 
 
 class InvestmentPrice(Base):
@@ -841,20 +1268,20 @@ class Debt(Base):
 
     @hybrid_property
     def name(self):
-        return decrypt_value(self._name_encrypted) if self._name_encrypted else None
+        return _decrypt_field(self, self._name_encrypted) if self._name_encrypted else None
 
     @name.setter
     def name(self, value):
-        self._name_encrypted = encrypt_value(value) if value else None
+        self._name_encrypted = _encrypt_field(self, value) if value else None
 
     @hybrid_property
     def balance(self):
-        val = decrypt_value(self._balance_encrypted) if self._balance_encrypted else "0.0"
+        val = _decrypt_field(self, self._balance_encrypted) if self._balance_encrypted else "0.0"
         return float(val)
 
     @balance.setter
     def balance(self, value):
-        self._balance_encrypted = encrypt_value(str(value))
+        self._balance_encrypted = _encrypt_field(self, str(value))
 
 
 class NetWorthSnapshot(Base):
@@ -886,7 +1313,7 @@ class NetWorthSnapshot(Base):
 
     @hybrid_property
     def assets_json(self):
-        raw = decrypt_value(self._assets_json_encrypted) if self._assets_json_encrypted else None
+        raw = _decrypt_field(self, self._assets_json_encrypted) if self._assets_json_encrypted else None
         if not raw:
             return []
         import json
@@ -895,11 +1322,11 @@ class NetWorthSnapshot(Base):
     @assets_json.setter
     def assets_json(self, value):
         import json
-        self._assets_json_encrypted = encrypt_value(json.dumps(value)) if value is not None else None
+        self._assets_json_encrypted = _encrypt_field(self, json.dumps(value)) if value is not None else None
 
     @hybrid_property
     def liabilities_json(self):
-        raw = decrypt_value(self._liabilities_json_encrypted) if self._liabilities_json_encrypted else None
+        raw = _decrypt_field(self, self._liabilities_json_encrypted) if self._liabilities_json_encrypted else None
         if not raw:
             return []
         import json
@@ -908,7 +1335,7 @@ class NetWorthSnapshot(Base):
     @liabilities_json.setter
     def liabilities_json(self, value):
         import json
-        self._liabilities_json_encrypted = encrypt_value(json.dumps(value)) if value is not None else None
+        self._liabilities_json_encrypted = _encrypt_field(self, json.dumps(value)) if value is not None else None
 
 
 class MilestoneNotificationSent(Base):
@@ -959,11 +1386,11 @@ class BankConnection(Base):
 
     @hybrid_property
     def provider(self):
-        return decrypt_value(self._provider_encrypted) if self._provider_encrypted else None
+        return _decrypt_field(self, self._provider_encrypted) if self._provider_encrypted else None
 
     @provider.setter
     def provider(self, value):
-        self._provider_encrypted = encrypt_value(value) if value else None
+        self._provider_encrypted = _encrypt_field(self, value) if value else None
 
     @provider.expression
     def provider(cls):
@@ -971,11 +1398,11 @@ class BankConnection(Base):
 
     @hybrid_property
     def access_token(self):
-        return decrypt_value(self._access_token_encrypted) if self._access_token_encrypted else None
+        return _decrypt_field(self, self._access_token_encrypted) if self._access_token_encrypted else None
 
     @access_token.setter
     def access_token(self, value):
-        self._access_token_encrypted = encrypt_value(value) if value else None
+        self._access_token_encrypted = _encrypt_field(self, value) if value else None
 
     @access_token.expression
     def access_token(cls):
@@ -983,11 +1410,11 @@ class BankConnection(Base):
 
     @hybrid_property
     def refresh_token(self):
-        return decrypt_value(self._refresh_token_encrypted) if self._refresh_token_encrypted else None
+        return _decrypt_field(self, self._refresh_token_encrypted) if self._refresh_token_encrypted else None
 
     @refresh_token.setter
     def refresh_token(self, value):
-        self._refresh_token_encrypted = encrypt_value(value) if value else None
+        self._refresh_token_encrypted = _encrypt_field(self, value) if value else None
 
     @refresh_token.expression
     def refresh_token(cls):
@@ -995,11 +1422,11 @@ class BankConnection(Base):
 
     @hybrid_property
     def account_id(self):
-        return decrypt_value(self._account_id_encrypted) if self._account_id_encrypted else None
+        return _decrypt_field(self, self._account_id_encrypted) if self._account_id_encrypted else None
 
     @account_id.setter
     def account_id(self, value):
-        self._account_id_encrypted = encrypt_value(value) if value else None
+        self._account_id_encrypted = _encrypt_field(self, value) if value else None
 
     @account_id.expression
     def account_id(cls):
@@ -1013,6 +1440,9 @@ class BankTransaction(Base):
     All PII/financial fields are Fernet-encrypted at rest.
     """
     __tablename__ = "bank_transactions"
+    __table_args__ = (
+        Index("ix_bank_transactions_connection_external_bidx", "bank_connection_id", "external_id_bidx"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
@@ -1020,6 +1450,8 @@ class BankTransaction(Base):
     monthly_expense_id = Column(Integer, ForeignKey("monthly_expenses.id"), nullable=True)
 
     _external_id_encrypted = Column("external_id_encrypted", String(512), nullable=False)
+    # Blind index of external_id — sync dedups against it without decrypting
+    external_id_bidx = Column(String(64), nullable=True)
     _description_encrypted = Column("description_encrypted", String(512), nullable=True)
     _amount_encrypted = Column("amount_encrypted", String(64), nullable=True)
     _currency_encrypted = Column("currency_encrypted", String(64), nullable=True)
@@ -1035,11 +1467,12 @@ class BankTransaction(Base):
 
     @hybrid_property
     def external_id(self):
-        return decrypt_value(self._external_id_encrypted) if self._external_id_encrypted else None
+        return _decrypt_field(self, self._external_id_encrypted) if self._external_id_encrypted else None
 
     @external_id.setter
     def external_id(self, value):
-        self._external_id_encrypted = encrypt_value(value) if value else None
+        self._external_id_encrypted = _encrypt_field(self, value) if value else None
+        self.external_id_bidx = external_id_blind_index(value) if value else None
 
     @external_id.expression
     def external_id(cls):
@@ -1047,11 +1480,11 @@ class BankTransaction(Base):
 
     @hybrid_property
     def description(self):
-        return decrypt_value(self._description_encrypted) if self._description_encrypted else None
+        return _decrypt_field(self, self._description_encrypted) if self._description_encrypted else None
 
     @description.setter
     def description(self, value):
-        self._description_encrypted = encrypt_value(value) if value else None
+        self._description_encrypted = _encrypt_field(self, value) if value else None
 
     @description.expression
     def description(cls):
@@ -1059,12 +1492,12 @@ class BankTransaction(Base):
 
     @hybrid_property
     def amount(self):
-        raw = decrypt_value(self._amount_encrypted) if self._amount_encrypted else None
+        raw = _decrypt_field(self, self._amount_encrypted) if self._amount_encrypted else None
         return float(raw) if raw is not None else None
 
     @amount.setter
     def amount(self, value):
-        self._amount_encrypted = encrypt_value(str(value)) if value is not None else None
+        self._amount_encrypted = _encrypt_field(self, str(value)) if value is not None else None
 
     @amount.expression
     def amount(cls):
@@ -1072,11 +1505,11 @@ class BankTransaction(Base):
 
     @hybrid_property
     def currency(self):
-        return decrypt_value(self._currency_encrypted) if self._currency_encrypted else None
+        return _decrypt_field(self, self._currency_encrypted) if self._currency_encrypted else None
 
     @currency.setter
     def currency(self, value):
-        self._currency_encrypted = encrypt_value(value) if value else None
+        self._currency_encrypted = _encrypt_field(self, value) if value else None
 
     @currency.expression
     def currency(cls):
@@ -1108,11 +1541,11 @@ class CategoryRule(Base):
 
     @hybrid_property
     def category(self):
-        return decrypt_value(self._category_encrypted) if self._category_encrypted else None
+        return _decrypt_field(self, self._category_encrypted) if self._category_encrypted else None
 
     @category.setter
     def category(self, value):
-        self._category_encrypted = encrypt_value(value) if value else None
+        self._category_encrypted = _encrypt_field(self, value) if value else None
 
     @category.expression
     def category(cls):
@@ -1145,11 +1578,11 @@ class IncomeSource(Base):
 
     @hybrid_property
     def name(self):
-        return decrypt_value(self._name_encrypted) if self._name_encrypted else None
+        return _decrypt_field(self, self._name_encrypted) if self._name_encrypted else None
 
     @name.setter
     def name(self, value):
-        self._name_encrypted = encrypt_value(value) if value else None
+        self._name_encrypted = _encrypt_field(self, value) if value else None
 
     @name.expression
     def name(cls):
@@ -1157,12 +1590,12 @@ class IncomeSource(Base):
 
     @hybrid_property
     def amount(self):
-        val = decrypt_value(self._amount_encrypted) if self._amount_encrypted else None
+        val = _decrypt_field(self, self._amount_encrypted) if self._amount_encrypted else None
         return float(val) if val is not None else 0.0
 
     @amount.setter
     def amount(self, value):
-        self._amount_encrypted = encrypt_value(str(value)) if value is not None else None
+        self._amount_encrypted = _encrypt_field(self, str(value)) if value is not None else None
 
     @amount.expression
     def amount(cls):
@@ -1186,6 +1619,83 @@ class IdempotencyRecord(Base):
     user = relationship("User")
 
 
+class JobRun(Base):
+    """
+    One row per scheduler job: the leader lease plus the state of its current run.
+    Whichever replica holds an unexpired lease runs the job; run_key identifies
+    the run (e.g. the day for a daily job) so a finished run is not repeated by
+    another replica and an unfinished one can be resumed after a crash.
+    """
+    __tablename__ = "job_runs"
+    job_name = Column(String(64), primary_key=True)
+    holder = Column(String(128), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    run_key = Column(String(64), nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class JobCheckpoint(Base):
+    """A chunk of a job run that committed — [first_item, last_item] of its sorted ids."""
+    __tablename__ = "job_checkpoints"
+    id = Column(Integer, primary_key=True, index=True)
+    job_name = Column(String(64), nullable=False)
+    run_key = Column(String(64), nullable=False)
+    first_item = Column(BigInteger, nullable=False)
+    last_item = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_job_checkpoints_job_run", "job_name", "run_key"),
+    )
+
+
+class ExportJob(Base):
+    """
+    A background export (see routers/export.py) and, once done, its artifact
+    in storage. dedup_key hashes the kind, its parameters and the user's
+    data_version, so repeating a request before the data changes reuses the job.
+    """
+    __tablename__ = "export_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(20), nullable=False)  # "pdf" | "tax-pdf" | "full-backup" | "gdpr"
+    params = Column(String(255), nullable=False, default="{}")  # canonical JSON
+    dedup_key = Column(String(64), nullable=False)
+    status = Column(String(16), nullable=False, default="pending")  # pending | running | done | failed
+    artifact_key = Column(String(255), nullable=True)
+    filename = Column(String(255), nullable=True)
+    media_type = Column(String(64), nullable=True)
+    size_bytes = Column(BigInteger, nullable=True)
+    error = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_export_jobs_user_dedup", "user_id", "dedup_key"),
+        Index("ix_export_jobs_status", "status"),
+    )
+
+
+class CSVImport(Base):
+    """
+    A parsed CSV upload awaiting confirmation (see routers/import_csv.py).
+    The preview rows live encrypted in artifact storage under artifact_key;
+    this row carries the counts so any page can be served without a rescan.
+    """
+    __tablename__ = "csv_imports"
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    artifact_key = Column(String(255), nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+    duplicates_count = Column(Integer, nullable=False, default=0)
+    parse_errors = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+
 # Default categories seeded for every new user on their first GET /categories.
 DEFAULT_CATEGORIES = [
     ("Housing",        "#ef4444"),
@@ -1209,3 +1719,559 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def find_month_row(db, user_id, month):
+    """
+    Return the user's MonthlyData row for *month* ("YYYY-MM"), or None.
+    Single probe on the (user_id, month_bidx) index — no decryption needed.
+    """
+    return (
+        db.query(MonthlyData)
+        .filter(
+            MonthlyData.user_id == user_id,
+            MonthlyData.month_bidx == month_blind_index(month),
+        )
+        .first()
+    )
+
+
+def load_tracker_month(db, user_id, month, limit=None, before_id=None):
+    """
+    Load the user's *month* for the tracker page in one statement: the month
+    row, its non-deleted expenses newest-first (``id < before_id`` when given,
+    at most *limit* rows) and its live income sources, eager-loaded onto
+    ``month_row.active_income_sources``.
+
+    Returns ``(month_row, expenses, total)`` — *total* counts every
+    non-deleted expense of the month, ignoring the cursor — or None when the
+    month does not exist. Nothing is decrypted here.
+    """
+    counted = aliased(MonthlyExpense)
+    expense_count = (
+        select(func.count(counted.id))
+        .where(counted.monthly_data_id == MonthlyData.id, counted.deleted_at == None)  # noqa: E711
+        .correlate(MonthlyData)
+        .scalar_subquery()
+    )
+    on_clause = [MonthlyExpense.monthly_data_id == MonthlyData.id, MonthlyExpense.deleted_at == None]  # noqa: E711
+    if before_id is not None:
+        on_clause.append(MonthlyExpense.id < before_id)
+    query = (
+        db.query(MonthlyData, MonthlyExpense, expense_count)
+        .outerjoin(MonthlyExpense, and_(*on_clause))
+        .options(joinedload(MonthlyData.active_income_sources))
+        .filter(
+            MonthlyData.user_id == user_id,
+            MonthlyData.month_bidx == month_blind_index(month),
+        )
+        .order_by(MonthlyExpense.id.desc())
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    rows = query.all()
+    if not rows:
+        return None
+    month_row, _, total = rows[0]
+    return month_row, [e for _, e, _ in rows if e is not None], total
+
+
+def months_in_range(db, user_id, start=None, end=None):
+    """
+    Query for the user's MonthlyData rows with start <= month <= end
+    ("YYYY-MM", both inclusive, either may be None), ordered by month.
+    Bounds become a BETWEEN on the (user_id, period) index. Raises ValueError
+    for a bound that isn't a valid month (e.g. "2026-13") rather than
+    silently matching nothing.
+    """
+    start_key, end_key = month_period_key(start), month_period_key(end)
+    for bound, key in ((start, start_key), (end, end_key)):
+        if bound and key is None:
+            raise ValueError(f"invalid month: {bound!r}")
+    query = db.query(MonthlyData).filter(MonthlyData.user_id == user_id)
+    if start and end:
+        query = query.filter(MonthlyData.period.between(start_key, end_key))
+    elif start:
+        query = query.filter(MonthlyData.period >= start_key)
+    elif end:
+        query = query.filter(MonthlyData.period <= end_key)
+    return query.order_by(MonthlyData.period)
+
+
+def month_rows_for_users(db, user_ids, month):
+    """
+    Return {user_id: MonthlyData} for every user in *user_ids* that has a row
+    for *month*. The blind index is user-independent, so this is one IN query
+    on (user_id, month_bidx) however many users are asked for.
+    """
+    ids = list(user_ids)
+    if not ids:
+        return {}
+    rows = (
+        db.query(MonthlyData)
+        .filter(
+            MonthlyData.user_id.in_(ids),
+            MonthlyData.month_bidx == month_blind_index(month),
+        )
+        .all()
+    )
+    return {m.user_id: m for m in rows}
+
+
+def expenses_by_month(db, month_ids, include_deleted=False):
+    """Load expenses for many months in one query and batch-decrypt them."""
+    if not month_ids:
+        return {}
+    query = db.query(MonthlyExpense).filter(MonthlyExpense.monthly_data_id.in_(month_ids))
+    if not include_deleted:
+        query = query.filter(MonthlyExpense.deleted_at.is_(None))
+    expenses = prefetch_decrypted(query.order_by(MonthlyExpense.id).all())
+    grouped = {}
+    for e in expenses:
+        grouped.setdefault(e.monthly_data_id, []).append(e)
+    return grouped
+
+
+def release_rows(rows, expunge=True):
+    """
+    Expunge *rows* from their session and drop their decrypt memo entries, so
+    a long-running reader (e.g. a streamed export) does not accumulate every
+    row and plaintext it has already written out. With expunge=False only the
+    memo entries go — for flushed rows a caller may still hold; the session's
+    identity map lets them go once nothing else references them.
+    """
+    for row in rows:
+        session = object_session(row)
+        if session is None:
+            continue
+        sa_inspect(row).info.pop(_DECRYPT_MEMO_KEY, None)
+        if expunge:
+            session.expunge(row)
+
+
+def iter_decrypted_batches(query, batch_size=500, *fields):
+    """
+    Stream *query* in lists of up to *batch_size* rows via yield_per, each
+    batch decrypted with prefetch_decrypted(batch, *fields). A batch is
+    released (see release_rows) once the consumer asks for the next one, so
+    memory stays flat however many rows the query returns.
+    """
+    batch = []
+    for row in query.yield_per(batch_size):
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield prefetch_decrypted(batch, *fields)
+            release_rows(batch)
+            batch = []
+    if batch:
+        yield prefetch_decrypted(batch, *fields)
+        release_rows(batch)
+
+
+def iter_decrypted_tuples(query, plain=1, batch_size=500):
+    """
+    Stream a column query (e.g. ``db.query(Model.id, Model._name_encrypted)``)
+    as tuples whose columns after the first *plain* are decrypted, one
+    decrypt_many() batch of *batch_size* rows at a time. No ORM rows are
+    loaded, so nothing accumulates in the session or its decrypt memo.
+    """
+    batch = []
+
+    def decrypted():
+        plaintexts = decrypt_many(token for row in batch for token in row[plain:])
+        for row in batch:
+            yield (*row[:plain], *(plaintexts.get(token) for token in row[plain:]))
+
+    for row in query.yield_per(batch_size):
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield from decrypted()
+            batch = []
+    yield from decrypted()
+
+
+def existing_dedup_keys(db, keys):
+    """Return the subset of notification dedup *keys* already used, in one query."""
+    keys = list(keys)
+    if not keys:
+        return set()
+    rows = db.query(Notification.dedup_key).filter(Notification.dedup_key.in_(keys)).all()
+    return {k for (k,) in rows}
+
+
+# ---------- Category rollup maintenance ----------
+# MonthlyCategoryTotal is never written by endpoints directly. after_flush
+# records which months had expenses added, edited, moved, soft-deleted or
+# deleted; before_commit recomputes just those months, so every write path
+# (budget saves, imports, bank confirms, recurring generation, bulk edits)
+# keeps the rollup in step without its own bookkeeping.
+_STALE_ROLLUP_INFO_KEY = "stale_category_totals"
+_ROLLUP_EXPENSE_ATTRS = (
+    "monthly_data_id", "_category_encrypted", "_planned_amount_encrypted",
+    "_actual_amount_encrypted", "deleted_at",
+)
+
+def refresh_category_totals(db, monthly_data_ids):
+    """
+    Recompute the MonthlyCategoryTotal rows for the given months from their
+    live expenses. Unchanged cells are left alone; cells whose category no
+    longer has expenses are deleted. Changes are left pending on *db*.
+    """
+    ids = {i for i in monthly_data_ids if i is not None}
+    if not ids:
+        return
+    with db.no_autoflush:
+        month_ids = {
+            mid for (mid,) in db.query(MonthlyData.id).filter(MonthlyData.id.in_(ids))
+        }
+        if not month_ids:
+            return
+        expenses = prefetch_decrypted(
+            db.query(MonthlyExpense)
+            .filter(
+                MonthlyExpense.monthly_data_id.in_(month_ids),
+                MonthlyExpense.deleted_at.is_(None),
+            )
+            .order_by(MonthlyExpense.id)
+            .all(),
+            "category", "planned_amount", "actual_amount",
+        )
+        totals = {mid: {} for mid in month_ids}
+        for e in expenses:
+            cat = e.category or "Other"
+            cell = totals[e.monthly_data_id].setdefault(
+                cat, {"planned": 0.0, "actual": 0.0, "stats": RunningStats()}
+            )
+            cell["planned"] += float(e.planned_amount or 0.0)
+            cell["actual"] += float(e.actual_amount or 0.0)
+            cell["stats"] = cell["stats"].add(float(e.actual_amount or 0.0))
+
+        cells = prefetch_decrypted(
+            db.query(MonthlyCategoryTotal)
+            .filter(MonthlyCategoryTotal.monthly_data_id.in_(month_ids))
+            .all()
+        )
+        existing = {(c.monthly_data_id, c.category): c for c in cells}
+        for mid, cats in totals.items():
+            for cat, vals in cats.items():
+                cell = existing.pop((mid, cat), None)
+                if cell is None:
+                    cell = MonthlyCategoryTotal(monthly_data_id=mid)
+                    cell.category = cat
+                    db.add(cell)
+                elif (
+                    cell.planned_total == vals["planned"]
+                    and cell.actual_total == vals["actual"]
+                    and cell.actual_stats == vals["stats"]
+                ):
+                    continue
+                cell.planned_total = vals["planned"]
+                cell.actual_total = vals["actual"]
+                cell.actual_stats = vals["stats"]
+        for cell in existing.values():
+            db.delete(cell)
+
+def category_totals_by_month(db, monthly_data_ids):
+    """
+    Return {monthly_data_id: {category: {"planned", "actual"}}} for the given
+    months, read from the rollup in one query with the cells batch-decrypted.
+    Months without expenses map to {}.
+    """
+    ids = [i for i in monthly_data_ids if i is not None]
+    result = {mid: {} for mid in ids}
+    if not ids:
+        return result
+    cells = prefetch_decrypted(
+        db.query(MonthlyCategoryTotal)
+        .filter(MonthlyCategoryTotal.monthly_data_id.in_(ids))
+        .order_by(MonthlyCategoryTotal.id)
+        .all()
+    )
+    for c in cells:
+        result[c.monthly_data_id][c.category] = {
+            "planned": c.planned_total,
+            "actual": c.actual_total,
+        }
+    return result
+
+def category_stats_by_month(db, monthly_data_ids):
+    """
+    Return {monthly_data_id: {category: RunningStats}} — the running
+    mean/variance of each category's individual actual amounts — for the
+    given months, from the same rollup cells as category_totals_by_month.
+    Merge them (RunningStats.merge) to get the statistics of a window.
+    """
+    ids = [i for i in monthly_data_ids if i is not None]
+    result = {mid: {} for mid in ids}
+    if not ids:
+        return result
+    cells = prefetch_decrypted(
+        db.query(MonthlyCategoryTotal)
+        .filter(MonthlyCategoryTotal.monthly_data_id.in_(ids))
+        .order_by(MonthlyCategoryTotal.id)
+        .all(),
+        "category", "actual_stats",
+    )
+    for c in cells:
+        stats = c.actual_stats
+        if stats is not None:
+            result[c.monthly_data_id][c.category] = stats
+    return result
+
+def _expense_touches_rollup(state):
+    return any(state.attrs[key].history.has_changes() for key in _ROLLUP_EXPENSE_ATTRS)
+
+@event.listens_for(Session, "after_flush")
+def _mark_stale_category_totals(session, flush_context):
+    stale = None
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, MonthlyExpense):
+            continue
+        state = sa_inspect(obj)
+        if obj in session.dirty and not _expense_touches_rollup(state):
+            continue
+        if stale is None:
+            stale = session.info.setdefault(_STALE_ROLLUP_INFO_KEY, set())
+        stale.add(obj.monthly_data_id)
+        # An expense moved between months leaves the old month stale too
+        stale.update(state.attrs.monthly_data_id.history.deleted or ())
+
+@event.listens_for(Session, "before_commit")
+def _refresh_stale_category_totals(session):
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    stale = session.info.pop(_STALE_ROLLUP_INFO_KEY, None)
+    if stale:
+        refresh_category_totals(session, stale)
+
+@event.listens_for(Session, "after_rollback")
+def _clear_stale_category_totals(session):
+    session.info.pop(_STALE_ROLLUP_INFO_KEY, None)
+
+
+# ---------- Expense search index ----------
+# ExpenseSearchToken rows are derived data like the rollup above: after_flush
+# records which expenses were added, renamed, recategorised, retagged, moved
+# or deleted, and before_commit re-tokenises just those. Tokens are
+# blind_index() HMACs scoped by user and field, so equal names in two
+# accounts never share a token, and truncated to 128 bits to keep the
+# (user_id, token) index small.
+_STALE_SEARCH_INFO_KEY = "stale_search_tokens"
+_SEARCH_EXPENSE_ATTRS = ("monthly_data_id", "_name_encrypted", "_category_encrypted", "_tags_encrypted")
+SEARCH_NGRAM = 3
+
+def search_token(user_id, field, value):
+    """Index token for *value* of *field* ("name", "category" or "tag")."""
+    return blind_index(f"{user_id}:{value}", f"search-{field}")[:32]
+
+def _name_ngrams(text):
+    text = text.lower()
+    return {text[i:i + SEARCH_NGRAM] for i in range(len(text) - SEARCH_NGRAM + 1)}
+
+def _expense_search_tokens(user_id, expense):
+    tokens = {search_token(user_id, "name", g) for g in _name_ngrams(expense.name or "")}
+    if expense.category:
+        tokens.add(search_token(user_id, "category", expense.category.lower()))
+    tokens.update(search_token(user_id, "tag", t.lower()) for t in expense.tags if t)
+    return tokens
+
+def _insert_search_tokens(db, expense_ids):
+    rows = (
+        db.query(MonthlyExpense, MonthlyData.user_id)
+        .join(MonthlyData, MonthlyExpense.monthly_data_id == MonthlyData.id)
+        .filter(MonthlyExpense.id.in_(expense_ids))
+        .all()
+    )
+    prefetch_decrypted([e for e, _ in rows], "name", "category", "tags")
+    values = [
+        {"user_id": user_id, "expense_id": e.id, "token": token}
+        for e, user_id in rows
+        for token in _expense_search_tokens(user_id, e)
+    ]
+    if values:
+        db.execute(ExpenseSearchToken.__table__.insert(), values)
+
+def reindex_expense_search(db, expense_ids):
+    """
+    Replace the search tokens of the given expenses (ids that no longer
+    exist just lose theirs). Statements run on *db*'s transaction.
+    """
+    ids = sorted({i for i in expense_ids if i is not None})
+    if not ids:
+        return
+    with db.no_autoflush:
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            db.query(ExpenseSearchToken).filter(ExpenseSearchToken.expense_id.in_(chunk)).delete(
+                synchronize_session=False
+            )
+            _insert_search_tokens(db, chunk)
+
+def build_user_search_index(db, user):
+    """Rebuild *user*'s whole search index and mark it complete. Caller commits."""
+    with db.no_autoflush:
+        db.query(ExpenseSearchToken).filter(ExpenseSearchToken.user_id == user.id).delete(
+            synchronize_session=False
+        )
+        ids = [
+            eid for (eid,) in (
+                db.query(MonthlyExpense.id)
+                .join(MonthlyData, MonthlyExpense.monthly_data_id == MonthlyData.id)
+                .filter(MonthlyData.user_id == user.id)
+                .order_by(MonthlyExpense.id)
+            )
+        ]
+        for start in range(0, len(ids), 500):
+            _insert_search_tokens(db, ids[start:start + 500])
+    user.search_indexed_at = datetime.utcnow()
+
+def build_missing_search_indexes(session_factory):
+    """
+    Scheduler job: build the search index of every account that predates it
+    (search_indexed_at IS NULL), committing per user.
+    """
+    db = session_factory()
+    try:
+        users = db.query(User).filter(User.search_indexed_at == None).order_by(User.id).all()  # noqa: E711
+        for user in users:
+            build_user_search_index(db, user)
+            db.commit()
+        if users:
+            logger.info("Built search indexes for %d account(s)", len(users))
+    finally:
+        db.close()
+
+def expense_search_query(db, user, q=None, category=None, tag=None):
+    """
+    Query for *user*'s live expenses that can match a search: every trigram
+    of *q* (case-insensitive substring), the lower-cased *category* and *tag*
+    must be among the expense's tokens. Only candidates are returned — HMAC
+    tokens can't confirm adjacency or case, so callers re-check the decrypted
+    fields. Queries shorter than SEARCH_NGRAM don't narrow by name.
+
+    An account whose index isn't built yet (see build_missing_search_indexes)
+    gets every live expense as a candidate; nothing is written on *db*.
+    """
+    query = (
+        db.query(MonthlyExpense)
+        .join(MonthlyData, MonthlyExpense.monthly_data_id == MonthlyData.id)
+        .filter(MonthlyData.user_id == user.id, MonthlyExpense.deleted_at == None)  # noqa: E711
+    )
+    if user.search_indexed_at is None:
+        return query
+    tokens = {search_token(user.id, "name", g) for g in _name_ngrams(q or "")}
+    if category:
+        tokens.add(search_token(user.id, "category", category.lower()))
+    if tag:
+        tokens.add(search_token(user.id, "tag", tag.lower()))
+    if tokens:
+        candidates = (
+            select(ExpenseSearchToken.expense_id)
+            .where(ExpenseSearchToken.user_id == user.id, ExpenseSearchToken.token.in_(tokens))
+            .group_by(ExpenseSearchToken.expense_id)
+            .having(func.count(func.distinct(ExpenseSearchToken.token)) == len(tokens))
+        )
+        query = query.filter(MonthlyExpense.id.in_(candidates))
+    return query
+
+@event.listens_for(Session, "after_flush")
+def _mark_stale_search_tokens(session, flush_context):
+    stale = None
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, MonthlyExpense):
+            continue
+        if obj in session.dirty:
+            state = sa_inspect(obj)
+            if not any(state.attrs[key].history.has_changes() for key in _SEARCH_EXPENSE_ATTRS):
+                continue
+        if stale is None:
+            stale = session.info.setdefault(_STALE_SEARCH_INFO_KEY, set())
+        stale.add(obj.id)
+
+@event.listens_for(Session, "before_commit")
+def _refresh_stale_search_tokens(session):
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    stale = session.info.pop(_STALE_SEARCH_INFO_KEY, None)
+    if stale:
+        reindex_expense_search(session, stale)
+
+@event.listens_for(Session, "after_rollback")
+def _clear_stale_search_tokens(session):
+    session.info.pop(_STALE_SEARCH_INFO_KEY, None)
+
+
+# ---------- Cache generations and data versions ----------
+# Cached endpoint results (core.cache.cached_endpoint) are keyed by a per-user
+# generation counter. after_flush collects the owners of changed budget rows
+# (a changed User row is its own owner), and after_commit bumps their
+# generations — only once the data is visible, so a concurrent reader can't
+# cache the old state under the new generation.
+# before_commit also bumps the owners' persistent User.data_version inside
+# the committing transaction, which export job deduplication relies on.
+_CACHE_OWNERS_INFO_KEY = "cache_generation_owners"
+_USER_OWNED_MODELS = (
+    MonthlyData, IncomeSource, SavingsGoal, RecurringExpense, Debt, NetWorthSnapshot,
+    UserCategory, BudgetAlert, CategoryRule, BankConnection, HouseholdMembership,
+)
+
+def _cache_owner_refs(obj):
+    """(user_ids, monthly_data_ids, goal_ids) that identify *obj*'s owner."""
+    if isinstance(obj, User):
+        # Profile fields (base_currency, ...) feed cached results too.
+        return (obj.id,), (), ()
+    if isinstance(obj, _USER_OWNED_MODELS):
+        return (obj.user_id,), (), ()
+    if isinstance(obj, MonthlyExpense):
+        return (), (obj.monthly_data_id,), ()
+    if isinstance(obj, SavingsContribution):
+        return (), (), (obj.goal_id,)
+    return (), (), ()
+
+@event.listens_for(Session, "after_flush")
+def _collect_cache_owners(session, flush_context):
+    owners = None
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        user_ids, month_ids, goal_ids = _cache_owner_refs(obj)
+        if not (user_ids or month_ids or goal_ids):
+            continue
+        if owners is None:
+            owners = session.info.setdefault(_CACHE_OWNERS_INFO_KEY, (set(), set(), set()))
+        owners[0].update(user_ids)
+        owners[1].update(month_ids)
+        owners[2].update(goal_ids)
+
+@event.listens_for(Session, "before_commit")
+def _resolve_cache_owners(session):
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    owners = session.info.get(_CACHE_OWNERS_INFO_KEY)
+    if not owners:
+        return
+    user_ids, month_ids, goal_ids = owners
+    with session.no_autoflush:
+        if month_ids:
+            user_ids.update(
+                uid for (uid,) in session.query(MonthlyData.user_id).filter(MonthlyData.id.in_(month_ids))
+            )
+        if goal_ids:
+            user_ids.update(
+                uid for (uid,) in session.query(SavingsGoal.user_id).filter(SavingsGoal.id.in_(goal_ids))
+            )
+    month_ids.clear()
+    goal_ids.clear()
+    ids = [uid for uid in user_ids if uid is not None]
+    if ids:
+        session.query(User).filter(User.id.in_(ids)).update(
+            {User.data_version: User.data_version + 1}, synchronize_session=False
+        )
+
+@event.listens_for(Session, "after_commit")
+def _bump_cache_generations(session):
+    owners = session.info.pop(_CACHE_OWNERS_INFO_KEY, None)
+    if owners and owners[0]:
+        from core.cache import bump_user_generations
+        bump_user_generations(owners[0])
+
+@event.listens_for(Session, "after_rollback")
+def _clear_cache_owners(session):
+    session.info.pop(_CACHE_OWNERS_INFO_KEY, None)
@@ -6,7 +6,7 @@ import re
 import time
 import uvicorn
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from fastapi import Path
 from fastapi import Body
 from fastapi import Query
@@ -28,15 +28,17 @@ from core.logging_config import setup_logging
 from core.config import settings, VERSION, CHANGELOG
 from core.limiter import limiter
 from core.idempotency import compute_key_hash, get_cached_response, save_response as save_idempotency
-from core.cache import invalidate_annual_cache
+from core.cache import cache_stats, invalidate_annual_cache
+from core.batch import BatchJob, job_stats, leader_only, resume_interrupted_jobs
+from core.stats import RunningStats
 from middleware.security import SecurityHeadersMiddleware
 from middleware.request_id import RequestIDMiddleware
 from alembic.config import Config as AlembicConfig
 from alembic import command as alembic_command
-from database import get_db, User, MonthlyData, MonthlyExpense, RefreshToken, PasswordResetToken, AuditLog, CategoryRule, IncomeSource, Notification
+from database import get_db, build_missing_search_indexes, category_stats_by_month, category_totals_by_month, decrypt_cache_stats, existing_dedup_keys, expense_search_query, find_month_row, load_tracker_month, shutdown_decrypt_pool, month_blind_index, month_rows_for_users, months_in_range, prefetch_decrypted, User, MonthlyData, MonthlyExpense, RefreshToken, PasswordResetToken, AuditLog, CategoryRule, Notification
 from apscheduler.schedulers.background import BackgroundScheduler
 from database import SessionLocal
-from security import create_access_token, verify_token, verify_password, create_totp_challenge_token
+from security import create_access_token, verify_token, verify_password, create_totp_challenge_token, get_current_user
 from models import ExpenseUpdateRequest
 from routers import tracker, overview, signup, users as users_router, recurring as recurring_router, savings as savings_router, alerts as alerts_router, insights as insights_router, export as export_router, audit as audit_router, currency as currency_router, investments as investments_router, household as household_router, categories as categories_router, import_csv as import_csv_router, forecast as forecast_router, debts as debts_router, net_worth as net_worth_router
 from routers import totp as totp_router
@@ -49,7 +51,6 @@ from routers import category_rules as category_rules_router
 from routers import income_sources as income_sources_router
 from routers import rollover as rollover_router
 import email_utils
-from collections import defaultdict
 
 _APP_START_TIME = time.monotonic()
 
@@ -145,6 +146,9 @@ class HealthDetailedResponse(BaseModel):
     db_ok: bool
     redis_ok: Optional[bool]
     scheduler_running: bool
+    decrypt_cache: Optional[Dict[str, float]] = None
+    jobs: Optional[Dict[str, Dict[str, Any]]] = None
+    endpoint_cache: Optional[Dict[str, Any]] = None
 
 class LoginRequest(BaseModel):
     identifier: str  # email or username
@@ -177,42 +181,25 @@ class ActualBudgetRequest(BaseModel):
     expenses: List[ActualExpenseItem]  # actual amounts submitted for the month
 
 # -------------------- Small DB helpers --------------------
-# DELETE this old helper:
-# def get_or_create_user(db: Session, username: str) -> User: ...
-
-# ADD these helpers instead:
-def get_user_by_email(db: Session, email: str) -> User | None:
-    return db.query(User).filter(User.email == email).first()
-
-def require_user_by_email(db: Session, email: str) -> User:
-    user = get_user_by_email(db, email)
-    if not user:
-        # Signup always creates the user, so treat this as a hard error
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
 # --- add to main.py near the top ---
 def normalize_month(m: str) -> str:
     parts = (m or "").split("-")
     if len(parts) != 2:
         raise HTTPException(status_code=422, detail="month must be 'YYYY-MM'")
-    y, mo = parts
-    return f"{int(y):04d}-{int(mo):02d}"
+    try:
+        y, mo = int(parts[0]), int(parts[1])
+    except ValueError:
+        raise HTTPException(status_code=422, detail="month must be 'YYYY-MM'")
+    if not (1 <= mo <= 12):
+        raise HTTPException(status_code=422, detail="month must be 'YYYY-MM'")
+    return f"{y:04d}-{mo:02d}"
 
 def find_month_by_value(db: Session, user: User, month: str) -> MonthlyData | None:
-    """Find a month row by decrypting values since encryption is non-deterministic."""
-    all_months = (
-        db.query(MonthlyData)
-        .filter(MonthlyData.user_id == user.id)
-        .all()
-    )
-    for row in all_months:
-        if row.month == month:
-            return row
-    return None
+    """Find a month row via its blind index (month is Fernet-encrypted, so no plaintext match)."""
+    return find_month_row(db, user.id, month)
 
 def get_or_create_month(db: Session, user: User, month: str) -> MonthlyData:
-    """Get or create a month record by comparing decrypted month values."""
+    """Get or create a month record, looked up by its month blind index."""
     rec = find_month_by_value(db, user, month)
     if not rec:
         rec = MonthlyData(user_id=user.id)  # Create without month
@@ -228,6 +215,18 @@ def find_expense_by_values(expenses: list[MonthlyExpense], name: str, category:
             return expense
     return None
 
+def index_expenses_by_values(expenses: list[MonthlyExpense]) -> dict[tuple[str, str], MonthlyExpense]:
+    """
+    Map (name, category) -> expense for set-based upserts. Names and categories
+    are decrypted in one batch; on duplicates the first row wins, matching
+    find_expense_by_values().
+    """
+    prefetch_decrypted(expenses, "name", "category")
+    index: dict[tuple[str, str], MonthlyExpense] = {}
+    for expense in expenses:
+        index.setdefault((expense.name, expense.category), expense)
+    return index
+
 # -------------------- Routes --------------------
 @app.get("/")
 async def root():
@@ -245,7 +244,7 @@ async def health_live():
 
 
 @app.get("/health/ready", response_model=HealthReadyResponse, tags=["health"])
-async def health_ready():
+def health_ready():
     """Readiness probe — returns 200 only when all critical dependencies are healthy.
 
     Checks:
@@ -311,7 +310,7 @@ def _memory_rss_mb() -> Optional[float]:
 
 
 @app.get("/health", response_model=HealthDetailedResponse, tags=["health"])
-async def health():
+def health():
     """Detailed health check including uptime, memory, and dependency status.
 
     Used by Docker and Railway health checks. Returns scheduler status,
@@ -351,6 +350,9 @@ async def health():
         db_ok=db_ok,
         redis_ok=redis_ok,
         scheduler_running=_scheduler.running if hasattr(_scheduler, "running") else False,
+        decrypt_cache=decrypt_cache_stats(),
+        jobs=job_stats(),
+        endpoint_cache=cache_stats(),
     )
 
 
@@ -414,11 +416,11 @@ def login(request: Request, response: Response, payload: LoginRequest, db: Sessi
 
 @app.post("/calculate-budget")
 @limiter.limit("60/minute")
-async def calculate_budget(
+def calculate_budget(
     request: Request,
     budget_data: BudgetRequest,
     commit: bool = Query(False),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
     x_idempotency_key: Optional[str] = Header(None, alias="X-Idempotency-Key"),
 ):
@@ -429,7 +431,7 @@ async def calculate_budget(
 
     logger.debug(
         "calculate_budget month=%s commit=%s user=%s salary=%s expenses=%d",
-        month_norm, commit, current_user,
+        month_norm, commit, user.email,
         budget_data.monthly_salary, len(budget_data.expenses),
     )
 
@@ -460,8 +462,7 @@ async def calculate_budget(
     # ---------- IDEMPOTENCY CHECK (commit path only) ----------
     _idem_key_hash = None
     if commit and x_idempotency_key:
-        user_for_idem = require_user_by_email(db, current_user)
-        _idem_key_hash = compute_key_hash(user_for_idem.id, x_idempotency_key)
+        _idem_key_hash = compute_key_hash(user.id, x_idempotency_key)
         cached = get_cached_response(db, _idem_key_hash)
         if cached is not None:
             return cached
@@ -480,15 +481,12 @@ async def calculate_budget(
             "recommendations": recs,
             "savings_rate": round((remaining_planned / budget_data.monthly_salary) * 100, 2)
                 if budget_data.monthly_salary else 0,
-            "user": current_user,
+            "user": user.email,
             "committed": False,
         }
 
     # ---------- COMMIT (WRITE) PATH ----------
-    logger.debug("calculate_budget starting commit path")
-
-    user = require_user_by_email(db, current_user)
-    logger.debug("calculate_budget user_id=%d", user.id)
+    logger.debug("calculate_budget starting commit path user_id=%d", user.id)
 
     month_row = get_or_create_month(db, user, month_norm)
     logger.debug("calculate_budget month_row_id=%d", month_row.id)
@@ -513,12 +511,15 @@ async def calculate_budget(
         .all()
     )
 
+    by_values = index_expenses_by_values(existing_expenses)
+    created: list[MonthlyExpense] = []
+
     for e in budget_data.expenses:
-        existing = find_expense_by_values(existing_expenses, e.name, e.category)
+        existing = by_values.get((e.name, e.category))
 
         if existing:
             logger.debug(
-                "calculate_budget updating expense id=%d name=%r planned=%s->%s",
+                "calculate_budget updating expense id=%s name=%r planned=%s->%s",
                 existing.id, e.name, existing.planned_amount, e.amount,
             )
             existing.planned_amount = e.amount
@@ -530,16 +531,16 @@ async def calculate_budget(
             expense.planned_amount = e.amount
             expense.actual_amount = 0.0
             expense.currency = user.base_currency or "GBP"
-            db.add(expense)
-            db.flush()  # populate expense.id before audit log
-            _write_audit(db, user.id, expense.id, "create", None, {
-                "name": e.name,
-                "category": e.category,
-                "planned_amount": float(e.amount),
-                "actual_amount": 0.0,
-                "currency": user.base_currency or "GBP",
-            })
-            existing_expenses.append(expense)
+            created.append(expense)
+            by_values[(e.name, e.category)] = expense
+
+    if created:
+        # One batched INSERT ... RETURNING (multi-row VALUES on PostgreSQL) populates
+        # every new id for the audit log
+        db.add_all(created)
+        db.flush()
+        for expense in created:
+            _write_audit(db, user.id, expense.id, "create", None, _expense_snapshot(expense))
 
     db.commit()
     logger.debug("calculate_budget committed all expenses")
@@ -556,7 +557,7 @@ async def calculate_budget(
         "recommendations": recs,
         "savings_rate": round((remaining_planned / budget_data.monthly_salary) * 100, 2)
             if budget_data.monthly_salary else 0,
-        "user": current_user,
+        "user": user.email,
         "committed": True,
     }
 
@@ -567,11 +568,11 @@ async def calculate_budget(
 
 @app.post("/monthly-tracker/{month}")
 @limiter.limit("60/minute")
-async def save_actuals(
+def save_actuals(
     request: Request,
     month: str = Path(..., description="Month in YYYY-MM format"),
     data: ActualBudgetRequest = Body(None),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
     x_idempotency_key: Optional[str] = Header(None, alias="X-Idempotency-Key"),
 ):
@@ -579,9 +580,6 @@ async def save_actuals(
         raise HTTPException(status_code=422, detail="X-Idempotency-Key must be ≤256 characters")
 
     month_norm = normalize_month(month)
-    user = get_user_by_email(db, current_user)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
 
     # Idempotency check
     _idem_key_hash = None
@@ -610,7 +608,7 @@ async def save_actuals(
     )
 
     # Load user's category rules once (sorted by priority) for auto-apply
-    from routers.category_rules import apply_rules_to_name
+    from routers.category_rules import rules_matcher
     active_rules = (
         db.query(CategoryRule)
         .filter(
@@ -621,15 +619,20 @@ async def save_actuals(
         .all()
     )
 
+    rule_matcher = rules_matcher(active_rules) if active_rules else None
+
+    by_values = index_expenses_by_values(existing_expenses)
+    created: list[MonthlyExpense] = []
+
     for item in items:
         # Auto-apply category rules to new expenses (override only when rule matches)
-        if active_rules:
-            matched_cat = apply_rules_to_name(active_rules, item.name)
+        if rule_matcher:
+            matched_cat = rule_matcher.match(item.name)
             if matched_cat:
                 item.category = matched_cat
 
-        exp = find_expense_by_values(existing_expenses, item.name, item.category)
-        
+        exp = by_values.get((item.name, item.category))
+
         item_currency = (item.currency or "").upper() or (user.base_currency or "GBP")
         if exp:
             # Update ONLY actual_amount (and currency if provided), preserve planned_amount
@@ -644,17 +647,16 @@ async def save_actuals(
             new_expense.planned_amount = 0.0  # No planned data for this new line
             new_expense.actual_amount = float(item.amount or 0.0)
             new_expense.currency = item_currency
-            db.add(new_expense)
-            db.flush()  # populate new_expense.id before audit log
-            _write_audit(db, user.id, new_expense.id, "create", None, {
-                "name": item.name,
-                "category": item.category,
-                "planned_amount": 0.0,
-                "actual_amount": float(item.amount or 0.0),
-                "currency": item_currency,
-            })
-            existing_expenses.append(new_expense)
+            created.append(new_expense)
+            by_values[(item.name, item.category)] = new_expense
 
+    if created:
+        # One batched INSERT ... RETURNING (multi-row VALUES on PostgreSQL) populates
+        # every new id for the audit log
+        db.add_all(created)
+        db.flush()
+        for new_expense in created:
+            _write_audit(db, user.id, new_expense.id, "create", None, _expense_snapshot(new_expense))
 
     db.commit()
 
@@ -681,11 +683,10 @@ async def save_actuals(
     db.refresh(month_row)
 
     # Spending anomaly detection — fire notifications for statistically unusual expenses
-    for expense in refreshed_expenses:
-        try:
-            _check_spending_anomaly(db, user, expense, month_norm)
-        except Exception:
-            pass  # Never fail the main request due to anomaly side-effects
+    try:
+        _check_spending_anomalies(db, user, refreshed_expenses, month_norm)
+    except Exception:
+        db.rollback()  # Never fail the main request due to anomaly side-effects
 
     invalidate_annual_cache(user.id, int(month_norm[:4]))
 
@@ -701,7 +702,7 @@ async def save_actuals(
         "remaining_actual": month_row.remaining_actual,
         "remaining_planned": month_row.remaining_planned,
         "expenses_by_category": expenses_by_category,
-        "user": current_user,
+        "user": user.email,
     }
 
     if _idem_key_hash and x_idempotency_key:
@@ -710,14 +711,14 @@ async def save_actuals(
     return response_data
 
 @app.get("/monthly-tracker/{month}")
-async def get_monthly_tracker(
+def get_monthly_tracker(
     month: str = Path(..., description="Month in YYYY-MM format"),
     category: Optional[str] = Query(None, description="Filter by category"),
     page: int = Query(1, ge=1, description="Page number (1-based)"),
     page_size: int = Query(25, ge=1, le=100, description="Items per page"),
     limit: int = Query(50, ge=1, le=200, description="Cursor-pagination page size (max 200)"),
     cursor: Optional[str] = Query(None, description="Opaque cursor from previous response (base64-encoded last expense ID)"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     month_norm = normalize_month(month)
@@ -730,8 +731,16 @@ async def get_monthly_tracker(
         except Exception:
             raise HTTPException(status_code=422, detail="Invalid cursor")
 
-    user = get_user_by_email(db, current_user)
-    if not user:
+    # One statement: month row (blind index), newest-first expense page via
+    # the id < cursor predicate, expense count and live income sources.
+    # Without a category filter the page is limited in SQL; with one, only the
+    # category column is decrypted to filter before paging.
+    loaded = load_tracker_month(
+        db, user.id, month_norm,
+        limit=None if category else limit + 1,
+        before_id=None if category else cursor_id,
+    )
+    if not loaded:
         return {
             "month": month_norm,
             "salary_planned": 0.0,
@@ -739,29 +748,24 @@ async def get_monthly_tracker(
             "rows": [],
             "expenses": {"items": [], "total": 0, "page": page, "pages": 0, "page_size": page_size, "next_cursor": None},
         }
+    month_row, candidates, total = loaded
 
-    # Use encrypted column for query
-    month_row = find_month_by_value(db, user, month_norm)
-    if not month_row:
-        return {
-            "month": month_norm,
-            "salary_planned": 0.0,
-            "salary_actual": 0.0,
-            "rows": [],
-            "expenses": {"items": [], "total": 0, "page": page, "pages": 0, "page_size": page_size, "next_cursor": None},
-        }
+    if category:
+        prefetch_decrypted(candidates, "category")
+        candidates = [e for e in candidates if (e.category or "") == category]
+        total = len(candidates)
+        if cursor_id is not None:
+            candidates = [e for e in candidates if e.id < cursor_id]
+        candidates = candidates[:limit + 1]
 
-    all_expenses = (
-        db.query(MonthlyExpense)
-        .filter(
-            MonthlyExpense.monthly_data_id == month_row.id,
-            MonthlyExpense.deleted_at == None,
-        )
-        .all()
-    )
+    pages = max(1, (total + page_size - 1) // page_size) if total > 0 else 0
 
-    # Decrypt and optionally filter by category (in Python — fields are Fernet-encrypted)
-    expense_dicts = [
+    next_cursor: Optional[str] = None
+    page_rows = prefetch_decrypted(candidates[:limit])
+    if len(candidates) > limit:
+        next_cursor = base64.b64encode(str(page_rows[-1].id).encode()).decode()
+
+    page_items = [
         {
             "id": e.id,
             "name": e.name or "",
@@ -772,46 +776,17 @@ async def get_monthly_tracker(
             "note": e.note,
             "tags": e.tags,
         }
-        for e in all_expenses
+        for e in page_rows
     ]
 
-    if category:
-        expense_dicts = [e for e in expense_dicts if e["category"] == category]
-
-    # Group by category for backward-compatible `rows` field (unfiltered)
-    sums = defaultdict(lambda: {"projected": 0.0, "actual": 0.0})
-    for e in expense_dicts:
-        sums[e["category"]]["projected"] += e["planned_amount"]
-        sums[e["category"]]["actual"]    += e["actual_amount"]
-
+    # Category sums come from the rollup, not from decrypting every expense
+    totals = category_totals_by_month(db, [month_row.id])[month_row.id]
     rows = [
-        {"category": cat, "projected": v["projected"], "actual": v["actual"]}
-        for cat, v in sums.items()
+        {"category": cat, "projected": v["planned"], "actual": v["actual"]}
+        for cat, v in totals.items()
+        if not category or cat == category
     ]
 
-    total = len(expense_dicts)
-    pages = max(1, (total + page_size - 1) // page_size) if total > 0 else 0
-
-    # Cursor-based pagination (newest-first by id)
-    sorted_expenses = sorted(expense_dicts, key=lambda e: e["id"], reverse=True)
-    next_cursor: Optional[str] = None
-
-    if cursor_id is not None:
-        sorted_expenses = [e for e in sorted_expenses if e["id"] < cursor_id]
-
-    page_items = sorted_expenses[:limit]
-    if len(sorted_expenses) > limit:
-        next_cursor = base64.b64encode(str(page_items[-1]["id"]).encode()).decode()
-
-    # Income sources — decrypt all for this month
-    raw_income_sources = (
-        db.query(IncomeSource)
-        .filter(
-            IncomeSource.monthly_data_id == month_row.id,
-            IncomeSource.deleted_at == None,
-        )
-        .all()
-    )
     income_sources = [
         {
             "id": s.id,
@@ -819,7 +794,7 @@ async def get_monthly_tracker(
             "amount": s.amount,
             "source_type": s.source_type,
         }
-        for s in raw_income_sources
+        for s in prefetch_decrypted(month_row.active_income_sources)
     ]
     total_income = sum(s["amount"] for s in income_sources)
 
@@ -842,7 +817,7 @@ async def get_monthly_tracker(
     }
 
 @app.get("/expenses/search")
-async def search_expenses(
+def search_expenses(
     q: Optional[str] = Query(None, max_length=200, description="Partial match on expense name (case-insensitive)"),
     category: Optional[str] = Query(None, max_length=100, description="Exact category filter"),
     tag: Optional[str] = Query(None, max_length=30, description="Exact tag filter"),
@@ -850,68 +825,60 @@ async def search_expenses(
     to_month: Optional[str] = Query(None, alias="to", description="End month YYYY-MM (inclusive)"),
     page: int = Query(1, ge=1, description="Page number (1-based)"),
     per_page: int = Query(20, ge=1, le=100, description="Items per page"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Search expenses across all months with optional name, category, and date-range filters."""
-    _month_re = re.compile(r"^\d{4}-\d{2}$")
+    _month_re = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
     if from_month and not _month_re.match(from_month):
         raise HTTPException(status_code=422, detail="'from' must be in YYYY-MM format")
     if to_month and not _month_re.match(to_month):
         raise HTTPException(status_code=422, detail="'to' must be in YYYY-MM format")
 
-    user = get_user_by_email(db, current_user)
-    if not user:
-        return {"items": [], "total": 0, "page": page, "per_page": per_page, "pages": 0}
-
-    # Fetch all month records for this user (decrypt month in Python — Fernet non-deterministic)
-    all_months = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
+    # SQL narrows to expenses carrying every search token, inside the requested
+    # range (BETWEEN on the period index); only those candidates are decrypted
+    range_ids = months_in_range(db, user.id, from_month, to_month).with_entities(MonthlyData.id).order_by(None)
+    candidates = prefetch_decrypted(
+        expense_search_query(db, user, q=q, category=category, tag=tag)
+        .filter(MonthlyExpense.monthly_data_id.in_(range_ids))
+        .all(),
+        "name", "category", "tags",
+    )
+    month_rows = prefetch_decrypted(
+        db.query(MonthlyData)
+        .filter(MonthlyData.id.in_({e.monthly_data_id for e in candidates}))
+        .all(),
+        "month",
+    )
+    month_strs = {md.id: md.month for md in month_rows}
 
-    # Filter months by date range
-    matching_months = []
-    for md in all_months:
-        m = md.month
-        if not m:
+    # Re-check the decrypted fields: tokens only say "may match"
+    results = []
+    q_lower = q.lower() if q else None
+    for e in candidates:
+        month_str = month_strs.get(e.monthly_data_id)
+        if not month_str:
             continue
-        if from_month and m < from_month:
+        name_dec = e.name or ""
+        cat_dec = e.category or ""
+        tags_dec = e.tags  # decrypted list
+        if q_lower and q_lower not in name_dec.lower():
             continue
-        if to_month and m > to_month:
+        if category and cat_dec != category:
             continue
-        matching_months.append((md, m))
-
-    # Collect matching expenses from those months
-    results = []
-    q_lower = q.lower() if q else None
-    for md, month_str in matching_months:
-        expenses = (
-            db.query(MonthlyExpense)
-            .filter(
-                MonthlyExpense.monthly_data_id == md.id,
-                MonthlyExpense.deleted_at == None,
-            )
-            .all()
-        )
-        for e in expenses:
-            name_dec = e.name or ""
-            cat_dec = e.category or ""
-            tags_dec = e.tags  # decrypted list
-            if q_lower and q_lower not in name_dec.lower():
-                continue
-            if category and cat_dec != category:
-                continue
-            if tag and tag not in tags_dec:
-                continue
-            results.append({
-                "id": e.id,
-                "name": name_dec,
-                "category": cat_dec,
-                "planned_amount": float(e.planned_amount or 0.0),
-                "actual_amount": float(e.actual_amount or 0.0),
-                "currency": e.currency or user.base_currency or "GBP",
-                "month": month_str,
-                "note": e.note,
-                "tags": tags_dec,
-            })
+        if tag and tag not in tags_dec:
+            continue
+        results.append({
+            "id": e.id,
+            "name": name_dec,
+            "category": cat_dec,
+            "planned_amount": float(e.planned_amount or 0.0),
+            "actual_amount": float(e.actual_amount or 0.0),
+            "currency": e.currency or user.base_currency or "GBP",
+            "month": month_str,
+            "note": e.note,
+            "tags": tags_dec,
+        })
 
     # Sort most-recent month first, then by name
     results.sort(key=lambda x: (-ord(x["month"][0]) * 1000000 + sum(ord(c) for c in x["month"]), x["name"]))
@@ -936,7 +903,7 @@ def _invalidate_expense_year_cache(db: Session, user_id: int, monthly_data_id: i
         invalidate_annual_cache(user_id, int(md.month[:4]))
 
 
-def _get_owned_expense(expense_id: int, current_user_email: str, db: Session) -> MonthlyExpense:
+def _get_owned_expense(expense_id: int, user: User, db: Session) -> MonthlyExpense:
     """Fetch an expense and verify the current user owns it. Raises 404/403 as appropriate."""
     expense = db.query(MonthlyExpense).filter(MonthlyExpense.id == expense_id).first()
     if not expense:
@@ -945,8 +912,7 @@ def _get_owned_expense(expense_id: int, current_user_email: str, db: Session) ->
     month_data = db.query(MonthlyData).filter(MonthlyData.id == expense.monthly_data_id).first()
     if not month_data:
         raise HTTPException(status_code=404, detail="Expense not found")
-    user = get_user_by_email(db, current_user_email)
-    if not user or month_data.user_id != user.id:
+    if month_data.user_id != user.id:
         raise HTTPException(status_code=403, detail="Not authorised to modify this expense")
     return expense
 
@@ -980,30 +946,30 @@ def _write_audit(
     db.add(log)
 
 
-def _check_spending_anomaly(
+def _check_spending_anomalies(
     db: Session,
     user: User,
-    expense: MonthlyExpense,
+    expenses: list[MonthlyExpense],
     current_month: str,
 ) -> None:
-    """Create a spending_anomaly Notification if expense.actual_amount is an outlier.
+    """Create a spending_anomaly Notification for each of *expenses* whose actual_amount is an outlier.
 
-    Compares the expense's category actual amount against the last 6 months of
-    history (excluding current_month). Triggers only when:
+    Compares each expense's actual amount against the individual expenses of
+    its category over the 6 months before current_month. The baseline comes
+    from the running statistics kept with the category rollup (one cell per
+    month and category, merged), so the whole check costs two queries however
+    many expenses are saved or how long the history is. Triggers only when:
       - >= 3 historical data points exist for the category
       - std > 0
       - actual_amount > mean + 2 * std
     Dedup key prevents duplicate notifications for the same expense.
     """
-    import math
-
-    # Determine the 6-month window before current month
     try:
         cur_dt = datetime.strptime(current_month, "%Y-%m")
     except ValueError:
         return
 
-    # Build ordered list of the 6 months preceding current_month
+    # The 6 months preceding current_month
     historical_months = []
     for i in range(1, 7):
         m = cur_dt.month - i
@@ -1011,98 +977,65 @@ def _check_spending_anomaly(
         m = ((m - 1) % 12) + 1
         historical_months.append(f"{y:04d}-{m:02d}")
 
-    # Fetch all MonthlyData rows for this user (excluding current month)
-    all_month_rows = (
-        db.query(MonthlyData)
-        .filter(MonthlyData.user_id == user.id)
-        .all()
-    )
-
-    # Decrypt month field and keep only rows in our 6-month window
-    target_category = expense.category
-    historical_amounts: list[float] = []
-
-    for row in all_month_rows:
-        try:
-            row_month = row.month
-        except Exception:
-            continue
-        if row_month not in historical_months:
-            continue
-        # Find expenses in this historical month matching the category
-        hist_expenses = (
-            db.query(MonthlyExpense)
-            .filter(
-                MonthlyExpense.monthly_data_id == row.id,
-                MonthlyExpense.deleted_at == None,
-            )
-            .all()
+    window_ids = [
+        row_id for (row_id,) in db.query(MonthlyData.id).filter(
+            MonthlyData.user_id == user.id,
+            MonthlyData.month_bidx.in_([month_blind_index(m) for m in historical_months]),
         )
-        for he in hist_expenses:
-            try:
-                if he.category == target_category and he.actual_amount is not None:
-                    historical_amounts.append(float(he.actual_amount))
-            except Exception:
-                continue
-
-    n = len(historical_amounts)
-    if n < 3:
-        return
-
-    mean = sum(historical_amounts) / n
-    variance = sum((x - mean) ** 2 for x in historical_amounts) / n
-    std = math.sqrt(variance)
-
-    if std == 0:
-        return
+    ]
+    baseline: dict[str, RunningStats] = {}
+    for cells in category_stats_by_month(db, window_ids).values():
+        for category, stats in cells.items():
+            baseline[category] = baseline.get(category, RunningStats()).merge(stats)
 
-    actual = float(expense.actual_amount or 0.0)
-    if actual <= mean + 2 * std:
+    outliers = []
+    for expense in expenses:
+        category = expense.category or "Other"
+        stats = baseline.get(category)
+        if stats is None or stats.n < 3 or stats.std == 0:
+            continue
+        actual = float(expense.actual_amount or 0.0)
+        if actual > stats.mean + 2 * stats.std:
+            outliers.append((expense, category, actual, stats.mean))
+    if not outliers:
         return
 
     # Check dedup to avoid re-notifying for the same expense
-    dedup_key = f"anomaly_{expense.id}"
-    existing = (
-        db.query(Notification)
-        .filter(
-            Notification.user_id == user.id,
-            Notification.dedup_key == dedup_key,
-        )
-        .first()
-    )
-    if existing:
-        return
+    notified = existing_dedup_keys(db, [f"anomaly_{expense.id}" for expense, *_ in outliers])
 
     currency_symbol = "£" if (user.base_currency or "GBP") == "GBP" else (user.base_currency or "GBP")
-    notif = Notification(
-        user_id=user.id,
-        type="spending_anomaly",
-        dedup_key=dedup_key,
-    )
-    notif.title = f"Unusual spending in {target_category}"
-    notif.message = (
-        f"Your {target_category} spend of {currency_symbol}{actual:.2f} is significantly "
-        f"higher than usual (avg {currency_symbol}{mean:.2f})."
-    )
-    db.add(notif)
+    for expense, category, actual, mean in outliers:
+        dedup_key = f"anomaly_{expense.id}"
+        if dedup_key in notified:
+            continue
+        notif = Notification(
+            user_id=user.id,
+            type="spending_anomaly",
+            dedup_key=dedup_key,
+        )
+        notif.title = f"Unusual spending in {category}"
+        notif.message = (
+            f"Your {category} spend of {currency_symbol}{actual:.2f} is significantly "
+            f"higher than usual (avg {currency_symbol}{mean:.2f})."
+        )
+        db.add(notif)
     db.commit()
 
 
 @app.put("/expenses/{expense_id}")
 @limiter.limit("120/minute")
-async def update_expense(
+def update_expense(
     request: Request,
     expense_id: int = Path(...),
     data: ExpenseUpdateRequest = Body(...),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    expense = _get_owned_expense(expense_id, current_user, db)
+    expense = _get_owned_expense(expense_id, user, db)
     if expense.deleted_at is not None:
         raise HTTPException(status_code=404, detail="Expense not found")
 
     before = _expense_snapshot(expense)
-    user = get_user_by_email(db, current_user)
 
     if data.name is not None:
         expense.name = data.name
@@ -1145,18 +1078,17 @@ async def update_expense(
 
 @app.delete("/expenses/{expense_id}", status_code=204)
 @limiter.limit("60/minute")
-async def delete_expense(
+def delete_expense(
     request: Request,
     expense_id: int = Path(...),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    expense = _get_owned_expense(expense_id, current_user, db)
+    expense = _get_owned_expense(expense_id, user, db)
     if expense.deleted_at is not None:
         raise HTTPException(status_code=404, detail="Expense not found")
 
     before = _expense_snapshot(expense)
-    user = get_user_by_email(db, current_user)
     monthly_data_id = expense.monthly_data_id
     expense.deleted_at = datetime.utcnow()
     _write_audit(db, user.id, expense.id, "delete", before, None)
@@ -1175,18 +1107,15 @@ class BulkCategoriseRequest(BaseModel):
 
 
 @app.post("/expenses/bulk-delete")
-async def bulk_delete_expenses(
+def bulk_delete_expenses(
     data: BulkDeleteRequest,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     if not data.ids:
         raise HTTPException(status_code=422, detail="ids must be a non-empty list")
     if len(data.ids) > 100:
         raise HTTPException(status_code=422, detail="ids must not exceed 100 items")
-    user = get_user_by_email(db, current_user)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
 
     all_expenses = db.query(MonthlyExpense).filter(
         MonthlyExpense.id.in_(data.ids)
@@ -1209,18 +1138,15 @@ async def bulk_delete_expenses(
 
 
 @app.post("/expenses/bulk-categorise")
-async def bulk_categorise_expenses(
+def bulk_categorise_expenses(
     data: BulkCategoriseRequest,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     if not data.ids:
         raise HTTPException(status_code=422, detail="ids must be a non-empty list")
     if len(data.ids) > 100:
         raise HTTPException(status_code=422, detail="ids must not exceed 100 items")
-    user = get_user_by_email(db, current_user)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
 
     all_expenses = db.query(MonthlyExpense).filter(
         MonthlyExpense.id.in_(data.ids)
@@ -1296,100 +1222,108 @@ def send_monthly_digests(session_factory):
 
     db = session_factory()
     try:
-        users = (
-            db.query(User)
-            .filter(User.digest_enabled == True, User.deleted_at == None)  # noqa: E711
-            .all()
-        )
-        sent = 0
-        for user in users:
-            # Find this user's MonthlyData for the previous month
-            month_rec = find_month_by_value(db, user, month_str)
-            if not month_rec:
-                continue  # no data → skip
-
-            # Collect non-deleted expenses for the month
-            expenses = (
-                db.query(MonthlyExpense)
+        # Opted-in users with data for the month — one query via the
+        # user-independent month blind index
+        user_ids = [
+            uid for (uid,) in (
+                db.query(MonthlyData.user_id)
+                .join(User, User.id == MonthlyData.user_id)
                 .filter(
-                    MonthlyExpense.monthly_data_id == month_rec.id,
-                    MonthlyExpense.deleted_at == None,  # noqa: E711
+                    MonthlyData.month_bidx == month_blind_index(month_str),
+                    User.digest_enabled == True,  # noqa: E712
+                    User.deleted_at == None,  # noqa: E711
                 )
+                .order_by(MonthlyData.user_id)
                 .all()
             )
-
-            # Aggregate actual spend per category
-            category_totals: dict[str, float] = {}
-            for exp in expenses:
-                cat = exp.category or "Other"
-                amt = exp.actual_amount or 0.0
-                category_totals[cat] = category_totals.get(cat, 0.0) + amt
-
-            total_spent = sum(category_totals.values())
-            income = month_rec.salary_actual or month_rec.salary_planned or 0.0
-            savings_rate = ((income - total_spent) / income * 100) if income > 0 else 0.0
-
-            top_categories = sorted(category_totals.items(), key=lambda x: x[1], reverse=True)[:3]
-
-            # Find over-budget categories
-            planned_by_cat: dict[str, float] = {}
-            for exp in expenses:
-                cat = exp.category or "Other"
-                planned = exp.planned_amount or 0.0
-                planned_by_cat[cat] = planned_by_cat.get(cat, 0.0) + planned
-
-            over_budget = [
-                cat for cat, actual in category_totals.items()
-                if actual > planned_by_cat.get(cat, float("inf"))
-            ]
-
-            currency = user.base_currency or "GBP"
-            try:
-                email_utils.send_monthly_digest_email(
-                    to_email=user.email,
-                    month=month_str,
-                    income=income,
-                    total_spent=total_spent,
-                    savings_rate=savings_rate,
-                    top_categories=top_categories,
-                    over_budget=over_budget,
-                    currency=currency,
-                )
-                sent += 1
-            except Exception:
-                logger.exception("Failed to send digest to user %s", user.id)
-        logger.info("Monthly digest job complete — sent=%d month=%s", sent, month_str)
+        ]
+
+        def process(db, chunk):
+            users = {u.id: u for u in db.query(User).filter(User.id.in_(chunk))}
+            months = month_rows_for_users(db, chunk, month_str)
+            totals = category_totals_by_month(db, [m.id for m in months.values()])
+
+            digests = []
+            for user_id, month_rec in months.items():
+                user = users[user_id]
+                cells = totals[month_rec.id]
+
+                # Actual and planned spend per category, from the rollup
+                category_totals = {cat: cell["actual"] for cat, cell in cells.items()}
+                planned_by_cat = {cat: cell["planned"] for cat, cell in cells.items()}
+
+                total_spent = sum(category_totals.values())
+                income = month_rec.salary_actual or month_rec.salary_planned or 0.0
+                savings_rate = ((income - total_spent) / income * 100) if income > 0 else 0.0
+
+                top_categories = sorted(category_totals.items(), key=lambda x: x[1], reverse=True)[:3]
+
+                # Find over-budget categories
+                over_budget = [
+                    cat for cat, actual in category_totals.items()
+                    if actual > planned_by_cat.get(cat, float("inf"))
+                ]
+
+                digests.append({
+                    "to_email": user.email,
+                    "month": month_str,
+                    "income": income,
+                    "total_spent": total_spent,
+                    "savings_rate": savings_rate,
+                    "top_categories": top_categories,
+                    "over_budget": over_budget,
+                    "currency": user.base_currency or "GBP",
+                })
+            return digests
+
+        def deliver(kwargs):
+            email_utils.send_monthly_digest_email(**kwargs)
+
+        with BatchJob("send_monthly_digests", session_factory, run_key=month_str) as job:
+            job.run_chunks(db, user_ids, process, deliver)
+        logger.info("Monthly digest job complete — sent=%d month=%s", job.delivered, month_str)
     finally:
         db.close()
 
 
 def sync_all_investment_prices(session_factory):
-    """Daily job: sync latest prices for all active investment holdings with a ticker."""
+    """
+    Daily job: sync latest prices for all active investment holdings with a ticker.
+    Each distinct ticker is fetched once per run, however many holdings share it.
+    """
     db = session_factory()
     try:
         from database import Investment, InvestmentPrice, User
         from routers.investments import fetch_price_for_ticker
 
-        users = db.query(User).filter(User.deleted_at == None).all()
-        total = 0
-        for user in users:
-            holdings = (
-                db.query(Investment)
-                .filter(Investment.user_id == user.id, Investment.deleted_at == None)
-                .all()
+        holdings = (
+            db.query(Investment.id, Investment.ticker)
+            .join(User, User.id == Investment.user_id)
+            .filter(
+                Investment.deleted_at == None,  # noqa: E711
+                User.deleted_at == None,  # noqa: E711
+                Investment.ticker != None,  # noqa: E711
+                Investment.ticker != "",
             )
-            for holding in holdings:
-                if not holding.ticker:
-                    continue
-                price = fetch_price_for_ticker(holding.ticker)
-                if price is None:
+            .order_by(Investment.id)
+            .all()
+        )
+        prices: dict[str, float | None] = {}
+
+        def process(db, chunk):
+            snaps = []
+            for holding_id, ticker in chunk:
+                if ticker not in prices:
+                    prices[ticker] = fetch_price_for_ticker(ticker)
+                if prices[ticker] is None:
                     continue
-                snap = InvestmentPrice(investment_id=holding.id, price=price)
-                db.add(snap)
-                total += 1
-        if total:
-            db.commit()
-        logger.info("Investment price sync complete — %d price(s) updated", total)
+                snaps.append(InvestmentPrice(investment_id=holding_id, price=prices[ticker]))
+            db.add_all(snaps)
+            return snaps
+
+        with BatchJob("sync_investment_prices", session_factory) as job:
+            job.run_chunks(db, holdings, process, key=lambda holding: holding[0])
+        logger.info("Investment price sync complete — %d price(s) updated", job.written)
     except Exception:
         logger.exception("Investment price sync job failed")
     finally:
@@ -1431,6 +1365,14 @@ def purge_expired_tokens(session_factory):
         db.close()
 
 
+@app.on_event("startup")
+async def _size_request_threadpool():
+    # Sync handlers run on anyio's default limiter; bound it so a burst of
+    # decrypt/bcrypt-heavy requests queues instead of spawning unbounded threads.
+    import anyio.to_thread
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.REQUEST_THREADS
+
+
 @app.on_event("startup")
 def _start_scheduler():
     if os.getenv("DISABLE_SCHEDULER", "").lower() in ("1", "true", "yes"):
@@ -1439,8 +1381,13 @@ def _start_scheduler():
     from routers.alerts import check_budget_alerts
     from routers.currency import sync_exchange_rates
     from routers.insights import check_spending_velocity
+    from routers.milestones import check_milestones
+    from routers.export import maintain_export_jobs
+    from routers.import_csv import purge_csv_imports
+    # Every worker/replica runs this scheduler; job leases in job_runs make
+    # sure each trigger is executed by exactly one of them.
     _scheduler.add_job(
-        sync_exchange_rates,
+        leader_only("sync_exchange_rates", sync_exchange_rates),
         "cron",
         hour=0,
         minute=15,
@@ -1485,9 +1432,8 @@ def _start_scheduler():
         replace_existing=True,
         args=[SessionLocal],
     )
-    from routers.milestones import check_milestones
     _scheduler.add_job(
-        check_milestones,
+        leader_only("check_milestones", check_milestones),
         "cron",
         day=1,
         hour=9,
@@ -1497,7 +1443,7 @@ def _start_scheduler():
         args=[SessionLocal],
     )
     _scheduler.add_job(
-        purge_expired_tokens,
+        leader_only("purge_expired_tokens", purge_expired_tokens),
         "cron",
         hour=3,
         minute=0,
@@ -1514,6 +1460,48 @@ def _start_scheduler():
         replace_existing=True,
         args=[SessionLocal],
     )
+    # Crash recovery: a run whose leader died resumes from its checkpoints
+    resumable = {
+        "generate_recurring": lambda: generate_all_recurring(SessionLocal),
+        "check_budget_alerts": lambda: check_budget_alerts(SessionLocal),
+        "send_monthly_digests": lambda: send_monthly_digests(SessionLocal),
+        "sync_investment_prices": lambda: sync_all_investment_prices(SessionLocal),
+        "check_spending_velocity": lambda: check_spending_velocity(SessionLocal),
+    }
+    _scheduler.add_job(
+        resume_interrupted_jobs,
+        "interval",
+        minutes=5,
+        id="resume_interrupted_jobs",
+        replace_existing=True,
+        args=[SessionLocal, resumable],
+    )
+    # Re-queue exports orphaned by a dead worker, purge expired ones
+    _scheduler.add_job(
+        leader_only("maintain_export_jobs", maintain_export_jobs, every=timedelta(minutes=5)),
+        "interval",
+        minutes=5,
+        id="maintain_export_jobs",
+        replace_existing=True,
+        args=[SessionLocal],
+    )
+    _scheduler.add_job(
+        leader_only("purge_csv_imports", purge_csv_imports, every=timedelta(hours=1)),
+        "interval",
+        hours=1,
+        id="purge_csv_imports",
+        replace_existing=True,
+        args=[SessionLocal],
+    )
+    # Search index of accounts that predate it (also built by backfill-indexes)
+    _scheduler.add_job(
+        leader_only("build_missing_search_indexes", build_missing_search_indexes, every=timedelta(minutes=10)),
+        "interval",
+        minutes=10,
+        id="build_missing_search_indexes",
+        replace_existing=True,
+        args=[SessionLocal],
+    )
     _scheduler.start()
     logger.info(
         "APScheduler started — recurring-expense generation at 00:05 UTC, "
@@ -1522,7 +1510,9 @@ def _start_scheduler():
         "investment price sync at 16:30 UTC, "
         "milestone email checks on 1st of month at 09:00 UTC, "
         "token cleanup daily at 03:00 UTC, "
-        "spending velocity checks every 6 hours"
+        "spending velocity checks every 6 hours, "
+        "interrupted-run recovery and export job maintenance every 5 minutes, "
+        "staged CSV import cleanup hourly, missing search indexes every 10 minutes"
     )
 
 
@@ -1531,6 +1521,7 @@ def _stop_scheduler():
     if _scheduler.running:
         _scheduler.shutdown(wait=False)
         logger.info("APScheduler stopped")
+    shutdown_decrypt_pool()
 
 # -------------------- Entrypoint --------------------
 if __name__ == "__main__":
@@ -3,7 +3,7 @@ from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
 # Import your encryption functions
-from database import encrypt_value
+from database import encrypt_value, month_blind_index, month_period_key
 
 # Connect to database
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -39,6 +39,8 @@ def migrate_monthly_data():
     # Add encrypted columns
     columns = [
         "month_encrypted VARCHAR(512)",
+        "month_bidx VARCHAR(64)",
+        "period BIGINT",
         "salary_planned_encrypted VARCHAR(512)",
         "salary_actual_encrypted VARCHAR(512)",
         "total_planned_encrypted VARCHAR(512)",
@@ -61,6 +63,8 @@ def migrate_monthly_data():
         session.execute(text("""
             UPDATE monthly_data SET
                 month_encrypted = :month,
+                month_bidx = :month_bidx,
+                period = :period,
                 salary_planned_encrypted = :sp,
                 salary_actual_encrypted = :sa,
                 total_planned_encrypted = :tp,
@@ -70,6 +74,8 @@ def migrate_monthly_data():
             WHERE id = :id
         """), {
             "month": encrypt_value(row[1]),
+            "month_bidx": month_blind_index(row[1]),
+            "period": month_period_key(row[1]),
             "sp": encrypt_value(str(row[2])),
             "sa": encrypt_value(str(row[3])),
             "tp": encrypt_value(str(row[4])),
@@ -327,6 +327,28 @@ class UserCategoryResponse(BaseModel):
         from_attributes = True
 
 
+# ---------- Export jobs ----------
+
+class ExportJobCreate(BaseModel):
+    kind: str = Field(..., pattern="^(pdf|tax-pdf|full-backup|gdpr)$")
+    month: Optional[str] = None     # YYYY-MM, required for "pdf"
+    tax_year: Optional[int] = None  # required for "tax-pdf"
+
+
+class ExportJobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str  # pending | running | done | failed
+    params: Dict[str, object]
+    filename: Optional[str] = None
+    size_bytes: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    download_url: Optional[str] = None
+
+
 # ---------- CSV Import ----------
 
 class CSVPreviewRow(BaseModel):
@@ -340,10 +362,13 @@ class CSVPreviewRow(BaseModel):
 
 
 class CSVPreviewResponse(BaseModel):
-    rows: List[CSVPreviewRow]
+    rows: List[CSVPreviewRow]  # one page, starting at `offset`
     total: int
     duplicates_count: int
     parse_errors: int
+    import_id: Optional[str] = None  # pass to GET /import/csv/{id} and the confirm call
+    offset: int = 0
+    limit: Optional[int] = None
 
 
 class CSVConfirmRow(BaseModel):
@@ -356,7 +381,12 @@ class CSVConfirmRow(BaseModel):
 
 
 class CSVConfirmRequest(BaseModel):
-    rows: List[CSVConfirmRow]
+    # Without import_id, exactly these rows are imported. With it, every staged
+    # row of that preview is imported as suggested, and `rows` only lists the
+    # ones the user edited or excluded (matched by row_id).
+    rows: List[CSVConfirmRow] = []
+    import_id: Optional[str] = None
+    skip_duplicates: bool = False  # staged rows flagged as duplicates default to excluded
 
 
 class CSVImportResult(BaseModel):
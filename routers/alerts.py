@@ -16,20 +16,22 @@ Background job (called by APScheduler):
   check_budget_alerts(session_factory)    Evaluate thresholds and fire notifications
 """
 import logging
-from collections import defaultdict
 from datetime import datetime
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, Path
 from sqlalchemy.orm import Session
 
+from core.batch import BatchJob
 from database import (
     BudgetAlert,
-    MonthlyData,
-    MonthlyExpense,
     Notification,
     User,
+    category_totals_by_month,
+    existing_dedup_keys,
     get_db,
+    month_rows_for_users,
+    prefetch_decrypted,
 )
 from email_utils import send_budget_alert_email
 from models import (
@@ -39,7 +41,7 @@ from models import (
     NotificationListResponse,
     NotificationResponse,
 )
-from security import verify_token
+from security import get_current_user
 
 logger = logging.getLogger(__name__)
 
@@ -48,13 +50,6 @@ router = APIRouter()
 
 # -------------------- Helpers --------------------
 
-def _get_user(email: str, db: Session) -> User:
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
-
 def _get_owned_alert(alert_id: int, user: User, db: Session) -> BudgetAlert:
     alert = db.query(BudgetAlert).filter(
         BudgetAlert.id == alert_id,
@@ -91,10 +86,9 @@ def _notif_to_response(n: Notification) -> NotificationResponse:
 
 @router.get("/budget-alerts", response_model=List[BudgetAlertResponse])
 def list_alerts(
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    user = _get_user(current_user, db)
     alerts = (
         db.query(BudgetAlert)
         .filter(BudgetAlert.user_id == user.id, BudgetAlert.deleted_at == None)
@@ -107,7 +101,7 @@ def list_alerts(
 @router.post("/budget-alerts", response_model=BudgetAlertResponse, status_code=201)
 def create_alert(
     payload: BudgetAlertCreate,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     if not payload.category or len(payload.category) > 50:
@@ -115,8 +109,6 @@ def create_alert(
     if not (1 <= payload.threshold_pct <= 100):
         raise HTTPException(status_code=422, detail="threshold_pct must be between 1 and 100")
 
-    user = _get_user(current_user, db)
-
     # Prevent duplicate active alerts for the same category
     existing_alerts = (
         db.query(BudgetAlert)
@@ -146,10 +138,9 @@ def create_alert(
 def update_alert(
     alert_id: int = Path(...),
     payload: BudgetAlertUpdate = None,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    user = _get_user(current_user, db)
     alert = _get_owned_alert(alert_id, user, db)
 
     if payload.category is not None:
@@ -171,10 +162,9 @@ def update_alert(
 @router.delete("/budget-alerts/{alert_id}", status_code=204)
 def delete_alert(
     alert_id: int = Path(...),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    user = _get_user(current_user, db)
     alert = _get_owned_alert(alert_id, user, db)
     alert.deleted_at = datetime.utcnow()
     db.commit()
@@ -184,10 +174,9 @@ def delete_alert(
 
 @router.get("/notifications", response_model=NotificationListResponse)
 def list_notifications(
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    user = _get_user(current_user, db)
     notifications = (
         db.query(Notification)
         .filter(Notification.user_id == user.id)
@@ -205,10 +194,9 @@ def list_notifications(
 @router.patch("/notifications/{notification_id}/read", response_model=NotificationResponse)
 def mark_notification_read(
     notification_id: int = Path(...),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    user = _get_user(current_user, db)
     notif = db.query(Notification).filter(
         Notification.id == notification_id,
         Notification.user_id == user.id,
@@ -224,10 +212,9 @@ def mark_notification_read(
 
 @router.patch("/notifications/read-all", status_code=204)
 def mark_all_read(
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    user = _get_user(current_user, db)
     now = datetime.utcnow()
     db.query(Notification).filter(
         Notification.user_id == user.id,
@@ -239,10 +226,9 @@ def mark_all_read(
 @router.delete("/notifications/{notification_id}", status_code=204)
 def delete_notification(
     notification_id: int = Path(...),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    user = _get_user(current_user, db)
     notif = db.query(Notification).filter(
         Notification.id == notification_id,
         Notification.user_id == user.id,
@@ -262,83 +248,74 @@ def check_budget_alerts(session_factory):
 
     Called daily by APScheduler (00:10 UTC) after recurring expense generation.
     Deduplication: one notification per alert per calendar month.
+
+    Runs in chunks of users: alerts, month rows, category rollups and existing
+    dedup keys are each loaded with one IN query per chunk, and the chunk's
+    notifications are committed together before any email goes out.
     """
     db = session_factory()
     try:
         current_month = datetime.utcnow().strftime("%Y-%m")
 
-        # Load all active, non-deleted alerts
-        alerts = (
-            db.query(BudgetAlert)
-            .filter(BudgetAlert.deleted_at == None, BudgetAlert.active == True)
-            .all()
-        )
-        if not alerts:
-            return
-
-        # Group alerts by user_id to avoid redundant DB lookups
-        alerts_by_user: dict[int, list[BudgetAlert]] = defaultdict(list)
-        for a in alerts:
-            alerts_by_user[a.user_id].append(a)
-
-        for user_id, user_alerts in alerts_by_user.items():
-            user = db.query(User).filter(User.id == user_id).first()
-            if not user or user.deleted_at is not None:
-                continue
-
-            # Find the MonthlyData row for the current month
-            all_months = (
-                db.query(MonthlyData)
-                .filter(MonthlyData.user_id == user_id)
+        user_ids = [
+            uid for (uid,) in (
+                db.query(BudgetAlert.user_id)
+                .filter(BudgetAlert.deleted_at == None, BudgetAlert.active == True)
+                .distinct()
+                .order_by(BudgetAlert.user_id)
                 .all()
             )
-            month_row = next((m for m in all_months if m.month == current_month), None)
-            if not month_row:
-                continue
+        ]
+        if not user_ids:
+            return
 
-            # Fetch and decrypt all active expenses for the month
-            expenses = (
-                db.query(MonthlyExpense)
+        def process(db, chunk):
+            users = {
+                u.id: u for u in db.query(User).filter(User.id.in_(chunk), User.deleted_at == None)
+            }
+            months = month_rows_for_users(db, users, current_month)
+            if not months:
+                return []
+            totals = category_totals_by_month(db, [m.id for m in months.values()])
+            alerts = prefetch_decrypted(
+                db.query(BudgetAlert)
                 .filter(
-                    MonthlyExpense.monthly_data_id == month_row.id,
-                    MonthlyExpense.deleted_at == None,
+                    BudgetAlert.user_id.in_(list(months)),
+                    BudgetAlert.deleted_at == None,
+                    BudgetAlert.active == True,
                 )
-                .all()
+                .order_by(BudgetAlert.id)
+                .all(),
+                "category",
             )
 
-            # Aggregate planned/actual by category
-            category_planned: dict[str, float] = defaultdict(float)
-            category_actual: dict[str, float] = defaultdict(float)
-            for e in expenses:
-                cat = e.category or "Other"
-                category_planned[cat] += e.planned_amount or 0.0
-                category_actual[cat] += e.actual_amount or 0.0
-
-            for alert in user_alerts:
+            breaches = []
+            for alert in alerts:
                 cat = alert.category or ""
-                planned = category_planned.get(cat, 0.0)
+                cell = totals[months[alert.user_id].id].get(cat)
+                planned = cell["planned"] if cell else 0.0
                 if planned <= 0:
                     continue
 
-                actual = category_actual.get(cat, 0.0)
+                actual = cell["actual"]
                 ratio_pct = (actual / planned) * 100.0
-
                 if ratio_pct < alert.threshold_pct:
                     continue
+                breaches.append((alert, cat, actual, planned, ratio_pct))
 
-                # Deduplication: one notification per alert per month
+            # Deduplication: one notification per alert per month
+            sent = existing_dedup_keys(
+                db, [f"ba:{alert.id}:{current_month}" for alert, *_ in breaches]
+            )
+            emails = []
+            for alert, cat, actual, planned, ratio_pct in breaches:
                 dedup_key = f"ba:{alert.id}:{current_month}"
-                already_sent = (
-                    db.query(Notification)
-                    .filter(Notification.dedup_key == dedup_key)
-                    .first()
-                )
-                if already_sent:
+                if dedup_key in sent:
                     continue
 
                 pct_display = round(ratio_pct, 1)
                 notif = Notification(
-                    user_id=user_id,
+                    user_id=alert.user_id,
                     type="budget_alert",
                     dedup_key=dedup_key,
                 )
@@ -348,18 +325,17 @@ def check_budget_alerts(session_factory):
                     f"(£{actual:.2f} of £{planned:.2f} planned)."
                 )
                 db.add(notif)
-                db.commit()
 
+                user = users[alert.user_id]
                 if getattr(user, "notif_budget_alerts", True):
-                    try:
-                        send_budget_alert_email(
-                            user.email, cat, pct_display, actual, planned, current_month
-                        )
-                    except Exception:
-                        logger.exception(
-                            "Failed to send budget alert email to %s for category %s",
-                            user.email, cat,
-                        )
+                    emails.append((user.email, cat, pct_display, actual, planned, current_month))
+            return emails
+
+        def deliver(args):
+            send_budget_alert_email(*args)
+
+        with BatchJob("check_budget_alerts", session_factory) as job:
+            job.run_chunks(db, user_ids, process, deliver)
 
     except Exception:
         logger.exception("check_budget_alerts background job failed")
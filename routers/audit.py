@@ -13,8 +13,8 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from database import get_db, AuditLog
-from security import verify_token
+from database import get_db, AuditLog, User
+from security import get_current_user
 from models import AuditLogResponse
 
 router = APIRouter(prefix="/audit", tags=["audit"])
@@ -24,7 +24,7 @@ logger = logging.getLogger(__name__)
 @router.get("/expenses/{expense_id}", response_model=List[AuditLogResponse])
 def get_expense_audit(
     expense_id: int,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """
@@ -33,11 +33,6 @@ def get_expense_audit(
     audited endpoint, or wrong expense_id).
     Returns 403 if the requesting user does not own any of the audit entries.
     """
-    from database import User
-
-    user = db.query(User).filter(User.email == current_user).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
 
     entries = (
         db.query(AuditLog)
@@ -23,7 +23,8 @@ import hashlib
 import hmac
 import logging
 import secrets
-from datetime import datetime, timedelta
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
 from urllib.parse import urlencode
 
 import httpx
@@ -33,7 +34,18 @@ from sqlalchemy.orm import Session
 
 from core.config import settings
 from core.limiter import limiter
-from database import BankConnection, BankTransaction, MonthlyData, MonthlyExpense, User, get_db
+from database import (
+    BankConnection,
+    BankTransaction,
+    MonthlyData,
+    MonthlyExpense,
+    User,
+    encrypt_value,
+    external_id_blind_index,
+    find_month_row,
+    get_db,
+    iter_decrypted_tuples,
+)
 from models import (
     BankConfirmAllResponse,
     BankConnectResponse,
@@ -46,7 +58,7 @@ from models import (
     BankSyncResponse,
     BankTransactionResponse,
 )
-from security import verify_token
+from security import verify_token, get_current_user
 
 logger = logging.getLogger(__name__)
 
@@ -108,13 +120,6 @@ def _verify_state(state: str) -> int:
 # DB helpers
 # ---------------------------------------------------------------------------
 
-def _require_user(db: Session, email: str) -> User:
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
-
 def _connection_response(conn: BankConnection) -> BankConnectionResponse:
     return BankConnectionResponse(
         id=conn.id,
@@ -146,7 +151,7 @@ def banking_status(current_user: str = Depends(verify_token)):
 
 @router.get("/connect", response_model=BankConnectResponse)
 def connect_bank(
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """
@@ -159,7 +164,6 @@ def connect_bank(
             detail="Open banking is not configured on this server",
         )
 
-    user = _require_user(db, current_user)
     state = _make_state(user.id)
 
     params = {
@@ -334,7 +338,7 @@ def list_institutions(
 @router.get("/connect/gocardless", response_model=BankConnectResponse)
 def connect_gocardless(
     institution_id: str = Query(..., description="GoCardless institution ID e.g. MONZO_MONZGB2L"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """
@@ -344,7 +348,6 @@ def connect_gocardless(
     if not _gc_configured():
         raise HTTPException(status_code=503, detail="GoCardless is not configured on this server")
 
-    user = _require_user(db, current_user)
     state = _make_state(user.id)
     token = _gc_api_token()
 
@@ -509,7 +512,7 @@ def _fetch_transactions_gocardless(account_ids_str: str, from_dt: datetime) -> l
 @router.post("/refresh/{connection_id}", response_model=BankConnectionResponse)
 def refresh_connection(
     connection_id: int,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """
@@ -519,7 +522,6 @@ def refresh_connection(
     if not _truelayer_configured():
         raise HTTPException(status_code=503, detail="Open banking is not configured")
 
-    user = _require_user(db, current_user)
     conn = (
         db.query(BankConnection)
         .filter(
@@ -572,14 +574,13 @@ def refresh_connection(
 @router.get("/connections/{connection_id}/details")
 def connection_details(
     connection_id: int,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """
     Fetch live account name and balance from TrueLayer for a connection.
     Not cached — called by the frontend when the card is rendered.
     """
-    user = _require_user(db, current_user)
     conn = (
         db.query(BankConnection)
         .filter(
@@ -667,11 +668,10 @@ def connection_details(
 
 @router.get("/connections", response_model=BankConnectionListResponse)
 def list_connections(
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Return the current user's active (non-disconnected) bank connections."""
-    user = _require_user(db, current_user)
     connections = (
         db.query(BankConnection)
         .filter(
@@ -693,7 +693,7 @@ def list_connections(
 @router.delete("/connections/{connection_id}", response_model=BankDisconnectResponse)
 def disconnect_bank(
     connection_id: int,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """
@@ -704,7 +704,6 @@ def disconnect_bank(
     - Hard-deletes all BankTransaction rows in 'draft' status for this connection.
     - Nulls bank_connection_id on 'confirmed' rows (preserves confirmed expenses).
     """
-    user = _require_user(db, current_user)
     conn = (
         db.query(BankConnection)
         .filter(
@@ -775,40 +774,83 @@ def disconnect_bank(
 # Internal helpers for sync
 # ---------------------------------------------------------------------------
 
-def _suggest_category(db: Session, user_id: int, description: str) -> str | None:
+# Drafts are written with one multi-row INSERT per batch
+SYNC_INSERT_BATCH = 500
+
+
+def _category_history(db: Session, user_id: int) -> dict[str, Counter]:
     """
-    Return the most frequently used category for the given description
-    from the user's own expense history (same logic as GET /insights/suggest-category).
-    Returns None when there are fewer than 2 history matches.
+    The user's live expenses as {lowercased name: Counter(category)}, built
+    with one decrypt pass per sync rather than one per transaction.
     """
-    all_monthly = db.query(MonthlyData).filter(MonthlyData.user_id == user_id).all()
-    if not all_monthly:
-        return None
-
-    monthly_ids = [m.id for m in all_monthly]
-    expenses = (
-        db.query(MonthlyExpense)
-        .filter(
-            MonthlyExpense.monthly_data_id.in_(monthly_ids),
-            MonthlyExpense.deleted_at == None,  # noqa: E711
-        )
-        .all()
+    query = (
+        db.query(MonthlyExpense._name_encrypted, MonthlyExpense._category_encrypted)
+        .join(MonthlyData, MonthlyData.id == MonthlyExpense.monthly_data_id)
+        .filter(MonthlyData.user_id == user_id, MonthlyExpense.deleted_at.is_(None))
     )
+    history: dict[str, Counter] = defaultdict(Counter)
+    for name, category in iter_decrypted_tuples(query, plain=0):
+        history[(name or "").lower()][category or "Other"] += 1
+    return history
 
+
+def _suggest_category(history: dict[str, Counter], description: str) -> str | None:
+    """
+    Return the most frequently used category for the given description
+    from the user's expense *history* (same logic as GET /insights/suggest-category).
+    Returns None when there are fewer than 2 history matches.
+    """
     name_lower = description.strip().lower()
-    category_counts: dict[str, int] = {}
-    for expense in expenses:
-        exp_name = (expense.name or "").lower()
+    category_counts: Counter = Counter()
+    for exp_name, categories in history.items():
         if name_lower in exp_name:
-            cat = expense.category or "Other"
-            category_counts[cat] = category_counts.get(cat, 0) + 1
+            category_counts.update(categories)
 
-    total = sum(category_counts.values())
-    if total < 2:
+    if sum(category_counts.values()) < 2:
         return None
     return max(category_counts, key=lambda c: category_counts[c])
 
 
+def _existing_external_bidx(db: Session, connection_id: int, bidxs: list[str]) -> set[str]:
+    """The subset of external-id blind indexes *bidxs* already synced on the connection."""
+    found: set[str] = set()
+    for i in range(0, len(bidxs), SYNC_INSERT_BATCH):
+        found.update(
+            bidx for (bidx,) in db.query(BankTransaction.external_id_bidx).filter(
+                BankTransaction.bank_connection_id == connection_id,
+                BankTransaction.external_id_bidx.in_(bidxs[i:i + SYNC_INSERT_BATCH]),
+            )
+        )
+    return found
+
+
+def _normalise_transaction(raw: dict, is_gocardless: bool) -> tuple[str, str, object, str, date]:
+    """(external_id, description, amount, currency, date) from a provider transaction."""
+    # Normalised keys differ between providers — GoCardless normalisation done in helper
+    if is_gocardless:
+        ext_id = raw.get("transaction_id", "")
+        description = raw.get("description", "")
+        amount = raw.get("amount")
+        currency = raw.get("currency", "GBP")
+        txn_date_str = raw.get("date", "")
+    else:
+        ext_id = raw.get("transaction_id") or raw.get("id", "")
+        description = raw.get("description") or raw.get("merchant_name") or ""
+        amount = raw.get("amount")
+        currency = raw.get("currency", "GBP")
+        txn_date_str = raw.get("timestamp") or raw.get("date") or ""
+
+    try:
+        if "T" in txn_date_str:
+            txn_date = datetime.fromisoformat(txn_date_str.replace("Z", "+00:00")).date()
+        else:
+            txn_date = date.fromisoformat(txn_date_str[:10])
+    except (ValueError, AttributeError):
+        txn_date = datetime.utcnow().date()
+
+    return ext_id, description, amount, currency, txn_date
+
+
 def _get_active_connection(db: Session, user_id: int, connection_id: int | None) -> BankConnection:
     """Return the user's active connection, optionally filtered by id. Raises 404 if not found."""
     q = db.query(BankConnection).filter(
@@ -872,10 +914,9 @@ def _transaction_response(txn: BankTransaction) -> BankTransactionResponse:
 
 def _get_or_create_month(db: Session, user: User, month: str) -> MonthlyData:
     """Get or create a MonthlyData row for the given YYYY-MM month string."""
-    all_monthly = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-    for row in all_monthly:
-        if row.month == month:
-            return row
+    row = find_month_row(db, user.id, month)
+    if row:
+        return row
     rec = MonthlyData(user_id=user.id)
     rec.month = month
     db.add(rec)
@@ -893,20 +934,20 @@ def _get_or_create_month(db: Session, user: User, month: str) -> MonthlyData:
 def sync_transactions(
     request: Request,
     connection_id: int | None = Query(default=None, description="Specific connection ID to sync (optional)"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """
     Fetch new transactions from TrueLayer for the user's active connection.
     Transactions since last_synced_at (or 90 days ago on first sync) are fetched.
-    Existing transactions are deduplicated by external_id.
-    Each new transaction gets a category suggestion from the user's expense history.
+    Existing transactions are deduplicated by external_id (via its blind index).
+    Each new transaction gets a category suggestion from the user's expense
+    history, which is decrypted once per sync; drafts are inserted in bulk.
     Rate-limited to 1 call per 5 minutes per IP.
     """
     if not _truelayer_configured():
         raise HTTPException(status_code=503, detail="Open banking is not configured on this server")
 
-    user = _require_user(db, current_user)
     conn = _get_active_connection(db, user.id, connection_id)
 
     logger.info(
@@ -942,60 +983,50 @@ def sync_transactions(
         logger.exception("Unexpected error during sync for connection %s: %s", conn.id, exc)
         raise HTTPException(status_code=500, detail=f"Sync failed unexpectedly: {type(exc).__name__}: {exc}")
 
-    # Collect existing external IDs for deduplication
-    existing_txns = (
-        db.query(BankTransaction)
-        .filter(BankTransaction.bank_connection_id == conn.id)
-        .all()
-    )
-    existing_external_ids = {t.external_id for t in existing_txns}
-
-    synced = 0
+    # Deduplicate against this batch and, via the external_id blind index,
+    # against what earlier syncs stored — no existing row is decrypted
+    candidates = {}
     skipped = 0
     for raw in raw_txns:
-        # Normalised keys differ between providers — GoCardless normalisation done in helper
-        if is_gocardless:
-            ext_id = raw.get("transaction_id", "")
-            description = raw.get("description", "")
-            amount = raw.get("amount")
-            currency = raw.get("currency", "GBP")
-            txn_date_str = raw.get("date", "")
-        else:
-            ext_id = raw.get("transaction_id") or raw.get("id", "")
-            description = raw.get("description") or raw.get("merchant_name") or ""
-            amount = raw.get("amount")
-            currency = raw.get("currency", "GBP")
-            txn_date_str = raw.get("timestamp") or raw.get("date") or ""
-
-        if not ext_id or ext_id in existing_external_ids:
+        txn = _normalise_transaction(raw, is_gocardless)
+        bidx = external_id_blind_index(txn[0]) if txn[0] else None
+        if bidx is None or bidx in candidates:
             skipped += 1
             continue
-
-        try:
-            from datetime import date as date_type
-            if "T" in txn_date_str:
-                txn_date = datetime.fromisoformat(txn_date_str.replace("Z", "+00:00")).date()
-            else:
-                txn_date = date_type.fromisoformat(txn_date_str[:10])
-        except (ValueError, AttributeError):
-            txn_date = datetime.utcnow().date()
-
-        suggested = _suggest_category(db, user.id, description) if description else None
-
-        txn = BankTransaction(
-            user_id=user.id,
-            bank_connection_id=conn.id,
-            transaction_date=txn_date,
-            suggested_category=suggested,
-            status="draft",
-        )
-        txn.external_id = ext_id
-        txn.description = description
-        txn.amount = float(amount) if amount is not None else None
-        txn.currency = currency
-        db.add(txn)
-        existing_external_ids.add(ext_id)
-        synced += 1
+        candidates[bidx] = txn
+    already_synced = _existing_external_bidx(db, conn.id, list(candidates))
+    skipped += len(already_synced)
+
+    history = None
+    suggestions: dict[str, str | None] = {}
+    now = datetime.utcnow()
+    rows = []
+    for bidx, (ext_id, description, amount, currency, txn_date) in candidates.items():
+        if bidx in already_synced:
+            continue
+        suggested = None
+        if description:
+            if description not in suggestions:
+                if history is None:
+                    history = _category_history(db, user.id)
+                suggestions[description] = _suggest_category(history, description)
+            suggested = suggestions[description]
+        rows.append({
+            "user_id": user.id,
+            "bank_connection_id": conn.id,
+            "external_id_encrypted": encrypt_value(ext_id),
+            "external_id_bidx": bidx,
+            "description_encrypted": encrypt_value(description) if description else None,
+            "amount_encrypted": encrypt_value(str(float(amount))) if amount is not None else None,
+            "currency_encrypted": encrypt_value(currency) if currency else None,
+            "transaction_date": txn_date,
+            "suggested_category": suggested,
+            "status": "draft",
+            "created_at": now,
+        })
+    for i in range(0, len(rows), SYNC_INSERT_BATCH):
+        db.execute(BankTransaction.__table__.insert(), rows[i:i + SYNC_INSERT_BATCH])
+    synced = len(rows)
 
     conn.last_synced_at = datetime.utcnow()
     db.commit()
@@ -1037,11 +1068,10 @@ def _do_refresh_connection(db: Session, conn: BankConnection) -> None:
 def list_drafts(
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=25, ge=1, le=100),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Return a paginated list of the user's draft (unreviewed) bank transactions."""
-    user = _require_user(db, current_user)
 
     all_drafts = (
         db.query(BankTransaction)
@@ -1073,7 +1103,7 @@ def list_drafts(
 def action_draft(
     draft_id: int,
     body: BankDraftActionRequest,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """
@@ -1086,7 +1116,6 @@ def action_draft(
     if body.action not in ("confirm", "reject"):
         raise HTTPException(status_code=422, detail="action must be 'confirm' or 'reject'")
 
-    user = _require_user(db, current_user)
     txn = db.query(BankTransaction).filter(BankTransaction.id == draft_id).first()
     if not txn:
         raise HTTPException(status_code=404, detail="Draft transaction not found")
@@ -1129,11 +1158,10 @@ def action_draft(
 
 @router.post("/drafts/confirm-all", response_model=BankConfirmAllResponse)
 def confirm_all_drafts(
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Bulk confirm all draft transactions for the authenticated user."""
-    user = _require_user(db, current_user)
 
     all_drafts = (
         db.query(BankTransaction)
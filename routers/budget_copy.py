@@ -13,8 +13,8 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from core.cache import invalidate_annual_cache
-from database import MonthlyData, MonthlyExpense, User, get_db
-from security import verify_token
+from database import MonthlyData, MonthlyExpense, User, find_month_row, get_db
+from security import get_current_user
 
 logger = logging.getLogger(__name__)
 
@@ -34,20 +34,18 @@ def _normalize_month(m: str) -> str:
     parts = (m or "").split("-")
     if len(parts) != 2:
         raise HTTPException(status_code=422, detail="month must be 'YYYY-MM'")
-    y, mo = parts
     try:
-        return f"{int(y):04d}-{int(mo):02d}"
+        y, mo = int(parts[0]), int(parts[1])
     except ValueError:
         raise HTTPException(status_code=422, detail="month must be 'YYYY-MM'")
+    if not (1 <= mo <= 12):
+        raise HTTPException(status_code=422, detail="month must be 'YYYY-MM'")
+    return f"{y:04d}-{mo:02d}"
 
 
 def _find_month(db: Session, user_id: int, month_str: str) -> MonthlyData | None:
-    """Linear scan with decryption — required because month is Fernet-encrypted."""
-    rows = db.query(MonthlyData).filter(MonthlyData.user_id == user_id).all()
-    for row in rows:
-        if row.month == month_str:
-            return row
-    return None
+    """Indexed lookup via the month blind index (month itself is Fernet-encrypted)."""
+    return find_month_row(db, user_id, month_str)
 
 
 def _get_or_create_month(db: Session, user: User, month_str: str) -> MonthlyData:
@@ -74,7 +72,7 @@ def _get_or_create_month(db: Session, user: User, month_str: str) -> MonthlyData
 def copy_budget_forward(
     payload: CopyForwardRequest,
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
     """
     Copy all planned expenses (and salary_planned) from *from_month* to
@@ -89,10 +87,6 @@ def copy_budget_forward(
             status_code=400, detail="from_month and to_month must be different"
         )
 
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
     # Source month must exist
     source = _find_month(db, user.id, from_month)
     if not source:
@@ -154,7 +148,7 @@ def copy_budget_forward(
 
     logger.info(
         "budget_copy_forward user=%s from=%s to=%s copied=%d skipped=%d",
-        email, from_month, to_month, copied, skipped,
+        user.email, from_month, to_month, copied, skipped,
     )
 
     return {
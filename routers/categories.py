@@ -15,7 +15,7 @@ from sqlalchemy.orm import Session
 
 from database import DEFAULT_CATEGORIES, UserCategory, User, get_db
 from models import UserCategoryCreate, UserCategoryUpdate, UserCategoryResponse
-from security import verify_token
+from security import get_current_user
 
 logger = logging.getLogger(__name__)
 
@@ -24,13 +24,6 @@ router = APIRouter(prefix="/categories", tags=["categories"])
 
 # -------------------- Helpers --------------------
 
-def _get_user(email: str, db: Session) -> User:
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
-
 def _seed_defaults(db: Session, user_id: int) -> None:
     """Insert the 8 built-in categories for a user who has none yet."""
     for name, color in DEFAULT_CATEGORIES:
@@ -57,20 +50,18 @@ def _get_or_seed(db: Session, user_id: int) -> List[UserCategory]:
 
 @router.get("", response_model=List[UserCategoryResponse])
 def list_categories(
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    user = _get_user(current_user, db)
     return _get_or_seed(db, user.id)
 
 
 @router.post("", response_model=UserCategoryResponse, status_code=201)
 def create_category(
     payload: UserCategoryCreate,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    user = _get_user(current_user, db)
     _get_or_seed(db, user.id)  # ensure defaults exist before adding a custom one
 
     existing = (
@@ -93,10 +84,9 @@ def create_category(
 def update_category(
     category_id: int = Path(...),
     payload: UserCategoryUpdate = None,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    user = _get_user(current_user, db)
     cat = (
         db.query(UserCategory)
         .filter(UserCategory.id == category_id, UserCategory.user_id == user.id)
@@ -130,10 +120,9 @@ def update_category(
 @router.delete("/{category_id}", status_code=204)
 def delete_category(
     category_id: int = Path(...),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    user = _get_user(current_user, db)
     cat = (
         db.query(UserCategory)
         .filter(UserCategory.id == category_id, UserCategory.user_id == user.id)
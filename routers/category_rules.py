@@ -3,7 +3,11 @@ Category-rule CRUD + bulk-apply endpoint.
 
 Rules let users define keyword patterns that auto-assign categories to expenses.
 Pattern matching is case-insensitive substring.  Rules evaluated in ascending
-priority order; first match wins.
+priority order; first match wins.  A user's rules are compiled into one
+KeywordMatcher (core/matcher.py) so a name is matched in a single pass however
+many rules there are; compiled matchers are cached on the rules' contents, so
+any create/update/delete yields a fresh one. The cache holds only patterns
+and rule positions — categories are decrypted per request, from the rows.
 
 Endpoints
 ---------
@@ -16,14 +20,16 @@ POST   /category-rules/apply        re-categorize all expenses in a month
 from __future__ import annotations
 
 from datetime import datetime
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
-from database import CategoryRule, MonthlyData, MonthlyExpense, User, get_db
-from security import verify_token
+from core.matcher import KeywordMatcher
+from database import CategoryRule, MonthlyExpense, User, find_month_row, get_db
+from security import get_current_user
 
 router = APIRouter(prefix="/category-rules", tags=["category-rules"])
 
@@ -55,13 +61,6 @@ class CategoryRuleOut(BaseModel):
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
-def _require_user(db: Session, email: str) -> User:
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
-
 def _get_rule(db: Session, rule_id: int, user_id: int) -> CategoryRule:
     rule = (
         db.query(CategoryRule)
@@ -81,34 +80,62 @@ def _normalize_month(m: str) -> str:
     parts = (m or "").split("-")
     if len(parts) != 2:
         raise HTTPException(status_code=422, detail="month must be 'YYYY-MM'")
-    y, mo = parts
     try:
-        return f"{int(y):04d}-{int(mo):02d}"
+        y, mo = int(parts[0]), int(parts[1])
     except ValueError:
         raise HTTPException(status_code=422, detail="month must be 'YYYY-MM'")
+    if not (1 <= mo <= 12):
+        raise HTTPException(status_code=422, detail="month must be 'YYYY-MM'")
+    return f"{y:04d}-{mo:02d}"
+
+
+@lru_cache(maxsize=256)
+def _compile_rules(key: tuple) -> KeywordMatcher[int]:
+    # Matches map to the rule's position: no decrypted category is cached
+    return KeywordMatcher((pattern, rank) for rank, (_, pattern, _) in enumerate(key))
+
+
+class RulesMatcher:
+    """A cached compiled matcher bound to the rule rows it was built from."""
+
+    def __init__(self, matcher: KeywordMatcher[int], rules: List[CategoryRule]):
+        self._matcher = matcher
+        self._rules = rules
+
+    def match(self, name: str) -> Optional[str]:
+        """Category of the first matching rule (decrypted on the row), or None."""
+        rank = self._matcher.match(name)
+        return None if rank is None else self._rules[rank].category
+
+
+def rules_matcher(rules: List[CategoryRule]) -> RulesMatcher:
+    """
+    Compiled matcher for *rules*, evaluated in ascending priority (ties keep
+    list order).  Keyed on each rule's id, pattern and encrypted category in
+    that order, so an edited, reordered, added or removed rule recompiles.
+    """
+    ordered = sorted(rules, key=lambda r: r.priority)
+    matcher = _compile_rules(tuple((r.id, r.pattern, r._category_encrypted) for r in ordered))
+    return RulesMatcher(matcher, ordered)
 
 
 def apply_rules_to_name(rules: List[CategoryRule], name: str) -> Optional[str]:
     """
     Return the category of the first rule (sorted by priority asc) whose
     pattern is a case-insensitive substring of *name*, or None if no match.
+    Matching many names against the same rules? Use rules_matcher() once.
     """
-    lower_name = name.lower()
-    for rule in sorted(rules, key=lambda r: r.priority):
-        if rule.pattern.lower() in lower_name:
-            return rule.category
-    return None
+    return rules_matcher(rules).match(name)
 
 
 # ── Endpoints ─────────────────────────────────────────────────────────────────
 
 @router.get("", response_model=List[CategoryRuleOut])
 def list_rules(
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> List[Dict[str, Any]]:
     """Return active rules for the current user, ordered by priority then id."""
-    user = _require_user(db, current_user)
     rules = (
         db.query(CategoryRule)
         .filter(
@@ -133,10 +160,9 @@ def list_rules(
 @router.post("", response_model=CategoryRuleOut, status_code=201)
 def create_rule(
     body: CategoryRuleCreate,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> CategoryRuleOut:
-    user = _require_user(db, current_user)
     rule = CategoryRule(user_id=user.id, pattern=body.pattern, priority=body.priority)
     rule.category = body.category
     db.add(rule)
@@ -155,10 +181,9 @@ def create_rule(
 def update_rule(
     rule_id: int,
     body: CategoryRuleUpdate,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> CategoryRuleOut:
-    user = _require_user(db, current_user)
     rule = _get_rule(db, rule_id, user.id)
     if body.pattern is not None:
         rule.pattern = body.pattern
@@ -180,10 +205,9 @@ def update_rule(
 @router.delete("/{rule_id}", status_code=204, response_model=None)
 def delete_rule(
     rule_id: int,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    user = _require_user(db, current_user)
     rule = _get_rule(db, rule_id, user.id)
     rule.deleted_at = datetime.utcnow()
     db.commit()
@@ -192,7 +216,7 @@ def delete_rule(
 @router.post("/apply")
 def apply_rules(
     month: str = Query(..., description="Month in YYYY-MM format"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -200,7 +224,6 @@ def apply_rules(
     user's active rules.  Returns the count of updated expenses.
     """
     month_norm = _normalize_month(month)
-    user = _require_user(db, current_user)
 
     rules = (
         db.query(CategoryRule)
@@ -212,13 +235,7 @@ def apply_rules(
         .all()
     )
 
-    # Find the month row first (O(n) decrypt — consistent with the rest of the app)
-    all_months = (
-        db.query(MonthlyData)
-        .filter(MonthlyData.user_id == user.id)
-        .all()
-    )
-    month_row = next((m for m in all_months if m.month == month_norm), None)
+    month_row = find_month_row(db, user.id, month_norm)
     if not month_row:
         raise HTTPException(status_code=404, detail="No data found for that month")
 
@@ -234,9 +251,10 @@ def apply_rules(
         .all()
     )
 
+    matcher = rules_matcher(rules)
     updated = 0
     for exp in expenses:
-        new_cat = apply_rules_to_name(rules, exp.name or "")
+        new_cat = matcher.match(exp.name or "")
         if new_cat and new_cat != exp.category:
             exp.category = new_cat
             updated += 1
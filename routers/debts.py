@@ -17,7 +17,7 @@ from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
 from sqlalchemy.orm import Session
 
 from database import get_db, Debt, User
-from security import verify_token
+from security import get_current_user
 from models import (
     DebtCreate,
     DebtUpdate,
@@ -37,13 +37,6 @@ MAX_PAYOFF_MONTHS = 360  # cap simulation to avoid infinite loops
 
 # ---------- helpers ----------
 
-def _get_user(db: Session, email: str) -> User:
-    user = db.query(User).filter(User.email == email, User.deleted_at == None).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
-
-
 def _get_debt(debt_id: int, user: User, db: Session) -> Debt:
     debt = (
         db.query(Debt)
@@ -170,12 +163,11 @@ def _compute_payoff_plan(debts: List[Debt], strategy: str) -> dict:
 def get_payoff_plan(
     strategy: str = Query(default="avalanche", description="snowball or avalanche"),
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
     if strategy not in VALID_STRATEGIES:
         raise HTTPException(status_code=422, detail="strategy must be 'snowball' or 'avalanche'")
 
-    user = _get_user(db, email)
     debts = (
         db.query(Debt)
         .filter(Debt.user_id == user.id, Debt.deleted_at == None)
@@ -196,9 +188,8 @@ def get_payoff_plan(
 @router.get("", response_model=List[DebtResponse])
 def list_debts(
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
-    user = _get_user(db, email)
     debts = (
         db.query(Debt)
         .filter(Debt.user_id == user.id, Debt.deleted_at == None)
@@ -212,9 +203,8 @@ def list_debts(
 def create_debt(
     body: DebtCreate,
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
-    user = _get_user(db, email)
     if body.balance <= 0:
         raise HTTPException(status_code=422, detail="balance must be positive")
     if body.interest_rate < 0 or body.interest_rate > 2:
@@ -241,9 +231,8 @@ def update_debt(
     body: DebtUpdate,
     debt_id: int = Path(...),
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
-    user = _get_user(db, email)
     debt = _get_debt(debt_id, user, db)
 
     if "name" in body.model_fields_set and body.name is not None:
@@ -270,9 +259,8 @@ def update_debt(
 def delete_debt(
     debt_id: int = Path(...),
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
-    user = _get_user(db, email)
     debt = _get_debt(debt_id, user, db)
     debt.deleted_at = datetime.utcnow()
     db.commit()
@@ -7,34 +7,46 @@ GET /export/pdf?month=YYYY-MM                         — monthly budget report
 GET /export/tax-summary?tax_year=YYYY                 — UK tax-year spending summary (JSON)
 GET /export/tax-pdf?tax_year=YYYY                     — SA302-style tax summary PDF
 GET /export/full-backup                               — full account data export as JSON (1/hour)
+GET /export/gdpr                                      — GDPR Article 20 data export as JSON (1/hour)
+POST /export/jobs                                     — queue any of pdf/tax-pdf/full-backup/gdpr in the background
+GET /export/jobs/{id}, GET /export/jobs/{id}/download — poll a queued export and fetch its artifact
 
 CSV/PDF endpoints are rate-limited to 1 request/minute per IP.
 Tax endpoints are rate-limited to 1 request/minute per IP.
 Full-backup endpoint is rate-limited to 1 request/hour per IP.
+Export jobs are rate-limited to 30 requests/hour per IP; identical requests
+reuse the existing job until the account's data or profile changes. New
+full-backup and gdpr job renders keep their 1/hour limit, per account.
 """
 import calendar as _calendar
 import csv
+import hashlib
 import io
 import json
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
-from typing import Optional
+from typing import Callable, Iterator, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from core.config import VERSION
+from core.config import VERSION, settings
+from core.json_stream import stream_json_object
 from core.limiter import limiter
+from core.storage import get_storage
 from database import (
-    get_db, User, MonthlyData, MonthlyExpense,
+    expenses_by_month, find_month_row, get_db, iter_decrypted_batches, months_in_range, prefetch_decrypted,
+    release_rows, SessionLocal, User, MonthlyData, MonthlyExpense,
     RecurringExpense, SavingsGoal, SavingsContribution,
     Debt, UserCategory, NetWorthSnapshot,
     BudgetAlert, BankConnection, CategoryRule, IncomeSource,
-    HouseholdMembership,
+    HouseholdMembership, ExportJob,
 )
-from models import TaxSummaryResponse, TaxCategoryBreakdown
-from security import verify_token
+from models import ExportJobCreate, ExportJobResponse, TaxSummaryResponse, TaxCategoryBreakdown
+from security import get_current_user
 
 # HMRC Self-Assessment expense category mapping.
 # Keys: our internal category names.
@@ -58,11 +70,15 @@ router = APIRouter(prefix="/export", tags=["export"])
 
 # -------------------- helpers --------------------
 
-def _require_user(db: Session, email: str) -> User:
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+def _require_fpdf():
+    try:
+        from fpdf import FPDF
+    except ImportError:
+        raise HTTPException(
+            status_code=503,
+            detail="PDF generation is not available (fpdf2 not installed)",
+        )
+    return FPDF
 
 
 def _validate_month(m: str) -> str:
@@ -78,14 +94,36 @@ def _validate_month(m: str) -> str:
     return f"{year:04d}-{mo:02d}"
 
 
-def _month_in_range(month_str: str, from_month: str, to_month: str) -> bool:
-    return from_month <= month_str <= to_month
+def _validate_tax_year(tax_year: int) -> int:
+    current_year = datetime.utcnow().year
+    if tax_year < 2000 or tax_year > current_year + 1:
+        raise HTTPException(
+            status_code=422,
+            detail=f"tax_year must be between 2000 and {current_year + 1}",
+        )
+    return tax_year
 
 
 def _get_all_months(db: Session, user: User) -> list[MonthlyData]:
     return db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
 
 
+def _contributions_by_goal(db: Session, goal_ids: list[int]) -> dict[int, list[SavingsContribution]]:
+    """Load contributions for many goals in one query and batch-decrypt them."""
+    if not goal_ids:
+        return {}
+    contribs = prefetch_decrypted(
+        db.query(SavingsContribution)
+        .filter(SavingsContribution.goal_id.in_(goal_ids))
+        .order_by(SavingsContribution.id)
+        .all()
+    )
+    grouped: dict[int, list[SavingsContribution]] = {}
+    for c in contribs:
+        grouped.setdefault(c.goal_id, []).append(c)
+    return grouped
+
+
 # -------------------- CSV export --------------------
 
 @router.get("/csv")
@@ -94,7 +132,7 @@ def export_csv(
     request: Request,
     from_month: str = Query(..., alias="from", description="Start month YYYY-MM"),
     to_month: str = Query(..., alias="to", description="End month YYYY-MM"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> StreamingResponse:
     """Stream all expenses in the given month range as a CSV file."""
@@ -103,29 +141,20 @@ def export_csv(
     if from_norm > to_norm:
         raise HTTPException(status_code=422, detail="'from' must not be after 'to'")
 
-    user = _require_user(db, current_user)
-    all_months = _get_all_months(db, user)
+    range_months = prefetch_decrypted(months_in_range(db, user.id, from_norm, to_norm).all(), "month")
+    month_expenses = expenses_by_month(db, [m.id for m in range_months])
 
     output = io.StringIO()
     writer = csv.writer(output)
     writer.writerow(["Month", "Category", "Name", "Planned Amount", "Actual Amount"])
 
     row_count = 0
-    for month_row in sorted(all_months, key=lambda r: r.month or ""):
+    for month_row in range_months:
         month_str = month_row.month
-        if not month_str or not _month_in_range(month_str, from_norm, to_norm):
+        if not month_str:
             continue
 
-        expenses = (
-            db.query(MonthlyExpense)
-            .filter(
-                MonthlyExpense.monthly_data_id == month_row.id,
-                MonthlyExpense.deleted_at == None,  # noqa: E711
-            )
-            .all()
-        )
-
-        for e in expenses:
+        for e in month_expenses.get(month_row.id, []):
             writer.writerow([
                 month_str,
                 e.category or "",
@@ -137,7 +166,7 @@ def export_csv(
 
     if row_count == 0:
         # Still return an empty CSV (just headers) rather than 404
-        logger.info("CSV export: no rows found for user %s in range %s–%s", current_user, from_norm, to_norm)
+        logger.info("CSV export: no rows found for user %s in range %s–%s", user.email, from_norm, to_norm)
 
     output.seek(0)
     filename = f"budget_export_{from_norm}_{to_norm}.csv"
@@ -156,27 +185,27 @@ def export_csv(
 def export_pdf(
     request: Request,
     month: str = Query(..., description="Month in YYYY-MM format"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> StreamingResponse:
     """Generate a monthly budget report as a PDF."""
-    try:
-        from fpdf import FPDF
-    except ImportError:
-        raise HTTPException(
-            status_code=503,
-            detail="PDF generation is not available (fpdf2 not installed)",
-        )
+    _require_fpdf()
 
     month_norm = _validate_month(month)
-    user = _require_user(db, current_user)
-    all_months = _get_all_months(db, user)
+    pdf_bytes = _render_month_pdf(db, user, month_norm)
+
+    filename = f"budget_report_{month_norm}.pdf"
+    return StreamingResponse(
+        iter([pdf_bytes]),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 
-    month_row: Optional[MonthlyData] = None
-    for r in all_months:
-        if r.month == month_norm:
-            month_row = r
-            break
+def _render_month_pdf(db: Session, user: User, month_norm: str) -> bytes:
+    """Render the monthly budget report for *month_norm*; 404 if the month has no data."""
+    FPDF = _require_fpdf()
+    month_row: Optional[MonthlyData] = find_month_row(db, user.id, month_norm)
 
     if not month_row:
         raise HTTPException(status_code=404, detail=f"No data found for {month_norm}")
@@ -297,14 +326,7 @@ def export_pdf(
     pdf.set_text_color(150, 150, 150)
     pdf.cell(0, 5, "Son of Mervan - Personal Budget Tracker", new_x="LMARGIN", new_y="NEXT")
 
-    pdf_bytes = pdf.output()
-
-    filename = f"budget_report_{month_norm}.pdf"
-    return StreamingResponse(
-        iter([bytes(pdf_bytes)]),
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-    )
+    return bytes(pdf.output())
 
 
 # -------------------- Tax helpers --------------------
@@ -402,17 +424,11 @@ def _build_tax_summary(
 def export_tax_summary(
     request: Request,
     tax_year: int = Query(..., description="UK tax year start, e.g. 2024 for April 2024 – April 2025"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> TaxSummaryResponse:
     """Return a JSON spending summary for the given UK tax year."""
-    current_year = datetime.utcnow().year
-    if tax_year < 2000 or tax_year > current_year + 1:
-        raise HTTPException(
-            status_code=422,
-            detail=f"tax_year must be between 2000 and {current_year + 1}",
-        )
-    user = _require_user(db, current_user)
+    _validate_tax_year(tax_year)
     return _build_tax_summary(user, db, tax_year)
 
 
@@ -423,26 +439,26 @@ def export_tax_summary(
 def export_tax_pdf(
     request: Request,
     tax_year: int = Query(..., description="UK tax year start, e.g. 2024 for April 2024 – April 2025"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> StreamingResponse:
     """Generate an SA302-style PDF summary for the given UK tax year."""
-    try:
-        from fpdf import FPDF
-    except ImportError:
-        raise HTTPException(
-            status_code=503,
-            detail="PDF generation is not available (fpdf2 not installed)",
-        )
+    _require_fpdf()
+
+    _validate_tax_year(tax_year)
+
+    pdf_bytes = _render_tax_pdf(db, user, tax_year)
+    filename = f"tax_summary_{tax_year}_{tax_year + 1}.pdf"
+    return StreamingResponse(
+        iter([pdf_bytes]),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
-    current_year = datetime.utcnow().year
-    if tax_year < 2000 or tax_year > current_year + 1:
-        raise HTTPException(
-            status_code=422,
-            detail=f"tax_year must be between 2000 and {current_year + 1}",
-        )
 
-    user = _require_user(db, current_user)
+def _render_tax_pdf(db: Session, user: User, tax_year: int) -> bytes:
+    """Render the SA302-style summary for *tax_year*."""
+    FPDF = _require_fpdf()
     summary = _build_tax_summary(user, db, tax_year)
 
     # ---- Build PDF ----
@@ -564,13 +580,52 @@ def export_tax_pdf(
     pdf.set_text_color(150, 150, 150)
     pdf.cell(0, 4, "Son of Mervan - Personal Budget Tracker  |  This is not professional tax advice.", new_x="LMARGIN", new_y="NEXT")
 
-    pdf_bytes = pdf.output()
-    filename = f"tax_summary_{tax_year}_{tax_year + 1}.pdf"
-    return StreamingResponse(
-        iter([bytes(pdf_bytes)]),
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-    )
+    return bytes(pdf.output())
+
+
+# -------------------- streamed JSON exports --------------------
+# Full-backup and GDPR exports can be arbitrarily large, so they are never
+# built in memory. Each section is a generator over yield_per batches of
+# EXPORT_BATCH_SIZE rows, decrypted a batch at a time and released once
+# written, and core.json_stream turns the sections into response chunks.
+# The stream runs on its own session, independent of the request's.
+
+EXPORT_BATCH_SIZE = 500
+
+
+def _stream_export(sections: Callable, user_id: int, profile: dict) -> Iterator[bytes]:
+    db = SessionLocal()
+    try:
+        yield from stream_json_object(sections(db, user_id, profile))
+    finally:
+        db.close()
+
+
+def _stream_rows(query, *fields) -> Iterator:
+    """Every row of *query*, decrypted and released a batch at a time."""
+    for batch in iter_decrypted_batches(query, EXPORT_BATCH_SIZE, *fields):
+        yield from batch
+
+
+def _months_with_expenses(db: Session, user_id: int, include_deleted: bool = False) -> Iterator[tuple]:
+    """(month, expenses) for each of the user's months, expenses loaded per batch of months."""
+    query = db.query(MonthlyData).filter(MonthlyData.user_id == user_id).order_by(MonthlyData.id)
+    for months in iter_decrypted_batches(query, EXPORT_BATCH_SIZE):
+        grouped = expenses_by_month(db, [m.id for m in months], include_deleted=include_deleted)
+        for m in months:
+            yield m, grouped.get(m.id, [])
+        for expenses in grouped.values():
+            release_rows(expenses)
+
+
+def _goals_with_contributions(db: Session, query) -> Iterator[tuple]:
+    """(goal, contributions) for each goal of *query*, contributions loaded per batch of goals."""
+    for goals in iter_decrypted_batches(query, EXPORT_BATCH_SIZE):
+        grouped = _contributions_by_goal(db, [g.id for g in goals])
+        for g in goals:
+            yield g, grouped.get(g.id, [])
+        for contribs in grouped.values():
+            release_rows(contribs)
 
 
 # -------------------- Full account data export --------------------
@@ -579,7 +634,7 @@ def export_tax_pdf(
 @limiter.limit("1/hour")
 def export_full_backup(
     request: Request,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> StreamingResponse:
     """
@@ -588,11 +643,20 @@ def export_full_backup(
     Includes: profile, months + expenses, recurring expenses, savings goals
     with contributions, debts, custom categories, and net worth snapshots.
     All encrypted fields are decrypted. Rate-limited to 1 request/hour.
+    The body is streamed section by section (see _stream_export).
     """
-    user = _require_user(db, current_user)
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    filename = f"backup-{today}.json"
+
+    return StreamingResponse(
+        _stream_export(_backup_sections, user.id, _backup_profile(user)),
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 
-    # ---- Profile ----
-    profile = {
+def _backup_profile(user: User) -> dict:
+    return {
         "email": user.email,
         "username": user.username if hasattr(user, "username") else None,
         "base_currency": user.base_currency,
@@ -600,23 +664,13 @@ def export_full_backup(
         "exported_at": datetime.utcnow().isoformat() + "Z",
     }
 
+
+def _backup_sections(db: Session, user_id: int, profile: dict) -> Iterator[tuple]:
+    yield "profile", profile
+
     # ---- Months + expenses ----
-    all_months = (
-        db.query(MonthlyData)
-        .filter(MonthlyData.user_id == user.id)
-        .all()
-    )
-    months_data = []
-    for m in all_months:
-        expenses = (
-            db.query(MonthlyExpense)
-            .filter(
-                MonthlyExpense.monthly_data_id == m.id,
-                MonthlyExpense.deleted_at.is_(None),
-            )
-            .all()
-        )
-        months_data.append({
+    yield "months", (
+        {
             "month": m.month,
             "salary_planned": m.salary_planned,
             "salary_actual": m.salary_actual,
@@ -635,18 +689,12 @@ def export_full_backup(
                 }
                 for e in expenses
             ],
-        })
+        }
+        for m, expenses in _months_with_expenses(db, user_id)
+    )
 
     # ---- Recurring expenses ----
-    recurring = (
-        db.query(RecurringExpense)
-        .filter(
-            RecurringExpense.user_id == user.id,
-            RecurringExpense.deleted_at.is_(None),
-        )
-        .all()
-    )
-    recurring_data = [
+    yield "recurring_expenses", (
         {
             "id": r.id,
             "name": r.name,
@@ -656,31 +704,23 @@ def export_full_backup(
             "start_date": r.start_date.isoformat() if r.start_date else None,
             "end_date": r.end_date.isoformat() if r.end_date else None,
         }
-        for r in recurring
-    ]
-
-    # ---- Savings goals + contributions ----
-    goals = (
-        db.query(SavingsGoal)
-        .filter(
-            SavingsGoal.user_id == user.id,
-            SavingsGoal.deleted_at.is_(None),
+        for r in _stream_rows(
+            db.query(RecurringExpense)
+            .filter(
+                RecurringExpense.user_id == user_id,
+                RecurringExpense.deleted_at.is_(None),
+            )
+            .order_by(RecurringExpense.id)
         )
-        .all()
     )
-    goals_data = []
-    for g in goals:
-        contribs = (
-            db.query(SavingsContribution)
-            .filter(SavingsContribution.goal_id == g.id)
-            .all()
-        )
-        current_amount = sum(c.amount for c in contribs)
-        goals_data.append({
+
+    # ---- Savings goals + contributions ----
+    yield "savings_goals", (
+        {
             "id": g.id,
             "name": g.name,
             "target_amount": g.target_amount,
-            "current_amount": current_amount,
+            "current_amount": sum(c.amount for c in contribs),
             "target_date": g.target_date.isoformat() if g.target_date else None,
             "contributions": [
                 {
@@ -691,18 +731,20 @@ def export_full_backup(
                 }
                 for c in contribs
             ],
-        })
-
-    # ---- Debts ----
-    debts = (
-        db.query(Debt)
-        .filter(
-            Debt.user_id == user.id,
-            Debt.deleted_at.is_(None),
+        }
+        for g, contribs in _goals_with_contributions(
+            db,
+            db.query(SavingsGoal)
+            .filter(
+                SavingsGoal.user_id == user_id,
+                SavingsGoal.deleted_at.is_(None),
+            )
+            .order_by(SavingsGoal.id),
         )
-        .all()
     )
-    debts_data = [
+
+    # ---- Debts ----
+    yield "debts", (
         {
             "id": d.id,
             "name": d.name,
@@ -710,36 +752,33 @@ def export_full_backup(
             "interest_rate": d.interest_rate,
             "minimum_payment": d.minimum_payment,
         }
-        for d in debts
-    ]
+        for d in _stream_rows(
+            db.query(Debt)
+            .filter(
+                Debt.user_id == user_id,
+                Debt.deleted_at.is_(None),
+            )
+            .order_by(Debt.id)
+        )
+    )
 
     # ---- Custom categories ----
-    categories = (
-        db.query(UserCategory)
-        .filter(UserCategory.user_id == user.id)
-        .all()
-    )
-    categories_data = [
+    yield "categories", (
         {
             "id": c.id,
             "name": c.name,
             "color": c.color,
             "is_default": c.is_default,
         }
-        for c in categories
-    ]
-
-    # ---- Net worth snapshots ----
-    snapshots = (
-        db.query(NetWorthSnapshot)
-        .filter(
-            NetWorthSnapshot.user_id == user.id,
-            NetWorthSnapshot.deleted_at.is_(None),
+        for c in _stream_rows(
+            db.query(UserCategory)
+            .filter(UserCategory.user_id == user_id)
+            .order_by(UserCategory.id)
         )
-        .order_by(NetWorthSnapshot.snapshot_date)
-        .all()
     )
-    snapshots_data = [
+
+    # ---- Net worth snapshots ----
+    yield "net_worth_snapshots", (
         {
             "id": s.id,
             "snapshot_date": s.snapshot_date.isoformat(),
@@ -749,27 +788,14 @@ def export_full_backup(
             "assets": s.assets_json,
             "liabilities": s.liabilities_json,
         }
-        for s in snapshots
-    ]
-
-    payload = {
-        "profile": profile,
-        "months": months_data,
-        "recurring_expenses": recurring_data,
-        "savings_goals": goals_data,
-        "debts": debts_data,
-        "categories": categories_data,
-        "net_worth_snapshots": snapshots_data,
-    }
-
-    json_bytes = json.dumps(payload, indent=2, default=str).encode("utf-8")
-    today = datetime.utcnow().strftime("%Y-%m-%d")
-    filename = f"backup-{today}.json"
-
-    return StreamingResponse(
-        iter([json_bytes]),
-        media_type="application/json",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        for s in _stream_rows(
+            db.query(NetWorthSnapshot)
+            .filter(
+                NetWorthSnapshot.user_id == user_id,
+                NetWorthSnapshot.deleted_at.is_(None),
+            )
+            .order_by(NetWorthSnapshot.snapshot_date, NetWorthSnapshot.id)
+        )
     )
 
 
@@ -876,11 +902,10 @@ def _build_ical(expenses: list, base_currency: str, today: date) -> str:
 @router.get("/calendar.ics")
 def export_calendar(
     request: Request,  # noqa: ARG001 — kept for API consistency / future rate-limiting
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> StreamingResponse:
     """Export recurring expenses as an RFC 5545 iCalendar file."""
-    user = _require_user(db, current_user)
 
     expenses = (
         db.query(RecurringExpense)
@@ -908,7 +933,7 @@ def export_calendar(
 @limiter.limit("1/hour")
 def export_gdpr(
     request: Request,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> StreamingResponse:
     """
@@ -917,13 +942,21 @@ def export_gdpr(
     Returns a complete JSON export of all data held for the authenticated
     user, with every Fernet-encrypted field decrypted.  Includes
     soft-deleted records so the user receives their full history.
-    Rate-limited to 1 request/hour.
+    Rate-limited to 1 request/hour. The body is streamed section by section
+    (see _stream_export).
     """
-    user = _require_user(db, current_user)
-    exported_at = datetime.utcnow().isoformat() + "Z"
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    filename = f"gdpr-export-{user.id}-{today}.json"
 
-    # ---- Profile ----
-    profile = {
+    return StreamingResponse(
+        _stream_export(_gdpr_sections, user.id, _gdpr_profile(user)),
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _gdpr_profile(user: User) -> dict:
+    return {
         "id": user.id,
         "email": user.email,
         "username": user.username if hasattr(user, "username") else None,
@@ -934,16 +967,15 @@ def export_gdpr(
         "deleted_at": user.deleted_at,
     }
 
+
+def _gdpr_sections(db: Session, user_id: int, profile: dict) -> Iterator[tuple]:
+    yield "exported_at", datetime.utcnow().isoformat() + "Z"
+    yield "app_version", VERSION
+    yield "profile", profile
+
     # ---- Monthly budgets + expenses (including soft-deleted expenses) ----
-    all_months = (
-        db.query(MonthlyData)
-        .filter(MonthlyData.user_id == user.id)
-        .all()
-    )
-    monthly_budgets = []
-    all_expenses = []
-    for m in all_months:
-        monthly_budgets.append({
+    yield "monthly_budgets", (
+        {
             "id": m.id,
             "month": m.month,
             "salary_planned": m.salary_planned,
@@ -952,42 +984,36 @@ def export_gdpr(
             "total_actual": m.total_actual,
             "remaining_planned": m.remaining_planned,
             "remaining_actual": m.remaining_actual,
-        })
-        expenses = (
-            db.query(MonthlyExpense)
-            .filter(MonthlyExpense.monthly_data_id == m.id)
-            .all()
+        }
+        for m in _stream_rows(
+            db.query(MonthlyData)
+            .filter(MonthlyData.user_id == user_id)
+            .order_by(MonthlyData.id)
         )
-        for e in expenses:
-            all_expenses.append({
-                "id": e.id,
-                "monthly_data_id": m.id,
-                "month": m.month,
-                "name": e.name,
-                "category": e.category,
-                "planned_amount": e.planned_amount,
-                "actual_amount": e.actual_amount,
-                "currency": e.currency,
-                "note": e.note,
-                "tags": e.tags,
-                "deleted_at": e.deleted_at,
-                "created_at": getattr(e, "created_at", None),
-            })
+    )
+    # A second pass over the months, so no section has to be held back
+    yield "expenses", (
+        {
+            "id": e.id,
+            "monthly_data_id": m.id,
+            "month": m.month,
+            "name": e.name,
+            "category": e.category,
+            "planned_amount": e.planned_amount,
+            "actual_amount": e.actual_amount,
+            "currency": e.currency,
+            "note": e.note,
+            "tags": e.tags,
+            "deleted_at": e.deleted_at,
+            "created_at": getattr(e, "created_at", None),
+        }
+        for m, expenses in _months_with_expenses(db, user_id, include_deleted=True)
+        for e in expenses
+    )
 
     # ---- Savings goals + contributions (including soft-deleted goals) ----
-    goals = (
-        db.query(SavingsGoal)
-        .filter(SavingsGoal.user_id == user.id)
-        .all()
-    )
-    savings_goals = []
-    for g in goals:
-        contribs = (
-            db.query(SavingsContribution)
-            .filter(SavingsContribution.goal_id == g.id)
-            .all()
-        )
-        savings_goals.append({
+    yield "savings_goals", (
+        {
             "id": g.id,
             "name": g.name,
             "target_amount": g.target_amount,
@@ -1003,10 +1029,17 @@ def export_gdpr(
                 }
                 for c in contribs
             ],
-        })
+        }
+        for g, contribs in _goals_with_contributions(
+            db,
+            db.query(SavingsGoal)
+            .filter(SavingsGoal.user_id == user_id)
+            .order_by(SavingsGoal.id),
+        )
+    )
 
     # ---- Recurring expenses (including soft-deleted) ----
-    recurring_expenses = [
+    yield "recurring_expenses", (
         {
             "id": r.id,
             "name": r.name,
@@ -1017,13 +1050,15 @@ def export_gdpr(
             "end_date": r.end_date.isoformat() if r.end_date else None,
             "deleted_at": r.deleted_at,
         }
-        for r in db.query(RecurringExpense)
-        .filter(RecurringExpense.user_id == user.id)
-        .all()
-    ]
+        for r in _stream_rows(
+            db.query(RecurringExpense)
+            .filter(RecurringExpense.user_id == user_id)
+            .order_by(RecurringExpense.id)
+        )
+    )
 
     # ---- Income sources (including soft-deleted) ----
-    income_sources = [
+    yield "income_sources", (
         {
             "id": s.id,
             "monthly_data_id": s.monthly_data_id,
@@ -1033,13 +1068,15 @@ def export_gdpr(
             "created_at": s.created_at,
             "deleted_at": s.deleted_at,
         }
-        for s in db.query(IncomeSource)
-        .filter(IncomeSource.user_id == user.id)
-        .all()
-    ]
+        for s in _stream_rows(
+            db.query(IncomeSource)
+            .filter(IncomeSource.user_id == user_id)
+            .order_by(IncomeSource.id)
+        )
+    )
 
     # ---- Budget alerts (including soft-deleted) ----
-    budget_alerts = [
+    yield "budget_alerts", (
         {
             "id": a.id,
             "category": a.category,
@@ -1048,13 +1085,15 @@ def export_gdpr(
             "created_at": a.created_at,
             "deleted_at": a.deleted_at,
         }
-        for a in db.query(BudgetAlert)
-        .filter(BudgetAlert.user_id == user.id)
-        .all()
-    ]
+        for a in _stream_rows(
+            db.query(BudgetAlert)
+            .filter(BudgetAlert.user_id == user_id)
+            .order_by(BudgetAlert.id)
+        )
+    )
 
     # ---- Category rules (including soft-deleted) ----
-    category_rules = [
+    yield "category_rules", (
         {
             "id": r.id,
             "pattern": r.pattern,
@@ -1063,13 +1102,15 @@ def export_gdpr(
             "created_at": r.created_at,
             "deleted_at": r.deleted_at,
         }
-        for r in db.query(CategoryRule)
-        .filter(CategoryRule.user_id == user.id)
-        .all()
-    ]
+        for r in _stream_rows(
+            db.query(CategoryRule)
+            .filter(CategoryRule.user_id == user_id)
+            .order_by(CategoryRule.id)
+        )
+    )
 
     # ---- Bank connections — metadata only, no tokens ----
-    bank_connections = [
+    yield "bank_connections", (
         {
             "id": bc.id,
             "provider": bc.provider,
@@ -1078,18 +1119,21 @@ def export_gdpr(
             "created_at": bc.created_at,
             "disconnected_at": bc.disconnected_at,
         }
-        for bc in db.query(BankConnection)
-        .filter(BankConnection.user_id == user.id)
-        .all()
-    ]
+        for bc in _stream_rows(
+            db.query(BankConnection)
+            .filter(BankConnection.user_id == user_id)
+            .order_by(BankConnection.id),
+            "provider", "account_id",
+        )
+    )
 
     # ---- Household memberships ----
     memberships = (
         db.query(HouseholdMembership)
-        .filter(HouseholdMembership.user_id == user.id)
+        .filter(HouseholdMembership.user_id == user_id)
         .all()
     )
-    households = [
+    yield "households", [
         {
             "household_id": mem.household_id,
             "household_name": mem.household.name if mem.household else None,
@@ -1099,27 +1143,304 @@ def export_gdpr(
         for mem in memberships
     ]
 
-    payload = {
-        "exported_at": exported_at,
-        "app_version": VERSION,
-        "profile": profile,
-        "monthly_budgets": monthly_budgets,
-        "expenses": all_expenses,
-        "savings_goals": savings_goals,
-        "recurring_expenses": recurring_expenses,
-        "income_sources": income_sources,
-        "budget_alerts": budget_alerts,
-        "category_rules": category_rules,
-        "bank_connections": bank_connections,
-        "households": households,
-    }
 
-    json_bytes = json.dumps(payload, indent=2, default=str).encode("utf-8")
+# -------------------- Background export jobs --------------------
+# POST /export/jobs records an ExportJob and hands it to a small per-process
+# worker pool, which renders it into artifact storage (core.storage); the
+# client polls GET /export/jobs/{id} and downloads the artifact once done.
+# A job is claimed with a conditional UPDATE (pending -> running), so if
+# several processes are offered the same job only one renders it. Requests
+# identical to an unexpired job — same kind, parameters, User.data_version
+# and profile fields — get that job back instead of a new render.
+
+JOB_ACTIVE_STATUSES = ("pending", "running", "done")
+
+# kind -> new renders allowed per account per hour, matching the direct
+# endpoints' limits. Requests answered by an existing job don't count.
+JOB_RENDERS_PER_HOUR = {"full-backup": 1, "gdpr": 1}
+
+_export_pool = ThreadPoolExecutor(max_workers=settings.EXPORT_WORKERS, thread_name_prefix="export")
+
+
+def _job_pdf(db: Session, user: User, params: dict) -> tuple:
+    month = params["month"]
+    return iter([_render_month_pdf(db, user, month)]), f"budget_report_{month}.pdf", "application/pdf"
+
+
+def _job_tax_pdf(db: Session, user: User, params: dict) -> tuple:
+    tax_year = params["tax_year"]
+    pdf_bytes = _render_tax_pdf(db, user, tax_year)
+    return iter([pdf_bytes]), f"tax_summary_{tax_year}_{tax_year + 1}.pdf", "application/pdf"
+
+
+def _job_full_backup(db: Session, user: User, params: dict) -> tuple:
     today = datetime.utcnow().strftime("%Y-%m-%d")
-    filename = f"gdpr-export-{user.id}-{today}.json"
+    chunks = _stream_export(_backup_sections, user.id, _backup_profile(user))
+    return chunks, f"backup-{today}.json", "application/json"
+
+
+def _job_gdpr(db: Session, user: User, params: dict) -> tuple:
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    chunks = _stream_export(_gdpr_sections, user.id, _gdpr_profile(user))
+    return chunks, f"gdpr-export-{user.id}-{today}.json", "application/json"
+
+
+# kind -> renderer(db, user, params) returning (byte chunks, filename, media type).
+# The JSON exports stream on their own session (see _stream_export).
+_EXPORT_KINDS: dict[str, Callable] = {
+    "pdf": _job_pdf,
+    "tax-pdf": _job_tax_pdf,
+    "full-backup": _job_full_backup,
+    "gdpr": _job_gdpr,
+}
+
+
+def _job_params(db: Session, user: User, body: ExportJobCreate) -> dict:
+    """Validate *body* for its kind and return the parameters the renderer needs."""
+    if body.kind == "pdf":
+        _require_fpdf()
+        if not body.month:
+            raise HTTPException(status_code=422, detail="month is required for a pdf export")
+        month = _validate_month(body.month)
+        if not find_month_row(db, user.id, month):
+            raise HTTPException(status_code=404, detail=f"No data found for {month}")
+        return {"month": month}
+    if body.kind == "tax-pdf":
+        _require_fpdf()
+        if body.tax_year is None:
+            raise HTTPException(status_code=422, detail="tax_year is required for a tax-pdf export")
+        return {"tax_year": _validate_tax_year(body.tax_year)}
+    return {}
+
+
+def _job_response(job: ExportJob) -> ExportJobResponse:
+    return ExportJobResponse(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        params=json.loads(job.params),
+        filename=job.filename,
+        size_bytes=job.size_bytes,
+        error=job.error,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        expires_at=job.expires_at,
+        download_url=f"/export/jobs/{job.id}/download" if job.status == "done" else None,
+    )
+
+
+def _submit_export_job(job_id: int) -> None:
+    _export_pool.submit(run_export_job, job_id)
+
+
+def _job_storage():
+    """
+    Artifact store for export jobs. Production must configure
+    EXPORT_STORAGE_URL (S3, or a file:// path every replica mounts): with the
+    per-host temp-dir default, a download reaching another replica finds
+    nothing.
+    """
+    if not settings.EXPORT_STORAGE_URL and settings.ENVIRONMENT == "production":
+        logger.error("Export job refused: EXPORT_STORAGE_URL is not set")
+        raise HTTPException(status_code=503, detail="Background exports are not configured")
+    return get_storage()
+
+
+def run_export_job(job_id: int) -> None:
+    """Claim pending job *job_id*, render it into storage and record the outcome."""
+    db = SessionLocal()
+    try:
+        claimed = (
+            db.query(ExportJob)
+            .filter(ExportJob.id == job_id, ExportJob.status == "pending")
+            .update({"status": "running", "started_at": datetime.utcnow()}, synchronize_session=False)
+        )
+        db.commit()
+        if not claimed:
+            return  # taken by another worker, or no longer pending
+        job = db.get(ExportJob, job_id)
+        user = db.get(User, job.user_id)
+        started = time.perf_counter()
+        try:
+            chunks, filename, media_type = _EXPORT_KINDS[job.kind](db, user, json.loads(job.params))
+            key = f"{job.user_id}/{job.id}/{filename}"
+            size = get_storage().save(key, chunks)
+        except Exception as exc:
+            db.rollback()
+            if isinstance(exc, HTTPException):
+                job.error = str(exc.detail)[:255]
+            else:
+                logger.exception("export job=%d kind=%s failed", job_id, job.kind)
+                job.error = "Export failed"
+            job.status = "failed"
+            job.finished_at = datetime.utcnow()
+            db.commit()
+            return
+        now = datetime.utcnow()
+        job.status = "done"
+        job.artifact_key = key
+        job.filename = filename
+        job.media_type = media_type
+        job.size_bytes = size
+        job.finished_at = now
+        job.expires_at = now + timedelta(hours=settings.EXPORT_ARTIFACT_TTL_HOURS)
+        db.commit()
+        logger.info(
+            "export job=%d kind=%s bytes=%d duration_ms=%.1f",
+            job_id, job.kind, size, (time.perf_counter() - started) * 1000,
+        )
+    finally:
+        db.close()
+
 
+def maintain_export_jobs(session_factory: Callable[[], Session]) -> None:
+    """
+    Periodic job: re-queue exports whose worker died (running past
+    EXPORT_JOB_TIMEOUT_SEC, or pending for over a minute), and delete expired
+    jobs together with their artifacts.
+    """
+    db = session_factory()
+    try:
+        now = datetime.utcnow()
+        db.query(ExportJob).filter(
+            ExportJob.status == "running",
+            ExportJob.started_at < now - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT_SEC),
+        ).update({"status": "pending", "started_at": None}, synchronize_session=False)
+        db.commit()
+        stalled = [
+            job_id for (job_id,) in (
+                db.query(ExportJob.id)
+                .filter(ExportJob.status == "pending", ExportJob.created_at < now - timedelta(minutes=1))
+                .all()
+            )
+        ]
+        expired = (
+            db.query(ExportJob)
+            .filter(
+                (ExportJob.expires_at < now)
+                | ((ExportJob.status == "failed")
+                   & (ExportJob.finished_at < now - timedelta(hours=settings.EXPORT_ARTIFACT_TTL_HOURS)))
+            )
+            .all()
+        )
+        for job in expired:
+            if job.artifact_key:
+                try:
+                    get_storage().delete(job.artifact_key)
+                except Exception:
+                    logger.warning("Could not delete export artifact %s", job.artifact_key, exc_info=True)
+            db.delete(job)
+        db.commit()
+    except Exception:
+        logger.exception("Export job maintenance failed")
+        db.rollback()
+        return
+    finally:
+        db.close()
+    for job_id in stalled:
+        _submit_export_job(job_id)
+    if stalled or expired:
+        logger.info("Export jobs: %d re-queued, %d expired", len(stalled), len(expired))
+
+
+@router.post("/jobs", response_model=ExportJobResponse, status_code=202)
+@limiter.limit("30/hour")
+def create_export_job(
+    request: Request,
+    body: ExportJobCreate,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> ExportJobResponse:
+    """
+    Queue a pdf, tax-pdf, full-backup or gdpr export. If an identical export
+    is already queued, running or finished and the account's data has not
+    changed since, that job is returned instead of rendering again.
+    """
+    storage = _job_storage()
+    params = json.dumps(_job_params(db, user, body), sort_keys=True)
+    data_version = db.query(User.data_version).filter(User.id == user.id).scalar() or 0
+    # Profile edits (email, username, base currency...) don't bump data_version
+    # but do change what the JSON exports contain.
+    profile = json.dumps(_gdpr_profile(user), sort_keys=True, default=str)
+    dedup_key = hashlib.sha256(f"{body.kind}|{params}|{data_version}|{profile}".encode()).hexdigest()
+
+    now = datetime.utcnow()
+    existing = (
+        db.query(ExportJob)
+        .filter(
+            ExportJob.user_id == user.id,
+            ExportJob.dedup_key == dedup_key,
+            ExportJob.status.in_(JOB_ACTIVE_STATUSES),
+            (ExportJob.expires_at == None) | (ExportJob.expires_at > now),  # noqa: E711
+        )
+        .order_by(ExportJob.id.desc())
+        .first()
+    )
+    if existing is not None and (existing.status != "done" or storage.exists(existing.artifact_key)):
+        return _job_response(existing)
+
+    # Replacing a finished job whose artifact went missing isn't a new render.
+    per_hour = JOB_RENDERS_PER_HOUR.get(body.kind)
+    if per_hour is not None and existing is None:
+        recent = (
+            db.query(ExportJob)
+            .filter(
+                ExportJob.user_id == user.id,
+                ExportJob.kind == body.kind,
+                ExportJob.status.in_(JOB_ACTIVE_STATUSES),
+                ExportJob.created_at > now - timedelta(hours=1),
+            )
+            .count()
+        )
+        if recent >= per_hour:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Only {per_hour} {body.kind} export per hour — try again later",
+            )
+
+    job = ExportJob(user_id=user.id, kind=body.kind, params=params, dedup_key=dedup_key)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    _submit_export_job(job.id)
+    return _job_response(job)
+
+
+def _get_job(db: Session, user: User, job_id: int) -> ExportJob:
+    job = db.query(ExportJob).filter(ExportJob.id == job_id, ExportJob.user_id == user.id).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=ExportJobResponse)
+def get_export_job(
+    job_id: int,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> ExportJobResponse:
+    """Status of an export job; ``download_url`` is set once it is done."""
+    return _job_response(_get_job(db, user, job_id))
+
+
+@router.get("/jobs/{job_id}/download")
+def download_export_job(
+    job_id: int,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> StreamingResponse:
+    """Stream a finished export's artifact from storage."""
+    job = _get_job(db, user, job_id)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Export job is {job.status}")
+    storage = get_storage()
+    if (job.expires_at and job.expires_at < datetime.utcnow()) or not storage.exists(job.artifact_key):
+        raise HTTPException(status_code=410, detail="Export has expired — request it again")
     return StreamingResponse(
-        iter([json_bytes]),
-        media_type="application/json",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        storage.open(job.artifact_key),
+        media_type=job.media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{job.filename}"',
+            "Content-Length": str(job.size_bytes),
+        },
     )
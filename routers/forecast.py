@@ -15,11 +15,11 @@ import calendar
 import logging
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 
 from database import get_db, MonthlyData, RecurringExpense, User
-from security import verify_token
+from security import get_current_user
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/forecast", tags=["forecast"])
@@ -27,13 +27,6 @@ router = APIRouter(prefix="/forecast", tags=["forecast"])
 
 # ---------- helpers ----------
 
-def _get_user(db: Session, email: str) -> User:
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
-
 def _monthly_cost(rec: RecurringExpense, year: int, month: int) -> float:
     """Scale a recurring expense's planned_amount to its effective monthly cost."""
     if rec.frequency == "daily":
@@ -93,7 +86,7 @@ def _active_recurring_expenses(db: Session, user_id: int, as_of: datetime) -> li
 def get_forecast(
     months: int = Query(default=3, ge=1, le=12, description="Number of months to project (1–12)"),
     salary_override: float = Query(default=None, ge=0, description="Override monthly salary for projection"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """
@@ -104,7 +97,6 @@ def get_forecast(
     - running_balance accumulates month over month.
     - deficit=true when the month's projected_balance is negative.
     """
-    user = _get_user(db, current_user)
 
     income = salary_override if salary_override is not None else _latest_salary(db, user.id)
 
@@ -143,6 +135,6 @@ def get_forecast(
 
     logger.info(
         "Cashflow forecast: user=%s months=%d income=%.2f",
-        current_user, months, income,
+        user.email, months, income,
     )
     return {"months": months, "monthly_income": round(income, 2), "projection": projection}
@@ -27,10 +27,10 @@ from database import (
     Household,
     HouseholdInvite,
     HouseholdMembership,
-    MonthlyData,
     User,
+    find_month_row,
 )
-from security import verify_token
+from security import get_current_user
 from models import (
     HouseholdBudgetMemberSummary,
     HouseholdBudgetResponse,
@@ -52,13 +52,6 @@ router = APIRouter(prefix="/households", tags=["household"])
 
 # ---------- helpers ----------
 
-def _get_user(db: Session, email: str) -> User:
-    user = db.query(User).filter(User.email == email, User.deleted_at == None).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
-
-
 def _get_membership(db: Session, user_id: int) -> HouseholdMembership | None:
     return (
         db.query(HouseholdMembership)
@@ -160,10 +153,9 @@ def _send_household_invite_email(to_email: str, invite_url: str, household_name:
 def create_household(
     body: HouseholdCreate,
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
     """Create a new household. The caller becomes the owner."""
-    user = _get_user(db, email)
 
     # A user can only belong to one household at a time
     if _get_membership(db, user.id):
@@ -192,10 +184,9 @@ def create_household(
 @router.get("/me", response_model=HouseholdResponse)
 def get_my_household(
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
     """Return the household the current user belongs to."""
-    user = _get_user(db, email)
     household, _ = _require_household(db, user)
     return _build_response(household, db)
 
@@ -204,10 +195,9 @@ def get_my_household(
 def invite_member(
     body: HouseholdInviteRequest,
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
     """Owner sends an invite email to a new member."""
-    user = _get_user(db, email)
     household, membership = _require_household(db, user)
     _require_owner(membership)
 
@@ -266,10 +256,9 @@ def invite_member(
 def join_household(
     body: HouseholdJoinRequest,
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
     """Accept a household invite using the token from the email link."""
-    user = _get_user(db, email)
 
     if _get_membership(db, user.id):
         raise HTTPException(status_code=409, detail="You already belong to a household")
@@ -321,10 +310,9 @@ def join_household(
 def remove_member(
     member_user_id: int,
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
     """Owner removes a member (cannot remove self/owner row)."""
-    user = _get_user(db, email)
     household, membership = _require_household(db, user)
     _require_owner(membership)
 
@@ -350,10 +338,9 @@ def remove_member(
 @router.delete("", status_code=status.HTTP_204_NO_CONTENT)
 def dissolve_household(
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
     """Owner dissolves the household (soft-delete). All members lose access."""
-    user = _get_user(db, email)
     household, membership = _require_household(db, user)
     _require_owner(membership)
 
@@ -366,13 +353,12 @@ def dissolve_household(
 def get_household_budget(
     month: str = Query(..., description="Month in YYYY-MM format"),
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
     """
     Return a combined budget view for all household members for a given month.
     Each member's MonthlyData is fetched; totals are aggregated across all members.
     """
-    user = _get_user(db, email)
     household, _ = _require_household(db, user)
 
     member_summaries: List[HouseholdBudgetMemberSummary] = []
@@ -387,13 +373,7 @@ def get_household_budget(
         if not member_user:
             continue
 
-        # Decrypt all monthly records and find the one matching this month (O(n) by design)
-        all_monthly = (
-            db.query(MonthlyData)
-            .filter(MonthlyData.user_id == member_user.id)
-            .all()
-        )
-        monthly = next((r for r in all_monthly if r.month == month), None)
+        monthly = find_month_row(db, member_user.id, month)
 
         if monthly:
             sp = monthly.salary_planned
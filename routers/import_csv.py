@@ -1,21 +1,42 @@
 """
-POST /import/csv        — Parse bank CSV, return preview (nothing saved yet)
-POST /import/csv/confirm — Persist confirmed rows as actual expenses
+POST /import/csv          — Parse bank CSV, stage it and return the first preview page (nothing saved yet)
+GET  /import/csv/{id}     — Further pages of a staged preview
+POST /import/csv/confirm  — Persist confirmed rows as actual expenses
 """
 import csv
 import io
 import json
+import logging
 import uuid
-from datetime import datetime
-from typing import Optional
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Iterator, Optional
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile
 from sqlalchemy.orm import Session
 
+from core.config import settings
 from core.limiter import limiter
-from database import AuditLog, MonthlyData, MonthlyExpense, User, get_db
+from core.matcher import KeywordMatcher
+from core.storage import get_storage
+from database import (
+    AuditLog,
+    CSVImport,
+    MonthlyData,
+    MonthlyExpense,
+    User,
+    decrypt_value,
+    encrypt_value,
+    find_month_row,
+    get_db,
+    iter_decrypted_tuples,
+    month_blind_index,
+    release_rows,
+)
 from models import CSVConfirmRequest, CSVImportResult, CSVPreviewResponse, CSVPreviewRow
-from security import verify_token
+from security import get_current_user
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/import", tags=["import"])
 
@@ -61,14 +82,15 @@ _CATEGORY_KEYWORDS: dict[str, list[str]] = {
 }
 
 
+# Compiled once: keywords in table order, so the first category listed wins.
+_KEYWORD_MATCHER: KeywordMatcher[str] = KeywordMatcher(
+    (kw, category) for category, keywords in _CATEGORY_KEYWORDS.items() for kw in keywords
+)
+
+
 def _suggest_category(description: str) -> str:
     """Return the best-matching category based on keyword matching."""
-    desc_lower = description.lower()
-    for category, keywords in _CATEGORY_KEYWORDS.items():
-        for kw in keywords:
-            if kw in desc_lower:
-                return category
-    return "Other"
+    return _KEYWORD_MATCHER.match(description) or "Other"
 
 
 def _detect_columns(header: list[str]) -> dict[str, int]:
@@ -147,85 +169,50 @@ def _parse_date(raw: str) -> Optional[datetime]:
 
 
 # ---------------------------------------------------------------------------
-# Endpoints
+# Streaming parse and staging
+#
+# The upload is never read into memory: it is decoded incrementally from the
+# spooled temp file in two passes. The first collects the months present so
+# duplicate detection only decrypts expenses from those months; the second
+# parses again and writes the preview rows, in encrypted blocks of
+# STAGE_BLOCK_ROWS, to artifact storage. Pages are then read back one block
+# at a time, and a confirm can import the staged rows directly.
 # ---------------------------------------------------------------------------
 
+PREVIEW_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+STAGE_BLOCK_ROWS = 500
+IMPORT_FLUSH_ROWS = 500
 
-@router.post("/csv", response_model=CSVPreviewResponse)
-@limiter.limit("20/minute")
-async def preview_csv_import(
-    request: Request,
-    file: UploadFile = File(...),
-    month: Optional[str] = Form(None),
-    db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
-) -> CSVPreviewResponse:
-    """
-    Parse a bank-exported CSV and return a preview payload.
-    Nothing is saved to the database at this stage.
-
-    - `file`: CSV file (multipart/form-data)
-    - `month`: Optional YYYY-MM override; if omitted, month is inferred from each row's date.
-    """
-    user = db.query(User).filter(User.email == email, User.deleted_at.is_(None)).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
 
-    # Validate explicit month param
-    if month:
-        try:
-            datetime.strptime(month, "%Y-%m")
-        except ValueError:
-            raise HTTPException(
-                status_code=422, detail="month must be in YYYY-MM format"
-            )
-
-    # Read and decode file
-    content = await file.read()
+@contextmanager
+def _csv_reader(fileobj, encoding: str):
+    """A csv.reader decoding *fileobj* incrementally from the start."""
+    fileobj.seek(0)
+    text = io.TextIOWrapper(fileobj, encoding=encoding, newline="")
     try:
-        text = content.decode("utf-8-sig")  # strip UTF-8 BOM if present
-    except UnicodeDecodeError:
-        text = content.decode("latin-1")
+        yield csv.reader(text)
+    finally:
+        text.detach()  # leave the upload open for the next pass
 
-    reader = csv.reader(io.StringIO(text))
-    rows_iter = iter(reader)
 
+def _read_header(reader) -> dict[str, int]:
     try:
-        header = next(rows_iter)
+        header = next(reader)
     except StopIteration:
         raise HTTPException(status_code=422, detail="CSV file is empty")
-
     try:
-        col = _detect_columns(header)
+        return _detect_columns(header)
     except ValueError as exc:
         raise HTTPException(status_code=422, detail=str(exc))
 
-    # Build a set of existing (name_lower, rounded_amount, month) for duplicate detection
-    existing: set[tuple[str, float, str]] = set()
-    all_month_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-    for md in all_month_rows:
-        md_month = md.month  # hybrid property decrypts
-        for exp in (
-            db.query(MonthlyExpense)
-            .filter(
-                MonthlyExpense.monthly_data_id == md.id,
-                MonthlyExpense.deleted_at.is_(None),
-            )
-            .all()
-        ):
-            existing.add(
-                (
-                    (exp.name or "").lower(),
-                    round(exp.actual_amount or 0.0, 2),
-                    md_month,
-                )
-            )
-
-    preview_rows: list[CSVPreviewRow] = []
-    parse_errors = 0
 
-    for raw in rows_iter:
-        # Skip blank lines
+def _parse_rows(reader, col: dict[str, int], month: Optional[str]) -> Iterator[Optional[tuple]]:
+    """
+    Yield ``(date, description, amount, month)`` for each data row of
+    *reader*, or None for a row that cannot be parsed. Blank lines are skipped.
+    """
+    for raw in reader:
         if not any(cell.strip() for cell in raw):
             continue
 
@@ -234,152 +221,239 @@ async def preview_csv_import(
             desc = raw[col["description"]].strip()
             amt_str = raw[col["amount"]].strip()
         except IndexError:
-            parse_errors += 1
+            yield None
             continue
 
         if not desc or not amt_str:
-            parse_errors += 1
+            yield None
             continue
 
         amount = _parse_amount(amt_str)
         if amount is None or amount <= 0:
-            parse_errors += 1
+            yield None
             continue
 
-        # Determine month for this row
         if month:
             row_month = month
         else:
             parsed_date = _parse_date(date_str)
             if parsed_date is None:
-                parse_errors += 1
+                yield None
                 continue
             row_month = parsed_date.strftime("%Y-%m")
 
-        suggested = _suggest_category(desc)
-        is_dup = (desc.lower(), round(amount, 2), row_month) in existing
-
-        preview_rows.append(
-            CSVPreviewRow(
-                row_id=str(uuid.uuid4()),
-                date=date_str,
-                description=desc,
-                amount=round(amount, 2),
-                month=row_month,
-                suggested_category=suggested,
-                is_duplicate=is_dup,
-            )
-        )
+        yield date_str, desc, round(amount, 2), row_month
 
-    duplicates_count = sum(1 for r in preview_rows if r.is_duplicate)
 
-    return CSVPreviewResponse(
-        rows=preview_rows,
-        total=len(preview_rows),
-        duplicates_count=duplicates_count,
-        parse_errors=parse_errors,
+def _scan_months(fileobj, month: Optional[str]) -> tuple[str, set[str]]:
+    """
+    First pass: validate the header and collect the months the file covers.
+    Returns the encoding to use — UTF-8 (BOM stripped), or latin-1 when the
+    file is not valid UTF-8.
+    """
+    for encoding in ("utf-8-sig", "latin-1"):
+        try:
+            with _csv_reader(fileobj, encoding) as reader:
+                col = _read_header(reader)
+                months = {row[3] for row in _parse_rows(reader, col, month) if row}
+            return encoding, months
+        except UnicodeDecodeError:
+            continue
+    raise AssertionError("latin-1 decodes any byte sequence")
+
+
+def _expense_columns(db: Session, month_ids: Iterable[int], *columns) -> Iterator[tuple]:
+    """``(id, monthly_data_id, *plaintexts)`` for the live expenses of *month_ids*."""
+    query = db.query(MonthlyExpense.id, MonthlyExpense.monthly_data_id, *columns).filter(
+        MonthlyExpense.monthly_data_id.in_(list(month_ids)),
+        MonthlyExpense.deleted_at.is_(None),
     )
+    return iter_decrypted_tuples(query, plain=2)
+
+
+def _existing_expense_keys(db: Session, user_id: int, months: set[str]) -> set[tuple[str, float, str]]:
+    """(name_lower, rounded_amount, month) of the user's live expenses in *months*."""
+    if not months:
+        return set()
+    month_by_bidx = {month_blind_index(m): m for m in months}
+    month_of = {
+        month_id: month_by_bidx[bidx]
+        for month_id, bidx in db.query(MonthlyData.id, MonthlyData.month_bidx).filter(
+            MonthlyData.user_id == user_id,
+            MonthlyData.month_bidx.in_(list(month_by_bidx)),
+        )
+    }
+    if not month_of:
+        return set()
+    return {
+        ((name or "").lower(), round(float(amount or 0.0), 2), month_of[month_id])
+        for _, month_id, name, amount in _expense_columns(
+            db, month_of, MonthlyExpense._name_encrypted, MonthlyExpense._actual_amount_encrypted
+        )
+    }
 
 
-@router.post("/csv/confirm", response_model=CSVImportResult)
-@limiter.limit("10/minute")
-async def confirm_csv_import(
-    request: Request,
-    payload: CSVConfirmRequest,
-    db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
-) -> CSVImportResult:
+def _stage_blocks(rows: Iterable[list]) -> Iterator[bytes]:
+    """Encrypt *rows* in JSON blocks of STAGE_BLOCK_ROWS, one block per line."""
+    block: list = []
+    for row in rows:
+        block.append(row)
+        if len(block) == STAGE_BLOCK_ROWS:
+            yield encrypt_value(json.dumps(block)).encode() + b"\n"
+            block = []
+    if block:
+        yield encrypt_value(json.dumps(block)).encode() + b"\n"
+
+
+def _read_staged(key: str, start: int = 0, stop: Optional[int] = None) -> Iterator[tuple[int, list]]:
     """
-    Persist confirmed CSV rows as actual expenses.
-    Rows with ``include=False`` are skipped without error.
-    Uses the standard name+category upsert: updates actual_amount if matched, inserts otherwise.
+    Yield ``(index, row)`` for staged rows start <= index < stop, decrypting
+    only the blocks that overlap the range.
     """
-    user = db.query(User).filter(User.email == email, User.deleted_at.is_(None)).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
+    chunks = get_storage().open(key)
+    try:
+        buffer = b""
+        block_no = 0
+        for chunk in chunks:
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                first = block_no * STAGE_BLOCK_ROWS
+                block_no += 1
+                if stop is not None and first >= stop:
+                    return
+                if first + STAGE_BLOCK_ROWS <= start:
+                    continue
+                for index, row in enumerate(json.loads(decrypt_value(line.decode())), first):
+                    if index >= start and (stop is None or index < stop):
+                        yield index, row
+    finally:
+        chunks.close()
+
+
+def _preview_row(index: int, row: list) -> CSVPreviewRow:
+    date_str, desc, amount, month, suggested, is_dup = row
+    return CSVPreviewRow(
+        row_id=str(index),
+        date=date_str,
+        description=desc,
+        amount=amount,
+        month=month,
+        suggested_category=suggested,
+        is_duplicate=is_dup,
+    )
+
+
+def _get_import(db: Session, user_id: int, import_id: str) -> CSVImport:
+    record = (
+        db.query(CSVImport)
+        .filter(CSVImport.id == import_id, CSVImport.user_id == user_id)
+        .first()
+    )
+    if record is None or record.expires_at < datetime.utcnow():
+        raise HTTPException(status_code=404, detail="Import not found or expired — upload the file again")
+    return record
+
 
+def _discard_import(db: Session, record: CSVImport) -> None:
+    try:
+        get_storage().delete(record.artifact_key)
+    except Exception:
+        logger.warning("Could not delete staged import %s", record.artifact_key, exc_info=True)
+    db.delete(record)
+
+
+def _import_rows(db: Session, user, rows: Iterable[tuple]) -> tuple[int, int]:
+    """
+    Upsert ``(include, description, amount, month, category)`` rows as actual
+    expenses, matching by name (case-insensitive) + category within the month.
+    Each month's expenses are indexed once (ids only), and pending writes are
+    flushed and their plaintext memo dropped every IMPORT_FLUSH_ROWS rows, so
+    memory stays flat however long the file. Returns
+    (imported, skipped); the caller commits.
+    """
     imported = 0
     skipped = 0
+    # month -> (MonthlyData, {(name_lower, category): expense id, or the unflushed new MonthlyExpense})
+    months: dict[str, tuple[MonthlyData, dict]] = {}
+    # (expense, action, before, after, month index, key) awaiting flush and audit
+    pending: list[tuple] = []
+
+    def flush():
+        db.flush()
+        for exp, action, before, after, index, key in pending:
+            db.add(
+                AuditLog(
+                    user_id=user.id,
+                    expense_id=exp.id,
+                    action=action,
+                    changed_fields=json.dumps({"before": before, "after": after}),
+                )
+            )
+            if action == "create":
+                index[key] = exp.id
+        release_rows([entry[0] for entry in pending], expunge=False)
+        pending.clear()
 
-    # Cache loaded MonthlyData rows to avoid repeated full-table scans within one request
-    month_cache: dict[str, MonthlyData] = {}
-    all_month_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-    for md in all_month_rows:
-        month_cache[md.month] = md  # hybrid property decrypts on access
-
-    for row in payload.rows:
-        if not row.include:
+    for include, description, amount, month, category in rows:
+        if not include:
             skipped += 1
             continue
 
-        # Validate month format
         try:
-            datetime.strptime(row.month, "%Y-%m")
+            datetime.strptime(month, "%Y-%m")
         except ValueError:
             skipped += 1
             continue
 
-        # Get or create MonthlyData for this month
-        month_row = month_cache.get(row.month)
-        if month_row is None:
-            month_row = MonthlyData(user_id=user.id)
-            month_row.month = row.month
-            month_row.salary_planned = 0.0
-            month_row.salary_actual = 0.0
-            month_row.total_planned = 0.0
-            month_row.total_actual = 0.0
-            month_row.remaining_planned = 0.0
-            month_row.remaining_actual = 0.0
-            db.add(month_row)
-            db.flush()
-            month_cache[row.month] = month_row
-
-        # Load active expenses for this month
-        existing_expenses = (
-            db.query(MonthlyExpense)
-            .filter(
-                MonthlyExpense.monthly_data_id == month_row.id,
-                MonthlyExpense.deleted_at.is_(None),
-            )
-            .all()
-        )
-
-        # Upsert: match by name (case-insensitive) + category
-        existing_exp: Optional[MonthlyExpense] = None
-        for exp in existing_expenses:
-            if (exp.name or "").lower() == row.description.lower() and exp.category == row.category:
-                existing_exp = exp
-                break
-
-        if existing_exp:
+        if month not in months:
+            month_row = find_month_row(db, user.id, month)
+            index: dict = {}
+            if month_row is None:
+                month_row = MonthlyData(user_id=user.id)
+                month_row.month = month
+                month_row.salary_planned = 0.0
+                month_row.salary_actual = 0.0
+                month_row.total_planned = 0.0
+                month_row.total_actual = 0.0
+                month_row.remaining_planned = 0.0
+                month_row.remaining_actual = 0.0
+                db.add(month_row)
+                db.flush()
+            else:
+                for exp_id, _, name, cat in _expense_columns(
+                    db, [month_row.id], MonthlyExpense._name_encrypted, MonthlyExpense._category_encrypted
+                ):
+                    index.setdefault(((name or "").lower(), cat), exp_id)
+            months[month] = (month_row, index)
+        month_row, index = months[month]
+
+        key = (description.lower(), category)
+        ref = index.get(key)
+        existing_exp = db.get(MonthlyExpense, ref) if isinstance(ref, int) else ref
+
+        if existing_exp is not None:
             before = {
                 "name": existing_exp.name,
                 "category": existing_exp.category,
                 "actual_amount": float(existing_exp.actual_amount or 0),
             }
-            existing_exp.actual_amount = row.amount
-            db.flush()
+            existing_exp.actual_amount = amount
             after = {
                 "name": existing_exp.name,
                 "category": existing_exp.category,
                 "actual_amount": float(existing_exp.actual_amount),
             }
-            audit = AuditLog(
-                user_id=user.id,
-                expense_id=existing_exp.id,
-                action="update",
-                changed_fields=json.dumps({"before": before, "after": after}),
-            )
-            db.add(audit)
+            pending.append((existing_exp, "update", before, after, index, key))
         else:
             new_exp = MonthlyExpense(monthly_data_id=month_row.id)
-            new_exp.name = row.description
-            new_exp.category = row.category
-            new_exp.actual_amount = row.amount
+            new_exp.name = description
+            new_exp.category = category
+            new_exp.actual_amount = amount
             new_exp.planned_amount = 0.0
             new_exp.currency = user.base_currency or "GBP"
             db.add(new_exp)
-            db.flush()
+            index[key] = new_exp
             after = {
                 "name": new_exp.name,
                 "category": new_exp.category,
@@ -387,15 +461,184 @@ async def confirm_csv_import(
                 "planned_amount": 0.0,
                 "currency": new_exp.currency,
             }
-            audit = AuditLog(
-                user_id=user.id,
-                expense_id=new_exp.id,
-                action="create",
-                changed_fields=json.dumps({"before": None, "after": after}),
-            )
-            db.add(audit)
+            pending.append((new_exp, "create", None, after, index, key))
 
         imported += 1
+        if len(pending) >= IMPORT_FLUSH_ROWS:
+            flush()
+
+    flush()
+    return imported, skipped
+
+
+# ---------------------------------------------------------------------------
+# Endpoints
+# ---------------------------------------------------------------------------
+
+
+@router.post("/csv", response_model=CSVPreviewResponse)
+@limiter.limit("20/minute")
+def preview_csv_import(
+    request: Request,
+    file: UploadFile = File(...),
+    month: Optional[str] = Form(None),
+    limit: int = Form(PREVIEW_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> CSVPreviewResponse:
+    """
+    Parse a bank-exported CSV and return the first page of the preview.
+    Nothing is saved to the user's budget at this stage; the parsed rows are
+    staged under the returned ``import_id`` for paging and confirmation.
+
+    - `file`: CSV file (multipart/form-data)
+    - `month`: Optional YYYY-MM override; if omitted, month is inferred from each row's date.
+    - `limit`: rows in the first page (default 200, max 1000).
+    """
+    if not user or user.deleted_at is not None:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    # Validate explicit month param
+    if month:
+        try:
+            datetime.strptime(month, "%Y-%m")
+        except ValueError:
+            raise HTTPException(
+                status_code=422, detail="month must be in YYYY-MM format"
+            )
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=422, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    encoding, months = _scan_months(file.file, month)
+    existing = _existing_expense_keys(db, user.id, months)
+
+    stats = {"total": 0, "duplicates": 0, "errors": 0}
+    first_page: list[CSVPreviewRow] = []
+
+    def staged_rows():
+        with _csv_reader(file.file, encoding) as reader:
+            col = _read_header(reader)
+            for parsed in _parse_rows(reader, col, month):
+                if parsed is None:
+                    stats["errors"] += 1
+                    continue
+                date_str, desc, amount, row_month = parsed
+                is_dup = (desc.lower(), amount, row_month) in existing
+                row = [date_str, desc, amount, row_month, _suggest_category(desc), is_dup]
+                if stats["total"] < limit:
+                    first_page.append(_preview_row(stats["total"], row))
+                stats["total"] += 1
+                stats["duplicates"] += is_dup
+                yield row
+
+    import_id = uuid.uuid4().hex
+    artifact_key = f"imports/{user.id}/{import_id}.jsonl"
+    get_storage().save(artifact_key, _stage_blocks(staged_rows()))
+
+    db.add(
+        CSVImport(
+            id=import_id,
+            user_id=user.id,
+            artifact_key=artifact_key,
+            total=stats["total"],
+            duplicates_count=stats["duplicates"],
+            parse_errors=stats["errors"],
+            expires_at=datetime.utcnow() + timedelta(hours=settings.CSV_IMPORT_TTL_HOURS),
+        )
+    )
+    db.commit()
+
+    return CSVPreviewResponse(
+        rows=first_page,
+        total=stats["total"],
+        duplicates_count=stats["duplicates"],
+        parse_errors=stats["errors"],
+        import_id=import_id,
+        offset=0,
+        limit=limit,
+    )
+
+
+@router.get("/csv/{import_id}", response_model=CSVPreviewResponse)
+@limiter.limit("120/minute")
+def get_csv_import_page(
+    request: Request,
+    import_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(PREVIEW_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> CSVPreviewResponse:
+    """Return a page of a staged preview. Rows are numbered from 0 in file order."""
+    if not user or user.deleted_at is not None:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    record = _get_import(db, user.id, import_id)
+    rows = [_preview_row(i, row) for i, row in _read_staged(record.artifact_key, offset, offset + limit)]
+    return CSVPreviewResponse(
+        rows=rows,
+        total=record.total,
+        duplicates_count=record.duplicates_count,
+        parse_errors=record.parse_errors,
+        import_id=record.id,
+        offset=offset,
+        limit=limit,
+    )
+
 
+@router.post("/csv/confirm", response_model=CSVImportResult)
+@limiter.limit("10/minute")
+def confirm_csv_import(
+    request: Request,
+    payload: CSVConfirmRequest,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> CSVImportResult:
+    """
+    Persist confirmed CSV rows as actual expenses.
+    Rows with ``include=False`` are skipped without error.
+    Uses the standard name+category upsert: updates actual_amount if matched, inserts otherwise.
+
+    With ``import_id``, the staged preview is imported: each row as suggested
+    unless ``rows`` carries an edited copy of it (same row_id), and rows
+    flagged as duplicates are skipped when ``skip_duplicates`` is set. The
+    staged preview is discarded afterwards.
+    """
+    if not user or user.deleted_at is not None:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    if payload.import_id is None:
+        rows = ((r.include, r.description, r.amount, r.month, r.category) for r in payload.rows)
+        imported, skipped = _import_rows(db, user, rows)
+        db.commit()
+        return CSVImportResult(imported=imported, skipped=skipped)
+
+    record = _get_import(db, user.id, payload.import_id)
+    edits = {r.row_id: r for r in payload.rows}
+
+    def staged_rows():
+        for index, (_, desc, amount, month, suggested, is_dup) in _read_staged(record.artifact_key):
+            edit = edits.get(str(index))
+            if edit is not None:
+                yield edit.include, edit.description, edit.amount, edit.month, edit.category
+            else:
+                yield not (payload.skip_duplicates and is_dup), desc, amount, month, suggested
+
+    imported, skipped = _import_rows(db, user, staged_rows())
+    _discard_import(db, record)
     db.commit()
     return CSVImportResult(imported=imported, skipped=skipped)
+
+
+def purge_csv_imports(session_factory: Callable[[], Session]) -> None:
+    """Periodic job: delete staged previews that were never confirmed."""
+    db = session_factory()
+    try:
+        for record in db.query(CSVImport).filter(CSVImport.expires_at < datetime.utcnow()).all():
+            _discard_import(db, record)
+        db.commit()
+    except Exception:
+        logger.exception("CSV import purge failed")
+        db.rollback()
+    finally:
+        db.close()
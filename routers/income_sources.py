@@ -21,9 +21,10 @@ from database import (
     MonthlyData,
     User,
     VALID_INCOME_SOURCE_TYPES,
+    find_month_row,
     get_db,
 )
-from security import verify_token
+from security import get_current_user
 
 router = APIRouter(prefix="/income-sources", tags=["income-sources"])
 
@@ -56,28 +57,23 @@ class IncomeSourceOut(BaseModel):
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
-def _require_user(db: Session, email: str) -> User:
-    user = db.query(User).filter(User.email == email, User.deleted_at == None).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
-
-
 def _find_month(db: Session, user: User, month: str) -> MonthlyData | None:
     """Return MonthlyData for *user* matching *month* (YYYY-MM), or None."""
-    rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-    for row in rows:
-        if row.month == month:
-            return row
-    return None
+    return find_month_row(db, user.id, month)
 
 
 def _normalize_month(month: str) -> str:
     """Accept YYYY-MM or YYYY-M and return YYYY-MM."""
     parts = month.split("-")
-    if len(parts) == 2:
-        return f"{parts[0]}-{parts[1].zfill(2)}"
-    return month
+    if len(parts) != 2:
+        raise HTTPException(status_code=422, detail="month must be 'YYYY-MM'")
+    try:
+        year, mo = int(parts[0]), int(parts[1])
+    except ValueError:
+        raise HTTPException(status_code=422, detail="month must be 'YYYY-MM'")
+    if not (1 <= mo <= 12):
+        raise HTTPException(status_code=422, detail="month must be 'YYYY-MM'")
+    return f"{year:04d}-{mo:02d}"
 
 
 def _get_source(source_id: int, user: User, db: Session) -> IncomeSource:
@@ -110,10 +106,9 @@ def _to_out(src: IncomeSource, month_row: MonthlyData) -> dict:
 @router.get("", response_model=List[IncomeSourceOut])
 def list_income_sources(
     month: str = Query(..., description="Month in YYYY-MM format"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    user = _require_user(db, current_user)
     month_norm = _normalize_month(month)
     month_row = _find_month(db, user, month_norm)
     if not month_row:
@@ -133,7 +128,7 @@ def list_income_sources(
 @router.post("", response_model=IncomeSourceOut, status_code=status.HTTP_201_CREATED)
 def create_income_source(
     body: IncomeSourceCreate,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     if body.source_type not in VALID_INCOME_SOURCE_TYPES:
@@ -142,7 +137,6 @@ def create_income_source(
             detail=f"source_type must be one of: {sorted(VALID_INCOME_SOURCE_TYPES)}",
         )
 
-    user = _require_user(db, current_user)
     month_norm = _normalize_month(body.month)
     month_row = _find_month(db, user, month_norm)
     if not month_row:
@@ -161,7 +155,7 @@ def create_income_source(
 def update_income_source(
     source_id: int,
     body: IncomeSourceUpdate,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     if body.source_type is not None and body.source_type not in VALID_INCOME_SOURCE_TYPES:
@@ -170,7 +164,6 @@ def update_income_source(
             detail=f"source_type must be one of: {sorted(VALID_INCOME_SOURCE_TYPES)}",
         )
 
-    user = _require_user(db, current_user)
     src = _get_source(source_id, user, db)
     month_row = db.query(MonthlyData).filter(MonthlyData.id == src.monthly_data_id).first()
 
@@ -189,10 +182,9 @@ def update_income_source(
 @router.delete("/{source_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_income_source(
     source_id: int,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    user = _require_user(db, current_user)
     src = _get_source(source_id, user, db)
     src.deleted_at = datetime.utcnow()
     db.commit()
@@ -2,15 +2,19 @@
 import calendar
 import json
 import logging
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from typing import Any, Dict, List, Optional
 
+import numpy as np
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, selectinload
 
-from database import get_db, User, MonthlyData, MonthlyExpense, Notification, SavingsGoal, SavingsContribution
-from security import verify_token
+from core.analytics import InsightsContext, SpendingMatrix, month_index, prior_months, shift_month
+from core.batch import BatchJob
+from database import category_totals_by_month, existing_dedup_keys, expense_search_query, find_month_row, get_db, iter_decrypted_tuples, month_blind_index, month_rows_for_users, months_in_range, prefetch_decrypted, User, MonthlyData, MonthlyExpense, Notification, SavingsGoal, SavingsContribution
+from core.cache import cached_endpoint
+from security import get_current_user
 
 logger = logging.getLogger(__name__)
 
@@ -23,31 +27,17 @@ _ai_review_counts: Dict[str, int] = {}
 
 # -------------------- helpers --------------------
 
-def _require_user(db: Session, email: str) -> User:
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
-
 def _normalize_month(m: str) -> str:
     parts = (m or "").split("-")
     if len(parts) != 2:
         raise HTTPException(status_code=422, detail="month must be 'YYYY-MM'")
-    y, mo = parts
     try:
-        return f"{int(y):04d}-{int(mo):02d}"
+        y, mo = int(parts[0]), int(parts[1])
     except ValueError:
         raise HTTPException(status_code=422, detail="month must be 'YYYY-MM'")
-
-
-def _prev_month_str(month_norm: str) -> str:
-    year, mo = map(int, month_norm.split("-"))
-    mo -= 1
-    if mo == 0:
-        mo = 12
-        year -= 1
-    return f"{year:04d}-{mo:02d}"
+    if not (1 <= mo <= 12):
+        raise HTTPException(status_code=422, detail="month must be 'YYYY-MM'")
+    return f"{y:04d}-{mo:02d}"
 
 
 def _month_list(n: int) -> list[str]:
@@ -64,41 +54,45 @@ def _month_list(n: int) -> list[str]:
     return months
 
 
-def _find_month(all_rows: list[MonthlyData], month_str: str) -> Optional[MonthlyData]:
-    for row in all_rows:
-        if row.month == month_str:
-            return row
-    return None
+def _find_month(db: Session, user_id: int, month_str: str) -> Optional[MonthlyData]:
+    return find_month_row(db, user_id, month_str)
 
 
 def _category_totals(db: Session, month_row: Optional[MonthlyData]) -> Dict[str, Dict[str, float]]:
-    """Return {category: {planned, actual}} for the given MonthlyData row."""
+    """Return {category: {planned, actual}} for the given MonthlyData row (from the rollup)."""
     if not month_row:
         return {}
-    expenses = (
-        db.query(MonthlyExpense)
+    return category_totals_by_month(db, [month_row.id])[month_row.id]
+
+
+def _category_totals_for_months(
+    db: Session, user_id: int, month_strs: List[str]
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Return {month_str: {category: {planned, actual}}} for those of *month_strs* with data."""
+    rows = (
+        db.query(MonthlyData)
         .filter(
-            MonthlyExpense.monthly_data_id == month_row.id,
-            MonthlyExpense.deleted_at == None,  # noqa: E711
+            MonthlyData.user_id == user_id,
+            MonthlyData.month_bidx.in_([month_blind_index(m) for m in month_strs]),
         )
         .all()
     )
-    totals: Dict[str, Dict[str, float]] = {}
-    for e in expenses:
-        cat = e.category or "Other"
-        if cat not in totals:
-            totals[cat] = {"planned": 0.0, "actual": 0.0}
-        totals[cat]["planned"] += float(e.planned_amount or 0.0)
-        totals[cat]["actual"] += float(e.actual_amount or 0.0)
-    return totals
+    totals = category_totals_by_month(db, [r.id for r in rows])
+    by_bidx = {r.month_bidx: totals[r.id] for r in rows}
+    return {
+        m: by_bidx[month_blind_index(m)]
+        for m in month_strs
+        if month_blind_index(m) in by_bidx
+    }
 
 
 # -------------------- endpoints --------------------
 
 @router.get("/monthly-summary")
+@cached_endpoint("insights:monthly-summary", ttl=300)
 def monthly_summary(
     month: str = Query(..., description="Month in YYYY-MM format"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -106,36 +100,29 @@ def monthly_summary(
     biggest overspend, net income, and plain-English insight cards.
     """
     month_norm = _normalize_month(month)
-    user = _require_user(db, current_user)
+    return _monthly_summary(InsightsContext(db, user.id), month_norm)
 
-    all_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-    current_row = _find_month(all_rows, month_norm)
-    prev_row = _find_month(all_rows, _prev_month_str(month_norm))
 
-    current_cats = _category_totals(db, current_row)
-    prev_cats = _category_totals(db, prev_row)
+def _monthly_summary(ctx: InsightsContext, month_norm: str) -> Dict[str, Any]:
+    prev_month = shift_month(month_norm, -1)
+    matrix = ctx.matrix([prev_month, month_norm])
+    prev, curr = matrix.row(prev_month), matrix.row(month_norm)
+    pct = matrix.growth(matrix.actual[prev], matrix.actual[curr])
 
-    all_categories = set(current_cats.keys()) | set(prev_cats.keys())
     categories: Dict[str, Any] = {}
-    for cat in sorted(all_categories):
-        curr = current_cats.get(cat, {"planned": 0.0, "actual": 0.0})
-        prev_actual = prev_cats.get(cat, {}).get("actual", 0.0)
-
-        pct_change: Optional[float] = None
-        if prev_actual > 0:
-            pct_change = round(((curr["actual"] - prev_actual) / prev_actual) * 100, 1)
-
-        variance = curr["actual"] - curr["planned"]
+    for j, cat in enumerate(matrix.categories):
+        planned = float(matrix.planned[curr, j])
+        actual = float(matrix.actual[curr, j])
         categories[cat] = {
-            "planned": round(curr["planned"], 2),
-            "actual": round(curr["actual"], 2),
-            "prev_month_actual": round(prev_actual, 2),
-            "pct_change": pct_change,
-            "over_budget": curr["actual"] > curr["planned"] and curr["planned"] > 0,
-            "variance": round(variance, 2),
+            "planned": round(planned, 2),
+            "actual": round(actual, 2),
+            "prev_month_actual": round(float(matrix.actual[prev, j]), 2),
+            "pct_change": None if np.isnan(pct[j]) else round(float(pct[j]), 1),
+            "over_budget": actual > planned and planned > 0,
+            "variance": round(actual - planned, 2),
         }
 
-    salary_actual = float(current_row.salary_actual or 0.0) if current_row else 0.0
+    salary_actual = float(matrix.salary_actual[curr])
     total_actual = sum(v["actual"] for v in categories.values())
     net_income = salary_actual - total_actual
 
@@ -207,9 +194,10 @@ def monthly_summary(
 
 
 @router.get("/month-close-summary")
+@cached_endpoint("insights:month-close-summary", ttl=300)
 def month_close_summary(
     month: str = Query(..., description="Month in YYYY-MM format"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -217,10 +205,8 @@ def month_close_summary(
     Intended to surface surplus at month-end so the user can move it to savings.
     """
     month_norm = _normalize_month(month)
-    user = _require_user(db, current_user)
 
-    all_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-    month_row = _find_month(all_rows, month_norm)
+    month_row = _find_month(db, user.id, month_norm)
 
     if not month_row:
         return {"month": month_norm, "total_unspent": 0.0, "categories": []}
@@ -242,81 +228,46 @@ def month_close_summary(
 
 
 @router.get("/trends")
+@cached_endpoint("insights:trends", ttl=600)
 def spending_trends(
     months: int = Query(6, ge=2, le=24, description="Number of months to include"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
     Monthly spending totals and per-category breakdown for the last N months,
     plus 3-month rolling averages for use in trend charts.
     """
-    user = _require_user(db, current_user)
-    month_strs = _month_list(months)
-
-    # Use selectinload to fetch all expenses in one query, avoiding N+1.
-    all_rows = (
-        db.query(MonthlyData)
-        .filter(MonthlyData.user_id == user.id)
-        .options(selectinload(MonthlyData.expenses))
-        .all()
-    )
-    month_map = {row.month: row for row in all_rows}
-
-    monthly: list[Dict[str, Any]] = []
-    for ms in month_strs:
-        row = month_map.get(ms)
-        if not row:
-            monthly.append({
-                "month": ms,
-                "total_actual": 0.0,
-                "salary_actual": 0.0,
-                "categories": {},
-            })
-            continue
+    return _spending_trends(InsightsContext(db, user.id), months)
 
-        # Expenses already loaded via selectinload — no extra DB query.
-        expenses = [e for e in row.expenses if e.deleted_at is None]
-        cat_totals: Dict[str, float] = {}
-        for e in expenses:
-            cat = e.category or "Other"
-            cat_totals[cat] = cat_totals.get(cat, 0.0) + float(e.actual_amount or 0.0)
 
-        monthly.append({
-            "month": ms,
-            "total_actual": float(row.total_actual or 0.0),
-            "salary_actual": float(row.salary_actual or 0.0),
-            "categories": cat_totals,
-        })
+def _spending_trends(ctx: InsightsContext, months: int) -> Dict[str, Any]:
+    month_strs = _month_list(months)
 
-    all_cats = sorted({cat for m in monthly for cat in m["categories"]})
+    matrix = ctx.matrix(month_strs)
+    rolling = matrix.rolling_mean(3)
 
     category_trends: Dict[str, list] = {}
     rolling_averages: Dict[str, list] = {}
-    for cat in all_cats:
-        amounts = [m["categories"].get(cat, 0.0) for m in monthly]
+    for j, cat in enumerate(matrix.categories):
         category_trends[cat] = [
-            {"month": month_strs[i], "amount": round(amounts[i], 2)}
-            for i in range(len(month_strs))
+            {"month": ms, "amount": round(float(a), 2)}
+            for ms, a in zip(month_strs, matrix.actual[:, j])
         ]
-        # 3-month rolling average
-        rolling = []
-        for i in range(len(amounts)):
-            window = amounts[max(0, i - 2) : i + 1]
-            rolling.append(round(sum(window) / len(window), 2))
         rolling_averages[cat] = [
-            {"month": month_strs[i], "amount": rolling[i]}
-            for i in range(len(month_strs))
+            {"month": ms, "amount": round(float(a), 2)}
+            for ms, a in zip(month_strs, rolling[:, j])
         ]
 
+    net = matrix.salary_actual - matrix.total_actual
     overall_trend = [
         {
-            "month": m["month"],
-            "total_actual": round(m["total_actual"], 2),
-            "salary_actual": round(m["salary_actual"], 2),
-            "net": round(m["salary_actual"] - m["total_actual"], 2),
+            "month": ms,
+            "total_actual": round(float(total), 2),
+            "salary_actual": round(float(salary), 2),
+            "net": round(float(n), 2),
         }
-        for m in monthly
+        for ms, total, salary, n in zip(month_strs, matrix.total_actual, matrix.salary_actual, net)
     ]
 
     return {
@@ -328,9 +279,10 @@ def spending_trends(
 
 
 @router.get("/heatmap")
+@cached_endpoint("insights:heatmap", ttl=600)
 def spending_heatmap(
     year: Optional[int] = Query(None, description="Year (defaults to current year)"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -338,43 +290,17 @@ def spending_heatmap(
     intensity levels (0=no data, 1=low, 2=medium, 3=high, 4=very high).
     """
     y = year or datetime.utcnow().year
-    user = _require_user(db, current_user)
-
-    all_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-
-    heatmap: list[Dict[str, Any]] = []
-    max_spending = 0.0
-    for mo in range(1, 13):
-        month_str = f"{y:04d}-{mo:02d}"
-        row = _find_month(all_rows, month_str)
-        total = float(row.total_actual or 0.0) if row else 0.0
-        max_spending = max(max_spending, total)
-        heatmap.append({"month": month_str, "total_actual": round(total, 2)})
-
-    # Assign quartile levels
-    non_zero = sorted(m["total_actual"] for m in heatmap if m["total_actual"] > 0)
-    if non_zero:
-        def quartile(lst, q):
-            idx = max(0, int(len(lst) * q) - 1)
-            return lst[idx]
-        q1 = quartile(non_zero, 0.25)
-        q2 = quartile(non_zero, 0.50)
-        q3 = quartile(non_zero, 0.75)
-    else:
-        q1, q2, q3 = 0.0, 0.0, 0.0
-
-    for m in heatmap:
-        amt = m["total_actual"]
-        if amt == 0:
-            m["level"] = 0
-        elif amt <= q1:
-            m["level"] = 1
-        elif amt <= q2:
-            m["level"] = 2
-        elif amt <= q3:
-            m["level"] = 3
-        else:
-            m["level"] = 4
+
+    month_strs = [f"{y:04d}-{mo:02d}" for mo in range(1, 13)]
+    matrix = SpendingMatrix.load(db, user.id, month_strs, cells=False)
+    totals = [round(float(t), 2) for t in matrix.total_actual]
+    levels = SpendingMatrix.quartile_levels(np.array(totals))
+    max_spending = max(0.0, float(matrix.total_actual.max()))
+
+    heatmap = [
+        {"month": ms, "total_actual": total, "level": int(level)}
+        for ms, total, level in zip(month_strs, totals, levels)
+    ]
 
     return {
         "year": str(y),
@@ -384,9 +310,10 @@ def spending_heatmap(
 
 
 @router.get("/health-score")
+@cached_endpoint("insights:health-score", ttl=600)
 def financial_health_score(
     month: str = Query(..., description="Month in YYYY-MM format"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -401,11 +328,12 @@ def financial_health_score(
     Returns score=0 with no data (not an error).
     """
     month_norm = _normalize_month(month)
-    user = _require_user(db, current_user)
+    return _health_score(InsightsContext(db, user.id), month_norm)
 
+
+def _health_score(ctx: InsightsContext, month_norm: str) -> Dict[str, Any]:
     # ── 1. Savings rate ──────────────────────────────────────────────────────
-    all_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-    month_row = _find_month(all_rows, month_norm)
+    month_row = ctx.month_row(month_norm)
 
     salary_actual = float(month_row.salary_actual or 0.0) if month_row else 0.0
     total_actual = float(month_row.total_actual or 0.0) if month_row else 0.0
@@ -421,7 +349,7 @@ def financial_health_score(
         savings_detail = "No income data for this month"
 
     # ── 2. Budget adherence ──────────────────────────────────────────────────
-    cat_data = _category_totals(db, month_row)
+    cat_data = ctx.category_totals([month_norm]).get(month_norm, {})
     cats_with_budget = [(cat, v) for cat, v in cat_data.items() if v["planned"] > 0]
     if cats_with_budget:
         within_budget = sum(1 for _, v in cats_with_budget if v["actual"] <= v["planned"])
@@ -437,34 +365,20 @@ def financial_health_score(
 
     # ── 3. Emergency fund coverage ───────────────────────────────────────────
     # Total saved across all active goals
-    goals = (
-        db.query(SavingsGoal)
-        .filter(SavingsGoal.user_id == user.id, SavingsGoal.deleted_at == None)  # noqa: E711
-        .all()
+    goal_ids = ctx.db.query(SavingsGoal.id).filter(
+        SavingsGoal.user_id == ctx.user_id, SavingsGoal.deleted_at == None  # noqa: E711
+    )
+    contribs = prefetch_decrypted(
+        ctx.db.query(SavingsContribution).filter(SavingsContribution.goal_id.in_(goal_ids)).all(),
+        "amount",
     )
-    total_savings = 0.0
-    for goal in goals:
-        contribs = db.query(SavingsContribution).filter(
-            SavingsContribution.goal_id == goal.id
-        ).all()
-        total_savings += sum(c.amount for c in contribs)
+    total_savings = sum(c.amount for c in contribs)
 
     # Average monthly actual spend over the last 3 months (including requested month)
-    year, mo = map(int, month_norm.split("-"))
-    last_3_months = []
-    for i in range(3):
-        m_mo = mo - i
-        m_yr = year
-        while m_mo <= 0:
-            m_mo += 12
-            m_yr -= 1
-        last_3_months.append(f"{m_yr:04d}-{m_mo:02d}")
-
-    monthly_expenses = []
-    for ms in last_3_months:
-        row = _find_month(all_rows, ms)
-        if row:
-            monthly_expenses.append(float(row.total_actual or 0.0))
+    last_3_months = [shift_month(month_norm, -i) for i in range(3)]
+    monthly_expenses = [
+        float(row.total_actual or 0.0) for row in ctx.month_rows(last_3_months).values()
+    ]
 
     avg_monthly_expenses = sum(monthly_expenses) / len(monthly_expenses) if monthly_expenses else 0.0
 
@@ -529,7 +443,7 @@ def financial_health_score(
 @router.get("/suggest-category")
 def suggest_category(
     name: str = Query(..., min_length=2, description="Expense name (min 2 chars)"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -539,7 +453,6 @@ def suggest_category(
     Matching is case-insensitive substring: "tesco" matches "Tesco Express".
     Returns null suggestion when there are fewer than 2 history matches.
     """
-    user = _require_user(db, current_user)
 
     all_monthly = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
     if not all_monthly:
@@ -555,6 +468,8 @@ def suggest_category(
         .all()
     )
 
+    prefetch_decrypted(expenses, "name", "category")
+
     name_lower = name.strip().lower()
     category_counts: Dict[str, int] = {}
     for expense in expenses:
@@ -576,9 +491,10 @@ def suggest_category(
 
 
 @router.get("/pace")
+@cached_endpoint("insights:pace", ttl=120)
 def spending_pace(
     month: str = Query(..., description="Month in YYYY-MM format"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -591,8 +507,10 @@ def spending_pace(
     overspend its planned budget by more than 10%.
     """
     month_norm = _normalize_month(month)
-    user = _require_user(db, current_user)
+    return _spending_pace(InsightsContext(db, user.id), month_norm)
 
+
+def _spending_pace(ctx: InsightsContext, month_norm: str) -> Dict[str, Any]:
     year, mo = map(int, month_norm.split("-"))
     days_in_month = calendar.monthrange(year, mo)[1]
 
@@ -616,9 +534,7 @@ def spending_pace(
     else:
         days_elapsed = today.day
 
-    all_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-    month_row = _find_month(all_rows, month_norm)
-    cat_data = _category_totals(db, month_row)
+    cat_data = ctx.category_totals([month_norm]).get(month_norm, {})
 
     categories: Dict[str, Any] = {}
     warnings: List[Dict[str, Any]] = []
@@ -782,10 +698,11 @@ async def _stream_ai_review(context: Dict[str, Any]):
 # -------------------- anomaly detection --------------------
 
 @router.get("/anomalies")
+@cached_endpoint("insights:anomalies", ttl=300)
 def spending_anomalies(
     month: str = Query(..., description="Month to analyse, YYYY-MM"),
     lookback: int = Query(3, ge=2, le=12, description="Prior months to use as baseline (2–12)"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -798,14 +715,19 @@ def spending_anomalies(
       low    — z-score ≥ 1.0 and spend >30% above mean
 
     Categories with no prior history are excluded (no baseline to compare against).
+    The window is loaded once into a core.analytics.SpendingMatrix and every
+    category is scored against its prior-month mean/std in one pass.
     """
     month_norm = _normalize_month(month)
-    user = _require_user(db, current_user)
+    return _spending_anomalies(InsightsContext(db, user.id), month_norm, lookback)
+
 
-    all_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-    current_row = _find_month(all_rows, month_norm)
+def _spending_anomalies(ctx: InsightsContext, month_norm: str, lookback: int) -> Dict[str, Any]:
+    baseline_months = prior_months(month_norm, lookback)
+    matrix = ctx.matrix(baseline_months + [month_norm])
+    row = matrix.row(month_norm)
 
-    if not current_row:
+    if not matrix.present[row].any():
         return {
             "month": month_norm,
             "anomalies": [],
@@ -813,50 +735,22 @@ def spending_anomalies(
             "categories_analysed": 0,
         }
 
-    # Build list of prior month strings (oldest → newest, excluding current month)
-    year, mo = map(int, month_norm.split("-"))
-    prior_months: list[str] = []
-    for i in range(lookback, 0, -1):
-        pmo = mo - i
-        pyr = year
-        while pmo <= 0:
-            pmo += 12
-            pyr -= 1
-        prior_months.append(f"{pyr:04d}-{pmo:02d}")
-
-    # Collect per-category actual spend for each prior month that has data
-    history: Dict[str, List[float]] = {}
-    for pm in prior_months:
-        pm_row = _find_month(all_rows, pm)
-        if pm_row is None:
-            continue
-        for cat, vals in _category_totals(db, pm_row).items():
-            history.setdefault(cat, []).append(vals["actual"])
+    count, mean, std, z = matrix.zscores(row, matrix.rows(baseline_months))
+    current = matrix.actual[row]
+    pct = matrix.growth(mean, current)
 
-    current_cats = _category_totals(db, current_row)
+    # Only categories spent on this month with a positive historical average
+    # are scored (no baseline, or a zero one, means nothing to compare to).
+    candidates = matrix.present[row] & (current > 0) & (count > 0) & (mean > 0)
 
     _severity_order = {"high": 0, "medium": 1, "low": 2}
     anomalies: List[Dict[str, Any]] = []
 
-    for cat, vals in current_cats.items():
-        current_actual = vals["actual"]
-        if current_actual <= 0:
-            continue
-
-        hist_values = history.get(cat)
-        if not hist_values:
-            continue  # No historical baseline — cannot determine anomaly
-
-        n = len(hist_values)
-        mean = sum(hist_values) / n
-        if mean <= 0:
-            continue  # Historical average is zero — skip to avoid division issues
-
-        pct_change = round(((current_actual - mean) / mean) * 100, 1)
-
-        std_dev = (sum((x - mean) ** 2 for x in hist_values) / n) ** 0.5
+    for j in np.flatnonzero(candidates):
+        cat = matrix.categories[j]
+        pct_change = round(float(pct[j]), 1)
 
-        if std_dev == 0:
+        if std[j] == 0:
             # All prior months identical — classify by pct_change only
             if pct_change > 100:
                 severity = "high"
@@ -864,39 +758,31 @@ def spending_anomalies(
                 severity = "medium"
             else:
                 continue
-            anomalies.append({
-                "category": cat,
-                "current_amount": round(current_actual, 2),
-                "historical_avg": round(mean, 2),
-                "pct_change": pct_change,
-                "z_score": None,
-                "severity": severity,
-                "message": f"{cat} spending is {pct_change:.0f}% above your usual amount.",
-            })
-            continue
-
-        z_score = round((current_actual - mean) / std_dev, 2)
-
-        if z_score >= 2.0:
-            severity = "high"
-        elif z_score >= 1.5:
-            severity = "medium"
-        elif z_score >= 1.0 and pct_change >= 30:
-            severity = "low"
+            z_score = None
+            message = f"{cat} spending is {pct_change:.0f}% above your usual amount."
         else:
-            continue  # Within normal range
+            z_score = round(float(z[j]), 2)
+            if z_score >= 2.0:
+                severity = "high"
+            elif z_score >= 1.5:
+                severity = "medium"
+            elif z_score >= 1.0 and pct_change >= 30:
+                severity = "low"
+            else:
+                continue  # Within normal range
+            message = (
+                f"{cat} spending is {pct_change:.0f}% above your "
+                f"{lookback}-month average."
+            )
 
         anomalies.append({
             "category": cat,
-            "current_amount": round(current_actual, 2),
-            "historical_avg": round(mean, 2),
+            "current_amount": round(float(current[j]), 2),
+            "historical_avg": round(float(mean[j]), 2),
             "pct_change": pct_change,
             "z_score": z_score,
             "severity": severity,
-            "message": (
-                f"{cat} spending is {pct_change:.0f}% above your "
-                f"{lookback}-month average."
-            ),
+            "message": message,
         })
 
     anomalies.sort(key=lambda x: _severity_order[x["severity"]])
@@ -905,15 +791,16 @@ def spending_anomalies(
         "month": month_norm,
         "anomalies": anomalies,
         "lookback_months": lookback,
-        "categories_analysed": len(current_cats),
+        "categories_analysed": int(matrix.present[row].sum()),
     }
 
 
 # -------------------- spending streaks --------------------
 
 @router.get("/streaks")
+@cached_endpoint("insights:streaks", ttl=600)
 def spending_streaks(
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -929,8 +816,11 @@ def spending_streaks(
     total_tracked   — total number of months with actual data.
     months_under    — total number of months that were under-budget.
     """
-    user = _require_user(db, current_user)
-    all_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
+    return _spending_streaks(InsightsContext(db, user.id))
+
+
+def _spending_streaks(ctx: InsightsContext) -> Dict[str, Any]:
+    all_rows = ctx.all_rows()
 
     # Filter to months that have actual spending data and sort chronologically
     tracked: list[tuple[str, bool]] = []  # (month_str, is_under_budget)
@@ -984,7 +874,7 @@ def spending_streaks(
 @router.post("/ai-review")
 async def ai_financial_review(
     month: str = Query(..., description="Month in YYYY-MM format"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> StreamingResponse:
     """
@@ -995,7 +885,6 @@ async def ai_financial_review(
     Response streams as Server-Sent Events (SSE).
     """
     month_norm = _normalize_month(month)
-    user = _require_user(db, current_user)
 
     allowed, remaining = _check_and_increment_ai_rate_limit(user.id)
     if not allowed:
@@ -1006,8 +895,7 @@ async def ai_financial_review(
         )
 
     # Gather anonymised context — no raw expense names
-    all_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-    month_row = _find_month(all_rows, month_norm)
+    month_row = _find_month(db, user.id, month_norm)
     cat_data = _category_totals(db, month_row)
 
     salary_planned = float(month_row.salary_planned or 0.0) if month_row else 0.0
@@ -1064,55 +952,48 @@ def expense_search(
     sort: str = Query("date", description="Sort order: 'date' (default, month desc) or 'amount' (planned_amount desc)"),
     page: int = Query(1, ge=1, description="1-based page number"),
     page_size: int = Query(20, ge=1, le=100, description="Results per page (max 100)"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
     Full-text search across all expenses for the authenticated user.
 
-    Because all financial fields are Fernet-encrypted (non-deterministic), all
-    filtering happens in Python after fetching from the DB — O(n) by design.
+    The month range and the search-index tokens for name/category are applied
+    in SQL; the (Fernet-encrypted) fields of the candidates are re-checked in
+    Python.
     """
-    user = _require_user(db, current_user)
 
     # Normalize optional month bounds
     from_norm = _normalize_month(from_month) if from_month else None
     to_norm = _normalize_month(to_month) if to_month else None
 
-    # Load all MonthlyData for this user, build a month→row map
-    all_rows: List[MonthlyData] = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-    # Build dict of month_str → row so we can attach month to each expense
-    month_map: Dict[int, str] = {row.id: (row.month or "") for row in all_rows}
-
-    if not all_rows:
-        return {"items": [], "total": 0, "page": page, "page_size": page_size}
-
-    monthly_ids = [row.id for row in all_rows]
+    q_lower = q.strip().lower() if q else None
+    cat_lower = category.strip().lower() if category else None
 
-    # Fetch all non-deleted expenses across all months
-    all_expenses: List[MonthlyExpense] = (
-        db.query(MonthlyExpense)
-        .filter(
-            MonthlyExpense.monthly_data_id.in_(monthly_ids),
-            MonthlyExpense.deleted_at == None,  # noqa: E711
-        )
+    # Index tokens narrow the candidates in SQL, inside [from, to] — BETWEEN
+    # on the (user_id, period) index; only candidates are decrypted
+    range_ids = months_in_range(db, user.id, from_norm, to_norm).with_entities(MonthlyData.id).order_by(None)
+    candidates: List[MonthlyExpense] = prefetch_decrypted(
+        expense_search_query(db, user, q=q_lower, category=cat_lower)
+        .filter(MonthlyExpense.monthly_data_id.in_(range_ids))
         .all()
     )
+    if not candidates:
+        return {"items": [], "total": 0, "page": page, "page_size": page_size}
 
-    # Python-side filtering (encryption prevents SQL predicates)
-    q_lower = q.strip().lower() if q else None
-    cat_lower = category.strip().lower() if category else None
+    month_rows = prefetch_decrypted(
+        db.query(MonthlyData)
+        .filter(MonthlyData.id.in_({e.monthly_data_id for e in candidates}))
+        .all(),
+        "month",
+    )
+    month_map: Dict[int, str] = {row.id: (row.month or "") for row in month_rows}
 
+    # Re-check the decrypted fields (tokens only say "may match")
     results = []
-    for exp in all_expenses:
+    for exp in candidates:
         month_str = month_map.get(exp.monthly_data_id, "")
 
-        # Month range filter
-        if from_norm and month_str < from_norm:
-            continue
-        if to_norm and month_str > to_norm:
-            continue
-
         # Keyword filter (case-insensitive substring)
         if q_lower:
             exp_name = (exp.name or "").lower()
@@ -1159,9 +1040,10 @@ def expense_search(
 # -------------------- spending velocity --------------------
 
 @router.get("/spending-velocity")
+@cached_endpoint("insights:spending-velocity", ttl=120)
 def spending_velocity(
     month: str = Query(..., description="Month in YYYY-MM format"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -1174,8 +1056,10 @@ def spending_velocity(
     Returns zeroed structure when no data exists for the month.
     """
     month_norm = _normalize_month(month)
-    user = _require_user(db, current_user)
+    return _spending_velocity(InsightsContext(db, user.id), month_norm)
+
 
+def _spending_velocity(ctx: InsightsContext, month_norm: str) -> Dict[str, Any]:
     year, mo = map(int, month_norm.split("-"))
     days_in_month = calendar.monthrange(year, mo)[1]
 
@@ -1190,8 +1074,7 @@ def spending_velocity(
     else:
         days_elapsed = today.day
 
-    all_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-    month_row = _find_month(all_rows, month_norm)
+    month_row = ctx.month_row(month_norm)
 
     if not month_row:
         return {
@@ -1226,9 +1109,10 @@ def spending_velocity(
 
 
 @router.get("/month-performance")
+@cached_endpoint("insights:month-performance", ttl=300)
 def month_performance(
     month: str = Query(..., description="Month in YYYY-MM format"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -1243,10 +1127,11 @@ def month_performance(
         over_budget — actual_ytd > 110% of planned_ytd
     """
     month_norm = _normalize_month(month)
-    user = _require_user(db, current_user)
+    return _month_performance(InsightsContext(db, user.id), month_norm)
+
 
-    all_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-    month_row = _find_month(all_rows, month_norm)
+def _month_performance(ctx: InsightsContext, month_norm: str) -> Dict[str, Any]:
+    month_row = ctx.month_row(month_norm)
 
     year, mo = map(int, month_norm.split("-"))
 
@@ -1301,13 +1186,112 @@ def month_performance(
     }
 
 
+# -------------------- dashboard --------------------
+
+# Widget name -> compute(ctx, opts); opts holds month, trend_months and lookback.
+_DASHBOARD_WIDGETS = {
+    "monthly-summary": lambda ctx, o: _monthly_summary(ctx, o["month"]),
+    "health-score": lambda ctx, o: _health_score(ctx, o["month"]),
+    "pace": lambda ctx, o: _spending_pace(ctx, o["month"]),
+    "streaks": lambda ctx, o: _spending_streaks(ctx),
+    "trends": lambda ctx, o: _spending_trends(ctx, o["trend_months"]),
+    "anomalies": lambda ctx, o: _spending_anomalies(ctx, o["month"], o["lookback"]),
+    "spending-velocity": lambda ctx, o: _spending_velocity(ctx, o["month"]),
+    "month-performance": lambda ctx, o: _month_performance(ctx, o["month"]),
+}
+
+
+def _dashboard_rollup_months(widgets: List[str], opts: Dict[str, Any]) -> List[str]:
+    """Every month whose category rollup the requested widgets read."""
+    month = opts["month"]
+    months = {month}
+    if "monthly-summary" in widgets:
+        months.add(shift_month(month, -1))
+    if "trends" in widgets:
+        months.update(_month_list(opts["trend_months"]))
+    if "anomalies" in widgets:
+        months.update(prior_months(month, opts["lookback"]))
+    return sorted(months)
+
+
+def _compute_widgets(ctx: InsightsContext, widgets: List[str], opts: Dict[str, Any]):
+    """Yield (name, result, error) per widget; one failing widget doesn't sink the rest."""
+    for name in widgets:
+        try:
+            yield name, _DASHBOARD_WIDGETS[name](ctx, opts), None
+        except HTTPException as exc:
+            yield name, None, exc.detail
+        except Exception:
+            logger.exception("Dashboard widget %s failed", name)
+            yield name, None, "Failed to compute widget"
+
+
+@router.get("/dashboard")
+@cached_endpoint("insights:dashboard", ttl=120)
+def insights_dashboard(
+    month: str = Query(..., description="Month in YYYY-MM format"),
+    widgets: Optional[List[str]] = Query(
+        None, description="Widgets to compute (repeat or comma-separate); default all"
+    ),
+    trend_months: int = Query(6, ge=2, le=24, description="Months for the trends widget"),
+    lookback: int = Query(3, ge=2, le=12, description="Baseline months for the anomalies widget"),
+    stream: bool = Query(False, description="Stream widgets as NDJSON as each finishes"),
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Several dashboard widgets from one data load. Each widget's result is
+    what its own endpoint (/insights/<widget>) returns for the same month.
+
+    The user's MonthlyData rows are loaded and decrypted once, and the
+    category rollup for every month the widgets need is read in one
+    more query; the widgets are then computed from that shared context.
+
+    Returns {month, widgets: {name: result}, errors: {name: detail}}, or with
+    stream=true one NDJSON line per widget as it finishes:
+    {"widget": name, "data": result} or {"widget": name, "error": detail}.
+    """
+    month_norm = _normalize_month(month)
+    requested = [w.strip() for value in (widgets or []) for w in value.split(",") if w.strip()]
+    requested = list(dict.fromkeys(requested)) or list(_DASHBOARD_WIDGETS)
+    unknown = [w for w in requested if w not in _DASHBOARD_WIDGETS]
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown widget(s): {', '.join(unknown)}. Valid: {', '.join(_DASHBOARD_WIDGETS)}",
+        )
+
+    opts = {"month": month_norm, "trend_months": trend_months, "lookback": lookback}
+    ctx = InsightsContext(db, user.id)
+    ctx.all_rows()
+    ctx.category_totals(_dashboard_rollup_months(requested, opts))
+
+    if stream:
+        def lines():
+            for name, result, error in _compute_widgets(ctx, requested, opts):
+                line = {"widget": name, "error": error} if error else {"widget": name, "data": result}
+                yield json.dumps(line, default=str) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    results: Dict[str, Any] = {}
+    errors: Dict[str, Any] = {}
+    for name, result, error in _compute_widgets(ctx, requested, opts):
+        if error:
+            errors[name] = error
+        else:
+            results[name] = result
+    return {"month": month_norm, "widgets": results, "errors": errors}
+
+
 # -------------------- spending forecast --------------------
 
 @router.get("/spending-forecast")
+@cached_endpoint("insights:spending-forecast", ttl=300)
 def spending_forecast(
     month: str = Query(..., description="Month to forecast for, YYYY-MM"),
     lookback: int = Query(3, ge=2, le=6, description="Prior months to average (2–6)"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -1319,47 +1303,20 @@ def spending_forecast(
     Returns an empty list when no historical data exists at all.
     """
     month_norm = _normalize_month(month)
-    user = _require_user(db, current_user)
 
-    all_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
+    baseline_months = prior_months(month_norm, lookback)
+    matrix = SpendingMatrix.load(db, user.id, baseline_months)
+    count, mean, _ = matrix.baseline(matrix.rows(baseline_months))
 
-    # Build list of prior month strings (oldest → newest, excluding the target month)
-    year, mo = map(int, month_norm.split("-"))
-    prior_months: list[str] = []
-    for i in range(lookback, 0, -1):
-        pmo = mo - i
-        pyr = year
-        while pmo <= 0:
-            pmo += 12
-            pyr -= 1
-        prior_months.append(f"{pyr:04d}-{pmo:02d}")
-
-    # Collect per-category actual spend across prior months that have data
-    history: Dict[str, List[float]] = {}
-    for pm in prior_months:
-        pm_row = _find_month(all_rows, pm)
-        if pm_row is None:
-            continue
-        for cat, vals in _category_totals(db, pm_row).items():
-            history.setdefault(cat, []).append(vals["actual"])
-
-    if not history:
-        return {
-            "month": month_norm,
-            "lookback": lookback,
-            "categories": [],
-            "total": 0.0,
-        }
-
-    categories: List[Dict[str, Any]] = []
-    for cat in sorted(history.keys()):
-        values = history[cat]
-        avg = round(sum(values) / len(values), 2)
-        categories.append({
+    categories: List[Dict[str, Any]] = [
+        {
             "category": cat,
-            "predicted_amount": avg,
-            "months_of_data": len(values),
-        })
+            "predicted_amount": round(float(mean[j]), 2),
+            "months_of_data": int(count[j]),
+        }
+        for j, cat in enumerate(matrix.categories)
+        if count[j]
+    ]
 
     total = round(sum(c["predicted_amount"] for c in categories), 2)
 
@@ -1374,9 +1331,10 @@ def spending_forecast(
 # -------------------- subscription tracker --------------------
 
 @router.get("/subscriptions")
+@cached_endpoint("insights:subscriptions", ttl=900)
 def subscription_tracker(
     year: int = Query(..., description="Year to analyse, e.g. 2026"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -1391,29 +1349,26 @@ def subscription_tracker(
     first_seen    = earliest YYYY-MM in which the expense appeared
     last_seen     = latest YYYY-MM in which the expense appeared
     """
-    user = _require_user(db, current_user)
-
-    all_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-
-    # Build month strings for the requested year
-    year_months = [f"{year:04d}-{mo:02d}" for mo in range(1, 13)]
 
     # key: (name_lower, category_lower) → {months: set[str], amounts: list[float]}
     tracker: Dict[tuple, Dict] = {}
 
-    for month_str in year_months:
-        month_row = _find_month(all_rows, month_str)
-        if month_row is None:
-            continue
+    # One range scan for the whole year; expenses batch-loaded alongside.
+    year_rows = (
+        months_in_range(db, user.id, f"{year:04d}-01", f"{year:04d}-12")
+        .options(selectinload(MonthlyData.expenses))
+        .all()
+    )
 
-        expenses = (
-            db.query(MonthlyExpense)
-            .filter(
-                MonthlyExpense.monthly_data_id == month_row.id,
-                MonthlyExpense.deleted_at == None,  # noqa: E711
-            )
-            .all()
-        )
+    prefetch_decrypted(year_rows, "month")
+    prefetch_decrypted(
+        [e for row in year_rows for e in row.expenses if e.deleted_at is None],
+        "name", "category", "actual_amount", "planned_amount",
+    )
+
+    for month_row in year_rows:
+        month_str = month_row.month
+        expenses = [e for e in month_row.expenses if e.deleted_at is None]
 
         for exp in expenses:
             name = (exp.name or "").strip()
@@ -1461,10 +1416,11 @@ def subscription_tracker(
 
 
 @router.get("/year-over-year")
+@cached_endpoint("insights:year-over-year", ttl=900)
 def year_over_year(
     month: int = Query(..., ge=1, le=12, description="Calendar month number (1–12)"),
     years: int = Query(3, ge=1, le=10, description="Number of past years to analyse"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -1476,41 +1432,32 @@ def year_over_year(
     Only years where data exists for the month are included in years_analyzed.
     Each category entry covers all analyzed years; missing years are shown as 0.
     """
-    user = _require_user(db, current_user)
-
-    all_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
 
     now = datetime.utcnow()
     candidate_years = list(range(now.year - years + 1, now.year + 1))
 
-    month_str = f"{month:02d}"  # zero-padded, e.g. "03"
+    # One IN query on the period index for that calendar month in every
+    # candidate year (the keys are year*12 apart, so a range would over-fetch).
+    month_strs = [f"{yr:04d}-{month:02d}" for yr in candidate_years]
+    matrix = SpendingMatrix.load(db, user.id, month_strs)
 
-    # Collect per-year per-category totals
-    year_data: Dict[int, Dict[str, float]] = {}
-    for yr in candidate_years:
-        yr_month_str = f"{yr:04d}-{month_str}"
-        row = _find_month(all_rows, yr_month_str)
-        if row is None:
-            continue
-        cats = _category_totals(db, row)
-        if not cats:
-            continue
-        year_data[yr] = {cat: round(vals["actual"], 2) for cat, vals in cats.items()}
-
-    years_analyzed = sorted(year_data.keys())
-
-    # Build per-category matrix covering all analyzed years
-    all_categories: set[str] = set()
-    for cats in year_data.values():
-        all_categories.update(cats.keys())
+    # Only years with category data for the month are analysed; within them
+    # a category missing that year shows as 0.
+    analysed = np.flatnonzero(matrix.has_cells())
+    years_analyzed = [candidate_years[i] for i in analysed]
+    spent = matrix.present[analysed].any(axis=0)
 
-    categories: List[Dict[str, Any]] = []
-    for cat in sorted(all_categories):
-        by_year = [
-            {"year": yr, "actual": year_data[yr].get(cat, 0.0)}
-            for yr in years_analyzed
-        ]
-        categories.append({"category": cat, "by_year": by_year})
+    categories: List[Dict[str, Any]] = [
+        {
+            "category": cat,
+            "by_year": [
+                {"year": candidate_years[i], "actual": round(float(matrix.actual[i, j]), 2)}
+                for i in analysed
+            ],
+        }
+        for j, cat in enumerate(matrix.categories)
+        if spent[j]
+    ]
 
     return {
         "month_number": month,
@@ -1520,9 +1467,10 @@ def year_over_year(
 
 
 @router.get("/reallocation-suggestions")
+@cached_endpoint("insights:reallocation-suggestions", ttl=300)
 def reallocation_suggestions(
     months: int = Query(3, ge=1, le=12, description="Number of past months to analyse (1–12)"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -1538,21 +1486,19 @@ def reallocation_suggestions(
         suggestions: [{ from_category, to_category, suggested_amount, rationale }],
       }
     """
-    user = _require_user(db, current_user)
 
     month_list = _month_list(months)
-    all_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
 
     # Accumulate per-category stats across the window
     # { category: { "planned_sum": float, "actual_sum": float, "months_with_data": int,
     #               "slack_months": int, "stress_months": int } }
     cat_stats: Dict[str, Dict[str, Any]] = {}
 
+    window_totals = _category_totals_for_months(db, user.id, month_list)
     for month_str in month_list:
-        row = _find_month(all_rows, month_str)
-        if row is None:
+        cat_totals = window_totals.get(month_str)
+        if cat_totals is None:
             continue
-        cat_totals = _category_totals(db, row)
         for cat, vals in cat_totals.items():
             planned = vals["planned"]
             actual = vals["actual"]
@@ -1633,10 +1579,11 @@ def reallocation_suggestions(
 
 
 @router.get("/month-comparison")
+@cached_endpoint("insights:month-comparison", ttl=300)
 def month_comparison(
     month_a: str = Query(..., description="First month in YYYY-MM format"),
     month_b: str = Query(..., description="Second month in YYYY-MM format"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -1651,11 +1598,8 @@ def month_comparison(
     month_a_norm = _normalize_month(month_a)
     month_b_norm = _normalize_month(month_b)
 
-    user = _require_user(db, current_user)
-
-    all_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-    row_a = _find_month(all_rows, month_a_norm)
-    row_b = _find_month(all_rows, month_b_norm)
+    row_a = _find_month(db, user.id, month_a_norm)
+    row_b = _find_month(db, user.id, month_b_norm)
 
     cats_a = _category_totals(db, row_a)
     cats_b = _category_totals(db, row_b)
@@ -1687,9 +1631,10 @@ def month_comparison(
 
 
 @router.get("/tag-summary")
+@cached_endpoint("insights:tag-summary", ttl=600)
 def tag_summary(
     months: int = Query(3, ge=1, le=24, description="Number of recent months to analyse"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -1699,16 +1644,13 @@ def tag_summary(
     descending.  Each entry includes: tag, total_actual, expense_count,
     avg_amount, categories (list of distinct categories that share the tag).
     """
-    user = _require_user(db, current_user)
     month_list = _month_list(months)
 
-    all_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-
     # tag → { total_actual, expense_count, categories: set }
     tag_data: Dict[str, Dict] = {}
 
     for month_str in month_list:
-        month_row = _find_month(all_rows, month_str)
+        month_row = _find_month(db, user.id, month_str)
         if month_row is None:
             continue
 
@@ -1765,10 +1707,11 @@ def tag_summary(
 
 
 @router.get("/tag-breakdown")
+@cached_endpoint("insights:tag-breakdown", ttl=600)
 def tag_breakdown(
     tag: str = Query(..., min_length=1, description="Tag to analyse (case-insensitive)"),
     months: int = Query(6, ge=1, le=24, description="Number of recent months to analyse"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -1777,18 +1720,15 @@ def tag_breakdown(
     Matching is case-insensitive.  Every month in the window is included;
     months with no matching expenses have zeroed values.
     """
-    user = _require_user(db, current_user)
     month_list = _month_list(months)
     tag_lower = tag.strip().lower()
 
-    all_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-
     monthly_results = []
     grand_total = 0.0
     grand_count = 0
 
     for month_str in month_list:
-        month_row = _find_month(all_rows, month_str)
+        month_row = _find_month(db, user.id, month_str)
         if month_row is None:
             monthly_results.append({
                 "month": month_str,
@@ -1845,14 +1785,96 @@ def tag_breakdown(
     }
 
 
+# A pair of expenses is a duplicate candidate when it shares a category and
+# its amounts and created_at dates are this close.
+DUPLICATE_AMOUNT_TOLERANCE = 0.01
+DUPLICATE_MAX_DAYS = 3
+MAX_DUPLICATE_SCAN_MONTHS = 24
+
+
+def _amount_diff(a: float, b: float) -> float:
+    """Relative difference of two amounts, using the larger as denominator."""
+    larger = max(a, b)
+    if larger == 0:
+        return 0.0  # Both zero — treat as identical amounts
+    return abs(a - b) / larger
+
+
+def _days_apart(a: Optional[datetime], b: Optional[datetime]) -> int:
+    if a is None or b is None:
+        return 0  # NULL → treat as same-day
+    return abs((a - b).days)
+
+
+def _duplicate_pairs(items: List[Dict[str, Any]]) -> List[tuple]:
+    """
+    Index pairs (i, j), i < j, of *items* that are duplicate candidates, in
+    (i, j) order — the same pairs a compare-everything loop would find.
+
+    Items are bucketed by category. A positive-amount bucket is sorted by
+    amount and swept: item i is only compared with the items after it that
+    are still within the 1% window, and each of those is then checked for
+    the 3-day window. Amounts <= 0 are within 1% of each other by the ratio
+    above (and never of a positive amount), so that rare bucket is swept by
+    created_at instead. Either way the cost is O(n log n) plus the pairs
+    inside a window, not O(n²).
+    """
+    buckets: Dict[str, List[int]] = {}
+    for idx, item in enumerate(items):
+        buckets.setdefault(item["category"], []).append(idx)
+
+    pairs = []
+
+    def check(i: int, j: int) -> None:
+        lo, hi = min(i, j), max(i, j)
+        a, b = items[lo], items[hi]
+        if (
+            _amount_diff(a["amount"], b["amount"]) <= DUPLICATE_AMOUNT_TOLERANCE
+            and _days_apart(a["created_at"], b["created_at"]) <= DUPLICATE_MAX_DAYS
+        ):
+            pairs.append((lo, hi))
+
+    # Whole days are floored, so qualifying pairs are under MAX_DAYS + 1 apart
+    max_gap = timedelta(days=DUPLICATE_MAX_DAYS + 1)
+    for members in buckets.values():
+        by_amount = sorted((i for i in members if items[i]["amount"] > 0), key=lambda i: items[i]["amount"])
+        for n, i in enumerate(by_amount):
+            for m in range(n + 1, len(by_amount)):
+                j = by_amount[m]
+                if _amount_diff(items[i]["amount"], items[j]["amount"]) > DUPLICATE_AMOUNT_TOLERANCE:
+                    break
+                check(i, j)
+
+        rest = [i for i in members if items[i]["amount"] <= 0]
+        undated = [i for i in rest if items[i]["created_at"] is None]
+        by_date = sorted((i for i in rest if items[i]["created_at"] is not None), key=lambda i: items[i]["created_at"])
+        for n, i in enumerate(by_date):
+            for m in range(n + 1, len(by_date)):
+                j = by_date[m]
+                if items[j]["created_at"] - items[i]["created_at"] >= max_gap:
+                    break
+                check(i, j)
+        for n, i in enumerate(undated):
+            for j in undated[n + 1:] + by_date:
+                check(i, j)
+
+    pairs.sort()
+    return pairs
+
+
 @router.get("/duplicate-candidates")
+@cached_endpoint("insights:duplicate-candidates", ttl=300)
 def duplicate_candidates(
-    month: str = Query(..., description="Month to scan in YYYY-MM format"),
-    current_user: str = Depends(verify_token),
+    month: Optional[str] = Query(None, description="Month to scan in YYYY-MM format"),
+    from_month: Optional[str] = Query(None, alias="from", description="Start month YYYY-MM (inclusive)"),
+    to_month: Optional[str] = Query(None, alias="to", description="End month YYYY-MM (inclusive)"),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
-    Return pairs of non-deleted expenses in *month* that are likely duplicates.
+    Return pairs of non-deleted expenses that are likely duplicates, within
+    *month* or across the months from *from* to *to* (inclusive, at most
+    MAX_DUPLICATE_SCAN_MONTHS) — pairs may then span two months.
 
     A pair qualifies when all three conditions hold:
     - Same category (case-insensitive)
@@ -1860,91 +1882,93 @@ def duplicate_candidates(
     - ``created_at`` timestamps within 3 days of each other
       (NULL ``created_at`` is treated as identical timestamps → 0 days apart)
     """
-    month_norm = _normalize_month(month)
-    user = _require_user(db, current_user)
+    if month:
+        month_norm = _normalize_month(month)
+        from_norm = to_norm = month_norm
+    elif from_month and to_month:
+        month_norm = None
+        from_norm, to_norm = _normalize_month(from_month), _normalize_month(to_month)
+    else:
+        raise HTTPException(status_code=422, detail="Provide month, or both from and to")
+    span = month_index(to_norm) - month_index(from_norm) + 1
+    if span < 1:
+        raise HTTPException(status_code=422, detail="'from' must not be after 'to'")
+    if span > MAX_DUPLICATE_SCAN_MONTHS:
+        raise HTTPException(
+            status_code=422, detail=f"Range may span at most {MAX_DUPLICATE_SCAN_MONTHS} months"
+        )
 
-    all_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-    month_row = _find_month(all_rows, month_norm)
-    if not month_row:
-        return {"month": month_norm, "duplicates": []}
+    result: Dict[str, Any] = {"month": month_norm, "from": from_norm, "to": to_norm, "duplicates": []}
+    month_rows = prefetch_decrypted(months_in_range(db, user.id, from_norm, to_norm).all(), "month")
+    if not month_rows:
+        return result
+    month_of = {row.id: row.month for row in month_rows}
 
-    expenses = (
-        db.query(MonthlyExpense)
+    currency = user.base_currency or "GBP"
+
+    # Decrypted summaries straight from a column query — no ORM rows, and
+    # each expense is decrypted once however many comparisons it takes part in
+    query = (
+        db.query(
+            MonthlyExpense.id,
+            MonthlyExpense.monthly_data_id,
+            MonthlyExpense.created_at,
+            MonthlyExpense._name_encrypted,
+            MonthlyExpense._category_encrypted,
+            MonthlyExpense._actual_amount_encrypted,
+            MonthlyExpense._planned_amount_encrypted,
+        )
         .filter(
-            MonthlyExpense.monthly_data_id == month_row.id,
+            MonthlyExpense.monthly_data_id.in_(list(month_of)),
             MonthlyExpense.deleted_at == None,  # noqa: E711
         )
-        .all()
+        .order_by(MonthlyExpense.id)
     )
+    items = [
+        {
+            "id": exp_id,
+            "month": month_of[month_id],
+            "name": name or "",
+            "category": (category or "").strip().lower(),
+            "category_display": category or "",
+            "amount": float(actual or "0.0") or float(planned or "0.0") or 0.0,
+            "created_at": created_at,
+        }
+        for exp_id, month_id, created_at, name, category, actual, planned in iter_decrypted_tuples(query, plain=3)
+    ]
 
-    currency = user.base_currency or "GBP"
+    for i, j in _duplicate_pairs(items):
+        a, b = items[i], items[j]
+        days_apart = _days_apart(a["created_at"], b["created_at"])
+
+        # Build human-readable reason
+        amt_a = f"{currency} {a['amount']:.2f}"
+        amt_b = f"{currency} {b['amount']:.2f}"
+        reason = (
+            f"Same category '{a['category_display']}', "
+            f"amounts {amt_a} and {amt_b}, "
+            f"entered {days_apart} day{'s' if days_apart != 1 else ''} apart"
+        )
 
-    # Build a plain-Python list of decrypted summaries once to avoid O(n²) decryptions
-    items = []
-    for exp in expenses:
-        items.append({
-            "id": exp.id,
-            "name": exp.name or "",
-            "category": (exp.category or "").strip().lower(),
-            "category_display": exp.category or "",
-            "amount": float(exp.actual_amount or exp.planned_amount or 0.0),
-            "created_at": exp.created_at,
+        result["duplicates"].append({
+            "expense_a": {
+                "id": a["id"],
+                "name": a["name"],
+                "month": a["month"],
+                "amount": round(a["amount"], 2),
+                "created_at": a["created_at"].isoformat() if a["created_at"] else None,
+            },
+            "expense_b": {
+                "id": b["id"],
+                "name": b["name"],
+                "month": b["month"],
+                "amount": round(b["amount"], 2),
+                "created_at": b["created_at"].isoformat() if b["created_at"] else None,
+            },
+            "reason": reason,
         })
 
-    duplicates = []
-    for i in range(len(items)):
-        for j in range(i + 1, len(items)):
-            a = items[i]
-            b = items[j]
-
-            # Condition 1: same category (case-insensitive)
-            if a["category"] != b["category"]:
-                continue
-
-            # Condition 2: amounts within 1%
-            larger = max(a["amount"], b["amount"])
-            if larger == 0:
-                # Both zero — treat as identical amounts (flag as duplicate)
-                pct_diff = 0.0
-            else:
-                pct_diff = abs(a["amount"] - b["amount"]) / larger
-            if pct_diff > 0.01:
-                continue
-
-            # Condition 3: created within 3 days of each other
-            if a["created_at"] is not None and b["created_at"] is not None:
-                days_apart = abs((a["created_at"] - b["created_at"]).days)
-            else:
-                days_apart = 0  # NULL → treat as same-day
-            if days_apart > 3:
-                continue
-
-            # Build human-readable reason
-            amt_a = f"{currency} {a['amount']:.2f}"
-            amt_b = f"{currency} {b['amount']:.2f}"
-            reason = (
-                f"Same category '{a['category_display']}', "
-                f"amounts {amt_a} and {amt_b}, "
-                f"entered {days_apart} day{'s' if days_apart != 1 else ''} apart"
-            )
-
-            duplicates.append({
-                "expense_a": {
-                    "id": a["id"],
-                    "name": a["name"],
-                    "amount": round(a["amount"], 2),
-                    "created_at": a["created_at"].isoformat() if a["created_at"] else None,
-                },
-                "expense_b": {
-                    "id": b["id"],
-                    "name": b["name"],
-                    "amount": round(b["amount"], 2),
-                    "created_at": b["created_at"].isoformat() if b["created_at"] else None,
-                },
-                "reason": reason,
-            })
-
-    return {"month": month_norm, "duplicates": duplicates}
+    return result
 
 
 # -------------------- background job --------------------
@@ -1974,74 +1998,82 @@ def check_spending_velocity(session_factory):
         if days_elapsed == 0:
             return  # First moment of month — no data yet
 
-        users = (
-            db.query(User)
-            .filter(User.deleted_at == None)  # noqa: E711
-            .all()
-        )
-
-        for user in users:
-            all_months = (
-                db.query(MonthlyData)
-                .filter(MonthlyData.user_id == user.id)
+        # Only users with a row for this month can breach — the month blind
+        # index is user-independent, so one query finds them all.
+        user_ids = [
+            uid for (uid,) in (
+                db.query(MonthlyData.user_id)
+                .join(User, User.id == MonthlyData.user_id)
+                .filter(
+                    MonthlyData.month_bidx == month_blind_index(current_month),
+                    User.deleted_at == None,  # noqa: E711
+                )
+                .order_by(MonthlyData.user_id)
                 .all()
             )
-            month_row = next((m for m in all_months if m.month == current_month), None)
-            if not month_row:
-                continue
+        ]
 
-            actual_ytd = float(month_row.total_actual or 0.0)
-            planned_total = float(month_row.total_planned or 0.0)
+        def process(db, chunk):
+            users = {u.id: u for u in db.query(User).filter(User.id.in_(chunk))}
+            months = month_rows_for_users(db, chunk, current_month)
 
-            if planned_total <= 0 or actual_ytd <= 0:
-                continue
+            breaches = []
+            for user_id, month_row in months.items():
+                actual_ytd = float(month_row.total_actual or 0.0)
+                planned_total = float(month_row.total_planned or 0.0)
 
-            projected_total = (actual_ytd / days_elapsed) * days_in_month
+                if planned_total <= 0 or actual_ytd <= 0:
+                    continue
 
-            if projected_total <= planned_total * 1.10:
-                continue
+                projected_total = (actual_ytd / days_elapsed) * days_in_month
+
+                if projected_total <= planned_total * 1.10:
+                    continue
+                breaches.append((users[user_id], actual_ytd, planned_total, projected_total))
 
             # Dedup: one notification per user per day per month
-            dedup_key = f"velocity:{user.id}:{current_month}:{today_str}"
-            already_sent = (
-                db.query(Notification)
-                .filter(Notification.dedup_key == dedup_key)
-                .first()
-            )
-            if already_sent:
-                continue
+            def dedup_key(user):
+                return f"velocity:{user.id}:{current_month}:{today_str}"
 
-            overage_pct = round((projected_total / planned_total - 1) * 100, 1)
-            currency = user.base_currency or "GBP"
+            sent = existing_dedup_keys(db, [dedup_key(b[0]) for b in breaches])
+            emails = []
+            for user, actual_ytd, planned_total, projected_total in breaches:
+                if dedup_key(user) in sent:
+                    continue
 
-            notif = Notification(
-                user_id=user.id,
-                type="velocity_warning",
-                dedup_key=dedup_key,
-            )
-            notif.title = "Spending pace warning"
-            notif.message = (
-                f"At your current pace you are projected to overspend your {current_month} "
-                f"budget by {overage_pct}% ({currency} {projected_total:.2f} vs "
-                f"{currency} {planned_total:.2f} planned)."
-            )
-            db.add(notif)
-            db.commit()
-
-            if getattr(user, "notif_budget_alerts", True):
-                try:
-                    send_velocity_warning_email(
-                        to_email=user.email,
-                        month=current_month,
-                        actual_ytd=actual_ytd,
-                        planned_total=planned_total,
-                        projected_total=round(projected_total, 2),
-                        currency=currency,
-                    )
-                except Exception:
-                    logger.exception(
-                        "Failed to send velocity warning email to %s", user.email
-                    )
+                overage_pct = round((projected_total / planned_total - 1) * 100, 1)
+                currency = user.base_currency or "GBP"
+
+                notif = Notification(
+                    user_id=user.id,
+                    type="velocity_warning",
+                    dedup_key=dedup_key(user),
+                )
+                notif.title = "Spending pace warning"
+                notif.message = (
+                    f"At your current pace you are projected to overspend your {current_month} "
+                    f"budget by {overage_pct}% ({currency} {projected_total:.2f} vs "
+                    f"{currency} {planned_total:.2f} planned)."
+                )
+                db.add(notif)
+
+                if getattr(user, "notif_budget_alerts", True):
+                    emails.append({
+                        "to_email": user.email,
+                        "month": current_month,
+                        "actual_ytd": actual_ytd,
+                        "planned_total": planned_total,
+                        "projected_total": round(projected_total, 2),
+                        "currency": currency,
+                    })
+            return emails
+
+        def deliver(kwargs):
+            send_velocity_warning_email(**kwargs)
+
+        run_key = f"{today_str}T{now.hour // 6 * 6:02d}"  # one run per 6-hour slot
+        with BatchJob("check_spending_velocity", session_factory, run_key=run_key) as job:
+            job.run_chunks(db, user_ids, process, deliver)
 
     except Exception:
         logger.exception("check_spending_velocity background job failed")
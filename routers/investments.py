@@ -18,7 +18,7 @@ from fastapi import APIRouter, Depends, HTTPException, Path, status
 from sqlalchemy.orm import Session
 
 from database import get_db, Investment, InvestmentPrice, User
-from security import verify_token
+from security import get_current_user
 from models import (
     InvestmentCreate,
     InvestmentUpdate,
@@ -34,13 +34,6 @@ router = APIRouter(prefix="/investments", tags=["investments"])
 
 # ---------- helpers ----------
 
-def _get_user(db: Session, email: str) -> User:
-    user = db.query(User).filter(User.email == email, User.deleted_at == None).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
-
-
 def _get_holding(holding_id: int, user: User, db: Session) -> Investment:
     holding = (
         db.query(Investment)
@@ -144,11 +137,10 @@ def sync_prices_for_user(user: User, db: Session) -> int:
 
 @router.get("", response_model=List[InvestmentResponse])
 def list_investments(
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """List all active investment holdings with latest price and P&L."""
-    user = _get_user(db, email)
     holdings = (
         db.query(Investment)
         .filter(Investment.user_id == user.id, Investment.deleted_at == None)
@@ -160,11 +152,10 @@ def list_investments(
 
 @router.get("/summary", response_model=InvestmentPortfolioSummary)
 def portfolio_summary(
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Return aggregate portfolio totals: total cost, total value, total gain/loss."""
-    user = _get_user(db, email)
     holdings = (
         db.query(Investment)
         .filter(Investment.user_id == user.id, Investment.deleted_at == None)
@@ -198,11 +189,10 @@ def portfolio_summary(
 @router.post("", response_model=InvestmentResponse, status_code=status.HTTP_201_CREATED)
 def create_investment(
     payload: InvestmentCreate,
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Add a new investment holding."""
-    user = _get_user(db, email)
 
     if payload.asset_type not in VALID_ASSET_TYPES:
         raise HTTPException(
@@ -245,11 +235,10 @@ def create_investment(
 def update_investment(
     holding_id: int = Path(..., gt=0),
     payload: InvestmentUpdate = ...,
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Update an existing investment holding."""
-    user = _get_user(db, email)
     holding = _get_holding(holding_id, user, db)
 
     if payload.asset_type is not None and payload.asset_type not in VALID_ASSET_TYPES:
@@ -286,11 +275,10 @@ def update_investment(
 @router.delete("/{holding_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_investment(
     holding_id: int = Path(..., gt=0),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Soft-delete an investment holding."""
-    user = _get_user(db, email)
     holding = _get_holding(holding_id, user, db)
     holding.deleted_at = datetime.utcnow()
     db.commit()
@@ -299,10 +287,9 @@ def delete_investment(
 
 @router.post("/sync-prices", status_code=status.HTTP_200_OK)
 def manual_sync_prices(
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Manually trigger a price sync for all holdings with a ticker symbol."""
-    user = _get_user(db, email)
     updated = sync_prices_for_user(user, db)
     return {"updated": updated, "message": f"Synced prices for {updated} holding(s)"}
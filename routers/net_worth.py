@@ -16,7 +16,7 @@ from fastapi import APIRouter, Depends, HTTPException, Path, status
 from sqlalchemy.orm import Session
 
 from database import get_db, NetWorthSnapshot, User
-from security import verify_token
+from security import get_current_user
 from models import (
     NetWorthSnapshotCreate,
     NetWorthSnapshotUpdate,
@@ -30,13 +30,6 @@ router = APIRouter(prefix="/net-worth/snapshots", tags=["net_worth"])
 
 # ---------- helpers ----------
 
-def _get_user(db: Session, email: str) -> User:
-    user = db.query(User).filter(User.email == email, User.deleted_at == None).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
-
-
 def _get_snapshot(snapshot_id: int, user: User, db: Session) -> NetWorthSnapshot:
     snap = (
         db.query(NetWorthSnapshot)
@@ -70,9 +63,8 @@ def _snap_to_response(snap: NetWorthSnapshot) -> dict:
 @router.get("", response_model=List[NetWorthSnapshotResponse])
 def list_snapshots(
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
-    user = _get_user(db, email)
     snaps = (
         db.query(NetWorthSnapshot)
         .filter(NetWorthSnapshot.user_id == user.id, NetWorthSnapshot.deleted_at == None)
@@ -86,10 +78,8 @@ def list_snapshots(
 def create_snapshot(
     body: NetWorthSnapshotCreate,
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
-    user = _get_user(db, email)
-
     if not body.assets and not body.liabilities:
         raise HTTPException(
             status_code=422,
@@ -122,9 +112,8 @@ def update_snapshot(
     body: NetWorthSnapshotUpdate,
     snapshot_id: int = Path(...),
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
-    user = _get_user(db, email)
     snap = _get_snapshot(snapshot_id, user, db)
 
     if "snapshot_date" in body.model_fields_set and body.snapshot_date is not None:
@@ -149,9 +138,8 @@ def update_snapshot(
 def delete_snapshot(
     snapshot_id: int = Path(...),
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
-    user = _get_user(db, email)
     snap = _get_snapshot(snapshot_id, user, db)
     snap.deleted_at = datetime.utcnow()
     db.commit()
@@ -8,22 +8,15 @@ Routes:
 """
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
 from database import get_db, MonthlyData, MonthlyExpense, RecurringExpense, SavingsGoal, User
-from security import verify_token
+from security import get_current_user
 
 router = APIRouter(prefix="/onboarding", tags=["onboarding"])
 
 
-def _get_user(db: Session, email: str) -> User:
-    user = db.query(User).filter(User.email == email, User.deleted_at == None).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
-
-
 def _compute_steps(user: User, db: Session) -> list[dict]:
     """Derive each wizard step's completion from real DB state."""
     # Step 1: Has set a salary (any month with salary_planned > 0)
@@ -78,11 +71,10 @@ def _compute_steps(user: User, db: Session) -> list[dict]:
 
 @router.get("/status")
 def get_onboarding_status(
-    current_user_email: str = Depends(verify_token),
+    current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Return the wizard step completion state and whether onboarding is complete."""
-    current_user = _get_user(db, current_user_email)
     steps = _compute_steps(current_user, db)
     completed = all(s["done"] for s in steps) or current_user.onboarding_dismissed_at is not None
     return {
@@ -94,11 +86,10 @@ def get_onboarding_status(
 
 @router.post("/dismiss", status_code=200)
 def dismiss_onboarding(
-    current_user_email: str = Depends(verify_token),
+    current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Permanently dismiss the onboarding wizard for the authenticated user."""
-    current_user = _get_user(db, current_user_email)
     if current_user.onboarding_dismissed_at is None:
         current_user.onboarding_dismissed_at = datetime.utcnow()
         db.commit()
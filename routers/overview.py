@@ -1,25 +1,19 @@
 # routers/overview.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 
-from database import get_db, User, MonthlyData
-from security import verify_token
-from core.cache import annual_cache_key, cache_get, cache_set
+from database import get_db, months_in_range, User, MonthlyData
+from security import get_current_user
+from core.cache import annual_cache_key, cache_get_or_compute
 
 router = APIRouter(prefix="/overview", tags=["overview"])
 
-def _require_user_by_email(db: Session, email: str) -> User:
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
 @router.get("/annual")
 def annual_overview(
     year: Optional[int] = Query(None),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -27,30 +21,22 @@ def annual_overview(
     plus year totals. Uses the authenticated user's email to scope data.
     """
     y = year or datetime.utcnow().year
-    user = _require_user_by_email(db, current_user)
-
-    # Serve from Redis cache when available (1-hour TTL)
-    cache_key = annual_cache_key(user.id, y)
-    cached = cache_get(cache_key)
-    if cached is not None:
-        return cached
+    user_id = user.id
 
-    # pull all months for that user+year
-    all_months: List[MonthlyData] = (
-        db.query(MonthlyData)
-        .filter(MonthlyData.user_id == user.id)
-        .all()
+    # 1-hour TTL; concurrent misses after a save share one computation, and an
+    # expired result is served for another hour while it refreshes in the background
+    return cache_get_or_compute(
+        annual_cache_key(user_id, y),
+        db,
+        lambda session: _annual_overview(session, user_id, y),
+        ttl=3600,
+        stale_ttl=3600,
     )
 
-    # Filter in Python after decryption
-    year_str = str(y)
-    months = [
-        m for m in all_months 
-        if m.month and m.month.startswith(f"{year_str}-")
-    ]
 
-    # Sort by month (already decrypted)
-    months.sort(key=lambda m: m.month)
+def _annual_overview(db: Session, user_id: int, y: int) -> Dict[str, Any]:
+    # Only the requested year's months — range scan on the period index
+    months: List[MonthlyData] = months_in_range(db, user_id, f"{y}-01", f"{y}-12").all()
 
     # prepare 12 slots
     by_index = {int(m.month[5:7]) - 1: m for m in months if m.month and len(m.month) >= 7}
@@ -100,6 +86,4 @@ def annual_overview(
         totals["total_actual"]     += total_actual
         totals["remaining_actual"] += remaining_actual
 
-    result = {"months": months_out, "totals": totals}
-    cache_set(cache_key, result, ttl=3600)
-    return result
+    return {"months": months_out, "totals": totals}
@@ -15,8 +15,12 @@ from datetime import datetime
 from fastapi import APIRouter, Body, Depends, HTTPException, Path
 from sqlalchemy.orm import Session
 
-from database import get_db, RecurringExpense, User, MonthlyExpense
-from security import verify_token
+from core.batch import BatchJob
+from database import (
+    expenses_by_month, get_db, month_rows_for_users, prefetch_decrypted,
+    MonthlyData, MonthlyExpense, RecurringExpense, User,
+)
+from security import get_current_user
 from models import (
     RecurringExpenseCreate,
     RecurringExpenseUpdate,
@@ -30,13 +34,6 @@ router = APIRouter(prefix="/recurring-expenses", tags=["recurring"])
 
 # ---------- helpers ----------
 
-def _get_user(db: Session, email: str) -> User:
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
-
 def _get_owned(rec_id: int, user: User, db: Session) -> RecurringExpense:
     rec = db.query(RecurringExpense).filter(RecurringExpense.id == rec_id).first()
     if not rec or rec.deleted_at is not None:
@@ -64,10 +61,9 @@ def _to_response(rec: RecurringExpense) -> dict:
 
 @router.get("", response_model=list[RecurringExpenseResponse])
 def list_recurring(
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    user = _get_user(db, current_user)
     rows = (
         db.query(RecurringExpense)
         .filter(RecurringExpense.user_id == user.id, RecurringExpense.deleted_at == None)
@@ -80,13 +76,12 @@ def list_recurring(
 @router.post("", response_model=RecurringExpenseResponse, status_code=201)
 def create_recurring(
     data: RecurringExpenseCreate = Body(...),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     if data.frequency not in VALID_FREQUENCIES:
         raise HTTPException(status_code=422, detail=f"frequency must be one of {sorted(VALID_FREQUENCIES)}")
 
-    user = _get_user(db, current_user)
     rec = RecurringExpense(
         user_id=user.id,
         frequency=data.frequency,
@@ -99,7 +94,7 @@ def create_recurring(
     db.add(rec)
     db.commit()
     db.refresh(rec)
-    logger.info("Created recurring expense id=%d user=%s", rec.id, current_user)
+    logger.info("Created recurring expense id=%d user=%s", rec.id, user.email)
     return _to_response(rec)
 
 
@@ -107,10 +102,9 @@ def create_recurring(
 def update_recurring(
     rec_id: int = Path(...),
     data: RecurringExpenseUpdate = Body(...),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    user = _get_user(db, current_user)
     rec = _get_owned(rec_id, user, db)
 
     if data.frequency is not None:
@@ -136,10 +130,9 @@ def update_recurring(
 @router.delete("/{rec_id}", status_code=204)
 def delete_recurring(
     rec_id: int = Path(...),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    user = _get_user(db, current_user)
     rec = _get_owned(rec_id, user, db)
     rec.deleted_at = datetime.utcnow()
     db.commit()
@@ -147,11 +140,10 @@ def delete_recurring(
 
 @router.post("/generate", status_code=200)
 def trigger_generate(
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Manually trigger generation of planned rows for the current month."""
-    user = _get_user(db, current_user)
     count = _generate_for_user(db, user)
     return {"generated": count, "month": datetime.utcnow().strftime("%Y-%m")}
 
@@ -168,6 +160,20 @@ def _monthly_amount(rec: RecurringExpense, year: int, month: int) -> float:
     return rec.planned_amount
 
 
+def _is_due(rec: RecurringExpense, today: datetime, current_month_start: datetime) -> bool:
+    """True when *rec* should generate a planned row for the current month."""
+    # Skip if past end_date
+    if rec.end_date and rec.end_date < today:
+        return False
+    # Skip if already generated this month
+    if rec.last_generated_at and rec.last_generated_at >= current_month_start:
+        return False
+    # Yearly: only generate in the same calendar month as start_date
+    if rec.frequency == "yearly" and today.month != rec.start_date.month:
+        return False
+    return True
+
+
 def _generate_for_user(db: Session, user: User) -> int:
     """
     Ensure planned MonthlyExpense rows exist for every active recurring expense
@@ -192,16 +198,7 @@ def _generate_for_user(db: Session, user: User) -> int:
 
     created = 0
     for rec in active:
-        # Skip if past end_date
-        if rec.end_date and rec.end_date < today:
-            continue
-
-        # Skip if already generated this month
-        if rec.last_generated_at and rec.last_generated_at >= current_month_start:
-            continue
-
-        # Yearly: only generate in the same calendar month as start_date
-        if rec.frequency == "yearly" and today.month != rec.start_date.month:
+        if not _is_due(rec, today, current_month_start):
             continue
 
         amount = _monthly_amount(rec, today.year, today.month)
@@ -239,9 +236,11 @@ def _generate_for_user(db: Session, user: User) -> int:
 def generate_all_recurring(db_factory) -> None:
     """
     Called by the APScheduler daily job.
-    Iterates all users with active recurring expenses and generates planned rows.
+    Generates planned rows for every user with due recurring expenses, a chunk
+    of users at a time: recurring entries, month rows and the months' existing
+    expenses are each loaded with one IN query per chunk.
     """
-    from main import get_or_create_month, find_expense_by_values  # noqa: F401 – imported inside to avoid circular import at module load
+    from main import index_expenses_by_values  # deferred to avoid circular import at module load
 
     db = db_factory()
     try:
@@ -249,59 +248,73 @@ def generate_all_recurring(db_factory) -> None:
         current_month_start = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
         current_month_str = today.strftime("%Y-%m")
 
-        active = (
-            db.query(RecurringExpense)
-            .filter(
-                RecurringExpense.deleted_at == None,
-                RecurringExpense.start_date <= today,
-            )
-            .all()
-        )
-
-        user_cache: dict[int, User] = {}
-        total = 0
-
-        for rec in active:
-            if rec.end_date and rec.end_date < today:
-                continue
-            if rec.last_generated_at and rec.last_generated_at >= current_month_start:
-                continue
-            if rec.frequency == "yearly" and today.month != rec.start_date.month:
-                continue
-
-            if rec.user_id not in user_cache:
-                u = db.query(User).filter(User.id == rec.user_id).first()
-                if not u or u.deleted_at is not None:
-                    continue
-                user_cache[rec.user_id] = u
-            user = user_cache[rec.user_id]
-
-            amount = _monthly_amount(rec, today.year, today.month)
-            month_row = get_or_create_month(db, user, current_month_str)
-
-            existing = (
-                db.query(MonthlyExpense)
+        user_ids = [
+            uid for (uid,) in (
+                db.query(RecurringExpense.user_id)
+                .join(User, User.id == RecurringExpense.user_id)
                 .filter(
-                    MonthlyExpense.monthly_data_id == month_row.id,
-                    MonthlyExpense.deleted_at == None,
+                    RecurringExpense.deleted_at == None,
+                    RecurringExpense.start_date <= today,
+                    User.deleted_at == None,
                 )
+                .distinct()
+                .order_by(RecurringExpense.user_id)
                 .all()
             )
-
-            if not find_expense_by_values(existing, rec.name, rec.category):
-                expense = MonthlyExpense(monthly_data_id=month_row.id)
-                expense.name = rec.name
-                expense.category = rec.category
-                expense.planned_amount = amount
-                expense.actual_amount = 0.0
-                db.add(expense)
-                total += 1
-
-            rec.last_generated_at = today
-
-        if total:
-            db.commit()
-        logger.info("generate_all_recurring: created %d rows for %s", total, current_month_str)
+        ]
+
+        def process(db, chunk):
+            due = [
+                rec for rec in (
+                    db.query(RecurringExpense)
+                    .filter(
+                        RecurringExpense.user_id.in_(chunk),
+                        RecurringExpense.deleted_at == None,
+                        RecurringExpense.start_date <= today,
+                    )
+                    .order_by(RecurringExpense.id)
+                    .all()
+                )
+                if _is_due(rec, today, current_month_start)
+            ]
+            if not due:
+                return []
+            prefetch_decrypted(due, "name", "category")
+
+            months = month_rows_for_users(db, {rec.user_id for rec in due}, current_month_str)
+            for user_id in sorted({rec.user_id for rec in due} - months.keys()):
+                month_row = MonthlyData(user_id=user_id)
+                month_row.month = current_month_str
+                db.add(month_row)
+                months[user_id] = month_row
+            db.flush()
+
+            existing = expenses_by_month(db, [m.id for m in months.values()])
+            by_month = {
+                m.id: index_expenses_by_values(existing.get(m.id, [])) for m in months.values()
+            }
+
+            created = []
+            for rec in due:
+                month_row = months[rec.user_id]
+                by_values = by_month[month_row.id]
+                if (rec.name, rec.category) not in by_values:
+                    expense = MonthlyExpense(monthly_data_id=month_row.id)
+                    expense.name = rec.name
+                    expense.category = rec.category
+                    expense.planned_amount = _monthly_amount(rec, today.year, today.month)
+                    expense.actual_amount = 0.0
+                    created.append(expense)
+                    by_values[(rec.name, rec.category)] = expense
+
+                rec.last_generated_at = today
+
+            db.add_all(created)
+            return created
+
+        with BatchJob("generate_recurring", db_factory) as job:
+            job.run_chunks(db, user_ids, process)
+        logger.info("generate_all_recurring: created %d rows for %s", job.written, current_month_str)
     except Exception:
         logger.exception("generate_all_recurring: failed")
         db.rollback()
@@ -1,11 +1,11 @@
 # routers/reports.py
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 
-from database import get_db, User, MonthlyData
-from security import verify_token
+from database import find_month_row, get_db, User
+from security import get_current_user
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
@@ -17,25 +17,11 @@ _QUARTER_MONTHS = {
 }
 
 
-def _require_user(db: Session, email: str) -> User:
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
-
-def _find_month(all_rows: List[MonthlyData], month_str: str) -> Optional[MonthlyData]:
-    for row in all_rows:
-        if row.month == month_str:
-            return row
-    return None
-
-
 @router.get("/quarterly")
 def quarterly_report(
     year: int = Query(..., description="Year e.g. 2026"),
     quarter: int = Query(..., ge=1, le=4, description="Quarter 1–4"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -43,11 +29,6 @@ def quarterly_report(
     Returns partial data for months that exist; zeroed placeholders for months
     with no data.
     """
-    user = _require_user(db, current_user)
-
-    all_rows: List[MonthlyData] = (
-        db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-    )
 
     month_nums = _QUARTER_MONTHS[quarter]
     months_out: List[Dict[str, Any]] = []
@@ -57,7 +38,7 @@ def quarterly_report(
 
     for mo in month_nums:
         month_str = f"{year:04d}-{mo:02d}"
-        row = _find_month(all_rows, month_str)
+        row = find_month_row(db, user.id, month_str)
 
         if row is None:
             months_out.append(
@@ -17,8 +17,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from core.cache import invalidate_annual_cache
-from database import MonthlyData, MonthlyExpense, User, get_db
-from security import verify_token
+from database import MonthlyData, MonthlyExpense, User, find_month_row, get_db
+from security import get_current_user
 
 logger = logging.getLogger(__name__)
 
@@ -31,11 +31,13 @@ def _normalize_month(m: str) -> str:
     parts = (m or "").split("-")
     if len(parts) != 2:
         raise HTTPException(status_code=422, detail="month must be 'YYYY-MM'")
-    y, mo = parts
     try:
-        return f"{int(y):04d}-{int(mo):02d}"
+        y, mo = int(parts[0]), int(parts[1])
     except ValueError:
         raise HTTPException(status_code=422, detail="month must be 'YYYY-MM'")
+    if not (1 <= mo <= 12):
+        raise HTTPException(status_code=422, detail="month must be 'YYYY-MM'")
+    return f"{y:04d}-{mo:02d}"
 
 
 def _next_month(month_str: str) -> str:
@@ -47,12 +49,8 @@ def _next_month(month_str: str) -> str:
 
 
 def _find_month(db: Session, user_id: int, month_str: str) -> MonthlyData | None:
-    """Linear scan with decryption — required because month is Fernet-encrypted."""
-    rows = db.query(MonthlyData).filter(MonthlyData.user_id == user_id).all()
-    for row in rows:
-        if row.month == month_str:
-            return row
-    return None
+    """Indexed lookup via the month blind index (month itself is Fernet-encrypted)."""
+    return find_month_row(db, user_id, month_str)
 
 
 def _get_or_create_month(
@@ -81,7 +79,7 @@ def _get_or_create_month(
 def rollover_budget(
     month: str,
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
     """
     Roll unspent planned budget from *month* into the following month.
@@ -100,10 +98,6 @@ def rollover_budget(
     source_month = _normalize_month(month)
     dest_month = _next_month(source_month)
 
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
     source = _find_month(db, user.id, source_month)
     if not source:
         raise HTTPException(
@@ -136,7 +130,7 @@ def rollover_budget(
     if dest.rolled_over_from == source_month:
         logger.info(
             "rollover already applied user=%s source=%s dest=%s — returning current state",
-            email, source_month, dest_month,
+            user.email, source_month, dest_month,
         )
         # Reconstruct the response from current dest expenses
         rolled = []
@@ -204,7 +198,7 @@ def rollover_budget(
 
     logger.info(
         "rollover user=%s source=%s dest=%s categories=%d total=%.2f",
-        email, source_month, dest_month, len(rolled), total,
+        user.email, source_month, dest_month, len(rolled), total,
     )
 
     return {
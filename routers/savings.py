@@ -20,7 +20,7 @@ from fastapi import APIRouter, Depends, HTTPException, Path, status
 from sqlalchemy.orm import Session
 
 from database import get_db, SavingsGoal, SavingsContribution, User
-from security import verify_token
+from security import get_current_user
 from models import (
     SavingsGoalCreate,
     SavingsGoalUpdate,
@@ -36,13 +36,6 @@ router = APIRouter(prefix="/savings-goals", tags=["savings"])
 
 # ---------- helpers ----------
 
-def _get_user(db: Session, email: str) -> User:
-    user = db.query(User).filter(User.email == email, User.deleted_at == None).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
-
-
 def _get_goal(goal_id: int, user: User, db: Session) -> SavingsGoal:
     goal = (
         db.query(SavingsGoal)
@@ -152,9 +145,8 @@ def _contrib_to_response(c: SavingsContribution) -> dict:
 @router.get("", response_model=List[SavingsGoalResponse])
 def list_goals(
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
-    user = _get_user(db, email)
     goals = (
         db.query(SavingsGoal)
         .filter(SavingsGoal.user_id == user.id, SavingsGoal.deleted_at == None)
@@ -168,9 +160,8 @@ def list_goals(
 def create_goal(
     body: SavingsGoalCreate,
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
-    user = _get_user(db, email)
     if body.target_amount <= 0:
         raise HTTPException(status_code=422, detail="target_amount must be positive")
 
@@ -189,9 +180,8 @@ def update_goal(
     body: SavingsGoalUpdate,
     goal_id: int = Path(...),
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
-    user = _get_user(db, email)
     goal = _get_goal(goal_id, user, db)
 
     if "name" in body.model_fields_set and body.name is not None:
@@ -212,9 +202,8 @@ def update_goal(
 def delete_goal(
     goal_id: int = Path(...),
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
-    user = _get_user(db, email)
     goal = _get_goal(goal_id, user, db)
     goal.deleted_at = datetime.utcnow()
     db.commit()
@@ -226,9 +215,8 @@ def delete_goal(
 def list_contributions(
     goal_id: int = Path(...),
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
-    user = _get_user(db, email)
     goal = _get_goal(goal_id, user, db)
     contribs = (
         db.query(SavingsContribution)
@@ -248,9 +236,8 @@ def add_contribution(
     body: SavingsContributionCreate,
     goal_id: int = Path(...),
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
-    user = _get_user(db, email)
     goal = _get_goal(goal_id, user, db)
     if body.amount <= 0:
         raise HTTPException(status_code=422, detail="amount must be positive")
@@ -276,9 +263,8 @@ def delete_contribution(
     goal_id: int = Path(...),
     contrib_id: int = Path(...),
     db: Session = Depends(get_db),
-    email: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
 ):
-    user = _get_user(db, email)
     goal = _get_goal(goal_id, user, db)
     contrib = _get_contribution(contrib_id, goal, db)
     db.delete(contrib)
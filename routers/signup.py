@@ -16,7 +16,7 @@ logger = logging.getLogger(__name__)
 from database import get_db, User, PasswordResetToken, RefreshToken
 from typing import Optional
 
-from security import get_password_hash, create_access_token, create_email_verify_token, decode_email_verify_token, verify_token as _verify_token
+from security import get_password_hash, create_access_token, create_email_verify_token, decode_email_verify_token, get_current_user, invalidate_user_cache
 from email_utils import send_verification_email, send_password_reset_email
 from core.limiter import limiter
 from core.config import settings
@@ -43,7 +43,7 @@ class SignupResponse(BaseModel):
 
 @router.post("/signup", response_model=SignupResponse)
 @limiter.limit("5/minute")
-async def signup(request: Request, payload: SignupRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+def signup(request: Request, payload: SignupRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     # 1) check duplicate
     existing = db.query(User).filter(User.email == payload.email).first()
     if existing:
@@ -99,7 +99,7 @@ class PasswordResetConfirmPayload(BaseModel):
 
 @router.post("/password-reset-request", response_model=SignupResponse)
 @limiter.limit("5/minute")
-async def password_reset_request(
+def password_reset_request(
     request: Request,
     payload: PasswordResetRequestPayload,
     background_tasks: BackgroundTasks,
@@ -145,7 +145,7 @@ async def password_reset_request(
 
 
 @router.post("/password-reset-confirm", response_model=SignupResponse)
-async def password_reset_confirm(
+def password_reset_confirm(
     payload: PasswordResetConfirmPayload,
     db: Session = Depends(get_db),
 ):
@@ -168,6 +168,7 @@ async def password_reset_confirm(
     user.password_hash = get_password_hash(payload.new_password)
     reset_token.used_at = datetime.utcnow()
     db.commit()
+    invalidate_user_cache(user.email)
 
     return {"message": "Password updated successfully. You can now log in."}
 
@@ -179,7 +180,7 @@ _RESEND_COOLDOWN_SECONDS = 120  # 2-minute cooldown between resends
 
 @router.post("/resend-verification", response_model=SignupResponse)
 @limiter.limit("3/minute")
-async def resend_verification(
+def resend_verification(
     request: Request,
     payload: ResendVerificationRequest,
     background_tasks: BackgroundTasks,
@@ -249,7 +250,7 @@ class RefreshResponse(BaseModel):
 
 
 @router.post("/refresh", response_model=RefreshResponse)
-async def refresh_access_token(request: Request, db: Session = Depends(get_db)):
+def refresh_access_token(request: Request, db: Session = Depends(get_db)):
     """Issue a new 15-min access token from a valid httpOnly refresh token cookie."""
     raw_token = request.cookies.get("refresh_token")
     if not raw_token:
@@ -278,7 +279,7 @@ async def refresh_access_token(request: Request, db: Session = Depends(get_db)):
 
 
 @router.post("/logout", response_model=VerifyResponse)
-async def logout(request: Request, response: Response, db: Session = Depends(get_db)):
+def logout(request: Request, response: Response, db: Session = Depends(get_db)):
     """Revoke the refresh token cookie and clear the cookie."""
     raw_token = request.cookies.get("refresh_token")
     if raw_token:
@@ -305,17 +306,12 @@ class SessionResponse(BaseModel):
 
 
 @router.get("/sessions", response_model=list[SessionResponse])
-async def list_sessions(
+def list_sessions(
     request: Request,
-    current_user_email: str = Depends(_verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Return all active (non-revoked, non-expired) sessions for the current user."""
-    from database import User as UserModel
-    user = db.query(UserModel).filter(UserModel.email == current_user_email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found.")
-
     now = datetime.utcnow()
     sessions = db.query(RefreshToken).filter(
         RefreshToken.user_id == user.id,
@@ -342,17 +338,12 @@ async def list_sessions(
 
 
 @router.delete("/sessions/{session_id}", response_model=VerifyResponse)
-async def revoke_session(
+def revoke_session(
     session_id: int,
-    current_user_email: str = Depends(_verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Revoke a single session by ID (ownership enforced)."""
-    from database import User as UserModel
-    user = db.query(UserModel).filter(UserModel.email == current_user_email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found.")
-
     session = db.query(RefreshToken).filter(RefreshToken.id == session_id).first()
     if not session or session.user_id != user.id:
         raise HTTPException(status_code=404, detail="Session not found.")
@@ -365,17 +356,12 @@ async def revoke_session(
 
 
 @router.delete("/sessions", response_model=VerifyResponse)
-async def revoke_all_other_sessions(
+def revoke_all_other_sessions(
     request: Request,
-    current_user_email: str = Depends(_verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Revoke all sessions except the current one."""
-    from database import User as UserModel
-    user = db.query(UserModel).filter(UserModel.email == current_user_email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found.")
-
     current_hash = None
     raw_token = request.cookies.get("refresh_token")
     if raw_token:
@@ -1,12 +1,12 @@
 # routers/templates.py
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
-from database import get_db, User, MonthlyData, MonthlyExpense
-from security import verify_token
+from database import find_month_row, get_db, User, MonthlyData, MonthlyExpense
+from security import get_current_user
 
 logger = logging.getLogger(__name__)
 
@@ -107,13 +107,6 @@ _TEMPLATE_BY_ID: Dict[str, Dict[str, Any]] = {t["id"]: t for t in TEMPLATES}
 # Helpers
 # ---------------------------------------------------------------------------
 
-def _require_user(db: Session, email: str) -> User:
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
-
 def _normalize_month(m: str) -> str:
     parts = (m or "").split("-")
     if len(parts) != 2:
@@ -127,16 +120,8 @@ def _normalize_month(m: str) -> str:
     return f"{y:04d}-{mo:02d}"
 
 
-def _find_month(rows: list, month_str: str) -> Optional[MonthlyData]:
-    for row in rows:
-        if row.month == month_str:
-            return row
-    return None
-
-
 def _get_or_create_month(db: Session, user: User, month: str) -> MonthlyData:
-    all_rows = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-    row = _find_month(all_rows, month)
+    row = find_month_row(db, user.id, month)
     if not row:
         row = MonthlyData(user_id=user.id)
         row.month = month
@@ -160,7 +145,7 @@ def list_templates() -> Dict[str, Any]:
 def apply_template(
     template_id: str,
     month: str = Query(..., description="Target month in YYYY-MM format"),
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -173,7 +158,6 @@ def apply_template(
         raise HTTPException(status_code=404, detail=f"Template '{template_id}' not found")
 
     month_norm = _normalize_month(month)
-    user = _require_user(db, current_user)
 
     month_row = _get_or_create_month(db, user, month_norm)
 
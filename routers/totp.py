@@ -33,7 +33,7 @@ from core.config import settings
 from core.limiter import limiter
 from database import get_db, User, RefreshToken
 from security import (
-    verify_token,
+    get_current_user,
     verify_password,
     create_access_token,
     decode_totp_challenge_token,
@@ -77,13 +77,6 @@ class TOTPVerifyLoginResponse(BaseModel):
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
-def _get_user(db: Session, email: str) -> User:
-    user = db.query(User).filter(User.email == email).first()
-    if not user or user.deleted_at is not None:
-        raise HTTPException(status_code=404, detail="User not found.")
-    return user
-
-
 def _verify_totp_code(secret: str, code: str) -> bool:
     """Returns True if code is valid within ±1 time-step window (±30s)."""
     totp = pyotp.TOTP(secret)
@@ -102,11 +95,10 @@ def _generate_qr_b64(provisioning_uri: str) -> str:
 
 @router.get("/status", response_model=TOTPStatusResponse)
 def totp_status(
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Return whether 2FA is enabled for the current user."""
-    user = _get_user(db, current_user)
     return {"enabled": bool(user.totp_enabled)}
 
 
@@ -114,14 +106,13 @@ def totp_status(
 @limiter.limit("10/minute")
 def totp_setup(
     request: Request,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """
     Generate a TOTP secret and return the provisioning URI + QR code.
     The secret is stored (encrypted) but NOT yet activated — call /confirm next.
     """
-    user = _get_user(db, current_user)
 
     if user.totp_enabled:
         raise HTTPException(
@@ -148,14 +139,13 @@ def totp_setup(
 def totp_confirm(
     request: Request,
     payload: TOTPConfirmRequest,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """
     Verify the first TOTP code from the authenticator app and enable 2FA.
     Must be called after /setup.
     """
-    user = _get_user(db, current_user)
 
     if user.totp_enabled:
         raise HTTPException(status_code=400, detail="2FA is already enabled.")
@@ -178,13 +168,12 @@ def totp_confirm(
 def totp_disable(
     request: Request,
     payload: TOTPDisableRequest,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """
     Disable 2FA. Requires the account password AND a valid TOTP code.
     """
-    user = _get_user(db, current_user)
 
     if not user.totp_enabled:
         raise HTTPException(status_code=400, detail="2FA is not currently enabled.")
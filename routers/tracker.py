@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from security import verify_token
-from database import get_db
-from crud import get_or_create_user, save_monthly_data, get_monthly_data
+from security import get_current_user
+from database import User, get_db
+from crud import save_monthly_data, get_monthly_data
 from models import MonthlyTrackerRequest, MonthlyTrackerResponse
 import json
 
@@ -11,10 +11,9 @@ router = APIRouter(prefix="/tracker", tags=["tracker"])
 @router.post("/", response_model=MonthlyTrackerResponse)
 def save_tracker_data(
     data: MonthlyTrackerRequest,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    user = get_or_create_user(db, current_user)
     saved = save_monthly_data(db, user, data)
     return MonthlyTrackerResponse(
         id=saved.id,
@@ -29,10 +28,9 @@ def save_tracker_data(
 @router.get("/{month}", response_model=MonthlyTrackerResponse)
 def get_tracker_data(
     month: str,
-    current_user: str = Depends(verify_token),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    user = get_or_create_user(db, current_user)
     record = get_monthly_data(db, user, month)
     if not record:
         raise HTTPException(status_code=404, detail="No data for this month")
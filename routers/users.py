@@ -8,7 +8,7 @@ from pydantic import BaseModel, constr, validator
 from sqlalchemy.orm import Session
 
 from database import get_db, User, RefreshToken
-from security import get_password_hash, verify_password, verify_token
+from security import get_password_hash, invalidate_user_cache, verify_password, get_current_user
 from email_utils import send_account_deletion_email
 
 logger = logging.getLogger(__name__)
@@ -57,19 +57,10 @@ class MessageResponse(BaseModel):
     message: str
 
 
-# ---------- Helpers ----------
-
-def _get_current_user(email: str = Depends(verify_token), db: Session = Depends(get_db)) -> User:
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
-
 # ---------- Endpoints ----------
 
 @router.get("/me", response_model=UserProfileResponse)
-def get_profile(user: User = Depends(_get_current_user)):
+def get_profile(user: User = Depends(get_current_user)):
     """Return the authenticated user's profile."""
     return {
         "email": user.email,
@@ -83,7 +74,7 @@ def get_profile(user: User = Depends(_get_current_user)):
 @router.put("/me", response_model=UserProfileResponse)
 def update_profile(
     payload: UpdateProfileRequest,
-    user: User = Depends(_get_current_user),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Update the authenticated user's profile (username and base_currency)."""
@@ -119,7 +110,7 @@ def _prefs_dict(user: User) -> dict:
 
 
 @router.get("/me/notification-preferences", response_model=NotificationPrefsResponse)
-def get_notification_preferences(user: User = Depends(_get_current_user)):
+def get_notification_preferences(user: User = Depends(get_current_user)):
     """Return the authenticated user's email notification preferences."""
     return _prefs_dict(user)
 
@@ -127,7 +118,7 @@ def get_notification_preferences(user: User = Depends(_get_current_user)):
 @router.put("/me/notification-preferences", response_model=NotificationPrefsResponse)
 def update_notification_preferences(
     payload: NotificationPrefsRequest,
-    user: User = Depends(_get_current_user),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Update the authenticated user's email notification preferences."""
@@ -145,7 +136,7 @@ def update_notification_preferences(
 @router.put("/me/password", response_model=MessageResponse)
 def change_password(
     payload: ChangePasswordRequest,
-    user: User = Depends(_get_current_user),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Change the authenticated user's password. Requires correct current password."""
@@ -156,6 +147,7 @@ def change_password(
 
     user.password_hash = get_password_hash(payload.new_password)
     db.commit()
+    invalidate_user_cache(user.email)
     logger.info("Password changed for user %s", user.email)
     return {"message": "Password updated successfully."}
 
@@ -163,7 +155,7 @@ def change_password(
 @router.delete("/me", response_model=MessageResponse)
 def delete_account(
     background_tasks: BackgroundTasks,
-    user: User = Depends(_get_current_user),
+    user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """
@@ -179,6 +171,7 @@ def delete_account(
     ).update({"revoked_at": datetime.utcnow()})
 
     db.commit()
+    invalidate_user_cache(user.email)
     logger.info("Account soft-deleted for user %s", user.email)
 
     background_tasks.add_task(send_account_deletion_email, user.email)
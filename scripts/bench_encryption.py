@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: per-call cost of building a Fernet vs the cached cipher.
+
+Usage:
+    python scripts/bench_encryption.py            # 20,000 calls per case
+    python scripts/bench_encryption.py -n 100000
+
+Uses ENCRYPTION_KEY from the environment, or a throwaway key when unset.
+The "uncached" case reproduces the old behaviour of reading the key and
+constructing a Fernet inside every encrypt_value/decrypt_value call.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.fernet import Fernet  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fernet construction micro-benchmark")
+    parser.add_argument("-n", "--number", type=int, default=20_000, help="Calls per case")
+    args = parser.parse_args()
+
+    os.environ.setdefault("ENCRYPTION_KEY", Fernet.generate_key().decode())
+    from database import decrypt_value, encrypt_value
+
+    token = encrypt_value("1234.56").encode()
+
+    def uncached_decrypt():
+        Fernet(os.getenv("ENCRYPTION_KEY").encode()).decrypt(token)
+
+    def uncached_encrypt():
+        Fernet(os.getenv("ENCRYPTION_KEY").encode()).encrypt(b"1234.56")
+
+    cases = [
+        ("decrypt, new Fernet per call (old)", uncached_decrypt),
+        ("decrypt_value, cached cipher", lambda: decrypt_value(token.decode())),
+        ("encrypt, new Fernet per call (old)", uncached_encrypt),
+        ("encrypt_value, cached cipher", lambda: encrypt_value("1234.56")),
+    ]
+    print(f"{args.number:,} calls per case")
+    for label, fn in cases:
+        seconds = min(timeit.repeat(fn, number=args.number, repeat=3))
+        print(f"  {label:<40} {seconds / args.number * 1e6:8.2f} µs/call")
+
+
+if __name__ == "__main__":
+    main()
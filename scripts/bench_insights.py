@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Benchmark: insights statistics as dict loops (old) vs core.analytics (new).
+
+Usage:
+    python scripts/bench_insights.py                  # 10 years x 40 categories
+    python scripts/bench_insights.py --years 20 --categories 80 -n 20
+
+Runs on a synthetic in-memory account, so it measures the statistics alone —
+both sides start from the {month: {category: {planned, actual}}} shape that
+category_totals_by_month returns. The "old" cases reproduce the loops the
+endpoints used before they moved onto SpendingMatrix; each "new" case
+is timed twice: end to end including building the matrix (as every
+endpoint call does), and the kernel alone on a prebuilt matrix.
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.fernet import Fernet  # noqa: E402
+
+
+def synthetic_account(years, n_categories, seed=0):
+    rng = random.Random(seed)
+    months = [f"{2026 - years + i // 12:04d}-{i % 12 + 1:02d}" for i in range(years * 12)]
+    cats = [f"Category {c:02d}" for c in range(n_categories)]
+    totals = {}
+    for m in months:
+        # Not every category is spent on every month.
+        totals[m] = {
+            c: {"planned": 200.0, "actual": round(rng.lognormvariate(5, 0.6), 2)}
+            for c in cats
+            if rng.random() < 0.85
+        }
+    scalars = {
+        m: {"total_actual": sum(v["actual"] for v in totals[m].values()), "salary_actual": 3000.0}
+        for m in months
+    }
+    return months, totals, scalars
+
+
+# ---------- old: nested loops over dicts of floats ----------
+
+def old_rolling(months, totals):
+    cats = sorted({c for m in months for c in totals[m]})
+    out = {}
+    for cat in cats:
+        amounts = [totals[m].get(cat, {}).get("actual", 0.0) for m in months]
+        rolling = []
+        for i in range(len(amounts)):
+            window = amounts[max(0, i - 2): i + 1]
+            rolling.append(round(sum(window) / len(window), 2))
+        out[cat] = rolling
+    return out
+
+
+def old_zscores(months, totals, lookback):
+    out = {}
+    for idx in range(lookback, len(months)):
+        history = {}
+        for pm in months[idx - lookback: idx]:
+            for cat, vals in totals[pm].items():
+                history.setdefault(cat, []).append(vals["actual"])
+        for cat, vals in totals[months[idx]].items():
+            values = history.get(cat)
+            if not values:
+                continue
+            mean = sum(values) / len(values)
+            std = (sum((v - mean) ** 2 for v in values) / len(values)) ** 0.5
+            if std:
+                out[(months[idx], cat)] = (vals["actual"] - mean) / std
+    return out
+
+
+def old_forecast(months, totals):
+    history = {}
+    for pm in months:
+        for cat, vals in totals[pm].items():
+            history.setdefault(cat, []).append(vals["actual"])
+    return {cat: round(sum(v) / len(v), 2) for cat, v in history.items()}
+
+
+def old_heatmap(months, scalars):
+    amounts = [round(scalars[m]["total_actual"], 2) for m in months]
+    non_zero = sorted(a for a in amounts if a > 0)
+
+    def quartile(lst, q):
+        return lst[max(0, int(len(lst) * q) - 1)]
+
+    q1, q2, q3 = (quartile(non_zero, q) for q in (0.25, 0.5, 0.75))
+    return [0 if a == 0 else 1 if a <= q1 else 2 if a <= q2 else 3 if a <= q3 else 4 for a in amounts]
+
+
+def old_year_over_year(months, totals):
+    out = {}
+    for mo in range(1, 13):
+        year_data = {m: totals[m] for m in months if int(m[5:]) == mo}
+        cats = sorted({c for cells in year_data.values() for c in cells})
+        out[mo] = {c: [round(cells.get(c, {}).get("actual", 0.0), 2) for cells in year_data.values()] for c in cats}
+    return out
+
+
+# ---------- new: SpendingMatrix kernels ----------
+
+def new_rolling(m):
+    return m.rolling_mean(3).round(2)
+
+
+def new_zscores(m, lookback):
+    return [m.zscores(idx, range(idx - lookback, idx))[3] for idx in range(lookback, len(m.months))]
+
+
+def new_forecast(m):
+    return m.baseline(slice(None))[1].round(2)
+
+
+def new_heatmap(m):
+    return m.quartile_levels(m.total_actual.round(2))
+
+
+def new_year_over_year(m):
+    return {mo: m.actual[mo - 1::12].round(2) for mo in range(1, 13)}
+
+
+def _per_call(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Insights statistics benchmark")
+    parser.add_argument("--years", type=int, default=10, help="Years of history")
+    parser.add_argument("--categories", type=int, default=40, help="Categories per account")
+    parser.add_argument("--lookback", type=int, default=12, help="Anomaly baseline months")
+    parser.add_argument("-n", "--number", type=int, default=50, help="Runs per case")
+    args = parser.parse_args()
+
+    os.environ.setdefault("ENCRYPTION_KEY", Fernet.generate_key().decode())
+    from core.analytics import SpendingMatrix
+
+    months, totals, scalars = synthetic_account(args.years, args.categories)
+
+    def build():
+        return SpendingMatrix.from_totals(months, totals, scalars)
+
+    def build_scalars():
+        # What the heatmap loads: per-month totals only (cells=False).
+        return SpendingMatrix.from_totals(months, {}, scalars)
+
+    matrix = build()
+    lb = args.lookback
+    cases = [
+        ("rolling averages (trends)", lambda: old_rolling(months, totals), new_rolling, build),
+        (f"z-scores, every month vs prior {lb}", lambda: old_zscores(months, totals, lb),
+         lambda m: new_zscores(m, lb), build),
+        ("forecast means", lambda: old_forecast(months, totals), new_forecast, build),
+        ("heatmap quartile levels", lambda: old_heatmap(months, scalars), new_heatmap, build_scalars),
+        ("year-over-year, all 12 months", lambda: old_year_over_year(months, totals),
+         new_year_over_year, build),
+    ]
+    print(f"{len(months)} months x {args.categories} categories, {args.number} runs per case")
+    print(f"  build SpendingMatrix: {_per_call(build, args.number) * 1e3:.3f} ms")
+    print(f"  {'case':<38} {'old ms':>9} {'new ms':>9} {'kernel ms':>10} {'speedup':>8}")
+    for label, old, kernel, builder in cases:
+        old_s = _per_call(old, args.number)
+        new_s = _per_call(lambda: kernel(builder()), args.number)
+        kernel_s = _per_call(lambda: kernel(matrix), args.number)
+        print(
+            f"  {label:<38} {old_s * 1e3:9.3f} {new_s * 1e3:9.3f} "
+            f"{kernel_s * 1e3:10.3f} {old_s / new_s:7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
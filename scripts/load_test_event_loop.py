@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Load test: /health/live latency while tracker saves run concurrently.
+
+Usage:
+    python scripts/load_test_event_loop.py                  # 32 concurrent savers, 10 s
+    python scripts/load_test_event_loop.py -c 64 -d 20 -e 200
+
+Drives the ASGI app in-process (httpx ASGITransport, no network) against a
+throwaway SQLite database. Each saver loops POST /monthly-tracker/{month}
+with *-e* expenses — every save decrypts and re-encrypts the month's rows —
+while a single prober hits /health/live every 10 ms. If a route handler
+blocks the event loop, the probe waits behind it and its p99 climbs to the
+duration of a whole save; with handlers on the thread pool it stays in the
+low milliseconds.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.fernet import Fernet  # noqa: E402
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _setup_app():
+    db_path = os.path.join(tempfile.mkdtemp(prefix="som-load-"), "load.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("JWT_SECRET_KEY", "load-test-secret")
+    os.environ.setdefault("ENCRYPTION_KEY", Fernet.generate_key().decode())
+    os.environ["DISABLE_SCHEDULER"] = "1"
+
+    with patch("alembic.command.upgrade"), patch("alembic.command.stamp"):
+        from main import app
+    from core.limiter import limiter
+    from database import Base, SessionLocal, User, engine
+    from security import create_access_token, get_password_hash
+
+    Base.metadata.create_all(bind=engine)
+    limiter.enabled = False
+
+    db = SessionLocal()
+    user = User(email="load@example.com", password_hash=get_password_hash("LoadTest1!"), email_verified=True)
+    db.add(user)
+    db.commit()
+    db.close()
+    return app, create_access_token({"sub": "load@example.com"})
+
+
+async def _run(args) -> None:
+    import httpx
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    app, token = _setup_app()
+    headers = {"Authorization": f"Bearer {token}"}
+    body = {
+        "salary": 3000.0,
+        "expenses": [
+            {"name": f"Item {i}", "category": f"Category {i % 8}", "amount": float(i)}
+            for i in range(args.expenses)
+        ],
+    }
+    probes: list = []
+    saves: list = []
+    errors = 0
+    deadline = time.perf_counter() + args.duration
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load") as client:
+
+        async def saver(n: int) -> None:
+            nonlocal errors
+            month = f"2026-{n % 12 + 1:02d}"
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                r = await client.post(f"/monthly-tracker/{month}", json=body, headers=headers)
+                saves.append(time.perf_counter() - started)
+                if r.status_code != 200:
+                    errors += 1
+
+        async def prober() -> None:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await client.get("/health/live")
+                probes.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(prober(), *(saver(n) for n in range(args.concurrency)))
+
+    print(f"{args.concurrency} concurrent savers x {args.expenses} expenses for {args.duration}s")
+    print(f"  tracker saves   {len(saves):6d}  errors={errors}  p50={statistics.median(saves) * 1000:8.1f} ms")
+    print(
+        f"  /health/live    {len(probes):6d}  "
+        f"p50={_percentile(probes, 50) * 1000:8.1f} ms  "
+        f"p99={_percentile(probes, 99) * 1000:8.1f} ms  "
+        f"max={max(probes) * 1000:8.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Event-loop responsiveness under concurrent tracker saves")
+    parser.add_argument("-c", "--concurrency", type=int, default=32, help="Concurrent tracker savers")
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("-e", "--expenses", type=int, default=100, help="Expenses per save")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
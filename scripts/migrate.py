@@ -6,6 +6,11 @@ Never expose these as HTTP endpoints — run them manually from the shell.
 Usage:
     python scripts/migrate.py migrate            # Migrate plaintext columns to Fernet-encrypted
     python scripts/migrate.py cleanup            # Drop old unencrypted columns after migration
+    python scripts/migrate.py backfill-indexes   # Recompute blind-index columns and search tokens
+    python scripts/migrate.py show-blind-index-key  # Print the BLIND_INDEX_KEY value to pin before rotating
+    python scripts/migrate.py rotate-keys        # Re-encrypt all rows under the primary ENCRYPTION_KEY
+    python scripts/migrate.py rebuild-rollups    # Recompute monthly_category_totals from expenses
+    python scripts/migrate.py rebuild-search-index  # Re-tokenise every user's expenses for search
     python scripts/migrate.py check-month YYYY-MM  # Inspect a month's data for a given user email
 """
 import argparse
@@ -55,9 +60,203 @@ def cmd_cleanup(_args: argparse.Namespace) -> None:
     print("Old unencrypted columns dropped successfully.")
 
 
+def _rebuild_search_indexes(db) -> int:
+    """Rebuild every user's expense search tokens, committing per user."""
+    from database import User, build_user_search_index
+
+    users = db.query(User).order_by(User.id).all()
+    for user in users:
+        build_user_search_index(db, user)
+        db.commit()
+    return len(users)
+
+
+def cmd_backfill_indexes(_args: argparse.Namespace) -> None:
+    """Recompute everything derived from the blind-index key.
+
+    Month blind indexes and period keys for every MonthlyData row, bank
+    transactions' external-id indexes (bank-sync dedup), and every user's
+    expense search tokens. Needed after changing BLIND_INDEX_KEY, or for
+    rows written by code that bypassed the ``MonthlyData.month`` setter.
+    Duplicate months keep the index only on the lowest id so the
+    (user_id, month_bidx) unique index holds.
+    """
+    from database import (
+        SessionLocal, BankTransaction, MonthlyData, external_id_blind_index, iter_decrypted_tuples,
+        month_blind_index, month_period_key,
+    )
+
+    db = SessionLocal()
+    try:
+        rows = db.query(MonthlyData).order_by(MonthlyData.id).all()
+        # Clear first so reassigning values can't collide mid-update
+        for row in rows:
+            row.month_bidx = None
+        db.flush()
+
+        seen = set()
+        updated = 0
+        for row in rows:
+            month = row.month if row._month_encrypted else None
+            row.period = month_period_key(month)
+            bidx = month_blind_index(month)
+            if bidx is None or (row.user_id, bidx) in seen:
+                continue
+            seen.add((row.user_id, bidx))
+            row.month_bidx = bidx
+            updated += 1
+        db.commit()
+        print(f"Backfilled month blind index and period key for {updated} row(s).")
+
+        rows = db.query(BankTransaction.id, BankTransaction._external_id_encrypted).order_by(BankTransaction.id)
+        values = [
+            {"id": txn_id, "external_id_bidx": external_id_blind_index(external_id)}
+            for txn_id, external_id in iter_decrypted_tuples(rows, plain=1)
+        ]
+        for start in range(0, len(values), 500):
+            db.bulk_update_mappings(BankTransaction, values[start:start + 500])
+            db.commit()
+        print(f"Backfilled external-id blind index for {len(values)} bank transaction(s).")
+
+        users = _rebuild_search_indexes(db)
+    finally:
+        db.close()
+
+    print(f"Rebuilt search index for {users} user(s).")
+
+
+def cmd_show_blind_index_key(_args: argparse.Namespace) -> None:
+    """Print the blind-index key in use, as a value for BLIND_INDEX_KEY."""
+    from database import get_blind_index_key
+
+    print(f"hex:{get_blind_index_key().hex()}")
+
+
+def cmd_rotate_keys(args: argparse.Namespace) -> None:
+    """Re-encrypt every ``*_encrypted`` column under the primary ENCRYPTION_KEY.
+
+    Rotation procedure:
+      1. Pin the blind-index key: set BLIND_INDEX_KEY to the output of
+         ``show-blind-index-key`` and deploy. Without it the key is derived
+         from the oldest Fernet key and would change in step 4, so month
+         lookups would miss (and create duplicate months) until a backfill.
+      2. Set ENCRYPTION_KEY to the new key and move the old one into
+         ENCRYPTION_KEYS_PREVIOUS, then deploy. Old rows keep decrypting.
+      3. Run this command. Rows are processed in id-ordered batches, each
+         committed on its own, so an interrupted run can simply be restarted.
+         Each row is only overwritten if its ciphertexts are unchanged since
+         they were read; rows the app wrote in between are re-read and retried.
+      4. Drop the old key from ENCRYPTION_KEYS_PREVIOUS.
+
+    Setting BLIND_INDEX_KEY to a new value instead of pinning the current
+    one? Run ``backfill-indexes`` right after that deploy: it recomputes the
+    month indexes and period keys and rebuilds the expense search tokens.
+    """
+    from sqlalchemy import and_, bindparam, select, update
+    from database import Base, engine, rotate_value
+
+    if not os.getenv("BLIND_INDEX_KEY"):
+        sys.exit(
+            "BLIND_INDEX_KEY is not set. Pin it first:\n"
+            "  BLIND_INDEX_KEY=$(python scripts/migrate.py show-blind-index-key)"
+        )
+
+    total = 0
+    for table in Base.metadata.sorted_tables:
+        enc_cols = [c for c in table.columns if c.name.endswith("_encrypted")]
+        if not enc_cols:
+            continue
+
+        # Compare-and-set: a concurrent app write changes the ciphertext, so
+        # the update matches nothing instead of overwriting it with stale data.
+        stmt = (
+            update(table)
+            .where(and_(
+                table.c.id == bindparam("row_id"),
+                *(c.is_not_distinct_from(bindparam(f"old_{c.name}")) for c in enc_cols),
+            ))
+            .values({c.name: bindparam(f"new_{c.name}") for c in enc_cols})
+        )
+        reread = select(table.c.id, *enc_cols).where(table.c.id == bindparam("row_id"))
+
+        def params(row):
+            values = {}
+            for c in enc_cols:
+                values[f"old_{c.name}"] = row._mapping[c]
+                values[f"new_{c.name}"] = rotate_value(row._mapping[c])
+            return {"row_id": row.id, **values}
+
+        last_id = 0
+        rotated = 0
+        while True:
+            with engine.begin() as conn:
+                rows = conn.execute(
+                    select(table.c.id, *enc_cols)
+                    .where(table.c.id > last_id)
+                    .order_by(table.c.id)
+                    .limit(args.batch_size)
+                ).fetchall()
+                if not rows:
+                    break
+                for row in rows:
+                    for _ in range(args.retries + 1):
+                        if conn.execute(stmt, params(row)).rowcount:
+                            rotated += 1
+                            break
+                        row = conn.execute(reread, {"row_id": row.id}).first()
+                        if row is None:  # deleted meanwhile
+                            break
+                    else:
+                        sys.exit(f"{table.name} row {row.id} kept changing; rerun rotate-keys")
+            last_id = rows[-1].id
+        if rotated:
+            print(f"  {table.name}: {rotated} row(s)")
+        total += rotated
+
+    print(f"Re-encrypted {total} row(s) under the primary key.")
+
+
+def cmd_rebuild_rollups(_args: argparse.Namespace) -> None:
+    """Recompute every month's category rollup from its live expenses.
+
+    The rollup is maintained automatically on commit; this is for repairing
+    drift after writes that bypassed the ORM (raw SQL, manual restores).
+    """
+    from database import SessionLocal, MonthlyData, refresh_category_totals
+
+    db = SessionLocal()
+    try:
+        month_ids = [mid for (mid,) in db.query(MonthlyData.id).order_by(MonthlyData.id)]
+        for start in range(0, len(month_ids), 200):
+            refresh_category_totals(db, month_ids[start:start + 200])
+            db.commit()
+    finally:
+        db.close()
+
+    print(f"Rebuilt category rollups for {len(month_ids)} month(s).")
+
+
+def cmd_rebuild_search_index(_args: argparse.Namespace) -> None:
+    """Rebuild every user's expense search index.
+
+    The index is maintained on commit and built lazily on a user's first
+    search; run this after deploying it, or to repair writes that bypassed
+    the ORM.
+    """
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        users = _rebuild_search_indexes(db)
+    finally:
+        db.close()
+
+    print(f"Rebuilt search index for {users} user(s).")
+
+
 def cmd_check_month(args: argparse.Namespace) -> None:
     """Print decrypted data for a specific month and user email."""
-    from database import get_db, User, MonthlyData, MonthlyExpense
+    from database import find_month_row, get_db, User, MonthlyExpense
 
     db = next(get_db())
     try:
@@ -65,8 +264,7 @@ def cmd_check_month(args: argparse.Namespace) -> None:
         if not user:
             sys.exit(f"User not found: {args.email}")
 
-        all_months = db.query(MonthlyData).filter(MonthlyData.user_id == user.id).all()
-        month_row = next((r for r in all_months if r.month == args.month), None)
+        month_row = find_month_row(db, user.id, args.month)
         if not month_row:
             sys.exit(f"No data found for month {args.month!r} and user {args.email!r}")
 
@@ -99,6 +297,14 @@ def main() -> None:
 
     sub.add_parser("migrate", help="Migrate plaintext columns to Fernet-encrypted columns")
     sub.add_parser("cleanup", help="Drop old unencrypted columns after migration is verified")
+    sub.add_parser("backfill-indexes", help="Recompute blind-index columns and search tokens")
+
+    sub.add_parser("show-blind-index-key", help="Print the blind-index key to pin as BLIND_INDEX_KEY")
+    rotate_p = sub.add_parser("rotate-keys", help="Re-encrypt all rows under the primary ENCRYPTION_KEY")
+    rotate_p.add_argument("--batch-size", type=int, default=500, help="Rows per committed batch")
+    rotate_p.add_argument("--retries", type=int, default=5, help="Re-reads of a row changed mid-rotation")
+    sub.add_parser("rebuild-rollups", help="Recompute monthly category rollups from expenses")
+    sub.add_parser("rebuild-search-index", help="Re-tokenise every user's expenses for search")
 
     check_p = sub.add_parser("check-month", help="Inspect a month's data for a user")
     check_p.add_argument("month", help="Month in YYYY-MM format")
@@ -109,6 +315,11 @@ def main() -> None:
     dispatch = {
         "migrate": cmd_migrate,
         "cleanup": cmd_cleanup,
+        "backfill-indexes": cmd_backfill_indexes,
+        "show-blind-index-key": cmd_show_blind_index_key,
+        "rotate-keys": cmd_rotate_keys,
+        "rebuild-rollups": cmd_rebuild_rollups,
+        "rebuild-search-index": cmd_rebuild_search_index,
         "check-month": cmd_check_month,
     }
     dispatch[args.command](args)
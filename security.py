@@ -1,6 +1,8 @@
 # security.py
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -8,8 +10,9 @@ from starlette import status
 
 from jose import jwt, JWTError, ExpiredSignatureError  # ← use python-jose only
 from passlib.context import CryptContext
+from sqlalchemy.orm import Session
 
-from database import SessionLocal, User
+from database import SessionLocal, User, get_db
 from core.config import settings
 
 security = HTTPBearer()
@@ -34,8 +37,60 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
-    """Return username (sub) if token is valid; else raise 401."""
+# ── Authenticated-user cache ────────────────────────────────────────────────
+# sub (email) -> (user_id, expires_at). Lets verify_token skip the DB entirely
+# for repeat requests within the TTL; routes then load the User by primary key
+# on their own session via resolve_user(). Entries are only stored for live
+# (non-deleted) users and are evicted on account deletion / password change.
+_USER_CACHE_MAX = 10_000
+_user_cache: Dict[str, Tuple[int, float]] = {}
+_user_cache_lock = threading.Lock()
+
+
+def _cached_user_id(sub: str) -> Optional[int]:
+    entry = _user_cache.get(sub)
+    if entry is None:
+        return None
+    user_id, expires_at = entry
+    if expires_at < time.monotonic():
+        _user_cache.pop(sub, None)
+        return None
+    return user_id
+
+
+def _cache_user(sub: str, user_id: int) -> None:
+    ttl = settings.USER_CACHE_TTL_SEC
+    if ttl <= 0:
+        return
+    now = time.monotonic()
+    with _user_cache_lock:
+        if len(_user_cache) >= _USER_CACHE_MAX:
+            for key in [k for k, (_, exp) in _user_cache.items() if exp < now]:
+                del _user_cache[key]
+            if len(_user_cache) >= _USER_CACHE_MAX:
+                _user_cache.clear()
+        _user_cache[sub] = (user_id, now + ttl)
+
+
+def invalidate_user_cache(sub: Optional[str] = None) -> None:
+    """Evict one user (by email/sub) from the auth cache, or everyone if None."""
+    with _user_cache_lock:
+        if sub is None:
+            _user_cache.clear()
+        else:
+            _user_cache.pop(sub, None)
+
+
+def verify_token(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+) -> str:
+    """Return username (sub) if token is valid; else raise 401.
+
+    The user row is read on the request's own session (shared with the route
+    via get_db), so a later resolve_user() on that session is served from the
+    identity map instead of a second query.
+    """
     token = credentials.credentials
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -43,18 +98,18 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security))
         if not sub:
             raise HTTPException(status_code=401, detail="Invalid token")
 
-        db = SessionLocal()
-        try:
-            # Match by email now
-            user = db.query(User).filter(User.email == sub).first()
-        finally:
-            db.close()
+        if _cached_user_id(sub) is not None:
+            return sub
+
+        # Match by email now
+        user = db.query(User).filter(User.email == sub).first()
 
         if not user:
             raise HTTPException(status_code=401, detail="User no longer exists")
         if user.deleted_at is not None:
             raise HTTPException(status_code=401, detail="Account has been deleted")
 
+        _cache_user(user.email, user.id)
         return user.email  # return the email
 
     except ExpiredSignatureError:
@@ -71,6 +126,36 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security))
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+def resolve_user(db: Session, email: str) -> Optional[User]:
+    """Load the authenticated user on *db* without repeating verify_token's query.
+
+    Uses the cached user id for a primary-key get (an identity-map hit when
+    verify_token already loaded the row on this session); falls back to an
+    email lookup when the cache is cold or disabled.
+    """
+    user_id = _cached_user_id(email)
+    if user_id is not None:
+        user = db.get(User, user_id)
+        if user is not None and user.email == email:
+            return user
+    return db.query(User).filter(User.email == email).first()
+
+def get_current_user(
+    current_user: str = Depends(verify_token),
+    db: Session = Depends(get_db),
+) -> User:
+    """Dependency returning the authenticated User ORM object on the request session.
+
+    Re-checks deleted_at: verify_token skips it on an auth-cache hit, and
+    invalidate_user_cache only evicts the deleting process's entry.
+    """
+    user = resolve_user(db, current_user)
+    if not user:
+        raise HTTPException(status_code=401, detail="User no longer exists")
+    if user.deleted_at is not None:
+        raise HTTPException(status_code=401, detail="Account has been deleted")
+    return user
+
 def authenticate_user(username: str, password: str) -> bool:
     """Check username/password against the DB."""
     db = SessionLocal()
@@ -44,8 +44,10 @@ from security import (
     create_access_token,
     create_email_verify_token,
     get_password_hash,
+    invalidate_user_cache,
     verify_token,
 )
+from core.cache import clear_local_cache
 from core.limiter import limiter
 
 import pytest
@@ -113,6 +115,10 @@ def clean_db():
         session.close()
     # Reset in-memory rate-limit storage so tests never see stale counters
     limiter.limiter.storage.reset()
+    # Drop cached auth principals and cached results so ids from truncated rows
+    # never leak across tests
+    invalidate_user_cache()
+    clear_local_cache()
     yield
 
 
@@ -0,0 +1,97 @@
+"""Tests for core/analytics.py (month × category spending matrix)."""
+import math
+import statistics
+
+import numpy as np
+import pytest
+
+from core.analytics import SpendingMatrix, prior_months, shift_month
+
+
+def _cell(actual, planned=0.0):
+    return {"actual": actual, "planned": planned}
+
+
+MONTHS = ["2026-01", "2026-02", "2026-03", "2026-04"]
+TOTALS = {
+    "2026-01": {"Food": _cell(100.0, 150.0), "Rent": _cell(800.0, 800.0)},
+    "2026-02": {"Food": _cell(120.0, 150.0)},
+    "2026-04": {"Food": _cell(400.0, 150.0), "Rent": _cell(0.0, 800.0)},
+}
+
+
+class TestMonthHelpers:
+    def test_shift_month_across_years(self):
+        assert shift_month("2026-01", -1) == "2025-12"
+        assert shift_month("2025-12", 1) == "2026-01"
+        assert shift_month("2026-03", -27) == "2023-12"
+
+    def test_prior_months_oldest_first(self):
+        assert prior_months("2026-02", 3) == ["2025-11", "2025-12", "2026-01"]
+
+
+class TestSpendingMatrix:
+    def test_layout(self):
+        m = SpendingMatrix.from_totals(MONTHS, TOTALS, {"2026-03": {"total_actual": 5.0}})
+
+        assert m.categories == ["Food", "Rent"]
+        assert m.actual[m.row("2026-01")].tolist() == [100.0, 800.0]
+        assert m.planned[m.row("2026-04")].tolist() == [150.0, 800.0]
+        # A 0.0 cell is present; a missing one is not.
+        assert m.present[m.row("2026-04")].tolist() == [True, True]
+        assert m.present[m.row("2026-02")].tolist() == [True, False]
+        assert m.has_row.tolist() == [True, True, True, True]
+        assert m.has_cells().tolist() == [True, True, False, True]
+        assert m.total_actual[m.row("2026-03")] == 5.0
+
+    def test_rolling_mean_uses_partial_leading_windows(self):
+        m = SpendingMatrix.from_totals(MONTHS, TOTALS)
+        food = [100.0, 120.0, 0.0, 400.0]
+        expected = [
+            sum(food[max(0, i - 2): i + 1]) / len(food[max(0, i - 2): i + 1])
+            for i in range(len(food))
+        ]
+        assert m.rolling_mean(3)[:, 0] == pytest.approx(expected)
+
+    def test_baseline_counts_only_present_cells(self):
+        m = SpendingMatrix.from_totals(MONTHS, TOTALS)
+        count, mean, std = m.baseline(m.rows(MONTHS[:3]))
+
+        assert count.tolist() == [2, 1]
+        assert mean[0] == pytest.approx(110.0)
+        assert std[0] == pytest.approx(statistics.pstdev([100.0, 120.0]))
+        assert mean[1] == 800.0 and std[1] == 0.0
+
+    def test_flat_history_has_exact_mean_and_zero_std(self):
+        months = ["2026-01", "2026-02", "2026-03"]
+        m = SpendingMatrix.from_totals(months, {ms: {"Fun": _cell(0.1)} for ms in months})
+        _, mean, std = m.baseline(m.rows(months))
+
+        assert mean[0] == 0.1
+        assert std[0] == 0.0
+
+    def test_zscores(self):
+        m = SpendingMatrix.from_totals(MONTHS, TOTALS)
+        count, mean, std, z = m.zscores(m.row("2026-04"), m.rows(MONTHS[:3]))
+
+        assert z[0] == pytest.approx((400.0 - 110.0) / 10.0)
+        assert math.isnan(z[1])  # flat Rent history
+
+    def test_empty_baseline(self):
+        m = SpendingMatrix.from_totals(MONTHS, TOTALS)
+        count, mean, std = m.baseline(m.rows(["2026-03"]))
+        assert count.tolist() == [0, 0]
+        assert mean.tolist() == [0.0, 0.0]
+        assert std.tolist() == [0.0, 0.0]
+
+    def test_growth(self):
+        pct = SpendingMatrix.growth(np.array([100.0, 0.0]), np.array([150.0, 20.0]))
+        assert pct[0] == pytest.approx(50.0)
+        assert math.isnan(pct[1])
+
+    def test_quartile_levels(self):
+        amounts = np.array([0.0, 10.0, 20.0, 30.0, 40.0, 50.0, 60.0, 70.0, 80.0])
+        assert SpendingMatrix.quartile_levels(amounts).tolist() == [0, 1, 1, 2, 2, 3, 3, 4, 4]
+
+    def test_quartile_levels_all_zero(self):
+        assert SpendingMatrix.quartile_levels(np.zeros(3)).tolist() == [0, 0, 0]
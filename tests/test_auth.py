@@ -4,10 +4,12 @@ import secrets
 from datetime import datetime, timedelta
 
 import pytest
+from sqlalchemy import event
 
+import security
 from conftest import TEST_EMAIL, TEST_EMAIL_2, TEST_PASSWORD
-from database import PasswordResetToken, RefreshToken, User
-from security import create_email_verify_token, get_password_hash
+from database import PasswordResetToken, RefreshToken, User, engine
+from security import create_access_token, create_email_verify_token, get_password_hash, resolve_user
 
 
 # ── Health ─────────────────────────────────────────────────────────────────────
@@ -477,3 +479,77 @@ class TestResendVerification:
         db.expire_all()
         updated = db.query(User).filter(User.id == user_id).first()
         assert updated.verification_sent_at > sent_before
+
+
+# ── Authenticated-user resolution ─────────────────────────────────────────────
+
+class TestAuthUserResolution:
+    @staticmethod
+    def _bearer(email=TEST_EMAIL):
+        return {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+    @staticmethod
+    def _count_user_selects():
+        statements = []
+
+        def on_execute(conn, cursor, statement, params, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+                statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", on_execute)
+        return statements, lambda: event.remove(engine, "before_cursor_execute", on_execute)
+
+    def test_user_is_loaded_once_per_request(self, client, verified_user):
+        headers = self._bearer()
+        statements, stop = self._count_user_selects()
+        try:
+            for _ in range(3):
+                statements.clear()
+                r = client.get("/users/me", headers=headers)
+                assert r.status_code == 200
+                assert len(statements) <= 1
+        finally:
+            stop()
+
+    def test_resolve_user_uses_cached_id(self, client, db, verified_user):
+        client.get("/users/me", headers=self._bearer())
+        assert resolve_user(db, TEST_EMAIL) is verified_user
+        assert resolve_user(db, "nobody@example.com") is None
+
+    def test_deleted_account_rejected_immediately(self, client, verified_user):
+        headers = self._bearer()
+        assert client.get("/users/me", headers=headers).status_code == 200
+
+        assert client.delete("/users/me", headers=headers).status_code == 200
+
+        r = client.get("/users/me", headers=headers)
+        assert r.status_code == 401
+
+    def test_deleted_account_rejected_on_stale_cache_entry(self, client, db, verified_user):
+        headers = self._bearer()
+        assert client.get("/users/me", headers=headers).status_code == 200
+
+        # Deleted by another worker: this process's cache entry survives
+        verified_user.deleted_at = datetime.utcnow()
+        db.commit()
+        assert TEST_EMAIL in security._user_cache
+
+        r = client.get("/users/me", headers=headers)
+        assert r.status_code == 401
+
+    def test_password_change_evicts_cache(self, client, verified_user):
+        headers = self._bearer()
+        client.get("/users/me", headers=headers)
+
+        r = client.put("/users/me/password", headers=headers, json={
+            "current_password": TEST_PASSWORD,
+            "new_password": "NewPass2@",
+        })
+        assert r.status_code == 200
+        assert TEST_EMAIL not in security._user_cache
+
+    def test_cache_disabled_with_zero_ttl(self, client, verified_user, monkeypatch):
+        monkeypatch.setattr(security.settings, "USER_CACHE_TTL_SEC", 0)
+
+        assert client.get("/users/me", headers=self._bearer()).status_code == 200
+        assert security._user_cache == {}
@@ -22,7 +22,8 @@ from unittest.mock import MagicMock, patch
 import pytest
 
 from database import BankConnection, BankTransaction, MonthlyExpense
-from tests.conftest import TEST_EMAIL
+from routers import banking
+from tests.conftest import TEST_EMAIL, make_expense, make_month
 
 
 # ---------------------------------------------------------------------------
@@ -473,6 +474,65 @@ class TestSync:
         assert len(txns) == 1
         assert txns[0].transaction_date == date(2026, 4, 2)
 
+    def _sync(self, auth_client, txns):
+        with patch("routers.banking.settings") as ms, \
+             patch("httpx.get", return_value=_mock_truelayer_transactions(txns)):
+            ms.TRUELAYER_CLIENT_ID = "cid"
+            ms.TRUELAYER_CLIENT_SECRET = "secret"
+            ms.TRUELAYER_SANDBOX = True
+            return auth_client.post("/banking/sync")
+
+    def test_sync_inserts_large_batches(self, auth_client, db, verified_user):
+        _make_connection(db, verified_user)
+        txns = [{**_SAMPLE_TXN, "transaction_id": f"t{i}", "amount": -(i + 1)} for i in range(1200)]
+
+        r = self._sync(auth_client, txns + [txns[0]])  # provider repeats one
+
+        assert r.json() == {"synced": 1200, "skipped": 1, "connection_id": r.json()["connection_id"]}
+        stored = db.query(BankTransaction).filter(BankTransaction.user_id == verified_user.id).all()
+        assert {t.external_id for t in stored} == {f"t{i}" for i in range(1200)}
+        assert sorted(t.amount for t in stored)[:2] == [-1200.0, -1199.0]
+
+    def test_second_sync_dedups_via_blind_index(self, auth_client, db, verified_user):
+        _make_connection(db, verified_user)
+        txns = [{**_SAMPLE_TXN, "transaction_id": f"t{i}"} for i in range(3)]
+        self._sync(auth_client, txns)
+
+        r = self._sync(auth_client, txns + [{**_SAMPLE_TXN, "transaction_id": "t3"}])
+
+        assert r.json()["synced"] == 1
+        assert r.json()["skipped"] == 3
+
+    def test_same_external_id_on_another_connection_is_not_a_duplicate(self, auth_client, db, verified_user):
+        other = _make_connection(db, verified_user)
+        _make_transaction(db, verified_user, other, external_id="txn_abc123")
+        other.disconnected_at = datetime.utcnow()
+        db.commit()
+        _make_connection(db, verified_user)
+
+        assert self._sync(auth_client, [_SAMPLE_TXN]).json()["synced"] == 1
+
+    def test_suggestion_from_history_built_once(self, auth_client, db, verified_user):
+        _make_connection(db, verified_user)
+        month = make_month(db, verified_user, month="2026-03")
+        make_expense(db, month, name="Tesco Stores Ltd", category="Food")
+        make_expense(db, month, name="tesco stores express", category="Food")
+        make_expense(db, month, name="Tesco Stores fuel", category="Transportation")
+
+        calls = []
+        real = banking._category_history
+        with patch.object(banking, "_category_history", lambda *a: calls.append(1) or real(*a)):
+            self._sync(auth_client, [
+                {**_SAMPLE_TXN, "transaction_id": "a"},
+                {**_SAMPLE_TXN, "transaction_id": "b"},
+                {**_SAMPLE_TXN, "transaction_id": "c", "description": "Unknown shop"},
+            ])
+
+        assert calls == [1]
+        db.expire_all()
+        by_id = {t.external_id: t.suggested_category for t in db.query(BankTransaction).all()}
+        assert by_id == {"a": "Food", "b": "Food", "c": None}
+
 
 # ---------------------------------------------------------------------------
 # GET /banking/drafts
@@ -0,0 +1,380 @@
+"""Tests for the chunked scheduler-job runner (core/batch.py) and the jobs built on it."""
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from conftest import make_expense, make_month
+from core import batch
+from core.batch import BatchJob, acquire_lease, chunked, job_stats, release_lease, resume_interrupted_jobs
+from database import (
+    BudgetAlert,
+    Investment,
+    InvestmentPrice,
+    JobCheckpoint,
+    JobRun,
+    MonthlyData,
+    MonthlyExpense,
+    Notification,
+    RecurringExpense,
+    find_month_row,
+)
+
+
+def _session_factory(db):
+    factory = MagicMock()
+    factory.return_value = db
+    db.close = MagicMock()
+    return factory
+
+
+@pytest.fixture
+def tiny_chunks(monkeypatch):
+    """Force one user per chunk so multi-user tests exercise several chunks."""
+    monkeypatch.setattr(batch, "BATCH_SIZE", 1)
+
+
+def _add_alert(db, user, category="Housing", threshold=80):
+    alert = BudgetAlert(user_id=user.id, threshold_pct=threshold, active=True)
+    alert.category = category
+    db.add(alert)
+    db.commit()
+    return alert
+
+
+def _add_recurring(db, user, name="Netflix", category="Entertainment", amount=10.0):
+    rec = RecurringExpense(
+        user_id=user.id,
+        frequency="monthly",
+        start_date=datetime.utcnow() - timedelta(days=40),
+    )
+    rec.name = name
+    rec.category = category
+    rec.planned_amount = amount
+    db.add(rec)
+    db.commit()
+    return rec
+
+
+class TestBatchJob:
+    def test_chunked_splits_sequence(self):
+        assert list(chunked([1, 2, 3, 4, 5], 2)) == [[1, 2], [3, 4], [5]]
+
+    def test_commits_per_chunk_and_records_stats(self, db):
+        db.commit = MagicMock()
+        delivered = []
+
+        with BatchJob("unit_job") as job:
+            job.run_chunks(db, list(range(5)), lambda db, chunk: chunk, delivered.append, size=2)
+
+        assert db.commit.call_count == 3
+        assert delivered == [0, 1, 2, 3, 4]
+        stats = job_stats()["unit_job"]
+        assert stats["chunks"] == 3
+        assert stats["rows"] == 5
+        assert stats["written"] == 5
+        assert stats["delivered"] == 5
+        assert stats["ok"] is True
+
+    def test_failed_chunk_is_rolled_back_and_skipped(self, db):
+        db.rollback = MagicMock()
+        delivered = []
+
+        def process(db, chunk):
+            if 2 in chunk:
+                raise RuntimeError("boom")
+            return chunk
+
+        with BatchJob("failing_job") as job:
+            job.run_chunks(db, [1, 2, 3], process, delivered.append, size=1)
+
+        db.rollback.assert_called_once()
+        assert delivered == [1, 3]
+        stats = job_stats()["failing_job"]
+        assert stats["failed_chunks"] == 1
+        assert stats["ok"] is False
+
+    def test_delivery_errors_do_not_stop_the_chunk(self, db):
+        def deliver(item):
+            if item == "bad":
+                raise RuntimeError("smtp down")
+
+        with BatchJob("delivery_job") as job:
+            job.run_chunks(db, ["a", "bad", "b"], lambda db, chunk: chunk, deliver)
+
+        assert job_stats()["delivery_job"]["delivered"] == 2
+
+    def test_health_reports_job_stats(self, client):
+        with BatchJob("health_job"):
+            pass
+
+        r = client.get("/health")
+        assert r.status_code == 200
+        assert "health_job" in r.json()["jobs"]
+
+
+class TestLeaderElection:
+    def test_only_one_holder_at_a_time(self, db):
+        assert acquire_lease(db, "lease_job", holder="replica-a")
+        assert acquire_lease(db, "lease_job", holder="replica-a")  # renewal
+        assert not acquire_lease(db, "lease_job", holder="replica-b")
+
+        release_lease(db, "lease_job", holder="replica-a")
+        assert acquire_lease(db, "lease_job", holder="replica-b")
+
+    def test_expired_lease_can_be_taken_over(self, db):
+        assert acquire_lease(db, "lease_job", holder="replica-a", ttl=1)
+        db.query(JobRun).update({"lease_expires_at": datetime.utcnow() - timedelta(seconds=5)})
+        db.commit()
+
+        assert acquire_lease(db, "lease_job", holder="replica-b")
+
+    def test_job_skipped_while_another_replica_holds_lease(self, db):
+        acquire_lease(db, "leased_job", holder="other-replica")
+        calls = []
+
+        with BatchJob("leased_job", _session_factory(db)) as job:
+            job.run_chunks(db, [1, 2], lambda db, chunk: calls.append(chunk))
+
+        assert job.acquired is False
+        assert calls == []
+
+    def test_finished_run_is_not_repeated(self, db):
+        factory = _session_factory(db)
+        calls = []
+        for _ in range(2):
+            with BatchJob("daily_job", factory, run_key="2026-10-17") as job:
+                job.run_chunks(db, [1, 2, 3], lambda db, chunk: calls.append(chunk))
+
+        assert calls == [[1, 2, 3]]
+        run = db.get(JobRun, "daily_job")
+        assert run.finished_at is not None
+        assert run.holder is None
+        assert db.query(JobCheckpoint).count() == 0
+
+    def test_new_run_key_starts_a_new_run(self, db):
+        factory = _session_factory(db)
+        calls = []
+        for day in ("2026-10-17", "2026-10-18"):
+            with BatchJob("daily_job", factory, run_key=day) as job:
+                job.run_chunks(db, [1], lambda db, chunk: calls.append(chunk))
+
+        assert calls == [[1], [1]]
+
+    def test_interval_job_runs_once_per_period(self, db, monkeypatch):
+        factory = _session_factory(db)
+        calls = []
+        job = batch.leader_only("interval_job", calls.append, every=timedelta(minutes=5))
+
+        monkeypatch.setattr(batch.time, "time", lambda: 1_800_000_000.0)
+        job(factory)
+        job(factory)  # another process, same period
+        monkeypatch.setattr(batch.time, "time", lambda: 1_800_000_300.0)
+        job(factory)
+
+        assert calls == [factory, factory]
+
+
+class TestCheckpointResume:
+    def _crash_after_first_chunk(self, db, factory):
+        seen = []
+
+        def process(db, chunk):
+            if seen:
+                raise SystemExit("leader killed")  # not caught by the chunk handler
+            seen.append(chunk)
+
+        with pytest.raises(SystemExit):
+            with BatchJob("crashy_job", factory, run_key="r1") as job:
+                job.run_chunks(db, [1, 2, 3, 4], process, size=2)
+        return seen
+
+    def test_crash_leaves_checkpoint_and_unfinished_run(self, db):
+        seen = self._crash_after_first_chunk(db, _session_factory(db))
+
+        assert seen == [[1, 2]]
+        db.rollback()
+        run = db.get(JobRun, "crashy_job")
+        assert run.finished_at is None
+        assert [(c.first_item, c.last_item) for c in db.query(JobCheckpoint)] == [(1, 2)]
+
+    def test_resume_skips_committed_chunks(self, db):
+        factory = _session_factory(db)
+        self._crash_after_first_chunk(db, factory)
+        db.rollback()
+        calls = []
+
+        with BatchJob("crashy_job", factory, run_key="r1") as job:
+            job.run_chunks(db, [1, 2, 3, 4], lambda db, chunk: calls.append(chunk), size=2)
+
+        assert job.resumed is True
+        assert calls == [[3, 4]]
+        assert db.get(JobRun, "crashy_job").finished_at is not None
+
+    def test_failed_chunk_keeps_run_open_and_is_retried(self, db):
+        factory = _session_factory(db)
+        db.rollback = MagicMock()
+        calls = []
+
+        def flaky(db, chunk):
+            if chunk == [3, 4] and "failed" not in calls:
+                calls.append("failed")
+                raise RuntimeError("boom")
+            calls.append(chunk)
+
+        with BatchJob("flaky_job", factory, run_key="r1") as job:
+            job.run_chunks(db, [1, 2, 3, 4], flaky, size=2)
+        assert db.get(JobRun, "flaky_job").finished_at is None
+
+        with BatchJob("flaky_job", factory, run_key="r1") as job:
+            job.run_chunks(db, [1, 2, 3, 4], flaky, size=2)
+
+        assert calls == [[1, 2], "failed", [3, 4]]
+        assert db.get(JobRun, "flaky_job").finished_at is not None
+
+    def test_resume_interrupted_jobs_reruns_stalled_job(self, db):
+        factory = _session_factory(db)
+        self._crash_after_first_chunk(db, factory)
+        db.rollback()
+        resumed = MagicMock()
+
+        resume_interrupted_jobs(factory, {"crashy_job": resumed, "other_job": MagicMock()})
+
+        resumed.assert_called_once_with()
+
+    def test_parallel_workers_process_every_chunk_once(self, db):
+        """Chunks fan out over the pool, each on its own session from the factory."""
+        db.close = MagicMock()
+        chunk_sessions = []
+
+        def factory():
+            # Lease bookkeeping stays on the test session; worker threads get
+            # stand-in sessions (SQLite connections can't write concurrently).
+            if threading.current_thread() is threading.main_thread():
+                return db
+            session = MagicMock()
+            chunk_sessions.append(session)
+            return session
+
+        processed = []
+
+        def process(chunk_db, chunk):
+            assert chunk_db is not db
+            processed.extend(chunk)
+            return chunk
+
+        with BatchJob("parallel_job", factory, run_key="p1", workers=4) as job:
+            job.run_chunks(db, list(range(1, 41)), process, size=5)
+
+        assert sorted(processed) == list(range(1, 41))
+        assert job.chunks == 8
+        assert job.written == 40
+        assert len(chunk_sessions) == 8
+        assert all(s.commit.called and s.close.called for s in chunk_sessions)
+        assert db.get(JobRun, "parallel_job").finished_at is not None
+
+
+class TestBudgetAlertJob:
+    def test_alerts_fire_across_chunks(self, db, verified_user, second_user, tiny_chunks):
+        current = datetime.utcnow().strftime("%Y-%m")
+        for user in (verified_user, second_user):
+            _add_alert(db, user)
+            month = make_month(db, user, month=current)
+            make_expense(db, month, category="Housing", planned=500.0, actual=450.0)
+
+        from routers.alerts import check_budget_alerts
+        with patch("routers.alerts.send_budget_alert_email") as mock_email:
+            check_budget_alerts(_session_factory(db))
+
+        assert mock_email.call_count == 2
+        assert db.query(Notification).filter(Notification.type == "budget_alert").count() == 2
+        assert job_stats()["check_budget_alerts"]["chunks"] == 2
+
+    def test_second_run_same_day_is_skipped(self, db, verified_user):
+        current = datetime.utcnow().strftime("%Y-%m")
+        _add_alert(db, verified_user)
+        month = make_month(db, verified_user, month=current)
+        make_expense(db, month, category="Housing", planned=500.0, actual=450.0)
+
+        from routers.alerts import check_budget_alerts
+        with patch("routers.alerts.send_budget_alert_email") as mock_email:
+            check_budget_alerts(_session_factory(db))
+            check_budget_alerts(_session_factory(db))
+
+        mock_email.assert_called_once()
+        assert db.query(Notification).count() == 1
+
+    def test_below_threshold_does_not_fire(self, db, verified_user):
+        current = datetime.utcnow().strftime("%Y-%m")
+        _add_alert(db, verified_user, threshold=95)
+        month = make_month(db, verified_user, month=current)
+        make_expense(db, month, category="Housing", planned=500.0, actual=450.0)
+
+        from routers.alerts import check_budget_alerts
+        with patch("routers.alerts.send_budget_alert_email") as mock_email:
+            check_budget_alerts(_session_factory(db))
+
+        mock_email.assert_not_called()
+
+
+class TestRecurringGenerationJob:
+    def test_generates_rows_for_several_users(self, db, verified_user, second_user, tiny_chunks):
+        _add_recurring(db, verified_user)
+        _add_recurring(db, second_user, name="Gym", category="Health", amount=30.0)
+
+        from routers.recurring import generate_all_recurring
+        generate_all_recurring(_session_factory(db))
+
+        current = datetime.utcnow().strftime("%Y-%m")
+        for user, name in ((verified_user, "Netflix"), (second_user, "Gym")):
+            month = find_month_row(db, user.id, current)
+            assert month is not None
+            names = [e.name for e in db.query(MonthlyExpense).filter_by(monthly_data_id=month.id)]
+            assert names == [name]
+        assert job_stats()["generate_recurring"]["written"] == 2
+
+    def test_existing_expense_is_not_duplicated(self, db, verified_user):
+        rec = _add_recurring(db, verified_user)
+        month = make_month(db, verified_user, month=datetime.utcnow().strftime("%Y-%m"))
+        make_expense(db, month, name="Netflix", category="Entertainment", planned=10.0)
+
+        from routers.recurring import generate_all_recurring
+        generate_all_recurring(_session_factory(db))
+
+        assert db.query(MonthlyExpense).count() == 1
+        assert db.query(MonthlyData).count() == 1
+        db.refresh(rec)
+        assert rec.last_generated_at is not None
+
+    def test_second_run_generates_nothing(self, db, verified_user):
+        _add_recurring(db, verified_user)
+
+        from routers.recurring import generate_all_recurring
+        generate_all_recurring(_session_factory(db))
+        generate_all_recurring(_session_factory(db))
+
+        assert db.query(MonthlyExpense).count() == 1
+
+
+class TestInvestmentPriceJob:
+    def _holding(self, db, user, ticker):
+        holding = Investment(user_id=user.id, ticker=ticker)
+        holding.name = ticker or "Fund"
+        holding.units = 1.0
+        holding.purchase_price = 100.0
+        db.add(holding)
+        db.commit()
+        return holding
+
+    def test_each_ticker_fetched_once(self, db, verified_user, second_user):
+        self._holding(db, verified_user, "VUSA")
+        self._holding(db, second_user, "VUSA")
+        self._holding(db, second_user, None)
+
+        from main import sync_all_investment_prices
+        with patch("routers.investments.fetch_price_for_ticker", return_value=71.5) as mock_fetch:
+            sync_all_investment_prices(_session_factory(db))
+
+        mock_fetch.assert_called_once_with("VUSA")
+        assert db.query(InvestmentPrice).count() == 2
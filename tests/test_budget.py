@@ -1,8 +1,11 @@
 """Tests for budget calculation, monthly-tracker, and annual overview endpoints."""
+import json
+
 import pytest
+from sqlalchemy import event
 
 from conftest import make_month, make_expense
-from database import MonthlyData, MonthlyExpense
+from database import AuditLog, MonthlyData, MonthlyExpense, engine
 
 
 STANDARD_EXPENSES = [
@@ -77,6 +80,50 @@ class TestCalculateBudget:
         assert len(housing) == 1
         assert housing[0].planned_amount == 900.0
 
+    def test_commit_inserts_new_lines_in_one_statement(self, auth_client, db, verified_user):
+        """A large budget save batches new rows into a single INSERT and audits each one."""
+        expenses = [{"name": f"Line {i}", "amount": i, "category": "Other"} for i in range(100)]
+        inserts = []
+
+        # Count statement executions (pre-expansion), not driver calls: SQLite
+        # cannot order multi-row RETURNING, so SQLAlchemy sends it row by row.
+        def on_execute(conn, clauseelement, multiparams, params, execution_options):
+            if getattr(clauseelement, "is_insert", False) and clauseelement.table.name == "monthly_expenses":
+                inserts.append(clauseelement)
+
+        event.listen(engine, "before_execute", on_execute)
+        try:
+            r = auth_client.post("/calculate-budget?commit=true", json={
+                "month": "2026-05",
+                "monthly_salary": 10000,
+                "expenses": expenses,
+            })
+        finally:
+            event.remove(engine, "before_execute", on_execute)
+
+        assert r.status_code == 200
+        assert len(inserts) == 1
+        ids = {e.id for e in db.query(MonthlyExpense).all()}
+        assert len(ids) == 100
+        audits = db.query(AuditLog).filter(AuditLog.action == "create").all()
+        assert {a.expense_id for a in audits} == ids
+        assert json.loads(audits[0].changed_fields)["after"]["category"] == "Other"
+
+    def test_commit_duplicate_lines_in_one_request_upsert(self, auth_client, db, verified_user):
+        """Repeated (name, category) pairs in one payload collapse onto one row."""
+        auth_client.post("/calculate-budget?commit=true", json={
+            "month": "2026-05",
+            "monthly_salary": 3000,
+            "expenses": [
+                {"name": "Rent", "amount": 800, "category": "Housing"},
+                {"name": "Rent", "amount": 850, "category": "Housing"},
+            ],
+        })
+
+        rows = db.query(MonthlyExpense).all()
+        assert len(rows) == 1
+        assert rows[0].planned_amount == 850.0
+
     def test_overspend_recommendation(self, auth_client):
         r = auth_client.post("/calculate-budget", json={
             "month": "2026-06",
@@ -124,6 +171,14 @@ class TestCalculateBudget:
         })
         assert r.status_code == 422
 
+    def test_out_of_range_month_returns_422(self, auth_client):
+        r = auth_client.post("/calculate-budget", json={
+            "month": "2026-13",
+            "monthly_salary": 3000,
+            "expenses": [],
+        })
+        assert r.status_code == 422
+
     def test_zero_salary_does_not_crash(self, auth_client):
         r = auth_client.post("/calculate-budget", json={
             "month": "2026-10",
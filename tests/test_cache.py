@@ -0,0 +1,394 @@
+"""Tests for core/cache.py — L1/L2 tiers, compressed values, per-user generations and cached endpoints."""
+import threading
+import time
+
+import pytest
+
+from conftest import make_expense, make_month
+from core import cache
+
+
+class FakeRedis:
+    """
+    The subset of redis.Redis used by core.cache, kept in a dict. Pub/sub is
+    delivered synchronously to handlers subscribed through pubsub().
+    """
+
+    def __init__(self):
+        self.store = {}
+        self.gets = 0
+        self.subscribers = {}
+
+    def ping(self):
+        return True
+
+    def get(self, key):
+        self.gets += 1
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value if isinstance(value, bytes) else str(value).encode()
+
+    def delete(self, key):
+        self.store.pop(key, None)
+
+    def incr(self, key):
+        value = int(self.store.get(key, b"0")) + 1
+        self.store[key] = str(value).encode()
+        return value
+
+    def expire(self, key, ttl):
+        return True
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def publish(self, channel, data):
+        for handler in self.subscribers.get(channel, []):
+            handler({"type": "message", "channel": channel, "data": data.encode()})
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+    def lock(self, name, timeout=None):
+        return FakeLock(self, name)
+
+
+class FakeLock:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def acquire(self, blocking=True):
+        if self.name in self.client.store:
+            return False
+        self.client.store[self.name] = b"1"
+        return True
+
+    def release(self):
+        self.client.store.pop(self.name, None)
+
+
+class FakePubSub:
+    def __init__(self, client):
+        self.client = client
+
+    def subscribe(self, **handlers):
+        for channel, handler in handlers.items():
+            self.client.subscribers.setdefault(channel, []).append(handler)
+
+    def run_in_thread(self, sleep_time=0, daemon=False):
+        return None
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def incr(self, key):
+        self.calls.append(key)
+
+    def execute(self):
+        return [self.client.incr(key) for key in self.calls]
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(cache, "_redis_client", fake)
+    monkeypatch.setattr(cache, "_redis_unavailable", False)
+    cache._start_invalidation_listener(fake)
+    cache.reset_cache_stats()
+    yield fake
+    cache.reset_cache_stats()
+
+
+@pytest.fixture
+def single_process(monkeypatch):
+    """No Redis, with in-process caching explicitly allowed."""
+    monkeypatch.setattr(cache.settings, "CACHE_SINGLE_PROCESS", True)
+
+
+class TestValues:
+    def test_large_values_are_compressed(self, redis):
+        value = {"rows": [{"category": "Food", "amount": i} for i in range(200)]}
+        cache.cache_set("big", value)
+
+        assert redis.store["big"][:1] == b"x"
+        assert len(redis.store["big"]) < len(str(value))
+        assert cache.cache_get("big") == value
+
+    def test_small_values_stay_plain_json(self, redis):
+        cache.cache_set("small", {"a": 1})
+        assert redis.store["small"] == b'{"a":1}'
+        assert cache.cache_get("small") == {"a": 1}
+
+    def test_annual_overview_round_trips(self, auth_client, redis):
+        first = auth_client.get("/overview/annual?year=2026").json()
+        assert auth_client.get("/overview/annual?year=2026").json() == first
+
+
+class TestCachedEndpoint:
+    def test_second_request_is_a_hit(self, auth_client, db, verified_user, redis):
+        make_expense(db, make_month(db, verified_user, month="2026-03"), planned=500.0, actual=400.0)
+
+        first = auth_client.get("/insights/tag-summary?month=2026-03")
+        second = auth_client.get("/insights/tag-summary?month=2026-03")
+
+        assert first.json() == second.json()
+        assert cache.cache_stats()["endpoints"]["insights:tag-summary"] == {"hits": 1, "misses": 1}
+
+    def test_query_params_are_part_of_the_key(self, auth_client, redis):
+        auth_client.get("/insights/trends?months=3")
+        auth_client.get("/insights/trends?months=6")
+
+        assert cache.cache_stats()["endpoints"]["insights:trends"] == {"hits": 0, "misses": 2}
+
+    def test_expense_write_bumps_generation_and_invalidates(self, auth_client, db, verified_user, redis):
+        month = make_month(db, verified_user, month="2026-04")
+        expense = make_expense(db, month, category="Food", planned=100.0, actual=50.0)
+        generation = cache.user_generation(verified_user.id)
+
+        before = auth_client.get("/insights/month-comparison?month_a=2026-04&month_b=2026-04").json()
+        expense.actual_amount = 90.0
+        db.commit()
+
+        assert cache.user_generation(verified_user.id) == generation + 1
+        after = auth_client.get("/insights/month-comparison?month_a=2026-04&month_b=2026-04").json()
+        assert after != before
+        assert cache.cache_stats()["endpoints"]["insights:month-comparison"]["hits"] == 0
+
+    def test_writes_are_scoped_to_their_owner(self, db, verified_user, second_user, redis):
+        make_month(db, verified_user, month="2026-05")
+
+        assert cache.user_generation(verified_user.id) >= 1
+        assert cache.user_generation(second_user.id) == 0
+
+    def test_rolled_back_write_does_not_bump(self, db, verified_user, redis):
+        month = make_month(db, verified_user, month="2026-06")
+        generation = cache.user_generation(verified_user.id)
+
+        month.salary_planned = 1.0
+        db.flush()
+        db.rollback()
+
+        assert cache.user_generation(verified_user.id) == generation
+
+    def test_profile_change_invalidates_cached_results(self, auth_client, db, verified_user, redis):
+        month = make_month(db, verified_user, month="2026-03")
+        make_expense(db, month, name="Rent A", category="Housing", planned=800.0, actual=800.0)
+        make_expense(db, month, name="Rent B", category="Housing", planned=800.0, actual=800.0)
+        url = "/insights/duplicate-candidates?month=2026-03"
+        assert "GBP 800.00" in auth_client.get(url).json()["duplicates"][0]["reason"]
+        generation = cache.user_generation(verified_user.id)
+
+        verified_user.base_currency = "EUR"
+        db.commit()
+
+        assert cache.user_generation(verified_user.id) == generation + 1
+        assert "EUR 800.00" in auth_client.get(url).json()["duplicates"][0]["reason"]
+
+    def test_without_redis_nothing_is_cached(self, auth_client):
+        cache.reset_cache_stats()
+        auth_client.get("/insights/streaks")
+        auth_client.get("/insights/streaks")
+
+        assert cache.cache_stats()["endpoints"]["insights:streaks"] == {"hits": 0, "misses": 2}
+
+    def test_single_process_l1_still_caches(self, auth_client, db, verified_user, single_process):
+        cache.reset_cache_stats()
+        month = make_month(db, verified_user, month="2026-04")
+        expense = make_expense(db, month, category="Food", planned=100.0, actual=50.0)
+
+        url = "/insights/month-comparison?month_a=2026-04&month_b=2026-04"
+        before = auth_client.get(url).json()
+        assert auth_client.get(url).json() == before
+        assert cache.cache_stats()["endpoints"]["insights:month-comparison"] == {"hits": 1, "misses": 1}
+
+        expense.actual_amount = 90.0
+        db.commit()  # bumps the process-local generation
+        assert auth_client.get(url).json() != before
+
+    def test_health_reports_hits_and_misses(self, auth_client, redis):
+        auth_client.get("/insights/streaks")
+        auth_client.get("/insights/streaks")
+
+        stats = auth_client.get("/health").json()["endpoint_cache"]
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+
+class TestLocalCache:
+    def test_evicts_least_recently_used_past_item_cap(self):
+        l1 = cache.LocalCache(max_items=2, max_bytes=1000)
+        l1.set("a", 1, 1, 60)
+        l1.set("b", 2, 1, 60)
+        l1.get("a")
+        l1.set("c", 3, 1, 60)
+
+        assert l1.get("b") is None
+        assert (l1.get("a"), l1.get("c")) == (1, 3)
+
+    def test_evicts_past_memory_cap(self):
+        l1 = cache.LocalCache(max_items=100, max_bytes=10)
+        l1.set("a", "x", 6, 60)
+        l1.set("b", "y", 6, 60)
+
+        assert l1.get("a") is None
+        assert l1.stats()["bytes"] == 6
+
+    def test_oversized_values_are_not_kept(self):
+        l1 = cache.LocalCache(max_items=100, max_bytes=10)
+        l1.set("big", "x" * 50, 50, 60)
+        assert l1.get("big") is None
+
+    def test_entries_expire(self):
+        l1 = cache.LocalCache(max_items=10, max_bytes=100)
+        l1.set("a", 1, 1, 0.01)
+        time.sleep(0.02)
+        assert l1.get("a") is None
+        assert l1.stats()["items"] == 0
+
+
+class TestTwoTiers:
+    def test_hot_key_is_served_from_l1(self, redis):
+        cache.cache_set("hot", {"v": 1})
+        gets = redis.gets
+
+        for _ in range(5):
+            assert cache.cache_get("hot") == {"v": 1}
+        assert redis.gets == gets
+
+    def test_l2_value_is_promoted_to_l1(self, redis):
+        redis.store["warm"] = b'{"v":2}'
+
+        assert cache.cache_get("warm") == {"v": 2}
+        assert cache.cache_get("warm") == {"v": 2}
+        assert redis.gets == 1
+
+    def test_other_workers_invalidation_drops_l1_copy(self, redis):
+        cache.cache_set("shared", {"v": 1})
+        redis.store["shared"] = b'{"v":2}'  # another worker wrote a new value...
+
+        redis.publish(cache.INVALIDATION_CHANNEL, "other-node|shared")  # ...and announced it
+
+        assert cache.cache_get("shared") == {"v": 2}
+
+    def test_own_invalidations_are_ignored(self, redis):
+        cache.cache_set("mine", {"v": 1})
+        redis.store["mine"] = b'{"v":2}'
+
+        redis.publish(cache.INVALIDATION_CHANNEL, f"{cache.NODE_ID}|mine")
+
+        assert cache.cache_get("mine") == {"v": 1}
+
+    def test_generation_bump_reaches_other_workers(self, redis, verified_user):
+        generation = cache.user_generation(verified_user.id)  # now held in L1
+        redis.incr(f"gen:{verified_user.id}")
+        assert cache.user_generation(verified_user.id) == generation
+
+        redis.publish(cache.INVALIDATION_CHANNEL, f"other-node|gen:{verified_user.id}")
+
+        assert cache.user_generation(verified_user.id) == generation + 1
+
+
+class TestSingleFlight:
+    def test_concurrent_misses_compute_once(self, single_process):
+        calls = []
+
+        def compute(db):
+            calls.append(1)
+            time.sleep(0.1)
+            return {"v": 1}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.cache_get_or_compute("sf", None, compute)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert results == [{"v": 1}] * 8
+
+    def test_waits_for_the_worker_holding_the_lock(self, redis):
+        redis.store["lock:peer"] = b"1"  # another worker is computing "peer"
+
+        def peer_finishes():
+            time.sleep(0.1)
+            redis.store["peer"] = b'{"from":"peer"}'
+
+        threading.Thread(target=peer_finishes).start()
+        value = cache.cache_get_or_compute("peer", None, lambda db: pytest.fail("computed twice"))
+
+        assert value == {"from": "peer"}
+
+    def test_computes_itself_when_the_peer_never_delivers(self, redis, monkeypatch):
+        monkeypatch.setattr(cache.settings, "CACHE_LOCK_TIMEOUT_SEC", 0.1)
+        redis.store["lock:dead"] = b"1"
+
+        assert cache.cache_get_or_compute("dead", None, lambda db: "mine") == "mine"
+        assert redis.store["dead"] == b'"mine"'
+
+    def test_lock_is_released_when_compute_fails(self, redis):
+        def boom(db):
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            cache.cache_get_or_compute("failing", None, boom)
+        assert "lock:failing" not in redis.store
+
+
+@pytest.mark.usefixtures("single_process")
+class TestStaleWhileRevalidate:
+    @pytest.fixture
+    def refreshes(self, monkeypatch):
+        tasks = []
+        monkeypatch.setattr(cache, "_submit_refresh", tasks.append)
+        return tasks
+
+    def _store_stale(self, key, value):
+        cache.cache_set(key, {cache._FRESH_UNTIL: time.time() - 1, "value": value})
+
+    def test_fresh_value_is_served_without_refresh(self, refreshes):
+        cache.cache_get_or_compute("swr", None, lambda db: "v1", ttl=60, stale_ttl=60)
+        assert cache.cache_get_or_compute("swr", None, lambda db: "v2", ttl=60, stale_ttl=60) == "v1"
+        assert refreshes == []
+
+    def test_stale_value_is_served_while_one_refresh_runs(self, refreshes, db):
+        self._store_stale("swr", "old")
+        sessions = []
+
+        def compute(session):
+            sessions.append(session)
+            return "new"
+
+        assert cache.cache_get_or_compute("swr", db, compute, ttl=60, stale_ttl=60) == "old"
+        assert cache.cache_get_or_compute("swr", db, compute, ttl=60, stale_ttl=60) == "old"
+        assert len(refreshes) == 1
+
+        refreshes[0]()
+        assert sessions[0] is not db  # the request's session may be gone by now
+        assert cache.cache_get_or_compute("swr", db, compute, ttl=60, stale_ttl=60) == "new"
+
+    def test_deleted_key_is_recomputed_synchronously(self, refreshes):
+        self._store_stale("swr", "old")
+        cache.cache_delete("swr")
+
+        assert cache.cache_get_or_compute("swr", None, lambda db: "new", ttl=60, stale_ttl=60) == "new"
+        assert refreshes == []
+
+    def test_annual_overview_reflects_a_save_after_invalidation(self, auth_client, refreshes):
+        auth_client.post("/monthly-tracker/2026-02", json={"salary": 1000.0, "expenses": []})
+        first = auth_client.get("/overview/annual?year=2026").json()
+
+        auth_client.post("/monthly-tracker/2026-02", json={"salary": 2500.0, "expenses": []})
+        second = auth_client.get("/overview/annual?year=2026").json()
+
+        assert first["months"][1]["actual_salary"] == 1000.0
+        assert second["months"][1]["actual_salary"] == 2500.0
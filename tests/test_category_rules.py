@@ -11,6 +11,7 @@ Covers:
 - Auto-apply on POST /monthly-tracker/{month} for new expenses
 - Priority ordering (lowest priority wins first)
 - Case-insensitive pattern matching
+- Editing a rule takes effect on the next apply (compiled matcher cache)
 """
 import pytest
 
@@ -197,6 +198,39 @@ def test_apply_priority_ordering(auth_client, db, verified_user):
         db2.close()
 
 
+def test_apply_after_rule_update_uses_new_category(auth_client, db, verified_user):
+    """The compiled matcher is cached; an edited rule must not reuse it."""
+    rule = _create_rule(auth_client, "tesco", "Food")
+    month_row = make_month(db, verified_user, month="2026-08")
+    make_expense(db, month_row, name="Tesco Express", category="Other")
+
+    assert auth_client.post("/category-rules/apply?month=2026-08").json()["updated"] == 1
+
+    r = auth_client.put(f"/category-rules/{rule['id']}", json={"category": "Groceries"})
+    assert r.status_code == 200
+    assert auth_client.post("/category-rules/apply?month=2026-08").json()["updated"] == 1
+
+    auth_client.delete(f"/category-rules/{rule['id']}")
+    assert auth_client.post("/category-rules/apply?month=2026-08").json()["updated"] == 0
+
+
+def test_compiled_matcher_cache_holds_no_categories(db, verified_user):
+    from database import CategoryRule
+    from routers.category_rules import _compile_rules, rules_matcher
+
+    rules = []
+    for priority, (pattern, category) in enumerate([("tesco", "Food"), ("tes", "Shopping")]):
+        rule = CategoryRule(user_id=verified_user.id, pattern=pattern, priority=priority)
+        rule.category = category
+        rules.append(rule)
+    db.add_all(rules)
+    db.commit()
+
+    assert rules_matcher(rules).match("TESCO Metro") == "Food"
+    key = tuple((r.id, r.pattern, r._category_encrypted) for r in rules)
+    assert _compile_rules(key).match("TESCO Metro") == 0
+
+
 # ── Auto-apply on POST /monthly-tracker ───────────────────────────────────────
 
 def test_auto_apply_on_monthly_tracker_post(auth_client, db, verified_user):
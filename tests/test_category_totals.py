@@ -0,0 +1,172 @@
+"""Tests for the per-(month, category) expense rollup (monthly_category_totals)."""
+from datetime import datetime
+
+import pytest
+
+from conftest import make_expense, make_month
+from core.stats import RunningStats
+from database import MonthlyCategoryTotal, category_stats_by_month, category_totals_by_month, refresh_category_totals
+
+
+def _totals(db, month):
+    db.expire_all()
+    return category_totals_by_month(db, [month.id])[month.id]
+
+
+class TestRollupMaintenance:
+    def test_new_expenses_are_summed_per_category(self, db, verified_user):
+        month = make_month(db, verified_user)
+        make_expense(db, month, name="Rent", category="Housing", planned=800.0, actual=790.0)
+        make_expense(db, month, name="Water", category="Housing", planned=40.0, actual=45.0)
+        make_expense(db, month, name="Bus", category="Transportation", planned=60.0, actual=0.0)
+
+        totals = _totals(db, month)
+        assert totals["Housing"] == {"planned": pytest.approx(840.0), "actual": pytest.approx(835.0)}
+        assert totals["Transportation"] == {"planned": pytest.approx(60.0), "actual": 0.0}
+
+    def test_rollup_is_encrypted_at_rest(self, db, verified_user):
+        month = make_month(db, verified_user)
+        make_expense(db, month, category="SecretCategory", planned=1234.5)
+
+        cell = db.query(MonthlyCategoryTotal).one()
+        assert "SecretCategory" not in cell._category_encrypted
+        assert "1234.5" not in cell._planned_total_encrypted
+
+    def test_amount_edit_updates_cell(self, db, verified_user):
+        month = make_month(db, verified_user)
+        expense = make_expense(db, month, planned=800.0, actual=0.0)
+
+        expense.actual_amount = 810.0
+        db.commit()
+
+        assert _totals(db, month)["Housing"]["actual"] == pytest.approx(810.0)
+
+    def test_category_change_moves_amounts(self, db, verified_user):
+        month = make_month(db, verified_user)
+        expense = make_expense(db, month, category="Food", planned=100.0)
+
+        expense.category = "Entertainment"
+        db.commit()
+
+        assert set(_totals(db, month)) == {"Entertainment"}
+
+    def test_soft_delete_and_restore(self, db, verified_user):
+        month = make_month(db, verified_user)
+        make_expense(db, month, name="Rent", planned=800.0)
+        gone = make_expense(db, month, name="Extra", planned=50.0)
+
+        gone.deleted_at = datetime.utcnow()
+        db.commit()
+        assert _totals(db, month)["Housing"]["planned"] == pytest.approx(800.0)
+
+        gone.deleted_at = None
+        db.commit()
+        assert _totals(db, month)["Housing"]["planned"] == pytest.approx(850.0)
+
+    def test_last_expense_removed_drops_category(self, db, verified_user):
+        month = make_month(db, verified_user)
+        expense = make_expense(db, month, category="Utilities")
+
+        db.delete(expense)
+        db.commit()
+
+        assert _totals(db, month) == {}
+        assert db.query(MonthlyCategoryTotal).count() == 0
+
+    def test_moving_expense_refreshes_both_months(self, db, verified_user):
+        jan = make_month(db, verified_user, month="2026-01")
+        feb = make_month(db, verified_user, month="2026-02")
+        expense = make_expense(db, jan, planned=300.0)
+
+        expense.monthly_data_id = feb.id
+        db.commit()
+
+        assert _totals(db, jan) == {}
+        assert _totals(db, feb)["Housing"]["planned"] == pytest.approx(300.0)
+
+    def test_deleting_month_removes_cells(self, db, verified_user):
+        month = make_month(db, verified_user)
+        make_expense(db, month)
+
+        db.delete(month)
+        db.commit()
+
+        assert db.query(MonthlyCategoryTotal).count() == 0
+
+    def test_rollback_discards_pending_refresh(self, db, verified_user):
+        month = make_month(db, verified_user)
+        expense = make_expense(db, month, planned=800.0)
+
+        expense.planned_amount = 1.0
+        db.flush()
+        db.rollback()
+        db.commit()
+
+        assert _totals(db, month)["Housing"]["planned"] == pytest.approx(800.0)
+
+    def test_refresh_repairs_drift(self, db, verified_user):
+        month = make_month(db, verified_user)
+        make_expense(db, month, planned=800.0)
+        db.query(MonthlyCategoryTotal).delete()
+        db.commit()
+        assert _totals(db, month) == {}
+
+        refresh_category_totals(db, [month.id])
+        db.commit()
+
+        assert _totals(db, month)["Housing"]["planned"] == pytest.approx(800.0)
+
+
+class TestRollupStatistics:
+    def _stats(self, db, month):
+        db.expire_all()
+        return category_stats_by_month(db, [month.id])[month.id]
+
+    def test_cells_carry_running_stats_of_actual_amounts(self, db, verified_user):
+        month = make_month(db, verified_user)
+        for actual in (10.0, 20.0, 60.0):
+            make_expense(db, month, category="Food", actual=actual)
+
+        stats = self._stats(db, month)["Food"]
+        assert stats.n == 3
+        assert stats.mean == pytest.approx(30.0)
+        assert stats.std == pytest.approx(RunningStats.of([10.0, 20.0, 60.0]).std)
+
+    def test_edits_and_deletes_update_stats(self, db, verified_user):
+        month = make_month(db, verified_user)
+        keep = make_expense(db, month, category="Food", actual=10.0)
+        gone = make_expense(db, month, category="Food", actual=500.0)
+
+        keep.actual_amount = 30.0
+        gone.deleted_at = datetime.utcnow()
+        db.commit()
+
+        assert self._stats(db, month)["Food"] == RunningStats.of([30.0])
+
+    def test_stats_are_encrypted_at_rest(self, db, verified_user):
+        month = make_month(db, verified_user)
+        make_expense(db, month, category="Food", actual=1234.5)
+
+        cell = db.query(MonthlyCategoryTotal).one()
+        assert "1234.5" not in cell._actual_stats_encrypted
+
+
+class TestRollupThroughEndpoints:
+    def test_bulk_delete_updates_rollup(self, auth_client, db, verified_user):
+        month = make_month(db, verified_user)
+        a = make_expense(db, month, name="A", category="Food", planned=10.0)
+        make_expense(db, month, name="B", category="Food", planned=5.0)
+
+        r = auth_client.post("/expenses/bulk-delete", json={"ids": [a.id]})
+        assert r.status_code == 200
+
+        assert _totals(db, month)["Food"]["planned"] == pytest.approx(5.0)
+
+    def test_update_expense_updates_rollup(self, auth_client, db, verified_user):
+        month = make_month(db, verified_user)
+        expense = make_expense(db, month, category="Food", planned=10.0)
+
+        r = auth_client.put(f"/expenses/{expense.id}", json={"category": "Other"})
+        assert r.status_code == 200
+
+        assert set(_totals(db, month)) == {"Other"}
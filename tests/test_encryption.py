@@ -13,8 +13,14 @@ from database import (
     MonthlyData,
     MonthlyExpense,
     User,
+    decrypt_cache_stats,
     decrypt_value,
     encrypt_value,
+    find_month_row,
+    month_blind_index,
+    month_period_key,
+    months_in_range,
+    reset_decrypt_cache_stats,
 )
 from security import get_password_hash
 
@@ -43,6 +49,10 @@ class TestEncryptionHelpers:
         enc2 = encrypt_value(val)
         assert enc1 != enc2
 
+    def test_cipher_is_cached(self):
+        from database import get_fernet
+        assert get_fernet() is get_fernet()
+
     def test_missing_encryption_key_raises(self, monkeypatch):
         monkeypatch.delenv("ENCRYPTION_KEY", raising=False)
         with pytest.raises(ValueError, match="ENCRYPTION_KEY"):
@@ -50,6 +60,69 @@ class TestEncryptionHelpers:
             get_encryption_key()
 
 
+class TestKeyRotation:
+    @pytest.fixture
+    def rotate_to_new_key(self, monkeypatch):
+        """Make a fresh key primary and keep the current one as a previous key."""
+        from cryptography.fernet import Fernet
+        from database import reset_encryption_cache
+
+        old_key = os.environ["ENCRYPTION_KEY"]
+        new_key = Fernet.generate_key().decode()
+
+        def rotate():
+            monkeypatch.setenv("ENCRYPTION_KEY", new_key)
+            monkeypatch.setenv("ENCRYPTION_KEYS_PREVIOUS", old_key)
+            reset_encryption_cache()
+            return old_key, new_key
+
+        yield rotate
+        monkeypatch.undo()
+        reset_encryption_cache()
+
+    def test_old_ciphertext_still_decrypts(self, rotate_to_new_key):
+        legacy = encrypt_value("legacy")
+        rotate_to_new_key()
+        assert decrypt_value(legacy) == "legacy"
+
+    def test_rotate_value_reencrypts_under_primary(self, rotate_to_new_key):
+        from cryptography.fernet import Fernet
+        from database import rotate_value
+
+        legacy = encrypt_value("balance")
+        _, new_key = rotate_to_new_key()
+        rotated = rotate_value(legacy)
+        assert Fernet(new_key.encode()).decrypt(rotated.encode()) == b"balance"
+
+    def test_blind_index_stable_during_rotation(self, rotate_to_new_key):
+        before = month_blind_index("2026-01")
+        rotate_to_new_key()
+        assert month_blind_index("2026-01") == before
+
+    def test_pinned_blind_index_key_survives_dropping_old_key(self, rotate_to_new_key, monkeypatch):
+        from database import get_blind_index_key, reset_encryption_cache
+
+        before = month_blind_index("2026-01")
+        monkeypatch.setenv("BLIND_INDEX_KEY", f"hex:{get_blind_index_key().hex()}")
+        rotate_to_new_key()
+        monkeypatch.delenv("ENCRYPTION_KEYS_PREVIOUS")
+        reset_encryption_cache()
+        assert month_blind_index("2026-01") == before
+
+    def test_reset_rereads_blind_index_key(self, monkeypatch):
+        from database import reset_encryption_cache
+
+        before = month_blind_index("2026-01")
+        monkeypatch.setenv("BLIND_INDEX_KEY", "a-different-blind-index-key")
+        reset_encryption_cache()
+        try:
+            assert month_blind_index("2026-01") != before
+        finally:
+            monkeypatch.undo()
+            reset_encryption_cache()
+        assert month_blind_index("2026-01") == before
+
+
 class TestUserFieldEncryption:
     def test_username_not_stored_as_plaintext(self, db):
         user = User(
@@ -104,6 +177,151 @@ class TestMonthlyDataEncryption:
         assert m.salary_planned == pytest.approx(99999.0)
 
 
+class TestMonthBlindIndex:
+    def test_setter_writes_blind_index(self, db, verified_user):
+        m = make_month(db, verified_user, month="2026-03")
+        assert m.month_bidx == month_blind_index("2026-03")
+        assert "2026" not in m.month_bidx
+
+    def test_blind_index_is_deterministic_and_distinct(self):
+        assert month_blind_index("2026-04") == month_blind_index("2026-04")
+        assert month_blind_index("2026-04") != month_blind_index("2026-05")
+
+    def test_find_month_row_uses_index(self, db, verified_user):
+        make_month(db, verified_user, month="2026-01")
+        target = make_month(db, verified_user, month="2026-02")
+        assert find_month_row(db, verified_user.id, "2026-02").id == target.id
+        assert find_month_row(db, verified_user.id, "2026-06") is None
+
+    def test_find_month_row_scoped_to_user(self, db, verified_user, second_user):
+        make_month(db, second_user, month="2026-01")
+        assert find_month_row(db, verified_user.id, "2026-01") is None
+
+    def test_duplicate_month_rejected(self, db, verified_user):
+        from sqlalchemy.exc import IntegrityError
+
+        make_month(db, verified_user, month="2026-01")
+        with pytest.raises(IntegrityError):
+            make_month(db, verified_user, month="2026-01")
+        db.rollback()
+
+
+class TestMonthPeriodKey:
+    def test_setter_writes_period(self, db, verified_user):
+        m = make_month(db, verified_user, month="2026-03")
+        assert m.period == month_period_key("2026-03")
+
+    def test_period_key_preserves_order_across_years(self):
+        keys = [month_period_key(m) for m in ("2025-11", "2025-12", "2026-01", "2026-02")]
+        assert keys == sorted(keys)
+        assert len(set(keys)) == 4
+
+    def test_period_key_hides_calendar_value(self):
+        assert month_period_key("2026-01") != 2026 * 12
+
+    def test_period_key_rejects_garbage(self):
+        assert month_period_key("not-a-month") is None
+        assert month_period_key("2026-13") is None
+        assert month_period_key(None) is None
+
+    def test_months_in_range_is_inclusive_and_ordered(self, db, verified_user):
+        for month in ("2025-12", "2026-01", "2026-02", "2026-03"):
+            make_month(db, verified_user, month=month)
+        rows = months_in_range(db, verified_user.id, "2026-01", "2026-02").all()
+        assert [r.month for r in rows] == ["2026-01", "2026-02"]
+        open_ended = months_in_range(db, verified_user.id, start="2026-02").all()
+        assert [r.month for r in open_ended] == ["2026-02", "2026-03"]
+
+    def test_months_in_range_rejects_invalid_bounds(self, db, verified_user):
+        with pytest.raises(ValueError):
+            months_in_range(db, verified_user.id, "2026-01", "2026-13")
+
+
+class TestDecryptMemoization:
+    def test_repeated_reads_hit_cache(self, db, verified_user, monkeypatch):
+        month = make_month(db, verified_user)
+        expense = make_expense(db, month, name="Coffee")
+        db.commit()  # start cold: ending the transaction drops decrypt memos
+
+        calls = []
+        import database
+        real = database.decrypt_value
+        monkeypatch.setattr(database, "decrypt_value", lambda v: calls.append(v) or real(v))
+        reset_decrypt_cache_stats()
+
+        for _ in range(3):
+            assert expense.name == "Coffee"
+        assert len(calls) == 1
+        stats = decrypt_cache_stats()
+        assert stats["hits"] == 2 and stats["misses"] == 1
+        assert stats["hit_rate"] == pytest.approx(2 / 3, abs=1e-3)
+
+    def test_setter_invalidates_stale_plaintext(self, db, verified_user):
+        month = make_month(db, verified_user)
+        expense = make_expense(db, month, name="Old name")
+        assert expense.name == "Old name"
+        expense.name = "New name"
+        assert expense.name == "New name"
+        db.commit()
+        db.refresh(expense)
+        assert expense.name == "New name"
+
+    @pytest.mark.parametrize("end", ["commit", "rollback", "close"])
+    def test_memo_dropped_when_transaction_ends(self, db, verified_user, end):
+        from sqlalchemy import inspect
+
+        expense = make_expense(db, make_month(db, verified_user), name="Coffee")
+        assert expense.name == "Coffee"
+        state = inspect(expense)
+        assert "Coffee" in state.info["decrypt_memo"].values()
+
+        getattr(db, end)()
+        assert "decrypt_memo" not in state.info
+
+    def test_detached_objects_are_not_cached(self):
+        e = MonthlyExpense()
+        e.name = "Loose"
+        reset_decrypt_cache_stats()
+        assert e.name == "Loose"
+        assert decrypt_cache_stats()["hits"] == 0
+
+
+class TestBatchDecryption:
+    def test_decrypt_many_dedupes_and_skips_none(self):
+        from database import decrypt_many
+
+        a, b = encrypt_value("alpha"), encrypt_value("beta")
+        result = decrypt_many([a, None, b, a])
+        assert result == {a: "alpha", b: "beta"}
+
+    def test_decrypt_many_process_pool(self, monkeypatch, caplog):
+        import database
+
+        monkeypatch.setattr(database, "DECRYPT_POOL_THRESHOLD", 2)
+        monkeypatch.setattr(database, "DECRYPT_POOL_WORKERS", 2)
+        tokens = [encrypt_value(str(i)) for i in range(20)]
+        try:
+            result = database.decrypt_many(tokens)
+        finally:
+            database.shutdown_decrypt_pool()
+        assert [result[t] for t in tokens] == [str(i) for i in range(20)]
+        assert "decrypt pool unavailable" not in caplog.text
+
+    def test_prefetch_warms_session_memo(self, db, verified_user, monkeypatch):
+        import database
+        from database import prefetch_decrypted
+
+        month = make_month(db, verified_user)
+        for i in range(3):
+            make_expense(db, month, name=f"Item {i}")
+        db.commit()  # start cold: ending the transaction drops decrypt memos
+        expenses = db.query(MonthlyExpense).filter(MonthlyExpense.monthly_data_id == month.id).all()
+
+        prefetch_decrypted(expenses, "name")
+        monkeypatch.setattr(database, "decrypt_value", lambda v: pytest.fail("not prefetched"))
+        assert sorted(e.name for e in expenses) == ["Item 0", "Item 1", "Item 2"]
+
+
 class TestMonthlyExpenseEncryption:
     def test_expense_name_not_plaintext(self, db, verified_user):
         month = make_month(db, verified_user)
@@ -4,8 +4,11 @@ Tests for the expense search endpoint.
 Coverage targets:
   routers/insights.py — GET /insights/search
 """
+from unittest.mock import patch
+
 import pytest
 
+from database import ExpenseSearchToken, MonthlyExpense, SessionLocal, build_missing_search_indexes
 from tests.conftest import make_month, make_expense
 
 
@@ -207,3 +210,90 @@ class TestExpenseSearch:
         assert body["total"] == 1
         assert body["items"][0]["month"] == "2026-01"
         assert body["items"][0]["category"] == "Food"
+
+
+class TestSearchIndex:
+    def _spy_decrypts(self):
+        import database
+
+        decrypted = []
+        real = database.decrypt_many
+
+        def spy(tokens):
+            tokens = list(tokens)
+            decrypted.extend(tokens)
+            return real(tokens)
+
+        return decrypted, patch("database.decrypt_many", side_effect=spy)
+
+    def test_only_candidates_are_decrypted(self, auth_client, db, verified_user):
+        month = make_month(db, verified_user, month="2026-01")
+        make_expense(db, month, name="Netflix", category="Entertainment")
+        for i in range(20):
+            make_expense(db, month, name=f"Groceries {i}", category="Food")
+        name_tokens = {e._name_encrypted: e.name for e in db.query(MonthlyExpense)}
+        auth_client.get("/insights/search")  # first search builds the account's index
+        db.commit()  # start cold: ending the transaction drops decrypt memos
+
+        decrypted, spy = self._spy_decrypts()
+        with spy:
+            r = auth_client.get("/insights/search?q=flix")
+
+        assert [i["name"] for i in r.json()["items"]] == ["Netflix"]
+        assert [name_tokens[t] for t in decrypted if t in name_tokens] == ["Netflix"]
+
+    def test_trigram_false_positives_are_rechecked(self, auth_client, db, verified_user):
+        month = make_month(db, verified_user, month="2026-01")
+        make_expense(db, month, name="abcd bcde", category="Other")  # every trigram of "abcde", not adjacent
+
+        r = auth_client.get("/insights/search?q=abcde")
+        assert r.json()["total"] == 0
+
+    def test_index_follows_renames_and_deletes(self, auth_client, db, verified_user):
+        month = make_month(db, verified_user, month="2026-01")
+        expense = make_expense(db, month, name="Spotify", category="Music")
+
+        expense.name = "Apple Music"
+        db.commit()
+        assert auth_client.get("/insights/search?q=spotify").json()["total"] == 0
+        assert auth_client.get("/insights/search?q=apple").json()["total"] == 1
+
+        db.delete(expense)
+        db.commit()
+        assert db.query(ExpenseSearchToken).filter_by(expense_id=expense.id).count() == 0
+
+    def test_unindexed_account_is_searched_without_writing(self, auth_client, db, verified_user):
+        month = make_month(db, verified_user, month="2026-01")
+        make_expense(db, month, name="Council Tax", category="Housing", tags=["bills"])
+        db.query(ExpenseSearchToken).delete()
+        verified_user.search_indexed_at = None
+        db.commit()
+
+        r = auth_client.get("/expenses/search?q=council&category=Housing&tag=bills")
+        assert r.json()["total"] == 1
+        db.refresh(verified_user)
+        assert verified_user.search_indexed_at is None
+        assert db.query(ExpenseSearchToken).count() == 0
+
+    def test_missing_indexes_are_built_in_the_background(self, db, verified_user):
+        make_expense(db, make_month(db, verified_user, month="2026-01"), name="Council Tax")
+        db.query(ExpenseSearchToken).delete()
+        verified_user.search_indexed_at = None
+        db.commit()
+
+        build_missing_search_indexes(SessionLocal)
+
+        db.refresh(verified_user)
+        assert verified_user.search_indexed_at is not None
+        assert db.query(ExpenseSearchToken).count() > 0
+
+    def test_tokens_are_scoped_per_user(self, db, verified_user, second_user):
+        for user in (verified_user, second_user):
+            make_expense(db, make_month(db, user, month="2026-01"), name="Rent", category="Housing")
+
+        tokens = {
+            user_id: {t for (t,) in db.query(ExpenseSearchToken.token).filter_by(user_id=user_id)}
+            for user_id in (verified_user.id, second_user.id)
+        }
+        assert tokens[verified_user.id]
+        assert not tokens[verified_user.id] & tokens[second_user.id]
@@ -1,11 +1,14 @@
 """Tests for individual expense CRUD and monthly tracker endpoints."""
 import base64
 from datetime import datetime
+from unittest.mock import patch
 
 import pytest
+from sqlalchemy import event
 
+import database
 from conftest import TEST_EMAIL, make_expense, make_month
-from database import MonthlyExpense
+from database import IncomeSource, MonthlyExpense, engine, load_tracker_month
 
 
 class TestUpdateExpense:
@@ -191,6 +194,78 @@ class TestMonthlyTrackerGet:
         r = auth_client.get("/monthly-tracker/2026/01")
         assert r.status_code in (404, 422)  # path routing
 
+    def test_only_the_returned_page_is_decrypted(self, auth_client, db, verified_user):
+        month = make_month(db, verified_user, "2026-09")
+        for i in range(30):
+            make_expense(db, month, f"Expense{i}", "Food", 10, 5)
+        name_tokens = {e._name_encrypted for e in db.query(MonthlyExpense)}
+        db.commit()  # start cold: ending the transaction drops decrypt memos
+
+        decrypted = []
+        real_decrypt_many = database.decrypt_many
+
+        def spy(tokens):
+            tokens = list(tokens)
+            decrypted.extend(tokens)
+            return real_decrypt_many(tokens)
+
+        with patch("database.decrypt_many", side_effect=spy):
+            r = auth_client.get("/monthly-tracker/2026-09?limit=5")
+
+        data = r.json()
+        assert data["expenses"]["total"] == 30
+        assert [i["name"] for i in data["expenses"]["items"]] == [f"Expense{i}" for i in range(29, 24, -1)]
+        assert data["rows"] == [{"category": "Food", "projected": 300.0, "actual": 150.0}]
+        assert len(name_tokens & set(decrypted)) == 5
+
+    def test_category_filter_pages_and_counts_matches(self, auth_client, db, verified_user):
+        month = make_month(db, verified_user, "2026-10")
+        for i in range(6):
+            make_expense(db, month, f"Expense{i}", "Food" if i % 2 else "Housing", 10, 10)
+
+        r1 = auth_client.get("/monthly-tracker/2026-10?category=Food&limit=2")
+        page1 = r1.json()
+        assert page1["expenses"]["total"] == 3
+        assert [i["name"] for i in page1["expenses"]["items"]] == ["Expense5", "Expense3"]
+        assert page1["rows"] == [{"category": "Food", "projected": 30.0, "actual": 30.0}]
+
+        cursor = page1["expenses"]["next_cursor"]
+        r2 = auth_client.get(f"/monthly-tracker/2026-10?category=Food&limit=2&cursor={cursor}")
+        page2 = r2.json()["expenses"]
+        assert [i["name"] for i in page2["items"]] == ["Expense1"]
+        assert page2["next_cursor"] is None
+
+    def test_loader_is_a_single_statement(self, db, verified_user):
+        month = make_month(db, verified_user, "2026-11")
+        for i in range(4):
+            make_expense(db, month, f"Expense{i}", "Food", 10, 10)
+        source = IncomeSource(user_id=verified_user.id, monthly_data_id=month.id, source_type="salary")
+        source.name = "Salary"
+        source.amount = 2500.0
+        db.add(source)
+        db.commit()
+        user_id = verified_user.id
+        db.expire_all()
+
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            month_row, expenses, total = load_tracker_month(
+                db, user_id, "2026-11", limit=2
+            )
+            income = month_row.active_income_sources
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+        assert len(statements) == 1
+        assert total == 4
+        assert len(expenses) == 2
+        assert [s.name for s in income] == ["Salary"]
+
 
 class TestExpenseSearch:
     def test_search_unauthenticated_returns_401_or_403(self, client):
@@ -308,6 +383,10 @@ class TestExpenseSearch:
         r = auth_client.get("/expenses/search?to=bad-date")
         assert r.status_code == 422
 
+    def test_search_out_of_range_month_returns_422(self, auth_client):
+        r = auth_client.get("/expenses/search?from=2026-01&to=2026-13")
+        assert r.status_code == 422
+
 
 class TestMonthlyTrackerPost:
     def test_save_new_actuals(self, auth_client):
@@ -353,6 +432,24 @@ class TestMonthlyTrackerPost:
         })
         assert r.json()["remaining_actual"] == 2000.0
 
+    def test_save_actuals_mixes_updates_and_inserts(self, auth_client, db, verified_user):
+        month = make_month(db, verified_user, "2026-12")
+        make_expense(db, month, "Rent", "Housing", planned=800.0, actual=0.0)
+
+        r = auth_client.post("/monthly-tracker/2026-12", json={
+            "salary": 3000,
+            "expenses": [
+                {"name": "Rent", "amount": 800, "category": "Housing"},
+                {"name": "Coffee", "amount": 12, "category": "Food"},
+                {"name": "Coffee", "amount": 15, "category": "Food"},
+            ],
+        })
+        assert r.status_code == 200
+        assert r.json()["total_actual"] == 815.0
+
+        rows = db.query(MonthlyExpense).order_by(MonthlyExpense.id).all()
+        assert [(e.name, e.actual_amount) for e in rows] == [("Rent", 800.0), ("Coffee", 15.0)]
+
 
 class TestExpenseNotesTags:
     """Phase 13.3 — Expense Notes & Tags."""
@@ -3,12 +3,17 @@ Tests for data export endpoints.
 
 Coverage targets:
   routers/export.py — GET /export/csv, GET /export/pdf, GET /export/calendar.ics
+  core/json_stream.py — incremental JSON writer behind the full-backup/GDPR exports
 """
+import json
+
 import pytest
 from datetime import datetime
 
 from tests.conftest import make_month, make_expense
+from core.json_stream import stream_json_object
 from database import RecurringExpense
+from routers import export as export_router
 
 
 def make_recurring(db, user, name="Rent", category="Housing", amount=1000.0,
@@ -393,3 +398,77 @@ class TestGdprExport:
         # Should parse as a datetime without error
         from datetime import datetime as dt
         dt.fromisoformat(exported_at.replace("Z", "+00:00"))
+
+
+class TestStreamedExports:
+    """Full-backup and GDPR bodies are written incrementally, a batch of rows at a time."""
+
+    @pytest.fixture
+    def small_batches(self, monkeypatch):
+        monkeypatch.setattr(export_router, "EXPORT_BATCH_SIZE", 2)
+
+    def test_writer_matches_json_dumps(self):
+        data = {
+            "profile": {"email": "a@b.c", "created_at": datetime(2026, 1, 2)},
+            "empty": [],
+            "rows": [{"id": 1, "tags": ["x", "y"]}, {"id": 2, "tags": []}],
+            "count": 2,
+        }
+        fields = [(k, iter(v) if isinstance(v, list) else v) for k, v in data.items()]
+
+        streamed = b"".join(stream_json_object(fields)).decode()
+
+        assert streamed == json.dumps(data, indent=2, default=str)
+
+    def test_writer_flushes_first_field_before_consuming_the_rest(self):
+        def fields():
+            yield "profile", {"id": 1}
+            raise AssertionError("later sections must not run before the first chunk is sent")
+
+        first = next(stream_json_object(fields()))
+        assert first.startswith(b'{\n  "profile": ')
+
+    def test_writer_chunks_large_arrays(self):
+        rows = ({"id": i, "name": "x" * 100} for i in range(2000))
+        chunks = list(stream_json_object([("rows", rows)], chunk_bytes=4096))
+
+        assert len(chunks) > 10
+        assert len(json.loads(b"".join(chunks))["rows"]) == 2000
+
+    def test_full_backup_spans_batches_in_order(self, auth_client, db, verified_user, small_batches):
+        for i in range(1, 6):
+            month = make_month(db, verified_user, month=f"2026-{i:02d}")
+            make_expense(db, month, name=f"Item {i}", category="Food")
+
+        body = auth_client.get("/export/full-backup").json()
+
+        assert [m["month"] for m in body["months"]] == [f"2026-{i:02d}" for i in range(1, 6)]
+        assert [m["expenses"][0]["name"] for m in body["months"]] == [f"Item {i}" for i in range(1, 6)]
+
+    def test_gdpr_spans_batches(self, auth_client, db, verified_user, small_batches):
+        for i in range(1, 6):
+            month = make_month(db, verified_user, month=f"2026-{i:02d}")
+            make_expense(db, month, name=f"Item {i}a", category="Food")
+            make_expense(db, month, name=f"Item {i}b", category="Food")
+
+        body = auth_client.get("/export/gdpr").json()
+
+        assert len(body["monthly_budgets"]) == 5
+        assert [e["name"] for e in body["expenses"]] == [f"Item {i}{s}" for i in range(1, 6) for s in "ab"]
+        assert {e["month"] for e in body["expenses"]} == {f"2026-{i:02d}" for i in range(1, 6)}
+
+    def test_written_rows_are_released(self, db, verified_user, small_batches):
+        for i in range(1, 6):
+            make_expense(db, make_month(db, verified_user, month=f"2026-{i:02d}"), category="Food")
+        user_id = verified_user.id
+        db.expunge_all()
+        db.commit()  # start cold: ending the transaction drops decrypt memos
+
+        seen = 0
+        for month, expenses in export_router._months_with_expenses(db, user_id):
+            seen += 1
+            # Never more than the current batch of months (and its expenses) in the session
+            assert len(db.identity_map) <= 2 * 2
+        assert seen == 5
+        assert len(db.identity_map) == 0
+        assert not any("decrypt_memo" in state.info for state in db.info.get("decrypt_memo_rows", ()))
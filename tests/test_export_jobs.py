@@ -0,0 +1,306 @@
+"""
+Tests for background export jobs.
+
+Coverage targets:
+  routers/export.py — POST /export/jobs (dedup, per-kind render limits), GET /export/jobs/{id},
+                      GET /export/jobs/{id}/download, run_export_job, maintain_export_jobs
+  core/storage.py   — LocalStorage
+  database.py       — User.data_version bumps
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from core import storage as storage_module
+from core.storage import LocalStorage
+from database import Debt, ExportJob, SessionLocal, User
+from routers import export as export_router
+from tests.conftest import make_expense, make_month
+
+
+@pytest.fixture
+def artifacts(tmp_path, monkeypatch):
+    store = LocalStorage(str(tmp_path / "exports"))
+    monkeypatch.setattr(storage_module, "_storage", store)
+    return store
+
+
+@pytest.fixture
+def queued(monkeypatch):
+    """Collect submitted job ids instead of running them on the worker pool."""
+    ids = []
+    monkeypatch.setattr(export_router, "_submit_export_job", ids.append)
+    return ids
+
+
+@pytest.fixture
+def inline(monkeypatch):
+    """Run submitted jobs synchronously."""
+    monkeypatch.setattr(export_router, "_submit_export_job", export_router.run_export_job)
+
+
+def _poll(auth_client, db, job_id):
+    # The test client shares the db session; drop its copy of rows a worker changed
+    db.expire_all()
+    return auth_client.get(f"/export/jobs/{job_id}").json()
+
+
+def _age(db, job_id, hours=2):
+    """Backdate a job past the per-hour render limits."""
+    db.expire_all()
+    db.get(ExportJob, job_id).created_at = datetime.utcnow() - timedelta(hours=hours)
+    db.commit()
+
+
+def _data_version(db, user_id):
+    db.expire_all()
+    return db.query(User.data_version).filter(User.id == user_id).scalar()
+
+
+class TestCreateJob:
+    def test_full_backup_job_renders_and_downloads(self, auth_client, db, verified_user, artifacts, inline):
+        month = make_month(db, verified_user, month="2026-03")
+        make_expense(db, month, name="Groceries", category="Food")
+
+        r = auth_client.post("/export/jobs", json={"kind": "full-backup"})
+        assert r.status_code == 202
+        job = _poll(auth_client, db, r.json()["id"])
+        assert job["status"] == "done"
+        assert job["filename"].startswith("backup-")
+
+        download = auth_client.get(job["download_url"])
+        assert download.status_code == 200
+        assert "attachment" in download.headers["content-disposition"]
+        body = download.json()
+        assert body["months"][0]["expenses"][0]["name"] == "Groceries"
+        assert int(download.headers["content-length"]) == job["size_bytes"]
+
+    def test_new_job_is_pending_until_a_worker_runs_it(self, auth_client, db, artifacts, queued):
+        r = auth_client.post("/export/jobs", json={"kind": "gdpr"})
+
+        assert r.json()["status"] == "pending"
+        assert r.json()["download_url"] is None
+        assert queued == [r.json()["id"]]
+        assert auth_client.get(f"/export/jobs/{r.json()['id']}/download").status_code == 409
+
+        export_router.run_export_job(queued[0])
+        assert _poll(auth_client, db, r.json()["id"])["status"] == "done"
+
+    def test_identical_request_reuses_the_job(self, auth_client, artifacts, queued):
+        first = auth_client.post("/export/jobs", json={"kind": "gdpr"}).json()
+        second = auth_client.post("/export/jobs", json={"kind": "gdpr"}).json()
+
+        assert second["id"] == first["id"]
+        assert len(queued) == 1
+
+    def test_data_change_starts_a_new_job(self, auth_client, db, verified_user, artifacts, inline):
+        first = auth_client.post("/export/jobs", json={"kind": "full-backup"}).json()
+        _age(db, first["id"])
+        make_month(db, verified_user, month="2026-04")
+        second = _poll(auth_client, db, auth_client.post("/export/jobs", json={"kind": "full-backup"}).json()["id"])
+
+        assert second["id"] != first["id"]
+        assert len(auth_client.get(second["download_url"]).json()["months"]) == 1
+
+    def test_profile_change_starts_a_new_job(self, auth_client, db, verified_user, artifacts, inline):
+        first = auth_client.post("/export/jobs", json={"kind": "gdpr"}).json()
+        _age(db, first["id"])
+        verified_user.base_currency = "EUR"
+        db.commit()
+
+        second = _poll(auth_client, db, auth_client.post("/export/jobs", json={"kind": "gdpr"}).json()["id"])
+        assert second["id"] != first["id"]
+        assert auth_client.get(second["download_url"]).json()["profile"]["base_currency"] == "EUR"
+
+    @pytest.mark.parametrize("kind", ["full-backup", "gdpr"])
+    def test_new_renders_are_limited_per_hour(self, auth_client, db, verified_user, artifacts, queued, kind):
+        first = auth_client.post("/export/jobs", json={"kind": kind})
+        assert first.status_code == 202
+        make_month(db, verified_user, month="2026-04")
+
+        assert auth_client.post("/export/jobs", json={"kind": kind}).status_code == 429
+        _age(db, first.json()["id"])
+        assert auth_client.post("/export/jobs", json={"kind": kind}).status_code == 202
+
+    def test_render_limit_is_per_kind(self, auth_client, artifacts, queued):
+        assert auth_client.post("/export/jobs", json={"kind": "gdpr"}).status_code == 202
+        assert auth_client.post("/export/jobs", json={"kind": "full-backup"}).status_code == 202
+
+    def test_params_are_part_of_the_dedup_key(self, auth_client, db, verified_user, artifacts, queued):
+        make_month(db, verified_user, month="2026-01")
+        make_month(db, verified_user, month="2026-02")
+
+        a = auth_client.post("/export/jobs", json={"kind": "pdf", "month": "2026-01"}).json()
+        b = auth_client.post("/export/jobs", json={"kind": "pdf", "month": "2026-02"}).json()
+
+        assert a["id"] != b["id"]
+        assert a["params"] == {"month": "2026-01"}
+
+    def test_missing_artifact_is_rendered_again(self, auth_client, db, artifacts, inline):
+        first = auth_client.post("/export/jobs", json={"kind": "gdpr"}).json()
+        artifacts.clear()
+        db.expire_all()
+
+        second = _poll(auth_client, db, auth_client.post("/export/jobs", json={"kind": "gdpr"}).json()["id"])
+        assert second["id"] != first["id"]
+        assert auth_client.get(second["download_url"]).status_code == 200
+
+    def test_pdf_job_renders_a_pdf(self, auth_client, db, verified_user, artifacts, inline):
+        pytest.importorskip("fpdf")
+        make_expense(db, make_month(db, verified_user, month="2026-02"), category="Food")
+
+        job_id = auth_client.post("/export/jobs", json={"kind": "pdf", "month": "2026-02"}).json()["id"]
+        job = _poll(auth_client, db, job_id)
+
+        assert job["filename"] == "budget_report_2026-02.pdf"
+        download = auth_client.get(job["download_url"])
+        assert download.headers["content-type"] == "application/pdf"
+        assert download.content.startswith(b"%PDF")
+
+    def test_pdf_requires_month(self, auth_client, queued):
+        r = auth_client.post("/export/jobs", json={"kind": "pdf"})
+        assert r.status_code in (422, 503)
+
+    def test_pdf_for_month_without_data_is_404(self, auth_client, queued):
+        r = auth_client.post("/export/jobs", json={"kind": "pdf", "month": "2026-09"})
+        assert r.status_code in (404, 503)
+        assert queued == []
+
+    def test_unknown_kind_is_rejected(self, auth_client, queued):
+        assert auth_client.post("/export/jobs", json={"kind": "xlsx"}).status_code == 422
+
+    def test_unauthenticated(self, client):
+        assert client.post("/export/jobs", json={"kind": "gdpr"}).status_code in (401, 403)
+
+    def test_production_refuses_per_host_storage(self, auth_client, artifacts, queued, monkeypatch):
+        monkeypatch.setattr(export_router.settings, "ENVIRONMENT", "production")
+        monkeypatch.setattr(export_router.settings, "EXPORT_STORAGE_URL", "")
+
+        assert auth_client.post("/export/jobs", json={"kind": "gdpr"}).status_code == 503
+        assert queued == []
+
+    def test_production_accepts_configured_storage(self, auth_client, artifacts, queued, monkeypatch):
+        monkeypatch.setattr(export_router.settings, "ENVIRONMENT", "production")
+        monkeypatch.setattr(export_router.settings, "EXPORT_STORAGE_URL", "file:///srv/shared/exports")
+
+        assert auth_client.post("/export/jobs", json={"kind": "gdpr"}).status_code == 202
+
+    def test_jobs_are_private(self, auth_client, db, second_user, artifacts):
+        job = ExportJob(user_id=second_user.id, kind="gdpr", params="{}", dedup_key="x")
+        db.add(job)
+        db.commit()
+
+        assert auth_client.get(f"/export/jobs/{job.id}").status_code == 404
+        assert auth_client.get(f"/export/jobs/{job.id}/download").status_code == 404
+
+
+class TestRunJob:
+    def test_failed_render_records_the_error(self, auth_client, db, artifacts, queued, monkeypatch):
+        def boom(db, user, params):
+            raise RuntimeError("disk on fire")
+
+        monkeypatch.setitem(export_router._EXPORT_KINDS, "gdpr", boom)
+        job_id = auth_client.post("/export/jobs", json={"kind": "gdpr"}).json()["id"]
+        export_router.run_export_job(job_id)
+
+        job = _poll(auth_client, db, job_id)
+        assert job["status"] == "failed"
+        assert job["error"] == "Export failed"
+
+    def test_job_is_rendered_once(self, auth_client, artifacts, queued, monkeypatch):
+        calls = []
+        render = export_router._EXPORT_KINDS["gdpr"]
+        monkeypatch.setitem(
+            export_router._EXPORT_KINDS, "gdpr", lambda *args: calls.append(1) or render(*args)
+        )
+        job_id = auth_client.post("/export/jobs", json={"kind": "gdpr"}).json()["id"]
+
+        export_router.run_export_job(job_id)
+        export_router.run_export_job(job_id)  # e.g. re-queued by a second process
+        assert calls == [1]
+
+
+class TestMaintenance:
+    def test_stale_running_job_is_requeued(self, db, verified_user, queued):
+        job = ExportJob(
+            user_id=verified_user.id, kind="gdpr", params="{}", dedup_key="x", status="running",
+            created_at=datetime.utcnow() - timedelta(hours=2),
+            started_at=datetime.utcnow() - timedelta(hours=1),
+        )
+        db.add(job)
+        db.commit()
+        job_id = job.id
+
+        export_router.maintain_export_jobs(SessionLocal)
+
+        assert db.get(ExportJob, job_id, populate_existing=True).status == "pending"
+        assert queued == [job_id]
+
+    def test_expired_job_and_artifact_are_deleted(self, auth_client, db, artifacts, inline):
+        job_id = auth_client.post("/export/jobs", json={"kind": "gdpr"}).json()["id"]
+        db.expire_all()
+        job = db.get(ExportJob, job_id)
+        key = job.artifact_key
+        job.expires_at = datetime.utcnow() - timedelta(minutes=1)
+        db.commit()
+
+        export_router.maintain_export_jobs(SessionLocal)
+
+        assert not artifacts.exists(key)
+        db.expire_all()
+        assert db.query(ExportJob).filter(ExportJob.id == job_id).first() is None
+
+
+class TestDataVersion:
+    def test_expense_write_bumps_owner_only(self, db, verified_user, second_user):
+        month = make_month(db, verified_user, month="2026-05")
+        before, other = _data_version(db, verified_user.id), _data_version(db, second_user.id)
+
+        make_expense(db, month, name="Coffee")
+
+        assert _data_version(db, verified_user.id) == before + 1
+        assert _data_version(db, second_user.id) == other
+
+    def test_debt_write_bumps(self, db, verified_user):
+        before = _data_version(db, verified_user.id)
+        debt = Debt(user_id=verified_user.id, interest_rate=5.0)
+        debt.name = "Card"
+        debt.balance = 500.0
+        debt.minimum_payment = 25.0
+        db.add(debt)
+        db.commit()
+
+        assert _data_version(db, verified_user.id) == before + 1
+
+    def test_export_job_rows_do_not_bump(self, db, verified_user):
+        before = _data_version(db, verified_user.id)
+        db.add(ExportJob(user_id=verified_user.id, kind="gdpr", params="{}", dedup_key="x"))
+        db.commit()
+
+        assert _data_version(db, verified_user.id) == before
+
+
+class TestLocalStorage:
+    def test_round_trip(self, tmp_path):
+        store = LocalStorage(str(tmp_path))
+        size = store.save("1/2/out.json", iter([b"ab", b"cd"]))
+
+        assert size == 4
+        assert b"".join(store.open("1/2/out.json")) == b"abcd"
+
+    def test_rejects_keys_outside_the_root(self, tmp_path):
+        store = LocalStorage(str(tmp_path / "root"))
+        with pytest.raises(ValueError):
+            store.save("../escape", iter([b"x"]))
+
+    def test_failed_write_leaves_nothing_behind(self, tmp_path):
+        store = LocalStorage(str(tmp_path))
+
+        def chunks():
+            yield b"partial"
+            raise RuntimeError("render failed")
+
+        with pytest.raises(RuntimeError):
+            store.save("k", chunks())
+        assert not store.exists("k")
+        assert list(tmp_path.iterdir()) == []
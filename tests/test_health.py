@@ -144,6 +144,13 @@ class TestHealthDetailed:
         body = r.json()
         assert "memory_mb" in body
 
+    def test_includes_decrypt_cache_stats(self, client):
+        """Response must report decrypt memoization hits, misses and hit rate."""
+        r = client.get("/health")
+        stats = r.json()["decrypt_cache"]
+        assert set(stats) == {"hits", "misses", "hit_rate"}
+        assert 0.0 <= stats["hit_rate"] <= 1.0
+
     def test_status_ok_when_db_healthy(self, client):
         """Status must be 'ok' when DB is reachable."""
         r = client.get("/health")
@@ -153,3 +160,32 @@ class TestHealthDetailed:
         """/health is public."""
         r = client.get("/health")
         assert r.status_code == 200
+
+
+class TestEventLoopOffload:
+    def test_blocking_handlers_run_on_threadpool(self):
+        """Handlers that hit the DB, decrypt or hash passwords must be sync so
+        FastAPI runs them on the thread pool instead of the event loop."""
+        import inspect
+
+        from main import app
+
+        blocking = {
+            "/calculate-budget", "/monthly-tracker/{month}", "/expenses/search",
+            "/auth/signup", "/auth/refresh", "/auth/sessions",
+            "/import/csv", "/import/csv/confirm", "/health", "/health/ready",
+        }
+        found = {
+            route.path: route.endpoint for route in app.routes
+            if getattr(route, "path", None) in blocking
+        }
+        assert set(found) == blocking
+        for path, endpoint in found.items():
+            assert not inspect.iscoroutinefunction(endpoint), path
+
+    def test_liveness_stays_on_event_loop(self):
+        import inspect
+
+        from main import health_live
+
+        assert inspect.iscoroutinefunction(health_live)
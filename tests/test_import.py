@@ -1,7 +1,14 @@
-"""Tests for POST /import/csv and POST /import/csv/confirm."""
+"""Tests for POST /import/csv, GET /import/csv/{id} and POST /import/csv/confirm."""
 import io
+from datetime import datetime, timedelta
+
 import pytest
 
+from core import storage as storage_module
+from core.storage import LocalStorage
+import database
+from database import AuditLog, CSVImport, MonthlyData, MonthlyExpense, SessionLocal
+from routers import import_csv
 from tests.conftest import make_month, make_expense
 
 
@@ -24,6 +31,14 @@ def _upload(client, content: bytes, month: str | None = None, filename: str = "t
     return client.post("/import/csv", files=files, data=data)
 
 
+@pytest.fixture(autouse=True)
+def artifacts(tmp_path, monkeypatch):
+    """Stage previews in a per-test directory."""
+    store = LocalStorage(str(tmp_path / "staged"))
+    monkeypatch.setattr(storage_module, "_storage", store)
+    return store
+
+
 # ---------------------------------------------------------------------------
 # Test: unauthenticated access
 # ---------------------------------------------------------------------------
@@ -261,3 +276,148 @@ class TestCSVConfirm:
         # Invalid month → skipped
         assert resp.json()["skipped"] == 1
         assert resp.json()["imported"] == 0
+
+
+# ---------------------------------------------------------------------------
+# Test: staged previews (paging, scoped duplicate detection, confirm by id)
+# ---------------------------------------------------------------------------
+
+def _rows(n: int, month: str = "2026-01") -> list[str]:
+    return [f"{month}-{i % 28 + 1:02d},Shop {i},{i + 1}.00" for i in range(n)]
+
+
+class TestStagedPreview:
+    def test_first_page_and_later_pages(self, auth_client):
+        resp = _upload(auth_client, _csv_bytes(*_rows(1200)))
+        data = resp.json()
+        assert data["total"] == 1200
+        assert len(data["rows"]) == import_csv.PREVIEW_PAGE_SIZE
+        assert data["rows"][0]["row_id"] == "0"
+
+        page = auth_client.get(
+            f"/import/csv/{data['import_id']}", params={"offset": 1150, "limit": 100}
+        ).json()
+        assert [r["row_id"] for r in page["rows"]] == [str(i) for i in range(1150, 1200)]
+        assert page["rows"][0]["description"] == "Shop 1150"
+        assert page["total"] == 1200
+
+    def test_page_straddling_blocks(self, auth_client):
+        data = _upload(auth_client, _csv_bytes(*_rows(700))).json()
+        page = auth_client.get(
+            f"/import/csv/{data['import_id']}", params={"offset": 450, "limit": 100}
+        ).json()
+        assert [r["description"] for r in page["rows"]] == [f"Shop {i}" for i in range(450, 550)]
+
+    def test_preview_is_private(self, auth_client, db, second_user):
+        db.add(CSVImport(
+            id="f" * 32, user_id=second_user.id, artifact_key="imports/x.jsonl",
+            expires_at=datetime.utcnow() + timedelta(hours=1),
+        ))
+        db.commit()
+        assert auth_client.get(f"/import/csv/{'f' * 32}").status_code == 404
+
+    def test_staged_rows_are_encrypted(self, auth_client, db, artifacts):
+        data = _upload(auth_client, _csv_bytes("2026-01-05,Netflix,12.99")).json()
+        key = db.get(CSVImport, data["import_id"]).artifact_key
+
+        assert key.startswith("imports/")
+        assert b"Netflix" not in b"".join(artifacts.open(key))
+
+    def test_latin1_file_falls_back(self, auth_client):
+        content = "Date,Description,Amount\n2026-01-05,Caf\xe9 Nero,3.50".encode("latin-1")
+        resp = _upload(auth_client, content)
+        assert resp.json()["rows"][0]["description"] == "Caf\xe9 Nero"
+
+    def test_utf8_bom_is_stripped(self, auth_client):
+        resp = _upload(auth_client, "\ufeff".encode() + _csv_bytes("2026-01-05,Netflix,12.99"))
+        assert resp.status_code == 200
+        assert resp.json()["total"] == 1
+
+    def test_duplicates_only_check_months_in_file(self, auth_client, db, verified_user, monkeypatch):
+        make_expense(db, make_month(db, verified_user, month="2026-01"), name="Netflix", actual=12.99)
+        old = make_month(db, verified_user, month="2024-06")
+        for i in range(5):
+            make_expense(db, old, name=f"Old {i}")
+
+        decrypted = []
+        real = database.decrypt_many
+
+        def spy(tokens):
+            tokens = list(tokens)
+            decrypted.extend(tokens)
+            return real(tokens)
+
+        monkeypatch.setattr(database, "decrypt_many", spy)
+        data = _upload(auth_client, _csv_bytes("2026-01-10,Netflix,12.99", "2026-02-01,Rent,900")).json()
+
+        assert data["duplicates_count"] == 1
+        assert len(decrypted) == 2  # name + amount of the one 2026-01 expense
+
+    def test_expired_previews_are_purged(self, auth_client, db, artifacts):
+        data = _upload(auth_client, _csv_bytes("2026-01-05,Netflix,12.99")).json()
+        db.expire_all()
+        record = db.get(CSVImport, data["import_id"])
+        key = record.artifact_key
+        record.expires_at = datetime.utcnow() - timedelta(minutes=1)
+        db.commit()
+
+        assert auth_client.get(f"/import/csv/{data['import_id']}").status_code == 404
+        import_csv.purge_csv_imports(SessionLocal)
+
+        assert not artifacts.exists(key)
+        db.expire_all()
+        assert db.get(CSVImport, data["import_id"]) is None
+
+
+class TestStagedConfirm:
+    def _expenses(self, db, verified_user):
+        db.expire_all()
+        return {
+            (e.name, e.category, e.actual_amount)
+            for e in db.query(MonthlyExpense).join(MonthlyData).filter(MonthlyData.user_id == verified_user.id)
+        }
+
+    def test_imports_every_staged_row_with_edits(self, auth_client, db, verified_user):
+        data = _upload(auth_client, _csv_bytes(
+            "2026-01-05,Spotify,12.99", "2026-01-06,Tesco,40.00", "2026-02-01,Mystery,5.00",
+        )).json()
+        resp = auth_client.post("/import/csv/confirm", json={
+            "import_id": data["import_id"],
+            "rows": [
+                {**data["rows"][1], "category": "Other", "include": False},
+                {**data["rows"][2], "category": "Healthcare"},
+            ],
+        })
+
+        assert resp.json() == {"imported": 2, "skipped": 1}
+        assert self._expenses(db, verified_user) == {
+            ("Spotify", "Entertainment", 12.99), ("Mystery", "Healthcare", 5.0),
+        }
+        assert auth_client.get(f"/import/csv/{data['import_id']}").status_code == 404
+
+    def test_skip_duplicates(self, auth_client, db, verified_user):
+        make_expense(db, make_month(db, verified_user, month="2026-01"), name="Netflix", actual=12.99)
+        data = _upload(auth_client, _csv_bytes("2026-01-05,Netflix,12.99", "2026-01-06,Tesco,40.00")).json()
+
+        resp = auth_client.post("/import/csv/confirm", json={
+            "import_id": data["import_id"], "skip_duplicates": True,
+        })
+        assert resp.json() == {"imported": 1, "skipped": 1}
+
+    def test_unknown_import_is_404(self, auth_client):
+        resp = auth_client.post("/import/csv/confirm", json={"import_id": "0" * 32})
+        assert resp.status_code == 404
+
+    def test_large_import_spans_flushes(self, auth_client, db, verified_user, monkeypatch):
+        monkeypatch.setattr(import_csv, "IMPORT_FLUSH_ROWS", 3)
+        rows = _rows(10) + ["2026-01-20,Shop 0,99.00"]  # same name+category: upserts
+        data = _upload(auth_client, _csv_bytes(*rows)).json()
+
+        resp = auth_client.post("/import/csv/confirm", json={"import_id": data["import_id"]})
+
+        assert resp.json() == {"imported": 11, "skipped": 0}
+        expenses = self._expenses(db, verified_user)
+        assert len(expenses) == 10
+        assert ("Shop 0", "Other", 99.0) in expenses
+        actions = [a for (a,) in db.query(AuditLog.action).filter(AuditLog.user_id == verified_user.id)]
+        assert sorted(actions) == ["create"] * 10 + ["update"]
@@ -101,6 +101,11 @@ def test_delete_nonexistent_returns_404(auth_client):
     assert r.status_code == 404
 
 
+def test_out_of_range_month_returns_422(auth_client):
+    r = auth_client.get("/income-sources?month=2026-13")
+    assert r.status_code == 422
+
+
 # ── source_type validation ────────────────────────────────────────────────────
 
 def test_invalid_source_type_returns_422(auth_client, db, verified_user):
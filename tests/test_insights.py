@@ -24,6 +24,10 @@ class TestMonthlySummary:
         r = auth_client.get("/insights/monthly-summary?month=January")
         assert r.status_code == 422
 
+    def test_out_of_range_month_returns_422(self, auth_client):
+        r = auth_client.get("/insights/monthly-summary?month=2026-13")
+        assert r.status_code == 422
+
     def test_with_data_returns_summary(self, auth_client, db, verified_user):
         month = make_month(db, verified_user, month="2026-03", salary_planned=3000.0, total_planned=1500.0)
         make_expense(db, month, name="Rent", category="Housing", planned=800.0, actual=850.0)
@@ -1819,7 +1823,7 @@ class TestReallocationSuggestions:
 
 
 class TestDuplicateCandidates:
-    """Tests for GET /insights/duplicate-candidates?month=YYYY-MM"""
+    """Tests for GET /insights/duplicate-candidates?month=YYYY-MM (or from/to)"""
 
     def test_unauthenticated_returns_401_or_403(self, client):
         r = client.get("/insights/duplicate-candidates?month=2026-01")
@@ -1833,6 +1837,10 @@ class TestDuplicateCandidates:
         r = auth_client.get("/insights/duplicate-candidates?month=January")
         assert r.status_code == 422
 
+    def test_out_of_range_bound_returns_422(self, auth_client):
+        r = auth_client.get("/insights/duplicate-candidates?from=2026-00&to=2026-03")
+        assert r.status_code == 422
+
     def test_empty_month_returns_empty_list(self, auth_client):
         """No expenses → empty duplicates list."""
         r = auth_client.get("/insights/duplicate-candidates?month=2026-01")
@@ -1952,6 +1960,63 @@ class TestDuplicateCandidates:
         assert r.status_code == 200
         assert r.json()["duplicates"] == []
 
+    def test_sweep_matches_pairwise_comparison(self):
+        """The bucketed sweep finds exactly the pairs an all-pairs loop does, in the same order."""
+        import random
+        from datetime import datetime, timedelta
+
+        from routers.insights import _amount_diff, _days_apart, _duplicate_pairs
+
+        rng = random.Random(7)
+        base = datetime(2026, 3, 1)
+        items = [
+            {
+                "category": rng.choice(["food", "rent", "fun"]),
+                "amount": rng.choice([0.0, -5.0, -5.02, 100.0, 100.5, 101.0, 250.0, rng.uniform(1, 300)]),
+                "created_at": None if rng.random() < 0.05 else base + timedelta(hours=rng.randint(0, 24 * 30)),
+            }
+            for _ in range(300)
+        ]
+        expected = [
+            (i, j)
+            for i in range(len(items))
+            for j in range(i + 1, len(items))
+            if items[i]["category"] == items[j]["category"]
+            and _amount_diff(items[i]["amount"], items[j]["amount"]) <= 0.01
+            and _days_apart(items[i]["created_at"], items[j]["created_at"]) <= 3
+        ]
+        assert expected
+        assert _duplicate_pairs(items) == expected
+
+    def test_range_finds_pairs_across_months(self, auth_client, db, verified_user):
+        """With from/to, a duplicate entered in the next month is paired too."""
+        march = make_month(db, verified_user, month="2026-03", salary_planned=3000.0)
+        april = make_month(db, verified_user, month="2026-04", salary_planned=3000.0)
+        e1 = make_expense(db, march, name="Gym", category="Fitness", planned=40.0, actual=40.0)
+        e2 = make_expense(db, april, name="Gym", category="Fitness", planned=40.0, actual=40.0)
+
+        r = auth_client.get("/insights/duplicate-candidates?from=2026-03&to=2026-04")
+        assert r.status_code == 200
+        body = r.json()
+        assert body["from"] == "2026-03" and body["to"] == "2026-04"
+        assert len(body["duplicates"]) == 1
+        pair = body["duplicates"][0]
+        assert (pair["expense_a"]["id"], pair["expense_a"]["month"]) == (e1.id, "2026-03")
+        assert (pair["expense_b"]["id"], pair["expense_b"]["month"]) == (e2.id, "2026-04")
+
+        # A single month only sees its own expenses
+        r = auth_client.get("/insights/duplicate-candidates?month=2026-04")
+        assert r.json()["duplicates"] == []
+
+    @pytest.mark.parametrize("query", [
+        "from=2026-03",
+        "from=2026-05&to=2026-03",
+        "from=2020-01&to=2026-01",
+    ])
+    def test_invalid_range_returns_422(self, auth_client, query):
+        r = auth_client.get(f"/insights/duplicate-candidates?{query}")
+        assert r.status_code == 422
+
     def test_deleted_expenses_excluded(self, auth_client, db, verified_user):
         """Soft-deleted expenses must not appear in duplicate candidates."""
         from datetime import datetime
@@ -1966,3 +2031,108 @@ class TestDuplicateCandidates:
         r = auth_client.get("/insights/duplicate-candidates?month=2026-03")
         assert r.status_code == 200
         assert r.json()["duplicates"] == []
+
+
+class TestInsightsDashboard:
+    """Tests for GET /insights/dashboard."""
+
+    WIDGETS = [
+        "monthly-summary", "health-score", "pace", "streaks", "trends",
+        "anomalies", "spending-velocity", "month-performance",
+    ]
+
+    @staticmethod
+    def _seed(db, user):
+        from core.analytics import shift_month
+        from routers.insights import _month_list
+
+        current = _month_list(1)[0]
+        for i, amount in enumerate([200.0, 210.0, 190.0, 600.0]):
+            month = shift_month(current, i - 3)
+            m = make_month(db, user, month=month, salary_actual=3000.0,
+                           total_planned=250.0, total_actual=amount)
+            make_expense(db, m, name="Groceries", category="Food", planned=250.0, actual=amount)
+        return current
+
+    def test_unauthenticated_returns_401_or_403(self, client):
+        r = client.get("/insights/dashboard?month=2026-01")
+        assert r.status_code in (401, 403)
+
+    def test_invalid_month_returns_422(self, auth_client):
+        r = auth_client.get("/insights/dashboard?month=January")
+        assert r.status_code == 422
+
+    def test_unknown_widget_returns_422(self, auth_client):
+        r = auth_client.get("/insights/dashboard?month=2026-01&widgets=trends,nope")
+        assert r.status_code == 422
+        assert "nope" in r.json()["detail"]
+
+    def test_widgets_match_their_endpoints(self, auth_client, db, verified_user):
+        month = self._seed(db, verified_user)
+
+        r = auth_client.get(f"/insights/dashboard?month={month}")
+        assert r.status_code == 200
+        body = r.json()
+        assert body["month"] == month
+        assert body["errors"] == {}
+        assert list(body["widgets"]) == self.WIDGETS
+
+        endpoints = {
+            "monthly-summary": f"/insights/monthly-summary?month={month}",
+            "health-score": f"/insights/health-score?month={month}",
+            "pace": f"/insights/pace?month={month}",
+            "streaks": "/insights/streaks",
+            "trends": "/insights/trends?months=6",
+            "anomalies": f"/insights/anomalies?month={month}&lookback=3",
+            "spending-velocity": f"/insights/spending-velocity?month={month}",
+            "month-performance": f"/insights/month-performance?month={month}",
+        }
+        for name, url in endpoints.items():
+            assert body["widgets"][name] == auth_client.get(url).json(), name
+        assert body["widgets"]["anomalies"]["anomalies"][0]["category"] == "Food"
+
+    def test_selected_widgets_comma_and_repeated(self, auth_client, db, verified_user):
+        month = self._seed(db, verified_user)
+
+        r = auth_client.get(
+            f"/insights/dashboard?month={month}&widgets=streaks,trends&widgets=streaks"
+            "&trend_months=3"
+        )
+        assert r.status_code == 200
+        widgets = r.json()["widgets"]
+        assert list(widgets) == ["streaks", "trends"]
+        assert len(widgets["trends"]["months"]) == 3
+
+    def test_stream_ndjson(self, auth_client, db, verified_user):
+        import json
+
+        month = self._seed(db, verified_user)
+
+        r = auth_client.get(f"/insights/dashboard?month={month}&widgets=streaks,pace&stream=true")
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in r.text.splitlines()]
+        assert [line["widget"] for line in lines] == ["streaks", "pace"]
+        assert lines[0]["data"]["total_tracked"] == 4
+
+    def test_loads_month_rows_and_rollup_once(self, auth_client, db, verified_user):
+        from sqlalchemy import event
+
+        from database import engine
+
+        month = self._seed(db, verified_user)
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            r = auth_client.get(f"/insights/dashboard?month={month}")
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+        assert r.status_code == 200
+        selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+        assert sum("FROM monthly_data" in s for s in selects) == 1
+        assert sum("FROM monthly_category_totals" in s for s in selects) == 1
@@ -0,0 +1,67 @@
+"""Tests for core/matcher.py (compiled multi-pattern substring matcher)."""
+import random
+
+from core.matcher import KeywordMatcher
+from routers.import_csv import _CATEGORY_KEYWORDS, _suggest_category
+
+
+def _naive(patterns, text):
+    lower = text.lower()
+    for pattern, value in patterns:
+        if pattern.lower() in lower:
+            return value
+    return None
+
+
+class TestKeywordMatcher:
+    def test_first_listed_pattern_wins_wherever_it_occurs(self):
+        m = KeywordMatcher([("petrol", "Transport"), ("tesco", "Food")])
+        # "tesco" occurs first in the text, but "petrol" is listed first.
+        assert m.match("Tesco Petrol Station") == "Transport"
+        assert m.match("Tesco Metro") == "Food"
+
+    def test_case_insensitive(self):
+        m = KeywordMatcher([("NetFlix", "Entertainment")])
+        assert m.match("NETFLIX.COM subscription") == "Entertainment"
+
+    def test_no_match_returns_none(self):
+        assert KeywordMatcher([("tesco", "Food")]).match("Amazon") is None
+        assert KeywordMatcher([]).match("anything") is None
+
+    def test_pattern_inside_another_pattern(self):
+        # "co" only occurs inside "tesco" here; reached via the failure links.
+        m = KeywordMatcher([("tesco ", "Food"), ("co", "Other")])
+        assert m.match("tesco") == "Other"
+        assert m.match("tesco express") == "Food"
+
+    def test_empty_pattern_matches_everything(self):
+        m = KeywordMatcher([("tesco", "Food"), ("", "Fallback")])
+        assert m.match("") == "Fallback"
+        assert m.match("tesco") == "Food"
+
+    def test_duplicate_patterns_keep_first(self):
+        m = KeywordMatcher([("tesco", "Food"), ("tesco", "Transport")])
+        assert m.match("tesco") == "Food"
+
+    def test_matches_naive_loop_on_random_input(self):
+        rng = random.Random(7)
+
+        def word(lo, hi):
+            return "".join(rng.choice("abcAB ") for _ in range(rng.randint(lo, hi)))
+
+        for _ in range(50):
+            patterns = [(word(1, 4), i) for i in range(rng.randint(1, 30))]
+            m = KeywordMatcher(patterns)
+            for _ in range(40):
+                text = word(0, 20)
+                assert m.match(text) == _naive(patterns, text), (patterns, text)
+
+
+class TestSuggestCategory:
+    def test_keyword_table_order_preserved(self):
+        patterns = [(kw, cat) for cat, kws in _CATEGORY_KEYWORDS.items() for kw in kws]
+        for text in ("NETFLIX", "Tesco Superstore", "Uber trip", "Council tax", "mystery"):
+            assert _suggest_category(text) == (_naive(patterns, text) or "Other")
+
+    def test_unmatched_is_other(self):
+        assert _suggest_category("zzz unknown payee") == "Other"
@@ -240,3 +240,37 @@ class TestSpendingAnomalyAlerts:
         assert r.status_code == 200
         assert "total_actual" in r.json()
         assert r.json()["total_actual"] == 200.0
+
+
+class TestAnomalyCheckCost:
+    def test_check_does_not_rescan_history(self, auth_client, db, verified_user):
+        """The check reads rollup statistics: its query count is flat in both expenses saved and history."""
+        from sqlalchemy import event
+
+        from database import engine
+        from main import _check_spending_anomalies
+
+        _make_historical_expenses(db, verified_user, (2026, 4), "Groceries", [100, 110, 90, 95, 105, 100])
+        month = make_month(db, verified_user, month="2026-04")
+        expenses = [
+            make_expense(db, month, name=f"Shop {i}", category="Groceries", actual=100 + i * 40)
+            for i in range(20)
+        ]
+        for e in expenses:  # as in save_actuals, the saved rows are already loaded
+            e.category, e.actual_amount
+
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            _check_spending_anomalies(db, verified_user, expenses, "2026-04")
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+        assert not any("monthly_expenses" in s for s in statements)
+        notifications = db.query(Notification).filter(Notification.type == "spending_anomaly").all()
+        # mean 100, std ~5.77 → anything above ~111.5 is flagged (i >= 1)
+        assert len(notifications) == 19
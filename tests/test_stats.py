@@ -0,0 +1,40 @@
+"""Tests for core/stats.py (running mean/variance)."""
+import statistics
+
+import pytest
+
+from core.stats import RunningStats
+
+
+class TestRunningStats:
+    def test_matches_two_pass_population_statistics(self):
+        values = [100.0, 110.0, 90.0, 250.5, 0.0]
+        stats = RunningStats.of(values)
+
+        assert stats.n == 5
+        assert stats.mean == pytest.approx(statistics.fmean(values))
+        assert stats.std == pytest.approx(statistics.pstdev(values))
+
+    def test_merge_equals_folding_everything(self):
+        a, b = [12.5, 7.0, 30.0], [1000.0, 999.5]
+        merged = RunningStats.of(a).merge(RunningStats.of(b))
+        whole = RunningStats.of(a + b)
+
+        assert merged.n == whole.n
+        assert merged.mean == pytest.approx(whole.mean)
+        assert merged.m2 == pytest.approx(whole.m2)
+
+    def test_merge_with_empty(self):
+        stats = RunningStats.of([1.0, 2.0])
+        assert stats.merge(RunningStats()) == stats
+        assert RunningStats().merge(stats) == stats
+
+    def test_identical_values_have_exactly_zero_std(self):
+        assert RunningStats.of([42.1] * 6).std == 0.0
+
+    def test_empty(self):
+        assert RunningStats().variance == 0.0
+
+    def test_encode_round_trip(self):
+        stats = RunningStats.of([0.1, 0.2, 0.7])
+        assert RunningStats.decode(stats.encode()) == stats
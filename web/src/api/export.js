@@ -16,6 +16,33 @@ function downloadBlob(blob, filename) {
   URL.revokeObjectURL(url);
 }
 
+const JOB_POLL_MS = 1000;
+const JOB_TIMEOUT_MS = 5 * 60 * 1000;
+
+/**
+ * Queue a background export, wait for it to finish and download the artifact.
+ * Identical requests made before the account's data changes reuse the
+ * server's existing job, so repeat downloads are immediate.
+ * @param {'pdf'|'tax-pdf'|'full-backup'|'gdpr'} kind
+ * @param {object} [params]  e.g. { month } for pdf, { tax_year } for tax-pdf
+ */
+async function runExportJob(kind, params = {}) {
+  let { data: job } = await client.post('/export/jobs', { kind, ...params });
+  const deadline = Date.now() + JOB_TIMEOUT_MS;
+  while (job.status === 'pending' || job.status === 'running') {
+    if (Date.now() > deadline) {
+      throw new Error('Export is taking longer than expected — try again shortly.');
+    }
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_MS));
+    ({ data: job } = await client.get(`/export/jobs/${job.id}`));
+  }
+  if (job.status !== 'done') {
+    throw new Error(job.error || 'Export failed');
+  }
+  const res = await client.get(job.download_url, { responseType: 'blob' });
+  downloadBlob(res.data, job.filename);
+}
+
 /**
  * Download expenses as CSV for the given month range.
  * @param {string} fromMonth  YYYY-MM
@@ -34,11 +61,7 @@ export async function exportCSV(fromMonth, toMonth) {
  * @param {string} month  YYYY-MM
  */
 export async function exportPDF(month) {
-  const res = await client.get('/export/pdf', {
-    params: { month },
-    responseType: 'blob',
-  });
-  downloadBlob(res.data, `budget_report_${month}.pdf`);
+  await runExportJob('pdf', { month });
 }
 
 /**
@@ -58,21 +81,14 @@ export async function getTaxSummary(taxYear) {
  * @param {number} taxYear  e.g. 2024 for April 2024 – April 2025
  */
 export async function exportTaxPDF(taxYear) {
-  const res = await client.get('/export/tax-pdf', {
-    params: { tax_year: taxYear },
-    responseType: 'blob',
-  });
-  downloadBlob(res.data, `tax_summary_${taxYear}_${taxYear + 1}.pdf`);
+  await runExportJob('tax-pdf', { tax_year: taxYear });
 }
 
 /**
  * Download a full account data backup as JSON.
- * Rate-limited to 1 request/hour server-side.
  */
 export async function exportFullBackup() {
-  const today = new Date().toISOString().slice(0, 10);
-  const res = await client.get('/export/full-backup', { responseType: 'blob' });
-  downloadBlob(res.data, `backup-${today}.json`);
+  await runExportJob('full-backup');
 }
 
 /**
@@ -1,7 +1,10 @@
 import client from './client';
 
+export const IMPORT_PAGE_SIZE = 200;
+
 /**
- * Upload a CSV file and get a preview of parsed rows (nothing is saved).
+ * Upload a CSV file and get the first page of parsed rows (nothing is saved).
+ * The server stages the full preview under `import_id`.
  * @param {File} file - CSV file
  * @param {string|null} month - Optional YYYY-MM override
  * @returns {Promise<import('../hooks/useImport').CSVPreviewResponse>}
@@ -10,6 +13,7 @@ export async function previewCSVImport(file, month = null) {
   const formData = new FormData();
   formData.append('file', file);
   if (month) formData.append('month', month);
+  formData.append('limit', String(IMPORT_PAGE_SIZE));
 
   const response = await client.post('/import/csv', formData, {
     headers: { 'Content-Type': 'multipart/form-data' },
@@ -18,11 +22,29 @@ export async function previewCSVImport(file, month = null) {
 }
 
 /**
- * Confirm and persist selected CSV rows as actual expenses.
- * @param {Array} rows - Array of CSVConfirmRow objects
+ * Fetch a page of a staged CSV preview.
+ * @param {string} importId
+ * @param {number} offset - Index of the first row
+ * @param {number} [limit]
+ */
+export async function getCSVImportPage(importId, offset, limit = IMPORT_PAGE_SIZE) {
+  const response = await client.get(`/import/csv/${importId}`, {
+    params: { offset, limit },
+  });
+  return response.data;
+}
+
+/**
+ * Confirm a staged preview. Every row is imported as suggested except those
+ * in `rows` (edited or excluded copies, matched by row_id).
+ * @param {{importId: string, rows: Array, skipDuplicates: boolean}} args
  * @returns {Promise<{imported: number, skipped: number}>}
  */
-export async function confirmCSVImport(rows) {
-  const response = await client.post('/import/csv/confirm', { rows });
+export async function confirmCSVImport({ importId, rows, skipDuplicates = false }) {
+  const response = await client.post('/import/csv/confirm', {
+    import_id: importId,
+    rows,
+    skip_duplicates: skipDuplicates,
+  });
   return response.data;
 }
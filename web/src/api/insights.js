@@ -30,6 +30,22 @@ export const getStreaks = () =>
 export const getMonthCloseSummary = (month) =>
   client.get("/insights/month-close-summary", { params: { month } }).then((r) => r.data);
 
+/**
+ * Compute several insights widgets from one server-side data load.
+ * Each entry of `widgets` in the result matches what that widget's own
+ * endpoint returns; widgets that failed are listed in `errors` instead.
+ *
+ * @param {string} month - "YYYY-MM"
+ * @param {string[]} widgets - e.g. ["monthly-summary", "health-score"]
+ * @param {{ trendMonths?: number, lookback?: number }} [options]
+ */
+export const getInsightsDashboard = (month, widgets, { trendMonths = 6, lookback = 3 } = {}) =>
+  client
+    .get("/insights/dashboard", {
+      params: { month, widgets: widgets.join(","), trend_months: trendMonths, lookback },
+    })
+    .then((r) => r.data);
+
 /**
  * Stream an AI financial review for the given month.
  * Uses native fetch() so the response body can be read as a stream.
@@ -1,6 +1,7 @@
 import React, { useRef, useState } from 'react';
 import { Upload, AlertTriangle, CheckCircle, X, FileText } from 'lucide-react';
-import { useCSVPreview, useCSVConfirm } from '../hooks/useImport';
+import { useCSVPreview, useCSVImportPage, useCSVConfirm } from '../hooks/useImport';
+import { IMPORT_PAGE_SIZE } from '../api/import';
 import { useCategories } from '../hooks/useCategories';
 import PageWrapper from './PageWrapper';
 
@@ -13,7 +14,10 @@ export default function ImportPage() {
   const fileInputRef = useRef(null);
   const [selectedFile, setSelectedFile] = useState(null);
   const [monthOverride, setMonthOverride] = useState('');
-  const [rows, setRows] = useState([]); // preview rows with user edits
+  const [staged, setStaged] = useState(null); // first preview page + totals, incl. import_id
+  const [offset, setOffset] = useState(0);
+  const [edits, setEdits] = useState({}); // row_id -> row with user changes (category, include)
+  const [skipDuplicates, setSkipDuplicates] = useState(false);
   const [result, setResult] = useState(null); // { imported, skipped }
   const [step, setStep] = useState('upload'); // 'upload' | 'preview' | 'done'
 
@@ -21,6 +25,7 @@ export default function ImportPage() {
   const confirm = useCSVConfirm();
   const { data: categoryData } = useCategories();
   const categories = categoryData?.map((c) => c.name) ?? FALLBACK_CATEGORIES;
+  const page = useCSVImportPage(staged?.import_id, offset, staged);
 
   // ---------------------------------------------------------------------------
   // Handlers
@@ -44,38 +49,40 @@ export default function ImportPage() {
         file: selectedFile,
         month: monthOverride || null,
       });
-      // Initialise rows with suggested categories; all included by default
-      setRows(
-        data.rows.map((r) => ({
-          ...r,
-          category: r.suggested_category,
-          include: true,
-        }))
-      );
+      // Rows are included with their suggested category unless edited
+      setStaged(data);
+      setOffset(0);
+      setEdits({});
       setStep('preview');
     } catch {
       // error surfaced via preview.error
     }
   }
 
-  function toggleInclude(rowId) {
-    setRows((prev) =>
-      prev.map((r) => (r.row_id === rowId ? { ...r, include: !r.include } : r))
-    );
+  function defaultInclude(row) {
+    return !(skipDuplicates && row.is_duplicate);
   }
 
-  function toggleAll(checked) {
-    setRows((prev) => prev.map((r) => ({ ...r, include: checked })));
+  function withEdits(row) {
+    return edits[row.row_id] ?? { ...row, category: row.suggested_category, include: defaultInclude(row) };
   }
 
-  function setCategory(rowId, category) {
-    setRows((prev) =>
-      prev.map((r) => (r.row_id === rowId ? { ...r, category } : r))
-    );
+  function editRow(row, changes) {
+    setEdits((prev) => ({ ...prev, [row.row_id]: { ...withEdits(row), ...changes } }));
+  }
+
+  function togglePage(checked) {
+    setEdits((prev) => {
+      const next = { ...prev };
+      pageRows.forEach((r) => {
+        next[r.row_id] = { ...r, include: checked };
+      });
+      return next;
+    });
   }
 
   async function handleConfirm() {
-    const payload = rows.map((r) => ({
+    const rows = Object.values(edits).map((r) => ({
       row_id: r.row_id,
       description: r.description,
       amount: r.amount,
@@ -84,7 +91,11 @@ export default function ImportPage() {
       include: r.include,
     }));
     try {
-      const data = await confirm.mutateAsync(payload);
+      const data = await confirm.mutateAsync({
+        importId: staged.import_id,
+        rows,
+        skipDuplicates,
+      });
       setResult(data);
       setStep('done');
     } catch {
@@ -95,7 +106,10 @@ export default function ImportPage() {
   function handleReset() {
     setSelectedFile(null);
     setMonthOverride('');
-    setRows([]);
+    setStaged(null);
+    setOffset(0);
+    setEdits({});
+    setSkipDuplicates(false);
     setResult(null);
     setStep('upload');
     preview.reset();
@@ -105,9 +119,16 @@ export default function ImportPage() {
   // ---------------------------------------------------------------------------
   // Derived stats
   // ---------------------------------------------------------------------------
-  const includedCount = rows.filter((r) => r.include).length;
-  const duplicateCount = rows.filter((r) => r.is_duplicate).length;
-  const allChecked = rows.length > 0 && rows.every((r) => r.include);
+  // Only one page is held client-side; counts come from the staged totals
+  // adjusted by the rows the user has edited
+  const total = staged?.total ?? 0;
+  const duplicateCount = staged?.duplicates_count ?? 0;
+  const pageRows = (page.data?.rows ?? []).map(withEdits);
+  const includedCount =
+    total -
+    (skipDuplicates ? duplicateCount : 0) +
+    Object.values(edits).reduce((n, r) => n + Number(r.include) - Number(defaultInclude(r)), 0);
+  const allChecked = pageRows.length > 0 && pageRows.every((r) => r.include);
 
   // ---------------------------------------------------------------------------
   // Render
@@ -224,7 +245,7 @@ export default function ImportPage() {
           {/* Summary bar */}
           <div className="flex flex-wrap gap-4 p-4 bg-gray-50 dark:bg-gray-800 rounded-xl text-sm">
             <span className="text-gray-700 dark:text-gray-300">
-              <strong>{rows.length}</strong> row{rows.length !== 1 ? 's' : ''} parsed
+              <strong>{total}</strong> row{total !== 1 ? 's' : ''} parsed
             </span>
             {duplicateCount > 0 && (
               <span className="text-amber-600 dark:text-amber-400 flex items-center gap-1">
@@ -232,6 +253,16 @@ export default function ImportPage() {
                 {duplicateCount} possible duplicate{duplicateCount !== 1 ? 's' : ''}
               </span>
             )}
+            {duplicateCount > 0 && (
+              <label className="flex items-center gap-1 text-gray-700 dark:text-gray-300">
+                <input
+                  type="checkbox"
+                  checked={skipDuplicates}
+                  onChange={(e) => setSkipDuplicates(e.target.checked)}
+                />
+                Skip duplicates
+              </label>
+            )}
             <span className="text-blue-600 dark:text-blue-400">
               {includedCount} selected for import
             </span>
@@ -243,7 +274,7 @@ export default function ImportPage() {
             </button>
           </div>
 
-          {rows.length === 0 ? (
+          {total === 0 ? (
             <div className="text-center py-12 text-gray-500">
               No valid rows were found in the CSV.
             </div>
@@ -257,8 +288,8 @@ export default function ImportPage() {
                         <input
                           type="checkbox"
                           checked={allChecked}
-                          onChange={(e) => toggleAll(e.target.checked)}
-                          aria-label="Select all"
+                          onChange={(e) => togglePage(e.target.checked)}
+                          aria-label="Select all on this page"
                         />
                       </th>
                       <th className="px-3 py-3 text-left">Date</th>
@@ -270,7 +301,7 @@ export default function ImportPage() {
                     </tr>
                   </thead>
                   <tbody className="divide-y divide-gray-100 dark:divide-gray-700">
-                    {rows.map((row) => (
+                    {pageRows.map((row) => (
                       <tr
                         key={row.row_id}
                         className={`${
@@ -281,7 +312,7 @@ export default function ImportPage() {
                           <input
                             type="checkbox"
                             checked={row.include}
-                            onChange={() => toggleInclude(row.row_id)}
+                            onChange={() => editRow(row, { include: !row.include })}
                             aria-label={`Include ${row.description}`}
                           />
                         </td>
@@ -300,7 +331,7 @@ export default function ImportPage() {
                         <td className="px-3 py-2">
                           <select
                             value={row.category}
-                            onChange={(e) => setCategory(row.row_id, e.target.value)}
+                            onChange={(e) => editRow(row, { category: e.target.value })}
                             className="border border-gray-300 dark:border-gray-600 rounded px-2 py-1 text-xs bg-white dark:bg-gray-800 text-gray-900 dark:text-white"
                           >
                             {categories.map((c) => (
@@ -324,6 +355,30 @@ export default function ImportPage() {
                 </table>
               </div>
 
+              {total > IMPORT_PAGE_SIZE && (
+                <div className="flex items-center justify-between text-sm text-gray-600 dark:text-gray-400">
+                  <span>
+                    Rows {offset + 1}–{Math.min(offset + IMPORT_PAGE_SIZE, total)} of {total}
+                  </span>
+                  <div className="flex gap-2">
+                    <button
+                      onClick={() => setOffset(Math.max(0, offset - IMPORT_PAGE_SIZE))}
+                      disabled={offset === 0 || page.isFetching}
+                      className="px-3 py-1 border border-gray-300 dark:border-gray-600 rounded disabled:opacity-50"
+                    >
+                      Previous
+                    </button>
+                    <button
+                      onClick={() => setOffset(offset + IMPORT_PAGE_SIZE)}
+                      disabled={offset + IMPORT_PAGE_SIZE >= total || page.isFetching}
+                      className="px-3 py-1 border border-gray-300 dark:border-gray-600 rounded disabled:opacity-50"
+                    >
+                      Next
+                    </button>
+                  </div>
+                </div>
+              )}
+
               {confirm.error && (
                 <div className="flex items-start gap-2 p-3 bg-red-50 dark:bg-red-900/20 border border-red-200 dark:border-red-800 rounded-lg text-sm text-red-700 dark:text-red-400">
                   <AlertTriangle className="w-4 h-4 mt-0.5 shrink-0" />
@@ -8,7 +8,7 @@ import {
   TrendingUp, TrendingDown, AlertTriangle, CheckCircle,
   Info, BarChart2, Heart, Sparkles, RefreshCw,
 } from "lucide-react";
-import { useMonthlySummary, useSpendingTrends, useSpendingHeatmap, useHealthScore, useAnomalyDetection } from "../hooks/useInsights";
+import { useMonthlySummary, useSpendingTrends, useSpendingHeatmap, useHealthScore, useAnomalyDetection, useInsightsDashboard } from "../hooks/useInsights";
 import { requestAIReview } from "../api/insights";
 import { SkeletonCard } from "./Skeleton";
 import { useTheme } from "../hooks/useTheme";
@@ -340,8 +340,9 @@ function ComponentRow({ label, score, weight, detail }) {
   );
 }
 
-function HealthScoreCard({ month }) {
-  const { data, isLoading } = useHealthScore(month);
+function HealthScoreCard({ month, ready = true }) {
+  const { data, isLoading: fetching } = useHealthScore(month, { enabled: ready });
+  const isLoading = fetching || !ready;
 
   if (isLoading) {
     return (
@@ -447,9 +448,10 @@ const ANOMALY_STYLES = {
   },
 };
 
-function AnomalyAlertsSection({ month }) {
+function AnomalyAlertsSection({ month, ready = true }) {
   const [lookback, setLookback] = useState(3);
-  const { data, isLoading } = useAnomalyDetection(month, lookback);
+  const { data, isLoading: fetching } = useAnomalyDetection(month, lookback, { enabled: ready });
+  const isLoading = fetching || !ready;
 
   const anomalies = data?.anomalies || [];
 
@@ -647,8 +649,13 @@ export default function InsightsPage() {
   const [heatmapYear, setHeatmapYear] = useState(new Date().getFullYear());
   const { theme } = useTheme();
 
-  const { data: summary, isLoading: summaryLoading } = useMonthlySummary(selectedMonth);
-  const { data: trends, isLoading: trendsLoading } = useSpendingTrends(trendWindow);
+  // One request for the summary, trends, health score and anomalies widgets;
+  // their own hooks then read the seeded cache (or refetch on a param change).
+  const { isFetched: dashboardReady } = useInsightsDashboard(selectedMonth);
+  const { data: summary, isLoading: summaryFetching } = useMonthlySummary(selectedMonth, { enabled: dashboardReady });
+  const { data: trends, isLoading: trendsFetching } = useSpendingTrends(trendWindow, { enabled: dashboardReady });
+  const summaryLoading = summaryFetching || !dashboardReady;
+  const trendsLoading = trendsFetching || !dashboardReady;
   const { data: heatmap, isLoading: heatmapLoading } = useSpendingHeatmap(heatmapYear);
 
   const isDark = theme === "dark";
@@ -679,10 +686,10 @@ export default function InsightsPage() {
       </div>
 
       {/* ---- Health Score ---- */}
-      <HealthScoreCard month={selectedMonth} />
+      <HealthScoreCard month={selectedMonth} ready={dashboardReady} />
 
       {/* ---- Anomaly Detection ---- */}
-      <AnomalyAlertsSection month={selectedMonth} />
+      <AnomalyAlertsSection month={selectedMonth} ready={dashboardReady} />
 
       {/* ---- AI Financial Review ---- */}
       <AIReviewSection month={selectedMonth} />
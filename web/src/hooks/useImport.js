@@ -1,8 +1,8 @@
-import { useMutation } from '@tanstack/react-query';
-import { previewCSVImport, confirmCSVImport } from '../api/import';
+import { useMutation, useQuery } from '@tanstack/react-query';
+import { previewCSVImport, getCSVImportPage, confirmCSVImport } from '../api/import';
 
 /**
- * Mutation: parse a CSV file and return a preview.
+ * Mutation: parse a CSV file and return the first preview page.
  * Does NOT save anything. Call mutateAsync({ file, month }).
  */
 export function useCSVPreview() {
@@ -12,10 +12,25 @@ export function useCSVPreview() {
 }
 
 /**
- * Mutation: persist confirmed rows. Call mutateAsync(rows).
+ * Query: one page of a staged preview. Page 0 comes from the upload itself,
+ * so it is passed in as initial data.
+ */
+export function useCSVImportPage(importId, offset, firstPage) {
+  return useQuery({
+    queryKey: ['csv-import', importId, offset],
+    queryFn: () => getCSVImportPage(importId, offset),
+    enabled: Boolean(importId),
+    initialData: offset === 0 ? firstPage : undefined,
+    placeholderData: (previous) => previous,
+    staleTime: Infinity,
+  });
+}
+
+/**
+ * Mutation: persist a staged preview. Call mutateAsync({ importId, rows, skipDuplicates }).
  */
 export function useCSVConfirm() {
   return useMutation({
-    mutationFn: (rows) => confirmCSVImport(rows),
+    mutationFn: (args) => confirmCSVImport(args),
   });
 }
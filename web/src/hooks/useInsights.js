@@ -1,19 +1,20 @@
-import { useQuery } from "@tanstack/react-query";
-import { getMonthlySummary, getSpendingTrends, getSpendingHeatmap, getSpendingPace, suggestCategory, getHealthScore, getAnomalyDetection, getStreaks, getMonthCloseSummary } from "../api/insights";
+import { useQuery, useQueryClient } from "@tanstack/react-query";
+import { getMonthlySummary, getSpendingTrends, getSpendingHeatmap, getSpendingPace, suggestCategory, getHealthScore, getAnomalyDetection, getStreaks, getMonthCloseSummary, getInsightsDashboard } from "../api/insights";
 
-export function useMonthlySummary(month) {
+export function useMonthlySummary(month, { enabled = true } = {}) {
   return useQuery({
     queryKey: ["insights-summary", month],
     queryFn: () => getMonthlySummary(month),
-    enabled: !!month,
+    enabled: !!month && enabled,
     staleTime: 2 * 60 * 1000,
   });
 }
 
-export function useSpendingTrends(months = 6) {
+export function useSpendingTrends(months = 6, { enabled = true } = {}) {
   return useQuery({
     queryKey: ["insights-trends", months],
     queryFn: () => getSpendingTrends(months),
+    enabled,
     staleTime: 5 * 60 * 1000,
   });
 }
@@ -35,20 +36,20 @@ export function useSpendingPace(month) {
   });
 }
 
-export function useHealthScore(month) {
+export function useHealthScore(month, { enabled = true } = {}) {
   return useQuery({
     queryKey: ["insights-health-score", month],
     queryFn: () => getHealthScore(month),
-    enabled: !!month,
+    enabled: !!month && enabled,
     staleTime: 5 * 60 * 1000,
   });
 }
 
-export function useAnomalyDetection(month, lookback = 3) {
+export function useAnomalyDetection(month, lookback = 3, { enabled = true } = {}) {
   return useQuery({
     queryKey: ["insights-anomalies", month, lookback],
     queryFn: () => getAnomalyDetection(month, lookback),
-    enabled: !!month,
+    enabled: !!month && enabled,
     staleTime: 2 * 60 * 1000,
   });
 }
@@ -80,3 +81,36 @@ export function useCategorySuggestion(name) {
     refetchOnWindowFocus: false,
   });
 }
+
+/**
+ * Load the Insights page widgets in one request and seed each widget's own
+ * query with its result, so useMonthlySummary / useSpendingTrends /
+ * useHealthScore / useAnomalyDetection read from the cache instead of each
+ * fetching. Pass `enabled: isFetched` to those hooks; a widget the dashboard
+ * could not compute (or a later parameter change) falls back to its endpoint.
+ */
+export function useInsightsDashboard(month, { trendMonths = 6, lookback = 3 } = {}) {
+  const qc = useQueryClient();
+  return useQuery({
+    queryKey: ["insights-dashboard", month, trendMonths, lookback],
+    queryFn: async () => {
+      const data = await getInsightsDashboard(
+        month,
+        ["monthly-summary", "trends", "health-score", "anomalies"],
+        { trendMonths, lookback }
+      );
+      const seeds = {
+        "monthly-summary": ["insights-summary", month],
+        trends: ["insights-trends", trendMonths],
+        "health-score": ["insights-health-score", month],
+        anomalies: ["insights-anomalies", month, lookback],
+      };
+      Object.entries(data.widgets).forEach(([name, result]) => {
+        qc.setQueryData(seeds[name], result);
+      });
+      return data;
+    },
+    enabled: !!month,
+    staleTime: 2 * 60 * 1000,
+  });
+}